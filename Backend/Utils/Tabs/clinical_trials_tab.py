@@ -9,15 +9,22 @@ programmatic checks and Gemini LLM analysis.
 import os
 import re
 import json
+import hashlib
+import threading
 import requests
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple, Any
 from concurrent.futures import ThreadPoolExecutor
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
+try:
+    from Backend.http_sessions import get_session
+    from Backend.Utils.gemini_client import get_gemini_client, extract_json
+except ModuleNotFoundError:
+    from http_sessions import get_session
+    from Utils.gemini_client import get_gemini_client, extract_json
 
-# Initialize Vertex AI
 BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
-vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
 
 # ClinicalTrials.gov API v2 base URL
 CLINICALTRIALS_API_BASE = "https://clinicaltrials.gov/api/v2"
@@ -89,7 +96,7 @@ def fetch_trials_from_api(
             if page_token:
                 params["pageToken"] = page_token
 
-            response = requests.get(url, params=params, timeout=30)
+            response = get_session(url).get(url, params=params, timeout=30)
             response.raise_for_status()
             data = response.json()
 
@@ -1117,6 +1124,374 @@ No prior systemic therapy documented.
     return "\n".join(context_parts)
 
 
+# ============================================================================
+# Compiled keyword matching for check_disease_match / pre_filter_trial
+# ============================================================================
+
+# Conditions that should NOT match cancer patients
+NON_ONCOLOGY_CONDITIONS = (
+    # Neurological / psychiatric (never oncology)
+    "nmda", "nmdare", "encephalitis", "autoimmune encephalitis",
+    "alzheimer", "parkinson", "dementia",
+    "borderline personality", "schizophreni", "bipolar disorder",
+    "major depressive disorder", "obsessive compulsive", "ptsd",
+    "autism", "adhd", "eating disorder", "anorexia nervosa", "bulimia",
+    "transcranial magnetic stimulation",
+    # Infectious disease (not oncology unless cancer-related)
+    "hiv", "aids",
+    "covid", "coronavirus", "sars-cov",
+    "malaria", "tuberculosis",
+    # Autoimmune / inflammatory
+    "castleman", "mcd", "multicentric castleman",
+    "arthritis", "rheumatoid",
+    "lupus", "sle",
+    "crohn", "colitis", "ibd",
+    "multiple sclerosis",
+    # Metabolic
+    "diabetes", "diabetic",
+    # Cardiovascular (standalone, not as cancer comorbidity)
+    "heart failure", "cardiomyopathy",
+    # Respiratory
+    "asthma", "copd",
+    "cystic fibrosis", "pulmonary fibrosis",
+    # Other clearly non-oncology
+    "healthy volunteer",
+    "dental", "periodontal",
+    "osteoporosis", "osteoarthritis",
+    "glaucoma", "macular degeneration",
+    "chronic kidney disease", "dialysis",
+    "sleep apnea",
+    "erectile dysfunction",
+    "migraine", "fibromyalgia",
+)
+
+# Some trials study non-oncology conditions IN cancer patients
+# (e.g. "erectile function after radiotherapy")
+ONCOLOGY_TERMS = (
+    "cancer", "tumor", "tumour", "neoplasm", "oncolog", "carcinoma", "malignant",
+    "chemotherapy", "immunotherapy", "radiotherapy", "radiation", "checkpoint inhibitor",
+    "solid tumor", "metastatic", "lymphoma", "leukemia", "myeloma", "sarcoma", "melanoma",
+)
+
+CANCER_KEYWORDS = (
+    "lung", "breast", "colon", "colorectal", "rectal", "prostate",
+    "ovarian", "pancreatic", "liver", "hepatocellular", "kidney", "renal",
+    "bladder", "melanoma", "lymphoma", "leukemia", "myeloma",
+    "sarcoma", "mesothelioma", "glioblastoma", "brain", "thyroid",
+    "gastric", "stomach", "esophageal", "head and neck", "cervical",
+    "endometrial", "uterine", "testicular", "cholangiocarcinoma",
+    "bile duct", "gallbladder", "adrenal", "pleural", "peritoneal",
+)
+
+# Basket/pan-cancer terms — these trials accept any cancer type
+BASKET_TERMS = (
+    "solid tumor", "solid tumour", "advanced solid tumor", "advanced solid tumour",
+    "all solid tumor", "any solid tumor", "pan-cancer", "pan cancer",
+    "tumor agnostic", "tumour agnostic", "all comers",
+    "any advanced malignancy", "any malignant neoplasm",
+    "malignant solid neoplasm", "advanced malignant solid neoplasm",
+    "advanced malignant neoplasm",
+)
+
+
+def _keyword_pattern(terms: Tuple[str, ...]) -> "re.Pattern":
+    """Single alternation regex that finds any of the terms as a substring."""
+    return re.compile("|".join(re.escape(term) for term in sorted(set(terms), key=len, reverse=True)))
+
+
+_NON_ONCOLOGY_PATTERN = _keyword_pattern(NON_ONCOLOGY_CONDITIONS)
+_ONCOLOGY_PATTERN = _keyword_pattern(ONCOLOGY_TERMS)
+_CANCER_KEYWORD_PATTERN = _keyword_pattern(CANCER_KEYWORDS)
+_BASKET_PATTERN = _keyword_pattern(BASKET_TERMS)
+
+_FIRST_NUMBER_PATTERN = re.compile(r'(\d+)')
+_FIRST_DIGIT_PATTERN = re.compile(r'(\d)')
+
+# Common patterns: "ECOG 0-1", "ECOG ≤ 2", "ECOG performance status 0, 1, or 2"
+_ECOG_CRITERIA_PATTERNS = (
+    (re.compile(r'ecog[:\s]*(?:performance[:\s]*status)?[:\s]*[≤<=]\s*(\d)'), 'max'),  # ECOG ≤ 2
+    (re.compile(r'ecog[:\s]*(?:performance[:\s]*status)?[:\s]*(\d)\s*[-–]\s*(\d)'), 'range'),  # ECOG 0-1
+    (re.compile(r'ecog[:\s]*(?:performance[:\s]*status)?[:\s]*(\d)\s*or\s*less'), 'max'),  # ECOG 2 or less
+)
+
+
+def _keywords_in(text: str, terms: Tuple[str, ...], pattern: "re.Pattern") -> Tuple[str, ...]:
+    """The terms (in their listed order) that occur in text; one regex scan rules out most texts."""
+    if not text or pattern.search(text) is None:
+        return ()
+    return tuple(term for term in terms if term in text)
+
+
+def _first_int(pattern: "re.Pattern", value) -> Optional[int]:
+    match = pattern.search(str(value)) if value else None
+    return int(match.group(1)) if match else None
+
+
+# Bump when the layout or derivation of compute_trial_features changes, so that
+# features persisted by an older sync are recomputed instead of trusted.
+TRIAL_FEATURES_VERSION = 1
+
+_TRIAL_FEATURE_SOURCE_FIELDS = (
+    "title", "conditions", "cancer_types", "brief_summary", "eligibility_criteria_text",
+    "minimum_age", "maximum_age", "sex",
+)
+
+
+def trial_content_hash(trial: Dict) -> str:
+    """
+    Hash of the trial fields that compute_trial_features reads.
+
+    Args:
+        trial: Trial data dictionary
+
+    Returns:
+        Hex SHA-256 digest (changes whenever the derived features could)
+    """
+    source = {field: trial.get(field) for field in _TRIAL_FEATURE_SOURCE_FIELDS}
+    source["version"] = TRIAL_FEATURES_VERSION
+    payload = json.dumps(source, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def clean_criterion_text(criterion: str) -> str:
+    """Remove markdown escape sequences that break JSON parsing (e.g. \\*, 1\\.)."""
+    cleaned = criterion.replace('\\*', '*').replace('\\.', '.')
+    return re.sub(r'\\([^"\\/bfnrtu])', r'\1', cleaned)  # Remove invalid backslash escapes
+
+
+def compute_trial_features(trial: Dict) -> Dict[str, Any]:
+    """
+    Compute the compact trial features record used for patient matching.
+
+    Everything in it depends only on the trial, so it is computed once at
+    sync time (BatchEligibilityEngine.sync_trials) and stored with the trial
+    as trial["features"]; check_disease_match, pre_filter_trial and
+    process_single_trial read it instead of reparsing the trial text for
+    every patient. The record is JSON-serializable.
+
+    Args:
+        trial: Trial data dictionary
+
+    Returns:
+        Dictionary with:
+        - version, content_hash: TRIAL_FEATURES_VERSION and trial_content_hash(trial)
+        - inclusion, exclusion: parsed criteria (structured age/sex criteria first),
+          cleaned for the Gemini prompt
+        - min_age, max_age, sex: numeric age range and upper-case sex
+        - ecog_min, ecog_max: ECOG requirement from the criteria text (ecog_min is
+          only set for a range such as "ECOG 0-1")
+        - conditions: lower-cased conditions
+        - disease_tags: cancer keywords found in the conditions
+        - title_cancer_terms: cancer keywords found in the title
+        - oncology, non_oncology_terms, basket: oncology/non-oncology/basket trial markers
+    """
+    trial_conditions = trial.get("conditions", trial.get("cancer_types", [])) or []
+    trial_title = (trial.get("title") or "").lower()
+    trial_summary = (trial.get("brief_summary") or "").lower()
+    trial_text = " ".join([
+        " ".join(str(c) for c in trial_conditions if c) if trial_conditions else "",
+        trial_title,
+        trial_summary
+    ]).lower()
+    conditions_lower = [str(c).lower() for c in trial_conditions]
+
+    ecog_min = ecog_max = None
+    criteria_text = (trial.get("eligibility_criteria_text") or "").lower()
+    for pattern, pattern_type in _ECOG_CRITERIA_PATTERNS:
+        match = pattern.search(criteria_text)
+        if match:
+            if pattern_type == 'max':
+                ecog_max = int(match.group(1))
+            else:
+                ecog_min, ecog_max = int(match.group(1)), int(match.group(2))
+            break
+
+    # Parsed criteria, with structured criteria from API fields prepended to inclusion
+    parsed = parse_eligibility_criteria(trial.get("eligibility_criteria_text", ""))
+    structured_criteria = []
+    if trial.get("minimum_age"):
+        structured_criteria.append(f"Minimum age: {trial['minimum_age']}")
+    if trial.get("maximum_age"):
+        structured_criteria.append(f"Maximum age: {trial['maximum_age']}")
+    if trial.get("sex") and trial["sex"] != "ALL":
+        structured_criteria.append(f"Sex: {trial['sex']}")
+
+    return {
+        "version": TRIAL_FEATURES_VERSION,
+        "content_hash": trial_content_hash(trial),
+        "inclusion": [clean_criterion_text(c) for c in structured_criteria + parsed["inclusion"]],
+        "exclusion": [clean_criterion_text(c) for c in parsed["exclusion"]],
+        "min_age": _first_int(_FIRST_NUMBER_PATTERN, trial.get("minimum_age", "")),
+        "max_age": _first_int(_FIRST_NUMBER_PATTERN, trial.get("maximum_age", "")),
+        "sex": (trial.get("sex") or "ALL").upper(),
+        "ecog_min": ecog_min,
+        "ecog_max": ecog_max,
+        "conditions": conditions_lower,
+        "disease_tags": sorted({term for cond in conditions_lower
+                                for term in _keywords_in(cond, CANCER_KEYWORDS, _CANCER_KEYWORD_PATTERN)}),
+        "title_cancer_terms": list(_keywords_in(trial_title, CANCER_KEYWORDS, _CANCER_KEYWORD_PATTERN)),
+        "oncology": _ONCOLOGY_PATTERN.search(trial_text) is not None,
+        "non_oncology_terms": list(_keywords_in(trial_text, NON_ONCOLOGY_CONDITIONS, _NON_ONCOLOGY_PATTERN)),
+        "basket": (
+            any(_BASKET_PATTERN.search(cond) for cond in conditions_lower) or
+            _BASKET_PATTERN.search(trial_title) is not None
+        ),
+    }
+
+
+class TrialFeatureCache:
+    """
+    Per-NCT cache of compute_trial_features, shared by every patient scored against the trial.
+
+    Used for trials without (current) persisted features, e.g. trials synced
+    before features were stored, or fetched on demand by extract_clinical_trials.
+    Entries are keyed by NCT ID and validated against the trial fields they are
+    derived from, so a re-synced trial with new text is recomputed.
+    """
+
+    def __init__(self, max_entries: int = 20000):
+        """
+        Initialize trial feature cache.
+
+        Args:
+            max_entries: Trials kept (least recently used are dropped)
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def _signature(trial: Dict) -> int:
+        conditions = trial.get("conditions", trial.get("cancer_types", [])) or []
+        try:
+            conditions = tuple(conditions)
+            hash(conditions)
+        except TypeError:
+            conditions = tuple(str(c) for c in conditions)
+        return hash((
+            conditions, trial.get("title"), trial.get("brief_summary"),
+            trial.get("eligibility_criteria_text"), trial.get("minimum_age"), trial.get("maximum_age"),
+            trial.get("sex"),
+        ))
+
+    def get(self, trial: Dict) -> Dict[str, Any]:
+        """
+        Get the match features of a trial, computing them on first use.
+
+        Args:
+            trial: Trial data dictionary
+
+        Returns:
+            Feature dict (treat as read-only)
+        """
+        nct_id = trial.get("nct_id")
+        signature = self._signature(trial)
+        with self._lock:
+            cached = self._entries.get(nct_id) if nct_id else None
+            if cached is not None and cached[0] == signature:
+                self._entries.move_to_end(nct_id)
+                self._stats["hits"] += 1
+                return cached[1]
+            self._stats["misses"] += 1
+
+        features = compute_trial_features(trial)
+        if nct_id:
+            with self._lock:
+                self._entries[nct_id] = (signature, features)
+                self._entries.move_to_end(nct_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return features
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Get trial feature cache statistics."""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = f"{(stats['hits'] / total * 100):.1f}%" if total > 0 else "0.0%"
+        return stats
+
+
+# Global trial feature cache instance
+_trial_feature_cache_instance = None
+_trial_feature_cache_lock = threading.Lock()
+
+
+def get_trial_feature_cache() -> TrialFeatureCache:
+    """
+    Get global trial feature cache instance (singleton pattern).
+
+    Returns:
+        TrialFeatureCache instance
+    """
+    global _trial_feature_cache_instance
+    with _trial_feature_cache_lock:
+        if _trial_feature_cache_instance is None:
+            _trial_feature_cache_instance = TrialFeatureCache(
+                max_entries=int(os.environ.get("TRIAL_FEATURE_CACHE_SIZE", 20000))
+            )
+        return _trial_feature_cache_instance
+
+
+def drop_stale_trial_features(trials: List[Dict]) -> int:
+    """
+    Drop persisted features that no longer match their trial's content.
+
+    Call once per trial when a catalog is loaded: a trial edited after sync
+    keeps its old trial["features"] with the current version, and
+    get_trial_match_features only checks the version on the per-pair path.
+
+    Args:
+        trials: Trial dictionaries (modified in place)
+
+    Returns:
+        Number of trials whose features were dropped (recomputed on first use)
+    """
+    dropped = 0
+    for trial in trials:
+        features = trial.get("features")
+        if (isinstance(features, dict) and features.get("version") == TRIAL_FEATURES_VERSION
+                and features.get("content_hash") != trial_content_hash(trial)):
+            trial["features"] = None
+            dropped += 1
+    return dropped
+
+
+def get_trial_match_features(trial: Dict) -> Dict[str, Any]:
+    """
+    Get the trial features record (see compute_trial_features) for matching.
+
+    Uses trial["features"] as persisted at sync time when it is from the
+    current TRIAL_FEATURES_VERSION, otherwise the in-process TrialFeatureCache.
+    The content hash is checked once per catalog load by drop_stale_trial_features.
+
+    Args:
+        trial: Trial data dictionary
+
+    Returns:
+        Trial features dictionary (treat as read-only)
+    """
+    features = trial.get("features")
+    if isinstance(features, dict) and features.get("version") == TRIAL_FEATURES_VERSION:
+        return features
+    return get_trial_feature_cache().get(trial)
+
+
+@lru_cache(maxsize=1024)
+def _patient_cancer_terms(patient_cancer: str, patient_histology: str) -> Tuple[str, ...]:
+    """Cancer keywords in the patient's (lower-case) cancer type or histology."""
+    return tuple(
+        keyword for keyword in _keywords_in(f"{patient_cancer}\n{patient_histology}", CANCER_KEYWORDS, _CANCER_KEYWORD_PATTERN)
+        if keyword in patient_cancer or keyword in patient_histology
+    )
+
+
 def check_disease_match(trial: Dict, patient_data: Dict) -> Tuple[bool, str]:
     """
     Check if the patient's disease matches the trial's target condition.
@@ -1137,71 +1512,12 @@ def check_disease_match(trial: Dict, patient_data: Dict) -> Tuple[bool, str]:
     if not patient_cancer and not patient_histology:
         return True, "No patient diagnosis available for comparison"
 
-    # Get trial's target conditions
-    trial_conditions = trial.get("conditions", trial.get("cancer_types", [])) or []
-    trial_title = (trial.get("title") or "").lower()
-    trial_summary = (trial.get("brief_summary") or "").lower()
-
-    # Combine all trial condition text for matching
-    trial_text = " ".join([
-        " ".join(str(c) for c in trial_conditions if c) if trial_conditions else "",
-        trial_title,
-        trial_summary
-    ]).lower()
-
-    # List of non-cancer/oncology conditions that should NOT match cancer patients
-    non_oncology_conditions = [
-        # Neurological / psychiatric (never oncology)
-        "nmda", "nmdare", "encephalitis", "autoimmune encephalitis",
-        "alzheimer", "parkinson", "dementia",
-        "borderline personality", "schizophreni", "bipolar disorder",
-        "major depressive disorder", "obsessive compulsive", "ptsd",
-        "autism", "adhd", "eating disorder", "anorexia nervosa", "bulimia",
-        "transcranial magnetic stimulation",
-        # Infectious disease (not oncology unless cancer-related)
-        "hiv", "aids",
-        "covid", "coronavirus", "sars-cov",
-        "malaria", "tuberculosis",
-        # Autoimmune / inflammatory
-        "castleman", "mcd", "multicentric castleman",
-        "arthritis", "rheumatoid",
-        "lupus", "sle",
-        "crohn", "colitis", "ibd",
-        "multiple sclerosis",
-        # Metabolic
-        "diabetes", "diabetic",
-        # Cardiovascular (standalone, not as cancer comorbidity)
-        "heart failure", "cardiomyopathy",
-        # Respiratory
-        "asthma", "copd",
-        "cystic fibrosis", "pulmonary fibrosis",
-        # Other clearly non-oncology
-        "healthy volunteer",
-        "dental", "periodontal",
-        "osteoporosis", "osteoarthritis",
-        "glaucoma", "macular degeneration",
-        "chronic kidney disease", "dialysis",
-        "sleep apnea",
-        "erectile dysfunction",
-        "migraine", "fibromyalgia",
-    ]
+    features = get_trial_match_features(trial)
 
     # Check if trial is for a non-oncology condition
-    # Only filter if the trial has NO cancer/oncology terms (some trials study
-    # non-oncology conditions IN cancer patients, e.g., "erectile function after radiotherapy")
-    oncology_terms = [
-        "cancer", "tumor", "tumour", "neoplasm", "oncolog", "carcinoma", "malignant",
-        "chemotherapy", "immunotherapy", "radiotherapy", "radiation", "checkpoint inhibitor",
-        "solid tumor", "metastatic", "lymphoma", "leukemia", "myeloma", "sarcoma", "melanoma",
-    ]
-    trial_has_oncology = any(term in trial_text for term in oncology_terms)
-
-    for non_onc in non_oncology_conditions:
-        if non_onc in trial_text:
-            # If trial ALSO mentions cancer/oncology, it's likely studying the
-            # non-oncology condition in a cancer context — allow it
-            if trial_has_oncology:
-                continue
+    # Only filter if the trial has NO cancer/oncology terms
+    if features["non_oncology_terms"] and not features["oncology"]:
+        for non_onc in features["non_oncology_terms"]:
             # Check if patient has this specific condition
             patient_has_condition = (
                 non_onc in patient_cancer or
@@ -1212,48 +1528,16 @@ def check_disease_match(trial: Dict, patient_data: Dict) -> Tuple[bool, str]:
 
     # Check for cancer type match using STRUCTURED conditions field
     # This is more reliable than parsing free text from titles/summaries
-    patient_cancer_terms = []
-    cancer_keywords = [
-        "lung", "breast", "colon", "colorectal", "rectal", "prostate",
-        "ovarian", "pancreatic", "liver", "hepatocellular", "kidney", "renal",
-        "bladder", "melanoma", "lymphoma", "leukemia", "myeloma",
-        "sarcoma", "mesothelioma", "glioblastoma", "brain", "thyroid",
-        "gastric", "stomach", "esophageal", "head and neck", "cervical",
-        "endometrial", "uterine", "testicular", "cholangiocarcinoma",
-        "bile duct", "gallbladder", "adrenal", "pleural", "peritoneal",
-    ]
-
-    for keyword in cancer_keywords:
-        if keyword in patient_cancer or keyword in patient_histology:
-            patient_cancer_terms.append(keyword)
-
-    # Basket/pan-cancer terms — these trials accept any cancer type
-    basket_terms = [
-        "solid tumor", "solid tumour", "advanced solid tumor", "advanced solid tumour",
-        "all solid tumor", "any solid tumor", "pan-cancer", "pan cancer",
-        "tumor agnostic", "tumour agnostic", "all comers",
-        "any advanced malignancy", "any malignant neoplasm",
-        "malignant solid neoplasm", "advanced malignant solid neoplasm",
-        "advanced malignant neoplasm",
-    ]
-
-    # Use CONDITIONS field (structured data from ClinicalTrials.gov) for matching
-    trial_conditions_lower = [str(c).lower() for c in trial_conditions] if trial_conditions else []
-
-    # Check if it's a basket trial (from conditions or title)
-    is_basket_trial = any(
-        any(bt in cond for bt in basket_terms)
-        for cond in trial_conditions_lower
-    )
-    if not is_basket_trial:
-        is_basket_trial = any(term in trial_title for term in basket_terms)
+    patient_cancer_terms = _patient_cancer_terms(patient_cancer, patient_histology)
+    trial_conditions_lower = features["conditions"]
+    is_basket_trial = features["basket"]
 
     # If trial has conditions, match against them (strict, structured matching)
     if trial_conditions_lower and not is_basket_trial and patient_cancer_terms:
         # Check if ANY patient cancer term appears in ANY trial condition
+        # (disease_tags holds every cancer keyword found in the trial conditions)
         has_matching_condition = any(
-            any(patient_term in cond for patient_term in patient_cancer_terms)
-            for cond in trial_conditions_lower
+            patient_term in features["disease_tags"] for patient_term in patient_cancer_terms
         )
         # Also check if any trial condition appears in patient's cancer type
         if not has_matching_condition:
@@ -1262,17 +1546,17 @@ def check_disease_match(trial: Dict, patient_data: Dict) -> Tuple[bool, str]:
                 for cond in trial_conditions_lower
             )
         if not has_matching_condition:
-            return False, f"Trial conditions {trial_conditions_lower[:3]} don't match patient cancer [{patient_cancer}]"
+            return False, f"Trial conditions {list(trial_conditions_lower[:3])} don't match patient cancer [{patient_cancer}]"
 
     # Fallback for trials without conditions: check title only (not summary)
     if not trial_conditions_lower and not is_basket_trial and patient_cancer_terms:
-        trial_title_cancer = [kw for kw in cancer_keywords if kw in trial_title]
+        trial_title_cancer = list(features["title_cancer_terms"])
         if trial_title_cancer:
             has_matching_title = any(
                 pt in trial_title_cancer for pt in patient_cancer_terms
             )
             if not has_matching_title:
-                return False, f"Trial title targets {trial_title_cancer} but patient has {patient_cancer_terms}"
+                return False, f"Trial title targets {trial_title_cancer} but patient has {list(patient_cancer_terms)}"
 
     return True, "Disease type is compatible"
 
@@ -1296,38 +1580,25 @@ def pre_filter_trial(trial: Dict, patient_data: Dict) -> Tuple[bool, str]:
     """
     demographics = patient_data.get("demographics", {})
     comorbidities = patient_data.get("comorbidities", {})
+    features = get_trial_match_features(trial)
 
     # === AGE CHECK ===
-    patient_age_str = demographics.get("Age", "")
-    patient_age = None
-    if patient_age_str:
-        # Extract numeric age
-        age_match = re.search(r'(\d+)', str(patient_age_str))
-        if age_match:
-            patient_age = int(age_match.group(1))
+    patient_age = _first_int(_FIRST_NUMBER_PATTERN, demographics.get("Age", ""))
 
     if patient_age:
         # Check minimum age
-        min_age_str = trial.get("minimum_age", "")
-        if min_age_str:
-            min_age_match = re.search(r'(\d+)', str(min_age_str))
-            if min_age_match:
-                min_age = int(min_age_match.group(1))
-                if patient_age < min_age:
-                    return False, f"Patient age ({patient_age}) below minimum ({min_age})"
+        min_age = features["min_age"]
+        if min_age is not None and patient_age < min_age:
+            return False, f"Patient age ({patient_age}) below minimum ({min_age})"
 
         # Check maximum age
-        max_age_str = trial.get("maximum_age", "")
-        if max_age_str:
-            max_age_match = re.search(r'(\d+)', str(max_age_str))
-            if max_age_match:
-                max_age = int(max_age_match.group(1))
-                if patient_age > max_age:
-                    return False, f"Patient age ({patient_age}) above maximum ({max_age})"
+        max_age = features["max_age"]
+        if max_age is not None and patient_age > max_age:
+            return False, f"Patient age ({patient_age}) above maximum ({max_age})"
 
     # === GENDER CHECK ===
     patient_gender = (demographics.get("Gender") or demographics.get("Sex") or "").upper()
-    trial_sex = (trial.get("sex") or "ALL").upper()
+    trial_sex = features["sex"]
 
     if trial_sex and trial_sex != "ALL":
         if patient_gender:
@@ -1342,39 +1613,17 @@ def pre_filter_trial(trial: Dict, patient_data: Dict) -> Tuple[bool, str]:
 
     # === ECOG CHECK ===
     ecog_data = comorbidities.get("ecog_performance_status", {})
-    patient_ecog_str = ecog_data.get("score", "") if ecog_data else ""
-    patient_ecog = None
-
-    if patient_ecog_str:
-        ecog_match = re.search(r'(\d)', str(patient_ecog_str))
-        if ecog_match:
-            patient_ecog = int(ecog_match.group(1))
-
-    if patient_ecog is not None:
-        # Check eligibility criteria for ECOG requirements
-        criteria_text = (trial.get("eligibility_criteria_text") or "").lower()
-
-        # Common patterns: "ECOG 0-1", "ECOG ≤ 2", "ECOG performance status 0, 1, or 2"
-        ecog_patterns = [
-            (r'ecog[:\s]*(?:performance[:\s]*status)?[:\s]*[≤<=]\s*(\d)', 'max'),  # ECOG ≤ 2
-            (r'ecog[:\s]*(?:performance[:\s]*status)?[:\s]*(\d)\s*[-–]\s*(\d)', 'range'),  # ECOG 0-1
-            (r'ecog[:\s]*(?:performance[:\s]*status)?[:\s]*(\d)\s*or\s*less', 'max'),  # ECOG 2 or less
-        ]
-
-        for pattern, pattern_type in ecog_patterns:
-            match = re.search(pattern, criteria_text)
-            if match:
-                if pattern_type == 'max':
-                    max_ecog = int(match.group(1))
-                    if patient_ecog > max_ecog:
-                        return False, f"Patient ECOG ({patient_ecog}) exceeds trial max ({max_ecog})"
-                    break
-                elif pattern_type == 'range':
-                    min_ecog = int(match.group(1))
-                    max_ecog = int(match.group(2))
-                    if patient_ecog < min_ecog or patient_ecog > max_ecog:
-                        return False, f"Patient ECOG ({patient_ecog}) outside trial range ({min_ecog}-{max_ecog})"
-                    break
+    patient_ecog = _first_int(_FIRST_DIGIT_PATTERN, ecog_data.get("score", "") if ecog_data else "")
+
+    # First ECOG requirement found in the eligibility criteria (see _ECOG_CRITERIA_PATTERNS)
+    max_ecog = features["ecog_max"]
+    if patient_ecog is not None and max_ecog is not None:
+        min_ecog = features["ecog_min"]
+        if min_ecog is None:
+            if patient_ecog > max_ecog:
+                return False, f"Patient ECOG ({patient_ecog}) exceeds trial max ({max_ecog})"
+        elif patient_ecog < min_ecog or patient_ecog > max_ecog:
+            return False, f"Patient ECOG ({patient_ecog}) outside trial range ({min_ecog}-{max_ecog})"
 
     return True, "Passes pre-filter checks"
 
@@ -1660,18 +1909,70 @@ def derive_clinical_facts(patient_data: Dict) -> str:
     return header + "\n" + "\n".join(f"- {f}" for f in facts) + "\n"
 
 
-def _load_conversion_rules() -> List[Dict]:
-    """Load dynamic conversion rules from JSON config file."""
-    rules_path = os.path.join(os.path.dirname(__file__), "..", "conversion_rules.json")
+CONVERSION_RULES_PATH = os.path.join(os.path.dirname(__file__), "..", "conversion_rules.json")
+
+# Negated mention in free text: "no seizures", "denies chest pain", ...
+_NEGATION_PATTERN = re.compile(
+    r'(?:no|not|negative|denies|deny|without|absent|none|never|no evidence of)\s+(?:\w+\s+){0,3}',
+    re.IGNORECASE
+)
+_NUMBER_PATTERN = re.compile(r'(\d+)')
+_DECIMAL_PATTERN = re.compile(r'([\d.]+)')
+_ECOG_DIGIT_PATTERN = re.compile(r'(\d)')
+_FEET_INCHES_PATTERN = re.compile(r'(\d+)\s*(?:feet|foot|ft|\')\s*(\d+)\s*(?:inches|inch|in|")?')
+
+_conversion_rules_lock = threading.Lock()
+_conversion_rules_cache = {"signature": None, "rules": []}
+
+
+def _compile_conversion_rule(rule: Dict) -> Dict:
+    """Copy of an active rule with its formula compiled and search terms lowercased."""
+    compiled = dict(rule)
+    if rule.get("type") == "formula":
+        try:
+            compiled["_formula_code"] = compile(rule.get("formula", ""), f"<conversion rule {rule.get('id')}>", "eval")
+        except SyntaxError as e:
+            print(f"Warning: Invalid formula in conversion rule '{rule.get('id')}': {e}")
+            compiled["_formula_code"] = None
+    if rule.get("type") in ("data_search", "cross_reference"):
+        compiled["_search_terms"] = [term.lower() for term in rule.get("search_terms", [])]
+    return compiled
+
+
+def _read_conversion_rules(rules_path: Optional[str] = None) -> List[Dict]:
+    """Read and compile the active rules of a conversion rules file (default: CONVERSION_RULES_PATH)."""
     try:
-        with open(rules_path, "r") as f:
+        with open(rules_path or CONVERSION_RULES_PATH, "r") as f:
             data = json.load(f)
-        return [r for r in data.get("rules", []) if r.get("active", False)]
+        return [_compile_conversion_rule(r) for r in data.get("rules", []) if r.get("active", False)]
     except (FileNotFoundError, json.JSONDecodeError) as e:
         print(f"Warning: Could not load conversion rules: {e}")
         return []
 
 
+def _load_conversion_rules() -> List[Dict]:
+    """
+    Active dynamic conversion rules from conversion_rules.json, compiled.
+
+    The file is parsed once and cached; a change of its mtime or size (checked
+    with one stat per call) reloads it, so edits apply without a restart.
+    """
+    try:
+        stat = os.stat(CONVERSION_RULES_PATH)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        signature = "missing"
+
+    if _conversion_rules_cache["signature"] == signature:
+        return _conversion_rules_cache["rules"]
+
+    with _conversion_rules_lock:
+        if _conversion_rules_cache["signature"] != signature:
+            _conversion_rules_cache["rules"] = _read_conversion_rules()
+            _conversion_rules_cache["signature"] = signature
+        return _conversion_rules_cache["rules"]
+
+
 def _get_all_treatment_drugs(treatment_info: Dict) -> List[str]:
     """Extract all drug names from treatment history."""
     drugs = []
@@ -1730,7 +2031,7 @@ def _apply_dynamic_rules(patient_data: Dict, demographics: Dict, comorbidities:
     gender = (demographics.get("Gender", demographics.get("Sex", "")) or "").lower()
     age = None
     if age_str:
-        age_match = re.search(r'(\d+)', str(age_str))
+        age_match = _NUMBER_PATTERN.search(str(age_str))
         if age_match:
             age = int(age_match.group(1))
 
@@ -1742,13 +2043,13 @@ def _apply_dynamic_rules(patient_data: Dict, demographics: Dict, comorbidities:
     if height_str:
         hs = height_str.lower()
         # Handle "5 feet 6 inches", "5'6\"", "5 ft 6 in" patterns
-        ft_in_match = re.search(r'(\d+)\s*(?:feet|foot|ft|\')\s*(\d+)\s*(?:inches|inch|in|")?', hs)
+        ft_in_match = _FEET_INCHES_PATTERN.search(hs)
         if ft_in_match:
             feet = float(ft_in_match.group(1))
             inches = float(ft_in_match.group(2))
             height_cm = (feet * 12 + inches) * 2.54
         else:
-            h_match = re.search(r'([\d.]+)', hs)
+            h_match = _DECIMAL_PATTERN.search(hs)
             if h_match:
                 height_cm = float(h_match.group(1))
                 if "cm" in hs:
@@ -1760,7 +2061,7 @@ def _apply_dynamic_rules(patient_data: Dict, demographics: Dict, comorbidities:
                 elif "in" in hs or '"' in hs:
                     height_cm = height_cm * 2.54  # inches to cm
     if weight_str:
-        w_match = re.search(r'([\d.]+)', weight_str)
+        w_match = _DECIMAL_PATTERN.search(weight_str)
         if w_match:
             weight_kg = float(w_match.group(1))
             if "lb" in weight_str.lower() or "pound" in weight_str.lower():
@@ -1772,7 +2073,7 @@ def _apply_dynamic_rules(patient_data: Dict, demographics: Dict, comorbidities:
     if ecog_score in (None, '', 'NA', 'N/A', 'Unknown'):
         diag = patient_data.get("diagnosis", {}) or {}
         diag_ecog = diag.get("ecog_status", "") or ""
-        ecog_match = re.search(r'(\d)', str(diag_ecog))
+        ecog_match = _ECOG_DIGIT_PATTERN.search(str(diag_ecog))
         ecog_score = int(ecog_match.group(1)) if ecog_match else None
     else:
         try:
@@ -1830,11 +2131,10 @@ def _apply_dynamic_rules(patient_data: Dict, demographics: Dict, comorbidities:
                         has_all = False
                         break
 
-                if has_all and values:
-                    # Safe eval of simple math formula
-                    formula_str = rule.get("formula", "")
+                if has_all and values and rule.get("_formula_code") is not None:
+                    # Safe eval of simple math formula (compiled when the rules were loaded)
                     try:
-                        result = eval(formula_str, {"__builtins__": {}}, values)
+                        result = eval(rule["_formula_code"], {"__builtins__": {}}, values)
                         result = round(result, 2)
                         values["result"] = result
                         fact = rule["output_template"].format(**values)
@@ -1844,17 +2144,15 @@ def _apply_dynamic_rules(patient_data: Dict, demographics: Dict, comorbidities:
 
             elif rule_type == "data_search":
                 # Search treatment history for specific drugs
-                search_terms = rule.get("search_terms", [])
                 matches = []
-                drugs_searched = treatment_drugs
 
-                for term in search_terms:
+                for term in rule["_search_terms"]:
                     for drug in treatment_drugs:
-                        if term.lower() in drug:
+                        if term in drug:
                             matches.append(drug)
 
                 if matches:
-                    unique_matches = list(set(matches))
+                    unique_matches = list(dict.fromkeys(matches))
                     fact = rule["output_if_found"].format(matches=", ".join(unique_matches))
                 else:
                     fact = rule["output_if_not_found"].format(drugs_searched=", ".join(treatment_drugs[:10]) if treatment_drugs else "none documented")
@@ -1863,6 +2161,7 @@ def _apply_dynamic_rules(patient_data: Dict, demographics: Dict, comorbidities:
             elif rule_type == "cross_reference":
                 # Search across multiple sections
                 search_terms = rule.get("search_terms", [])
+                lowered_terms = rule["_search_terms"]
                 search_sections = rule.get("search_sections", [])
                 matches = []
 
@@ -1880,17 +2179,13 @@ def _apply_dynamic_rules(patient_data: Dict, demographics: Dict, comorbidities:
                     structured_items.extend(condition_names)
 
                 # Search structured items (these are condition/drug names — no negation)
-                for term in search_terms:
+                for term, lowered in zip(search_terms, lowered_terms):
                     for item in structured_items:
-                        if term.lower() in item:
+                        if lowered in item:
                             matches.append(term)
 
                 # For free-text sections (ROS, radiology), handle negation
                 # "No seizures" should NOT match as positive for "seizure"
-                negation_patterns = re.compile(
-                    r'(?:no|not|negative|denies|deny|without|absent|none|never|no evidence of)\s+(?:\w+\s+){0,3}',
-                    re.IGNORECASE
-                )
 
                 free_text_parts = []
                 if "radiology" in search_sections:
@@ -1905,20 +2200,20 @@ def _apply_dynamic_rules(patient_data: Dict, demographics: Dict, comorbidities:
                 for text in free_text_parts:
                     if not text:
                         continue
-                    for term in search_terms:
-                        if term.lower() in text:
+                    for term, lowered in zip(search_terms, lowered_terms):
+                        term_idx = text.find(lowered)
+                        if term_idx != -1:
                             # Check if this is a negated mention
-                            term_idx = text.find(term.lower())
                             # Look at the 80 chars before the term for negation words
                             context_before = text[max(0, term_idx - 80):term_idx].lower()
-                            if negation_patterns.search(context_before + " " + term.lower()):
+                            if _NEGATION_PATTERN.search(context_before + " " + lowered):
                                 # Negated — "no seizures" means ABSENCE, not presence
                                 pass
                             else:
                                 matches.append(term)
 
                 if matches:
-                    unique_matches = list(set(matches))
+                    unique_matches = list(dict.fromkeys(matches))
                     fact = rule["output_if_found"].format(matches=", ".join(unique_matches))
                 else:
                     fact = rule["output_if_not_found"]
@@ -1988,11 +2283,98 @@ def _apply_dynamic_rules(patient_data: Dict, demographics: Dict, comorbidities:
     return facts
 
 
+@dataclass(frozen=True)
+class PatientMatchContext:
+    """Patient-side inputs of criteria matching, shared by every trial scored for the patient."""
+    fingerprint: str
+    patient_context: str
+    derived_facts: str
+
+
+def patient_data_fingerprint(patient_data: Dict) -> str:
+    """SHA-256 of the patient document's canonical JSON (changes whenever its content does)."""
+    encoded = json.dumps(patient_data, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def build_patient_match_context(patient_data: Dict, fingerprint: Optional[str] = None) -> PatientMatchContext:
+    """
+    Run the per-patient work of criteria matching once.
+
+    build_patient_context and derive_clinical_facts only depend on the patient,
+    so a patient scored against many trials should build them once and pass
+    the result to process_single_trial.
+
+    Args:
+        patient_data: Patient data dictionary
+        fingerprint: Precomputed patient_data_fingerprint, if already known
+
+    Returns:
+        PatientMatchContext
+    """
+    return PatientMatchContext(
+        fingerprint=fingerprint or patient_data_fingerprint(patient_data),
+        patient_context=build_patient_context(patient_data),
+        derived_facts=derive_clinical_facts(patient_data),
+    )
+
+
+def _parse_criteria_results(response_text: str):
+    """
+    Parse a criteria matching response, repairing common LLM JSON mistakes.
+
+    Raises:
+        json.JSONDecodeError: If no strategy yields JSON
+    """
+    # Fast path: well-formed JSON (the common case with response_mime_type)
+    try:
+        results = extract_json(response_text)
+    except json.JSONDecodeError:
+        results = None
+
+    if results is None:
+        # Clean up response - remove markdown code blocks if present
+        if response_text.startswith("```"):
+            response_text = re.sub(r'^```(?:json)?\s*', '', response_text)
+            response_text = re.sub(r'\s*```$', '', response_text)
+
+        # Fix common JSON escape issues from LLM responses
+        # Replace unescaped backslashes that aren't valid escape sequences
+        response_text = re.sub(r'\\(?!["\\/bfnrtu])', r'\\\\', response_text)
+
+        # Try to parse JSON with multiple fallback strategies
+        for attempt in range(3):
+            try:
+                if attempt == 0:
+                    results = json.loads(response_text)
+                elif attempt == 1:
+                    # Try extracting just the array portion
+                    match = re.search(r'\[[\s\S]*\]', response_text)
+                    if match:
+                        results = json.loads(match.group())
+                elif attempt == 2:
+                    # Last resort: aggressively strip all backslashes except valid JSON escapes
+                    cleaned = re.sub(r'\\(?!["\\/bfnrtu])', '', response_text)
+                    results = json.loads(cleaned)
+                if results is not None:
+                    break
+            except json.JSONDecodeError:
+                if attempt == 2:
+                    raise
+                continue
+
+    if results is None:
+        raise json.JSONDecodeError("Failed all parse attempts", response_text, 0)
+    return results
+
+
 def match_criteria_with_gemini(
     criteria_list: List[str],
     criteria_type: str,  # "inclusion" or "exclusion"
     patient_context: str,
-    patient_data: Dict
+    patient_data: Dict,
+    derived_facts: Optional[str] = None,
+    precleaned: bool = False
 ) -> List[Dict]:
     """
     Use Gemini to match each criterion against patient data.
@@ -2005,6 +2387,9 @@ def match_criteria_with_gemini(
         criteria_type: "inclusion" or "exclusion"
         patient_context: Formatted patient context string
         patient_data: Raw patient data for additional context
+        derived_facts: derive_clinical_facts(patient_data), if already computed
+        precleaned: criteria_list is already cleaned with clean_criterion_text
+            (the trial features inclusion/exclusion lists are)
 
     Returns:
         List of criterion match results
@@ -2014,17 +2399,17 @@ def match_criteria_with_gemini(
 
     # Clean criteria text: remove markdown escape sequences that break JSON parsing
     # ClinicalTrials.gov sometimes has \*, 1\., etc. in criteria text
-    cleaned_criteria = []
-    for c in criteria_list:
-        cleaned = c.replace('\\*', '*').replace('\\.', '.')
-        cleaned = re.sub(r'\\([^"\\/bfnrtu])', r'\1', cleaned)  # Remove invalid backslash escapes
-        cleaned_criteria.append(cleaned)
+    if precleaned:
+        cleaned_criteria = criteria_list
+    else:
+        cleaned_criteria = [clean_criterion_text(c) for c in criteria_list]
 
     # Build the numbered criteria list
     criteria_numbered = "\n".join([f"{i+1}. {c}" for i, c in enumerate(cleaned_criteria)])
 
     # Compute derived clinical facts from patient data
-    derived_facts = derive_clinical_facts(patient_data)
+    if derived_facts is None:
+        derived_facts = derive_clinical_facts(patient_data)
 
     # Construct the prompt - THIS IS THE KEY PART
     # Enable clinical reasoning to infer eligibility from related data
@@ -2172,48 +2557,21 @@ Return ONLY the JSON array, no other text.
 """
 
     try:
-        model = GenerativeModel("gemini-2.5-flash")
         # Enforce JSON output to prevent parsing errors
         generation_config = {"response_mime_type": "application/json"}
-        response = model.generate_content(
-            prompt, generation_config=generation_config
-        )
+        request_kwargs = dict(model="gemini-2.5-flash", generation_config=generation_config,
+                              label="criteria_matching")
+        client = get_gemini_client()
+        response = client.generate(prompt, **request_kwargs)
         response_text = response.text.strip()
 
-        # Clean up response - remove markdown code blocks if present
-        if response_text.startswith("```"):
-            response_text = re.sub(r'^```(?:json)?\s*', '', response_text)
-            response_text = re.sub(r'\s*```$', '', response_text)
-        
-        # Fix common JSON escape issues from LLM responses
-        # Replace unescaped backslashes that aren't valid escape sequences
-        response_text = re.sub(r'\\(?!["\\/bfnrtu])', r'\\\\', response_text)
-
-        # Try to parse JSON with multiple fallback strategies
-        results = None
-        for attempt in range(3):
-            try:
-                if attempt == 0:
-                    results = json.loads(response_text)
-                elif attempt == 1:
-                    # Try extracting just the array portion
-                    match = re.search(r'\[[\s\S]*\]', response_text)
-                    if match:
-                        results = json.loads(match.group())
-                elif attempt == 2:
-                    # Last resort: aggressively strip all backslashes except valid JSON escapes
-                    cleaned = re.sub(r'\\(?!["\\/bfnrtu])', '', response_text)
-                    results = json.loads(cleaned)
-                if results is not None:
-                    break
-            except json.JSONDecodeError:
-                if attempt == 2:
-                    raise
-                continue
+        try:
+            results = _parse_criteria_results(response_text)
+        except json.JSONDecodeError:
+            # Don't serve the unparsable response from the cache on the next run
+            client.invalidate_cached_response(prompt, **request_kwargs)
+            raise
 
-        if results is None:
-            raise json.JSONDecodeError("Failed all parse attempts", response_text, 0)
-        
         # Add criterion type and original text to each result
         for i, r in enumerate(results):
             r["criterion_type"] = criteria_type
@@ -2576,19 +2934,12 @@ Return ONLY the JSON array, no other text.
 """
 
     try:
-        model = GenerativeModel("gemini-2.5-flash")
-        generation_config = {"response_mime_type": "application/json"}
-        response = model.generate_content(
-            prompt, generation_config=generation_config
+        classifications = get_gemini_client().generate_json(
+            prompt,
+            model="gemini-2.5-flash",
+            generation_config={"response_mime_type": "application/json"},
+            label="criteria_classification"
         )
-        response_text = response.text.strip()
-
-        # Clean up response
-        if response_text.startswith("```"):
-            response_text = re.sub(r'^```(?:json)?\s*', '', response_text)
-            response_text = re.sub(r'\s*```$', '', response_text)
-
-        classifications = json.loads(response_text)
 
         # Apply classifications back to the original criteria
         for cls in classifications:
@@ -2803,114 +3154,131 @@ def calculate_eligibility_score(criteria_results: List[Dict]) -> Dict:
     }
 
 
-def process_single_trial(trial: Dict, patient_context: str, patient_data: Dict) -> Dict:
+def prefilter_rejection_result(trial: Dict, patient_data: Dict, check: str, reason: str) -> Dict:
+    """
+    NOT_ELIGIBLE result (same shape as process_single_trial) for a failed prefilter check.
+
+    Args:
+        trial: Trial data dictionary
+        patient_data: Patient data dictionary
+        check: "disease" (check_disease_match) or "prefilter" (pre_filter_trial)
+        reason: Reason returned by the failed check
+
+    Returns:
+        Eligibility result
+    """
+    if check == "disease":
+        criterion = {
+            "criterion_number": 1,
+            "criterion_text": "Disease type must match trial target",
+            "patient_value": patient_data.get("diagnosis", {}).get("cancer_type", "Unknown"),
+            "met": False,
+            "confidence": "high",
+            "explanation": reason,
+            "criterion_type": "inclusion"
+        }
+    else:
+        criterion = {
+            "criterion_number": 1,
+            "criterion_text": reason.split(",")[0] if "," in reason else reason,
+            "patient_value": reason,
+            "met": False,
+            "confidence": "high",
+            "explanation": reason,
+            "criterion_type": "inclusion"
+        }
+    return {
+        "nct_id": trial["nct_id"],
+        "title": trial["title"],
+        "phase": trial.get("phase", ""),
+        "status": trial.get("status", ""),
+        "study_type": trial.get("study_type", ""),
+        "brief_summary": trial.get("brief_summary", "")[:300] + "..." if len(trial.get("brief_summary", "")) > 300 else trial.get("brief_summary", ""),
+        "eligibility": {
+            "status": "NOT_ELIGIBLE",
+            "status_reason": reason,
+            "percentage": 0,
+            "inclusion": {"met": 0, "not_met": 1, "unknown": 0, "total": 1},
+            "exclusion": {"clear": 0, "violated": 0, "unknown": 0, "total": 0}
+        },
+        "criteria_results": {
+            "inclusion": [criterion],
+            "exclusion": []
+        },
+        "contact": trial.get("contact", {}),
+        "locations": trial.get("locations", [])
+    }
+
+
+def prefilter_trial_result(trial: Dict, patient_data: Dict) -> Optional[Dict]:
+    """
+    Run the disease match and pre-filter checks for a patient-trial pair.
+
+    Args:
+        trial: Trial data dictionary
+        patient_data: Patient data dictionary
+
+    Returns:
+        NOT_ELIGIBLE result (same shape as process_single_trial) if either check
+        rejects the trial, None if it needs full criteria matching
+    """
+    # CRITICAL: First check if patient's disease matches trial's target condition
+    # (avoids wasting LLM calls on irrelevant trials)
+    disease_matches, disease_reason = check_disease_match(trial, patient_data)
+    if not disease_matches:
+        return prefilter_rejection_result(trial, patient_data, "disease", disease_reason)
+
+    # QUICK PRE-FILTER: Check age, gender, ECOG before expensive LLM calls
+    passes_prefilter, prefilter_reason = pre_filter_trial(trial, patient_data)
+    if not passes_prefilter:
+        return prefilter_rejection_result(trial, patient_data, "prefilter", prefilter_reason)
+
+    return None
+
+
+def process_single_trial(trial: Dict, patient_context: str, patient_data: Dict,
+                         derived_facts: Optional[str] = None, prefiltered: bool = False) -> Dict:
     """
     Process a single trial for eligibility matching.
     Helper function for parallel execution.
+
+    derived_facts (from derive_clinical_facts or build_patient_match_context)
+    is computed here when not given. prefiltered=True skips the disease match
+    and pre-filter checks (the trial already passed them, e.g. in
+    TrialPrefilterIndex).
     """
     try:
-        # CRITICAL: First check if patient's disease matches trial's target condition
-        disease_matches, disease_reason = check_disease_match(trial, patient_data)
-
-        if not disease_matches:
-            # Patient's disease doesn't match trial - return NOT_ELIGIBLE immediately
-            # This avoids wasting LLM calls on irrelevant trials
-            return {
-                "nct_id": trial["nct_id"],
-                "title": trial["title"],
-                "phase": trial.get("phase", ""),
-                "status": trial.get("status", ""),
-                "study_type": trial.get("study_type", ""),
-                "brief_summary": trial.get("brief_summary", "")[:300] + "..." if len(trial.get("brief_summary", "")) > 300 else trial.get("brief_summary", ""),
-                "eligibility": {
-                    "status": "NOT_ELIGIBLE",
-                    "status_reason": disease_reason,
-                    "percentage": 0,
-                    "inclusion": {"met": 0, "not_met": 1, "unknown": 0, "total": 1},
-                    "exclusion": {"clear": 0, "violated": 0, "unknown": 0, "total": 0}
-                },
-                "criteria_results": {
-                    "inclusion": [{
-                        "criterion_number": 1,
-                        "criterion_text": "Disease type must match trial target",
-                        "patient_value": patient_data.get("diagnosis", {}).get("cancer_type", "Unknown"),
-                        "met": False,
-                        "confidence": "high",
-                        "explanation": disease_reason,
-                        "criterion_type": "inclusion"
-                    }],
-                    "exclusion": []
-                },
-                "contact": trial.get("contact", {}),
-                "locations": trial.get("locations", [])
-            }
+        # Disease match and pre-filter: NOT_ELIGIBLE without any LLM calls
+        if not prefiltered:
+            rejection = prefilter_trial_result(trial, patient_data)
+            if rejection is not None:
+                return rejection
 
-        # QUICK PRE-FILTER: Check age, gender, ECOG before expensive LLM calls
-        passes_prefilter, prefilter_reason = pre_filter_trial(trial, patient_data)
-
-        if not passes_prefilter:
-            # Patient fails basic eligibility criteria - return NOT_ELIGIBLE immediately
-            # This saves LLM API calls and speeds up processing significantly
-            return {
-                "nct_id": trial["nct_id"],
-                "title": trial["title"],
-                "phase": trial.get("phase", ""),
-                "status": trial.get("status", ""),
-                "study_type": trial.get("study_type", ""),
-                "brief_summary": trial.get("brief_summary", "")[:300] + "..." if len(trial.get("brief_summary", "")) > 300 else trial.get("brief_summary", ""),
-                "eligibility": {
-                    "status": "NOT_ELIGIBLE",
-                    "status_reason": prefilter_reason,
-                    "percentage": 0,
-                    "inclusion": {"met": 0, "not_met": 1, "unknown": 0, "total": 1},
-                    "exclusion": {"clear": 0, "violated": 0, "unknown": 0, "total": 0}
-                },
-                "criteria_results": {
-                    "inclusion": [{
-                        "criterion_number": 1,
-                        "criterion_text": prefilter_reason.split(",")[0] if "," in prefilter_reason else prefilter_reason,
-                        "patient_value": prefilter_reason,
-                        "met": False,
-                        "confidence": "high",
-                        "explanation": prefilter_reason,
-                        "criterion_type": "inclusion"
-                    }],
-                    "exclusion": []
-                },
-                "contact": trial.get("contact", {}),
-                "locations": trial.get("locations", [])
-            }
+        # Parsed eligibility criteria (structured age/sex criteria first), from the trial features
+        features = get_trial_match_features(trial)
+
+        # Both criteria lists are matched against the same derived facts
+        if derived_facts is None:
+            derived_facts = derive_clinical_facts(patient_data)
 
-        # Parse eligibility criteria
-        criteria_text = trial.get("eligibility_criteria_text", "")
-        parsed = parse_eligibility_criteria(criteria_text)
-        
-        # Add structured criteria from API fields
-        structured_criteria = []
-        if trial.get("minimum_age"):
-            structured_criteria.append(f"Minimum age: {trial['minimum_age']}")
-        if trial.get("maximum_age"):
-            structured_criteria.append(f"Maximum age: {trial['maximum_age']}")
-        if trial.get("sex") and trial["sex"] != "ALL":
-            structured_criteria.append(f"Sex: {trial['sex']}")
-        
-        # Prepend structured criteria to inclusion list
-        parsed["inclusion"] = structured_criteria + parsed["inclusion"]
-        
         # Match inclusion criteria
         inclusion_results = match_criteria_with_gemini(
-            parsed["inclusion"],
+            features["inclusion"],
             "inclusion",
             patient_context,
-            patient_data
+            patient_data,
+            derived_facts,
+            precleaned=True
         )
         
         # Match exclusion criteria
         exclusion_results = match_criteria_with_gemini(
-            parsed["exclusion"],
+            features["exclusion"],
             "exclusion",
             patient_context,
-            patient_data
+            patient_data,
+            derived_facts,
+            precleaned=True
         )
         
         # Combine all criteria results
@@ -3229,8 +3597,8 @@ def extract_clinical_trials(patient_data: Dict, max_trials_per_query: int = 250,
             "trials": []
         }
 
-    # Build patient context for LLM
-    patient_context = build_patient_context(patient_data)
+    # Build patient context and derived facts for LLM (once for all trials)
+    match_context = build_patient_match_context(patient_data)
 
     print(f"\n=== ELIGIBILITY ANALYSIS ===")
     print(f"Analyzing {len(all_trials)} unique trials with Gemini LLM...")
@@ -3241,7 +3609,7 @@ def extract_clinical_trials(patient_data: Dict, max_trials_per_query: int = 250,
     with ThreadPoolExecutor(max_workers=10) as executor:
         # Map returns results in order
         results = list(executor.map(
-            lambda t: process_single_trial(t, patient_context, patient_data),
+            lambda t: process_single_trial(t, match_context.patient_context, patient_data, match_context.derived_facts),
             all_trials
         ))
 
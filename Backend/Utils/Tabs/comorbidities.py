@@ -14,11 +14,7 @@ Extracted comorbidities and functional data containing:
 """
 import sys
 import os
-import json
 import re
-import requests
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
 from datetime import datetime
 
 # Add Backend to path for imports
@@ -27,14 +23,13 @@ if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
 from Backend.Utils.Tabs.llmparser import llmresponsedetailed
+from Backend.Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+from Backend.http_sessions import get_session
 from Backend.Utils.logger_config import setup_logger
 
 # Setup logger
 logger = setup_logger(__name__)
 
-# Initialize Vertex AI
-vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
-
 
 def extract_comorbidities_with_gemini(pdf_input):
     """
@@ -70,14 +65,14 @@ def extract_comorbidities_with_gemini(pdf_input):
             else:
                 raise ValueError("Could not extract file ID from Google Drive URL")
 
-            response = requests.get(download_url, allow_redirects=True)
+            response = get_session(download_url).get(download_url, allow_redirects=True)
             response.raise_for_status()
             pdf_bytes = response.content
             logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
         elif pdf_input.startswith(('http://', 'https://')):
             # Handle other URLs
             logger.info(f"📤 Downloading PDF from URL: {pdf_input[:80]}...")
-            response = requests.get(pdf_input)
+            response = get_session(pdf_input).get(pdf_input)
             if response.status_code != 200:
                 raise ValueError(f"Failed to download PDF from URL. Status code: {response.status_code}")
             pdf_bytes = response.content
@@ -213,51 +208,21 @@ Just the JSON object following the schema above.
 
     logger.info("🤖 Generating extraction with Vertex AI Gemini...")
 
-    # Initialize the model
-    model = GenerativeModel("gemini-2.5-pro")
-
-    # Wrap PDF bytes in Part object
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
-
     # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, GEMINI_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            GEMINI_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="comorbidities"
         )
         logger.info("✅ Gemini extraction complete")
-    except Exception as e:
-        logger.error(f"❌ API request failed: {e}")
-        raise
-
-    # Parse JSON response
-    try:
-        # Extract text from the response
-        response_text = response.text.strip()
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
-
-        # Use regex to extract JSON from markdown code blocks
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
-
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🧹 Cleaned markdown code blocks from response using regex")
-        else:
-            response_text = response_text.strip()
-            logger.info("ℹ️  No markdown code blocks found, using response as is")
-
-        # Parse JSON
-        extracted_data = json.loads(response_text)
-        logger.info("✅ JSON parsed successfully")
-        return extracted_data
-
-    except (json.JSONDecodeError, AttributeError) as e:
+    except GeminiResponseParseError as e:
         logger.error(f"❌ Failed to parse Gemini response: {e}")
-        logger.error(f"Raw response text (first 500 chars): {response_text[:500] if 'response_text' in locals() else 'N/A'}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
 
         # Save the raw response for debugging
         error_file = f"gemini_error_comorbidities_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
@@ -265,9 +230,15 @@ Just the JSON object following the schema above.
             f.write("="*80 + "\n")
             f.write("GEMINI RAW RESPONSE - COMORBIDITIES\n")
             f.write("="*80 + "\n\n")
-            f.write(str(response))
+            f.write(str(e.response))
         logger.error(f"💾 Saved raw response to: {error_file}")
         raise
+    except Exception as e:
+        logger.error(f"❌ API request failed: {e}")
+        raise
+
+    logger.info("✅ JSON parsed successfully")
+    return extracted_data
 
 
 def extract_comorbidities_status(pdf_bytes=None, pdf_url=None, use_gemini=True):
@@ -315,14 +286,14 @@ def extract_comorbidities_status(pdf_bytes=None, pdf_url=None, use_gemini=True):
                 else:
                     raise ValueError("Could not extract file ID from Google Drive URL")
 
-                response = requests.get(download_url, allow_redirects=True)
+                response = get_session(download_url).get(download_url, allow_redirects=True)
                 response.raise_for_status()
                 pdf_bytes = response.content
                 logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
                 comorbidities_data = extract_comorbidities_with_gemini(pdf_bytes)
             else:
                 download_url = pdf_url
-                response = requests.get(download_url, allow_redirects=True)
+                response = get_session(download_url).get(download_url, allow_redirects=True)
                 response.raise_for_status()
                 pdf_bytes = response.content
                 logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
@@ -2,10 +2,7 @@ import sys
 import os
 import json
 import re
-import requests
-import vertexai
 from datetime import datetime
-from vertexai.generative_models import GenerativeModel, Part
 
 # Add Backend to path for imports
 BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
@@ -13,14 +10,19 @@ if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
 from Utils.Tabs.llmparser import llmresponsedetailed
+try:
+    from Backend.Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from Backend.http_sessions import get_session
+    from Backend.Utils.combined_extraction import ExtractionSection, extract_sections_combined, get_extraction_mode, record_split_run
+except ModuleNotFoundError:
+    from Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from http_sessions import get_session
+    from Utils.combined_extraction import ExtractionSection, extract_sections_combined, get_extraction_mode, record_split_run
 from Utils.logger_config import setup_logger, log_extraction_start, log_extraction_complete, log_extraction_output
 
 # Setup logger
 logger = setup_logger(__name__)
 
-# Initialize Vertex AI
-vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
-
 
 ## What all is to be extracted from the relevant documents for the diagnosis tab
 """1. Header Details (Patient Summary)
@@ -48,55 +50,13 @@ duration_since_progression: 6 months since progression to metastatic disease
 pdf_url = ""
 
 
-def extract_diagnosis_header_with_gemini(pdf_input):
+def build_diagnosis_header_prompt():
     """
-    Extract diagnosis header data using Vertex AI Gemini SDK.
-
-    Args:
-        pdf_input: Either bytes (PDF content) or URL/path to the PDF file
+    Build the diagnosis header extraction prompt.
 
     Returns:
-        Dictionary containing extracted diagnosis header data
+        Prompt string (shared by the split and combined extraction modes)
     """
-    # Handle both bytes and file path/URL inputs
-    if isinstance(pdf_input, bytes):
-        logger.info(f"📤 Using PDF bytes ({len(pdf_input)} bytes)")
-        pdf_bytes = pdf_input
-    elif isinstance(pdf_input, str):
-        if pdf_input.startswith("/api/documents/"):
-            # Handle Firebase Storage paths
-            logger.info(f"📥 Downloading PDF from Firebase Storage: {pdf_input}")
-            try:
-                from Backend.storage_uploader import download_pdf_bytes_from_url
-            except ModuleNotFoundError:
-                from storage_uploader import download_pdf_bytes_from_url
-            pdf_bytes = download_pdf_bytes_from_url(pdf_input)
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        elif pdf_input.startswith("http"):
-            # Handle Google Drive URLs
-            logger.info(f"📥 Downloading PDF from URL: {pdf_input}")
-            if "drive.google.com" in pdf_input:
-                match = re.search(r'/file/d/([^/]+)', pdf_input)
-                if match:
-                    file_id = match.group(1)
-                    download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-                else:
-                    raise ValueError("Could not extract file ID from Google Drive URL")
-            else:
-                download_url = pdf_input
-
-            response = requests.get(download_url, allow_redirects=True)
-            response.raise_for_status()
-            pdf_bytes = response.content
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        else:
-            # Assume it's a file path
-            logger.info(f"📤 Reading PDF from path: {pdf_input}")
-            with open(pdf_input, "rb") as f:
-                pdf_bytes = f.read()
-    else:
-        raise ValueError(f"Invalid pdf_input type: {type(pdf_input)}. Expected bytes or string.")
-
     # REFINED INSTRUCTIONS
     # Build prompt from extraction instructions and description
 
@@ -188,64 +148,18 @@ def extract_diagnosis_header_with_gemini(pdf_input):
     3. Before outputting JSON, verify each staging field follows these rules
     4. Return valid JSON only.
     """
+    return GEMINI_PROMPT
 
-    logger.info("🤖 Generating diagnosis header extraction with Vertex AI Gemini...")
-
-    # Initialize the model
-    model = GenerativeModel("gemini-2.5-pro")
 
-    # Wrap PDF bytes in Part object
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
-
-    # Make API request
-    try:
-        response = model.generate_content(
-            [doc_part, GEMINI_PROMPT],
-            generation_config={
-                "temperature": 0,
-                "top_p": 1
-            }
-        )
-        logger.info("✅ Gemini diagnosis header extraction complete")
-    except Exception as e:
-        logger.error(f"❌ API request failed: {e}")
-        raise
-
-    # Parse JSON response
-    try:
-        response_text = response.text.strip()
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
-
-        # Use regex to extract JSON from markdown code blocks
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
-
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🧹 Cleaned markdown code blocks from response using regex")
-        else:
-            response_text = response_text.strip()
-            logger.info("ℹ️  No markdown code blocks found, using response as is")
-
-        extracted_data = json.loads(response_text)
-        logger.info("✅ JSON parsed successfully")
-        return extracted_data
-
-    except (json.JSONDecodeError, AttributeError) as e:
-        logger.error(f"❌ Failed to parse Gemini response: {e}")
-        logger.error(f"Raw response text (first 500 chars): {response_text[:500] if 'response_text' in locals() else 'N/A'}")
-        raise
-
-
-def extract_diagnosis_evolution_with_gemini(pdf_input):
+def extract_diagnosis_header_with_gemini(pdf_input):
     """
-    Extract diagnosis evolution timeline data using Vertex AI Gemini SDK.
+    Extract diagnosis header data using Vertex AI Gemini SDK.
 
     Args:
         pdf_input: Either bytes (PDF content) or URL/path to the PDF file
 
     Returns:
-        Dictionary containing extracted diagnosis evolution timeline data
+        Dictionary containing extracted diagnosis header data
     """
     # Handle both bytes and file path/URL inputs
     if isinstance(pdf_input, bytes):
@@ -262,6 +176,7 @@ def extract_diagnosis_evolution_with_gemini(pdf_input):
             pdf_bytes = download_pdf_bytes_from_url(pdf_input)
             logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
         elif pdf_input.startswith("http"):
+            # Handle Google Drive URLs
             logger.info(f"📥 Downloading PDF from URL: {pdf_input}")
             if "drive.google.com" in pdf_input:
                 match = re.search(r'/file/d/([^/]+)', pdf_input)
@@ -273,17 +188,53 @@ def extract_diagnosis_evolution_with_gemini(pdf_input):
             else:
                 download_url = pdf_input
 
-            response = requests.get(download_url, allow_redirects=True)
+            response = get_session(download_url).get(download_url, allow_redirects=True)
             response.raise_for_status()
             pdf_bytes = response.content
             logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
         else:
+            # Assume it's a file path
             logger.info(f"📤 Reading PDF from path: {pdf_input}")
             with open(pdf_input, "rb") as f:
                 pdf_bytes = f.read()
     else:
         raise ValueError(f"Invalid pdf_input type: {type(pdf_input)}. Expected bytes or string.")
 
+    GEMINI_PROMPT = build_diagnosis_header_prompt()
+
+    logger.info("🤖 Generating diagnosis header extraction with Vertex AI Gemini...")
+
+    # Make API request
+    try:
+        extracted_data = get_gemini_client().generate_json(
+            GEMINI_PROMPT,
+            pdf_bytes=pdf_bytes,
+            generation_config={
+                "temperature": 0,
+                "top_p": 1
+            },
+            label="diagnosis_header"
+        )
+        logger.info("✅ Gemini diagnosis header extraction complete")
+    except GeminiResponseParseError as e:
+        logger.error(f"❌ Failed to parse Gemini response: {e}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
+        raise
+    except Exception as e:
+        logger.error(f"❌ API request failed: {e}")
+        raise
+
+    logger.info("✅ JSON parsed successfully")
+    return extracted_data
+
+
+def build_diagnosis_evolution_prompt():
+    """
+    Build the diagnosis evolution timeline extraction prompt.
+
+    Returns:
+        Prompt string (shared by the split and combined extraction modes)
+    """
     extraction_instruction = """
     Extract a Treatment and Stage Evolution Timeline for the patient.
 
@@ -884,54 +835,101 @@ No markdown code blocks.
 No commentary.
 Just the JSON object following the schema above.
 """
+    return GEMINI_PROMPT
 
-    logger.info("🤖 Generating diagnosis evolution timeline extraction with Vertex AI Gemini...")
 
-    model = GenerativeModel("gemini-2.5-pro")
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
+def extract_diagnosis_evolution_with_gemini(pdf_input):
+    """
+    Extract diagnosis evolution timeline data using Vertex AI Gemini SDK.
+
+    Args:
+        pdf_input: Either bytes (PDF content) or URL/path to the PDF file
+
+    Returns:
+        Dictionary containing extracted diagnosis evolution timeline data
+    """
+    # Handle both bytes and file path/URL inputs
+    if isinstance(pdf_input, bytes):
+        logger.info(f"📤 Using PDF bytes ({len(pdf_input)} bytes)")
+        pdf_bytes = pdf_input
+    elif isinstance(pdf_input, str):
+        if pdf_input.startswith("/api/documents/"):
+            # Handle Firebase Storage paths
+            logger.info(f"📥 Downloading PDF from Firebase Storage: {pdf_input}")
+            try:
+                from Backend.storage_uploader import download_pdf_bytes_from_url
+            except ModuleNotFoundError:
+                from storage_uploader import download_pdf_bytes_from_url
+            pdf_bytes = download_pdf_bytes_from_url(pdf_input)
+            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
+        elif pdf_input.startswith("http"):
+            logger.info(f"📥 Downloading PDF from URL: {pdf_input}")
+            if "drive.google.com" in pdf_input:
+                match = re.search(r'/file/d/([^/]+)', pdf_input)
+                if match:
+                    file_id = match.group(1)
+                    download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
+                else:
+                    raise ValueError("Could not extract file ID from Google Drive URL")
+            else:
+                download_url = pdf_input
+
+            response = get_session(download_url).get(download_url, allow_redirects=True)
+            response.raise_for_status()
+            pdf_bytes = response.content
+            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
+        else:
+            logger.info(f"📤 Reading PDF from path: {pdf_input}")
+            with open(pdf_input, "rb") as f:
+                pdf_bytes = f.read()
+    else:
+        raise ValueError(f"Invalid pdf_input type: {type(pdf_input)}. Expected bytes or string.")
 
+    GEMINI_PROMPT = build_diagnosis_evolution_prompt()
+
+    logger.info("🤖 Generating diagnosis evolution timeline extraction with Vertex AI Gemini...")
+
+    # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, GEMINI_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            GEMINI_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="diagnosis_evolution"
         )
         logger.info("✅ Gemini diagnosis evolution extraction complete")
+    except GeminiResponseParseError as e:
+        logger.error(f"❌ Failed to parse Gemini response: {e}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
+        raise
     except Exception as e:
         logger.error(f"❌ API request failed: {e}")
         raise
 
-    try:
-        response_text = response.text.strip()
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
+    logger.info("✅ JSON parsed successfully")
 
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
+    return normalize_evolution_timeline(extracted_data)
 
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🧹 Cleaned markdown code blocks from response using regex")
-        else:
-            response_text = response_text.strip()
-            logger.info("ℹ️  No markdown code blocks found, using response as is")
 
-        extracted_data = json.loads(response_text)
-        logger.info("✅ JSON parsed successfully")
+def normalize_evolution_timeline(extracted_data):
+    """
+    Post-process date labels in an evolution timeline extraction to normalize formats.
 
-        # Post-process date labels to normalize formats
-        if 'timeline' in extracted_data and isinstance(extracted_data['timeline'], list):
-            for event in extracted_data['timeline']:
-                if 'date_label' in event and event['date_label']:
-                    event['date_label'] = normalize_date_label(event['date_label'])
+    Args:
+        extracted_data: Parsed diagnosis evolution response
 
-        return extracted_data
+    Returns:
+        The same dictionary with normalized date labels
+    """
+    if 'timeline' in extracted_data and isinstance(extracted_data['timeline'], list):
+        for event in extracted_data['timeline']:
+            if 'date_label' in event and event['date_label']:
+                event['date_label'] = normalize_date_label(event['date_label'])
 
-    except (json.JSONDecodeError, AttributeError) as e:
-        logger.error(f"❌ Failed to parse Gemini response: {e}")
-        logger.error(f"Raw response text (first 500 chars): {response_text[:500] if 'response_text' in locals() else 'N/A'}")
-        raise
+    return extracted_data
 
 
 def normalize_date_label(date_str):
@@ -1151,52 +1149,13 @@ def recalculate_durations(diagnosis_footer_data):
     return diagnosis_footer_data
 
 
-def extract_diagnosis_footer_with_gemini(pdf_input):
+def build_diagnosis_footer_prompt():
     """
-    Extract diagnosis footer data using Vertex AI Gemini SDK.
-
-    Args:
-        pdf_input: Either bytes (PDF content) or URL/path to the PDF file
+    Build the diagnosis footer extraction prompt.
 
     Returns:
-        Dictionary containing extracted diagnosis footer data
+        Prompt string (shared by the split and combined extraction modes)
     """
-    if isinstance(pdf_input, bytes):
-        logger.info(f"📤 Using PDF bytes ({len(pdf_input)} bytes)")
-        pdf_bytes = pdf_input
-    elif isinstance(pdf_input, str):
-        if pdf_input.startswith("/api/documents/"):
-            # Handle Firebase Storage paths
-            logger.info(f"📥 Downloading PDF from Firebase Storage: {pdf_input}")
-            try:
-                from Backend.storage_uploader import download_pdf_bytes_from_url
-            except ModuleNotFoundError:
-                from storage_uploader import download_pdf_bytes_from_url
-            pdf_bytes = download_pdf_bytes_from_url(pdf_input)
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        elif pdf_input.startswith("http"):
-            logger.info(f"📥 Downloading PDF from URL: {pdf_input}")
-            if "drive.google.com" in pdf_input:
-                match = re.search(r'/file/d/([^/]+)', pdf_input)
-                if match:
-                    file_id = match.group(1)
-                    download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-                else:
-                    raise ValueError("Could not extract file ID from Google Drive URL")
-            else:
-                download_url = pdf_input
-
-            response = requests.get(download_url, allow_redirects=True)
-            response.raise_for_status()
-            pdf_bytes = response.content
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        else:
-            logger.info(f"📤 Reading PDF from path: {pdf_input}")
-            with open(pdf_input, "rb") as f:
-                pdf_bytes = f.read()
-    else:
-        raise ValueError(f"Invalid pdf_input type: {type(pdf_input)}. Expected bytes or string.")
-
     extraction_instruction = ("Extract temporal information about the patient's cancer diagnosis, disease progression, and relapse/recurrence. "
                                     "1. DIAGNOSIS DATE: Identify the date of the first cancer diagnosis and calculate the total duration from that date to the document signature date or current date mentioned in the document. "
                                     "2. PROGRESSION DATE: Identify the date of the most recent disease progression event (e.g., new metastases at NEW UNTREATED sites, disease advancement without prior remission, upstaging) and calculate the duration from that progression date to the document signature date. "
@@ -1288,60 +1247,121 @@ No markdown code blocks.
 No commentary.
 Just the JSON object following the schema above.
 """
+    return GEMINI_PROMPT
 
-    logger.info("🤖 Generating diagnosis footer extraction with Vertex AI Gemini...")
 
-    model = GenerativeModel("gemini-2.5-pro")
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
+def extract_diagnosis_footer_with_gemini(pdf_input):
+    """
+    Extract diagnosis footer data using Vertex AI Gemini SDK.
+
+    Args:
+        pdf_input: Either bytes (PDF content) or URL/path to the PDF file
+
+    Returns:
+        Dictionary containing extracted diagnosis footer data
+    """
+    if isinstance(pdf_input, bytes):
+        logger.info(f"📤 Using PDF bytes ({len(pdf_input)} bytes)")
+        pdf_bytes = pdf_input
+    elif isinstance(pdf_input, str):
+        if pdf_input.startswith("/api/documents/"):
+            # Handle Firebase Storage paths
+            logger.info(f"📥 Downloading PDF from Firebase Storage: {pdf_input}")
+            try:
+                from Backend.storage_uploader import download_pdf_bytes_from_url
+            except ModuleNotFoundError:
+                from storage_uploader import download_pdf_bytes_from_url
+            pdf_bytes = download_pdf_bytes_from_url(pdf_input)
+            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
+        elif pdf_input.startswith("http"):
+            logger.info(f"📥 Downloading PDF from URL: {pdf_input}")
+            if "drive.google.com" in pdf_input:
+                match = re.search(r'/file/d/([^/]+)', pdf_input)
+                if match:
+                    file_id = match.group(1)
+                    download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
+                else:
+                    raise ValueError("Could not extract file ID from Google Drive URL")
+            else:
+                download_url = pdf_input
+
+            response = get_session(download_url).get(download_url, allow_redirects=True)
+            response.raise_for_status()
+            pdf_bytes = response.content
+            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
+        else:
+            logger.info(f"📤 Reading PDF from path: {pdf_input}")
+            with open(pdf_input, "rb") as f:
+                pdf_bytes = f.read()
+    else:
+        raise ValueError(f"Invalid pdf_input type: {type(pdf_input)}. Expected bytes or string.")
+
+    GEMINI_PROMPT = build_diagnosis_footer_prompt()
+
+    logger.info("🤖 Generating diagnosis footer extraction with Vertex AI Gemini...")
 
+    # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, GEMINI_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            GEMINI_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="diagnosis_footer"
         )
         logger.info("✅ Gemini diagnosis footer extraction complete")
+    except GeminiResponseParseError as e:
+        logger.error(f"❌ Failed to parse Gemini response: {e}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
+        raise
     except Exception as e:
         logger.error(f"❌ API request failed: {e}")
         raise
 
-    try:
-        response_text = response.text.strip()
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
-
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
-
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🧹 Cleaned markdown code blocks from response using regex")
-        else:
-            response_text = response_text.strip()
-            logger.info("ℹ️  No markdown code blocks found, using response as is")
+    logger.info("✅ JSON parsed successfully")
 
-        extracted_data = json.loads(response_text)
-        logger.info("✅ JSON parsed successfully")
+    # Recalculate durations based on actual dates and today's date
+    extracted_data = recalculate_durations(extracted_data)
 
-        # Recalculate durations based on actual dates and today's date
-        extracted_data = recalculate_durations(extracted_data)
+    return extracted_data
 
-        return extracted_data
 
-    except (json.JSONDecodeError, AttributeError) as e:
-        logger.error(f"❌ Failed to parse Gemini response: {e}")
-        logger.error(f"Raw response text (first 500 chars): {response_text[:500] if 'response_text' in locals() else 'N/A'}")
-        raise
+def extract_diagnosis_combined(pdf_bytes):
+    """
+    Extract diagnosis header, evolution timeline and footer with one Gemini call.
 
+    Args:
+        pdf_bytes: PDF content
 
-def diagnosis_extraction(pdf_input, use_gemini=True):
+    Returns:
+        Tuple of (diagnosis_header, diagnosis_evolution_timeline, diagnosis_footer),
+        or None if the combined response failed validation
+    """
+    results = extract_sections_combined("diagnosis", pdf_bytes, [
+        ExtractionSection("header", build_diagnosis_header_prompt(), required_keys=("primary_diagnosis", "current_staging")),
+        ExtractionSection("evolution", build_diagnosis_evolution_prompt(), required_keys=("timeline",)),
+        ExtractionSection("footer", build_diagnosis_footer_prompt(), required_keys=("duration_since_diagnosis", "reference_dates")),
+    ])
+    if results is None:
+        return None
+    return (
+        results["header"],
+        normalize_evolution_timeline(results["evolution"]),
+        recalculate_durations(results["footer"]),
+    )
+
+
+def diagnosis_extraction(pdf_input, use_gemini=True, mode=None):
     """
     Extract diagnosis information from a PDF document.
 
     Args:
         pdf_input: Either bytes (PDF content), URL, or file path
         use_gemini: Whether to use Gemini pipeline (default: True)
+        mode: Gemini pipeline only - "combined" (one call) or "split" (one call per
+              component); defaults to EXTRACTION_MODE_DIAGNOSIS / EXTRACTION_MODE
 
     Returns:
         Tuple of (diagnosis_header, diagnosis_evolution_timeline, diagnosis_footer)
@@ -1522,7 +1542,7 @@ def diagnosis_extraction(pdf_input, use_gemini=True):
         else:
             download_url = pdf_input
 
-        response = requests.get(download_url, allow_redirects=True)
+        response = get_session(download_url).get(download_url, allow_redirects=True)
         response.raise_for_status()
         pdf_bytes = response.content
         logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes (will reuse for all 3 extractions)")
@@ -1535,9 +1555,21 @@ def diagnosis_extraction(pdf_input, use_gemini=True):
     else:
         raise ValueError("pdf_input must be bytes, URL string, or file path string")
 
+    if use_gemini and get_extraction_mode("diagnosis", mode) == "combined":
+        logger.info("🤖 Using Vertex AI Gemini pipeline (combined extraction)")
+        combined = extract_diagnosis_combined(pdf_bytes)
+        if combined is not None:
+            diagnosis_header, diagnosis_evolution_timeline, diagnosis_footer = combined
+            log_extraction_output(logger, "Diagnosis Header", diagnosis_header)
+            log_extraction_output(logger, "Diagnosis Evolution Timeline", diagnosis_evolution_timeline)
+            log_extraction_output(logger, "Diagnosis Footer", diagnosis_footer)
+            log_extraction_complete(logger, "Diagnosis Tab (combined)", ["header", "evolution", "footer"])
+            return diagnosis_header, diagnosis_evolution_timeline, diagnosis_footer
+
     if use_gemini:
         # Gemini pipeline - pass bytes to avoid multiple downloads
         logger.info("🤖 Using Vertex AI Gemini pipeline")
+        record_split_run("diagnosis")
 
         logger.info("🔄 Extracting patient diagnosis header data (1/3)...")
         diagnosis_header = extract_diagnosis_header_with_gemini(pdf_bytes)
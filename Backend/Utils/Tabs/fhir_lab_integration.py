@@ -9,10 +9,10 @@ deduplication to avoid duplicate entries.
 """
 
 import requests
-import time
 import re
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+from Backend.documents_reference import fhir_get, fhir_url
 from Backend.Utils.logger_config import setup_logger
 from Backend.Utils.Tabs.lab_unit_converter import convert_to_standard_unit
 
@@ -108,7 +108,7 @@ def fetch_fhir_observations(
     patient_id: str,
     onco_emr_token: str,
     category: str = "laboratory",
-    url: str = "https://fhir.prod.flatiron.io/fhir/Observation"
+    url: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     Fetch ALL laboratory observations from FHIR Observation API with pagination support.
@@ -117,7 +117,7 @@ def fetch_fhir_observations(
         patient_id: FHIR patient ID
         onco_emr_token: OncoEMR access token for authentication
         category: Observation category (default: "laboratory")
-        url: FHIR Observation endpoint URL
+        url: FHIR Observation endpoint URL (default: Observation under FHIR_BASE_URL)
 
     Returns:
         List of ALL observation entries from FHIR API (aggregated across all pages)
@@ -125,6 +125,7 @@ def fetch_fhir_observations(
     Raises:
         requests.RequestException: If API request fails
     """
+    url = url or fhir_url("Observation")
     logger.info(f"🔍 Fetching FHIR Observations for patient: {patient_id}")
 
     params = {
@@ -133,11 +134,6 @@ def fetch_fhir_observations(
         "_count": 100  # Fetch 100 observations per page
     }
 
-    headers = {
-        "Authorization": f"Bearer {onco_emr_token}",
-        "Accept": "application/fhir+json"
-    }
-
     all_entries = []
     current_url = url
     page_count = 0
@@ -149,16 +145,13 @@ def fetch_fhir_observations(
 
             # Make request
             if page_count == 1:
-                response = requests.get(current_url, headers=headers, params=params)
+                response = fhir_get(current_url, onco_emr_token, params=params)
             else:
                 # For subsequent pages, use the next link directly (no params)
-                response = requests.get(current_url, headers=headers)
+                response = fhir_get(current_url, onco_emr_token)
 
             response.raise_for_status()
 
-            # Add rate limiting delay
-            time.sleep(1.5)
-
             data = response.json()
             entries = data.get("entry", [])
             all_entries.extend(entries)
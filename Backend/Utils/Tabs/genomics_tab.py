@@ -1,23 +1,22 @@
 import os, sys
-import requests
-import json
 import re
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
 
 BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
 if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
 from Utils.Tabs.llmparser import llmresponsedetailed
+try:
+    from Backend.Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from Backend.http_sessions import get_session
+except ModuleNotFoundError:
+    from Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from http_sessions import get_session
 from Utils.logger_config import setup_logger, log_extraction_start, log_extraction_complete, log_extraction_output
 
 # Setup logger
 logger = setup_logger(__name__)
 
-# Initialize Vertex AI
-vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
-
 
 def extract_genomic_info_with_gemini(pdf_input):
     """
@@ -55,7 +54,7 @@ def extract_genomic_info_with_gemini(pdf_input):
             else:
                 raise ValueError("Could not extract file ID from Google Drive URL")
 
-            response = requests.get(download_url, allow_redirects=True)
+            response = get_session(download_url).get(download_url, allow_redirects=True)
             response.raise_for_status()
             pdf_bytes = response.content
             logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
@@ -265,53 +264,28 @@ Only the JSON object.
 
     logger.info("🤖 Requesting genomic data extraction from Vertex AI Gemini...")
 
-    # Initialize model
-    model = GenerativeModel("gemini-2.5-pro")
-
-    # Wrap PDF bytes in Part object
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
-
     # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, EXTRACTION_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            EXTRACTION_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="genomics_extraction"
         )
         logger.info("✅ Gemini extraction complete")
+    except GeminiResponseParseError as e:
+        logger.error(f"❌ Failed to parse Gemini response: {e}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
+        raise
     except Exception as e:
         logger.error(f"❌ API request failed: {e}")
         raise
 
-    # Parse JSON response
-    try:
-        # Extract text from the Vertex AI response
-        response_text = response.text.strip()
-
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
-
-        # Clean markdown code blocks if present
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
-
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🧹 Cleaned markdown code blocks from response")
-        else:
-            response_text = response_text.strip()
-            logger.info("ℹ️  No markdown code blocks found, using response as is")
-
-        # Parse JSON
-        extracted_data = json.loads(response_text)
-        logger.info("✅ Genomic data parsed successfully")
-        return extracted_data
-
-    except (KeyError, IndexError, json.JSONDecodeError) as e:
-        logger.error(f"❌ Failed to parse Gemini response: {e}")
-        logger.error(f"Raw response (first 500 chars): {response_text[:500]}")
-        raise
+    logger.info("✅ Genomic data parsed successfully")
+    return extracted_data
 
 
 def consolidate_genomic_data(raw_data):
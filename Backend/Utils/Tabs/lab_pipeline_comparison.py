@@ -14,7 +14,6 @@ are combined first before parsing.
 import sys
 import os
 import json
-import time
 from typing import List, Dict, Any
 from Backend.Utils.Tabs.llmparser import llmresponsedetailed
 
@@ -25,7 +24,9 @@ if BACKEND_DIR not in sys.path:
 
 from Backend.bytes_extractor import extract_lab_results_data_md_notes_combined
 from Backend.storage_uploader import upload_and_share_pdf_bytes
-from Backend.documents_reference import generate_bearer_token, get_patient_id_from_mrn, generate_onco_emr_token
+from Backend.documents_reference import get_fhir_tokens, fhir_get, fetch_attachment
+from Backend.document_bundle_cache import get_cached_patient_id
+from Backend.pdf_byte_cache import get_pdf_byte_cache, document_reference_key
 from Backend.Utils.Tabs.lab_postprocessor import process_lab_data_for_ui
 from Backend.Utils.logger_config import setup_logger
 from Backend.Utils.Tabs.lab_tab import extract_with_gemini
@@ -35,7 +36,6 @@ from Backend.Utils.Tabs.fhir_lab_integration import (
     merge_lab_data_with_fhir
 )
 
-import requests
 import tempfile
 
 # Setup logger
@@ -114,46 +114,27 @@ def fetch_individual_pdf_bytes(fhir_url: str, bearer_token: str, onco_emr_token:
         fhir_url: The FHIR DocumentReference URL
         bearer_token: Bearer token for authentication
         onco_emr_token: OncoEMR token for FHIR API
-        max_retries: Maximum number of retry attempts for 429 errors
+        max_retries: Maximum number of retries after 429 responses
 
     Returns:
         PDF bytes
     """
-    import base64
+    # Reuse bytes another pipeline already downloaded for this document
+    return get_pdf_byte_cache().get_or_fetch(
+        document_reference_key(fhir_url),
+        lambda: _download_individual_pdf_bytes(fhir_url, onco_emr_token, max_retries)
+    )
 
-    headers = {
-        "Authorization": f"Bearer {onco_emr_token}",
-        "Accept": "application/fhir+json"
-    }
 
-    # Fetch FHIR DocumentReference with retry logic
-    for attempt in range(max_retries):
-        try:
-            # Add delay before request to space out API calls
-            if attempt > 0:
-                # Exponential backoff: 2^attempt seconds (2, 4, 8, 16, 32)
-                backoff_time = 2 ** attempt
-                logger.info(f"   Retry attempt {attempt + 1}/{max_retries} after {backoff_time}s delay...")
-                time.sleep(backoff_time)
-            else:
-                # Initial delay to prevent overwhelming the API
-                time.sleep(1.5)
-
-            response = requests.get(fhir_url, headers=headers)
-            response.raise_for_status()
-            break  # Success - exit retry loop
-
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 429:  # Too Many Requests
-                if attempt < max_retries - 1:
-                    logger.warning(f"   ⚠️  Rate limit hit (429), will retry...")
-                    continue
-                else:
-                    logger.error(f"   ❌ Rate limit hit after {max_retries} attempts")
-                    raise
-            else:
-                # Other HTTP errors - don't retry
-                raise
+def _download_individual_pdf_bytes(fhir_url: str, onco_emr_token: str, max_retries: int = 5) -> bytes:
+    """Download PDF bytes for a FHIR DocumentReference URL (uncached)."""
+    import base64
+
+    # Fetch FHIR DocumentReference (shared rate limiter backs off and retries on 429)
+    response = fhir_get(fhir_url, onco_emr_token, max_throttle_retries=max_retries)
+    if response.status_code == 429:
+        logger.error(f"   ❌ Rate limit hit after {max_retries} retries")
+    response.raise_for_status()
 
     document_data = response.json()
 
@@ -164,31 +145,11 @@ def fetch_individual_pdf_bytes(fhir_url: str, bearer_token: str, onco_emr_token:
             # Try URL first
             pdf_url = attachment.get("url")
             if pdf_url:
-                # Fetch PDF with retry logic
-                for attempt in range(max_retries):
-                    try:
-                        # Add delay before PDF download
-                        if attempt > 0:
-                            backoff_time = 2 ** attempt
-                            logger.info(f"   PDF retry attempt {attempt + 1}/{max_retries} after {backoff_time}s delay...")
-                            time.sleep(backoff_time)
-                        else:
-                            time.sleep(1.5)
-
-                        pdf_response = requests.get(pdf_url)
-                        pdf_response.raise_for_status()
-                        return pdf_response.content
-
-                    except requests.exceptions.HTTPError as e:
-                        if e.response.status_code == 429:
-                            if attempt < max_retries - 1:
-                                logger.warning(f"   ⚠️  PDF download rate limit hit (429), will retry...")
-                                continue
-                            else:
-                                logger.error(f"   ❌ PDF download rate limit hit after {max_retries} attempts")
-                                raise
-                        else:
-                            raise
+                pdf_response = fetch_attachment(pdf_url, onco_emr_token, max_throttle_retries=max_retries)
+                if pdf_response.status_code == 429:
+                    logger.error(f"   ❌ PDF download rate limit hit after {max_retries} retries")
+                pdf_response.raise_for_status()
+                return pdf_response.content
 
             # Try base64 data
             pdf_data = attachment.get("data")
@@ -316,9 +277,7 @@ def process_individual_lab_results(mrn: str, verbose: bool = False) -> Dict[str,
 
     # Step 2: Get authentication tokens
     logger.info("🔑 Authenticating with FHIR API...")
-    bearer_token = generate_bearer_token()
-    onco_emr_token = generate_onco_emr_token(bearer_token)
-    patient_id, _ = get_patient_id_from_mrn(mrn, onco_emr_token)
+    bearer_token, onco_emr_token = get_fhir_tokens()
 
     # Step 3: Process each PDF individually
     individual_results = []
@@ -606,9 +565,8 @@ def process_individual_lab_results_gemini(mrn: str, verbose: bool = False) -> Di
 
     # Step 2: Get authentication tokens
     logger.info("🔑 Authenticating with FHIR API...")
-    bearer_token = generate_bearer_token()
-    onco_emr_token = generate_onco_emr_token(bearer_token)
-    patient_id, _ = get_patient_id_from_mrn(mrn, onco_emr_token)
+    bearer_token, onco_emr_token = get_fhir_tokens()
+    patient_id = get_cached_patient_id(mrn)
 
     # Step 3: Process each PDF individually with Gemini
     individual_results = []
@@ -12,13 +12,12 @@ from typing import Dict, List, Any
 from datetime import datetime
 import json
 import time
-import os
 import random
-import vertexai
-from vertexai.generative_models import GenerativeModel
 
-# Initialize Vertex AI
-vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
+try:
+    from Backend.Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+except ModuleNotFoundError:
+    from Utils.gemini_client import get_gemini_client, GeminiResponseParseError
 
 
 def exponential_retry(
@@ -741,105 +740,43 @@ Example:
 Return ONLY the JSON array, no other text."""
 
     try:
-        # Add initial delay to avoid rate limit issues when called after other Gemini API calls
-        print("⏳ Waiting 4 seconds before AI refinement to avoid rate limits...")
-        time.sleep(4)
+        # Gemini rate limits (and 429 retries) are handled by the shared client,
+        # so no fixed pre-call delay is needed here
+        gemini_client = get_gemini_client()
 
-        model = GenerativeModel("gemini-2.5-pro")
-
-        # Define the API call as a lambda function for exponential retry
-        # This now includes response validation and JSON parsing to enable retries on invalid responses
+        # Define the API call as a function for exponential retry
+        # This includes response validation and JSON parsing to enable retries on invalid responses
         def make_api_call():
-            # VERBOSE DEBUG: Print prompt info
             print(f"🔍 DEBUG: Sending prompt ({len(prompt)} chars, {len(raw_interpretations)} interpretations)")
 
-            response = model.generate_content(
-                prompt,
-                generation_config={
-                    "temperature": 0.3,
-                    "top_p": 0.95,
-                    "max_output_tokens": 4096,  # Increased to handle more comprehensive responses
-                    "response_mime_type": "application/json"  # Force JSON output
-                }
-            )
-
-            # VERBOSE DEBUG: Check response object
-            print(f"🔍 DEBUG: Got response object type: {type(response)}")
-            print(f"🔍 DEBUG: Has 'text' attr: {hasattr(response, 'text')}")
-
-            # Check if response was blocked by safety filters
-            if hasattr(response, 'prompt_feedback'):
-                feedback = response.prompt_feedback
-                print(f"🔍 DEBUG: Has prompt_feedback: {feedback}")
-                if hasattr(feedback, 'block_reason') and feedback.block_reason:
-                    raise ValueError(f"Response blocked by safety filters: {feedback.block_reason}")
-
-            # Check candidates for finish_reason
-            if hasattr(response, 'candidates') and response.candidates:
-                print(f"🔍 DEBUG: Candidates count: {len(response.candidates)}")
-                for i, candidate in enumerate(response.candidates):
-                    if hasattr(candidate, 'finish_reason'):
-                        print(f"🔍 DEBUG: Candidate {i} finish_reason: {candidate.finish_reason}")
-
-            # Validate response has text content
-            if not hasattr(response, 'text'):
-                raise ValueError(f"Response object has no 'text' attribute")
-
-            # VERBOSE DEBUG: Check response.text before any processing
-            print(f"🔍 DEBUG: response.text type: {type(response.text)}")
-            print(f"🔍 DEBUG: response.text length: {len(response.text) if response.text else 0}")
-            print(f"🔍 DEBUG: response.text repr (first 200 chars): {repr(response.text[:200]) if response.text else 'None'}")
-
-            if not response.text:
-                raise ValueError(f"Gemini response.text is empty or None")
-
-            response_text = response.text.strip()
-            print(f"🔍 DEBUG: After strip() length: {len(response_text)}")
-
-            # Debug logging for empty responses
-            if not response_text:
-                print(f"⚠️  DEBUG: response.text exists but is empty after strip()")
-                raise ValueError("Gemini response is empty after strip()")
-
-            # Extract JSON from potential markdown code blocks
-            import re
-            json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-            match = re.search(json_pattern, response_text)
-
-            if match:
-                print(f"🔍 DEBUG: Found markdown code block, extracting...")
-                extracted = match.group(1).strip()
-                print(f"🔍 DEBUG: Extracted length: {len(extracted)}")
-                response_text = extracted
-
-            # Check again after extracting from code block
-            if not response_text:
-                raise ValueError("Gemini response is empty after markdown extraction")
-
-            print(f"🔍 DEBUG: Final response_text length before JSON parse: {len(response_text)}")
-            print(f"🔍 DEBUG: Final response_text (first 300 chars): {response_text[:300]}")
-
-            # Parse and validate JSON response
             try:
-                refined_interpretations = json.loads(response_text)
-                if not isinstance(refined_interpretations, list):
-                    raise ValueError(f"Expected list, got {type(refined_interpretations).__name__}")
-                print(f"✅ DEBUG: Successfully parsed JSON with {len(refined_interpretations)} items")
-                return refined_interpretations
-            except json.JSONDecodeError as e:
-                # Enhanced error message with actual content for debugging
-                print(f"❌ DEBUG: JSON parsing failed: {e}")
-                print(f"❌ DEBUG: Response text length: {len(response_text)}")
-                print(f"❌ DEBUG: Response text (full): {response_text}")
-                raise ValueError(f"Invalid JSON response: {str(e)}")
-
-        # Execute with exponential retry (handles 429 rate limits and invalid responses)
-        # Changed max_retries to 6 to ensure we reach the 60-second maximum delay
-        # Delay progression: 2s, 4s, 8s, 16s, 32s, 60s (capped)
-        print("🔄 Calling Gemini API with exponential retry protection (up to 6 retries)...")
+                refined_interpretations = gemini_client.generate_json(
+                    prompt,
+                    generation_config={
+                        "temperature": 0.3,
+                        "top_p": 0.95,
+                        "max_output_tokens": 4096,  # Increased to handle more comprehensive responses
+                        "response_mime_type": "application/json"  # Force JSON output
+                    },
+                    label="lab_interpretation_refinement"
+                )
+            except GeminiResponseParseError as e:
+                print(f"❌ DEBUG: Invalid Gemini response: {e}")
+                print(f"❌ DEBUG: Response text (first 300 chars): {e.response_text[:300]}")
+                raise
+
+            if not isinstance(refined_interpretations, list):
+                raise ValueError(f"Expected list, got {type(refined_interpretations).__name__}")
+            print(f"✅ DEBUG: Successfully parsed JSON with {len(refined_interpretations)} items")
+            return refined_interpretations
+
+        # 429s are retried inside the Gemini client; exponential retry here covers
+        # empty, blocked or invalid responses (ValueError)
+        # Delay progression: 2s, 4s, 8s
+        print("🔄 Calling Gemini API with exponential retry protection (up to 3 retries)...")
         refined_interpretations = exponential_retry(
             func=make_api_call,
-            max_retries=6,
+            max_retries=3,
             base_delay=2.0,
             max_delay=60.0,
             exponential_base=2.0,
@@ -2,10 +2,7 @@ import sys
 import os
 import json
 import re
-import requests
 import base64
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
 from datetime import datetime
 from io import BytesIO
 
@@ -21,14 +18,17 @@ from Utils.Tabs.fhir_lab_integration import (
     convert_fhir_observations_to_lab_schema,
     merge_lab_data_with_fhir
 )
+try:
+    from Backend.Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from Backend.http_sessions import get_session
+except ModuleNotFoundError:
+    from Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from http_sessions import get_session
 from Utils.logger_config import setup_logger, log_extraction_start, log_extraction_complete, log_extraction_output
 
 # Setup logger
 logger = setup_logger(__name__)
 
-# Initialize Vertex AI
-vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
-
 extracted_instructions = (
     "Extract structured lab result data for a 'Patient Labs Dashboard' from the provided lab report. "
     "Scope: Analyze the SINGLE document provided and extract current values only. "
@@ -318,54 +318,21 @@ Just the JSON object following the schema above.
 
     logger.info("🤖 Generating extraction with Vertex AI Gemini...")
 
-    # Initialize the model
-    model = GenerativeModel("gemini-2.5-pro")
-
-    # Wrap PDF bytes in Part object
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
-
     # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, GEMINI_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            GEMINI_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="lab_extraction"
         )
         logger.info("✅ Gemini extraction complete")
-    except Exception as e:
-        logger.error(f"❌ API request failed: {e}")
-        raise
-
-    # Parse JSON response
-    try:
-        # Extract text from the response
-        response_text = response.text.strip()
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
-
-        # Use regex to extract JSON from markdown code blocks
-        # Pattern matches: ```json ... ``` or ``` ... ```
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
-
-        if match:
-            # Extract JSON from code block
-            response_text = match.group(1).strip()
-            logger.info("🧹 Cleaned markdown code blocks from response using regex")
-        else:
-            # No code blocks found, use as is
-            response_text = response_text.strip()
-            logger.info("ℹ️  No markdown code blocks found, using response as is")
-
-        # Parse JSON
-        extracted_data = json.loads(response_text)
-        logger.info("✅ JSON parsed successfully")
-        return extracted_data
-
-    except (json.JSONDecodeError, AttributeError) as e:
+    except GeminiResponseParseError as e:
         logger.error(f"❌ Failed to parse Gemini response: {e}")
-        logger.error(f"Raw response text (first 500 chars): {response_text[:500] if 'response_text' in locals() else 'N/A'}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
 
         # Save the raw response for debugging
         error_file = f"gemini_error_response_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
@@ -373,9 +340,15 @@ Just the JSON object following the schema above.
             f.write("="*80 + "\n")
             f.write("GEMINI RAW RESPONSE\n")
             f.write("="*80 + "\n\n")
-            f.write(str(response))
+            f.write(str(e.response))
         logger.error(f"💾 Saved raw response to: {error_file}")
         raise
+    except Exception as e:
+        logger.error(f"❌ API request failed: {e}")
+        raise
+
+    logger.info("✅ JSON parsed successfully")
+    return extracted_data
 
 def extract_lab_info(pdf_url=None, pdf_bytes=None, return_raw=False, use_gemini=True,
                      patient_id=None, onco_emr_token=None):
@@ -430,13 +403,13 @@ def extract_lab_info(pdf_url=None, pdf_bytes=None, return_raw=False, use_gemini=
                 else:
                     raise ValueError("Could not extract file ID from Google Drive URL")
 
-                response = requests.get(download_url, allow_redirects=True)
+                response = get_session(download_url).get(download_url, allow_redirects=True)
                 response.raise_for_status()
                 pdf_bytes = response.content
                 logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
             else:
                 download_url = pdf_url
-                response = requests.get(download_url, allow_redirects=True)
+                response = get_session(download_url).get(download_url, allow_redirects=True)
                 response.raise_for_status()
                 pdf_bytes = response.content
                 logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
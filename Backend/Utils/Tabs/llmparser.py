@@ -1,6 +1,10 @@
-import requests
 import json
 
+try:
+    from Backend.http_sessions import get_session
+except ModuleNotFoundError:
+    from http_sessions import get_session
+
 
 def llmresponsedetailed(
     pdf_url,
@@ -37,7 +41,7 @@ def llmresponsedetailed(
         "Authorization": "Bearer {{bearerToken}}"
     }
 
-    response = requests.post(url, headers=headers, json=payload)
+    response = get_session(url).post(url, headers=headers, json=payload)
 
     try:
         response_data = response.json()
@@ -3,10 +3,6 @@
 import sys
 import os
 import json
-import re
-import requests
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
 
 
 # Add Backend to path for imports
@@ -15,14 +11,17 @@ if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
 from Utils.Tabs.llmparser import llmresponsedetailed
+try:
+    from Backend.Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from Backend.Utils.combined_extraction import ExtractionSection, extract_sections_combined, get_extraction_mode, load_pdf_bytes, record_split_run
+except ModuleNotFoundError:
+    from Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from Utils.combined_extraction import ExtractionSection, extract_sections_combined, get_extraction_mode, load_pdf_bytes, record_split_run
 from Utils.logger_config import setup_logger, log_extraction_start, log_extraction_complete, log_extraction_output
 
 # Setup logger
 logger = setup_logger(__name__)
 
-# Initialize Vertex AI
-vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
-
 extracted_instructions = (
     "Role: Act as an Expert Clinical Data Abstractor. Extract structured data from the pathology report for a patient dashboard.\n\n"
     "1. HEADER & ALERTING:\n"
@@ -111,62 +110,13 @@ description_hist_ihc = {
 }
 
 
-def classify_pathology_report_with_gemini(pdf_input):
+def build_pathology_classification_prompt():
     """
-    Classify a pathology report as either 'GENOMIC_ALTERATIONS' or 'TYPICAL_PATHOLOGY' using Vertex AI Gemini.
-
-    Args:
-        pdf_input: Either bytes (PDF content), local path to PDF file, or Google Drive URL
+    Build the pathology report classification extraction prompt.
 
     Returns:
-        Dictionary with classification results:
-        {
-            "category": "GENOMIC_ALTERATIONS" or "TYPICAL_PATHOLOGY",
-            "confidence": "high", "medium", or "low",
-            "reasoning": "Brief explanation",
-            "key_indicators": ["list", "of", "indicators"]
-        }
+        Prompt string (shared by the split and combined extraction modes)
     """
-    logger.info("🔍 Starting pathology report classification with Vertex AI Gemini...")
-
-    # Handle different input types and get PDF bytes
-    if isinstance(pdf_input, bytes):
-        logger.info(f"📤 Using PDF bytes ({len(pdf_input)} bytes)")
-        pdf_bytes = pdf_input
-    elif isinstance(pdf_input, str):
-        if pdf_input.startswith("/api/documents/"):
-            # Handle Firebase Storage paths
-            logger.info(f"📥 Downloading PDF from Firebase Storage: {pdf_input}")
-            try:
-                from Backend.storage_uploader import download_pdf_bytes_from_url
-            except ModuleNotFoundError:
-                from storage_uploader import download_pdf_bytes_from_url
-            pdf_bytes = download_pdf_bytes_from_url(pdf_input)
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        elif "drive.google.com" in pdf_input:
-            # Handle Google Drive URLs
-            logger.info(f"📥 Downloading PDF from Google Drive: {pdf_input}")
-            match = re.search(r'/file/d/([^/]+)', pdf_input)
-            if match:
-                file_id = match.group(1)
-                download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-            else:
-                raise ValueError("Could not extract file ID from Google Drive URL")
-
-            response = requests.get(download_url, allow_redirects=True)
-            response.raise_for_status()
-            pdf_bytes = response.content
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        else:
-            # Assume it's a local file path
-            logger.info(f"📤 Reading PDF from local path: {pdf_input}")
-            with open(pdf_input, "rb") as f:
-                pdf_bytes = f.read()
-    else:
-        raise ValueError("pdf_input must be bytes, a local file path, Firebase Storage path, or a Google Drive URL")
-
-    logger.info(f"✅ PDF ready for processing ({len(pdf_bytes)} bytes)")
-
     # Classification prompt
     CLASSIFICATION_PROMPT = """
 You are an Expert Medical Report Classifier. Your task is to classify this pathology report into one of three categories.
@@ -237,117 +187,69 @@ No markdown code blocks.
 No commentary.
 Just the JSON object.
 """
+    return CLASSIFICATION_PROMPT
 
-    logger.info("🤖 Requesting classification from Vertex AI Gemini...")
 
-    # Initialize model
-    model = GenerativeModel("gemini-2.5-pro")
+def classify_pathology_report_with_gemini(pdf_input):
+    """
+    Classify a pathology report as either 'GENOMIC_ALTERATIONS' or 'TYPICAL_PATHOLOGY' using Vertex AI Gemini.
 
-    # Wrap PDF bytes in Part object
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
+    Args:
+        pdf_input: Either bytes (PDF content), local path to PDF file, or Google Drive URL
+
+    Returns:
+        Dictionary with classification results:
+        {
+            "category": "GENOMIC_ALTERATIONS" or "TYPICAL_PATHOLOGY",
+            "confidence": "high", "medium", or "low",
+            "reasoning": "Brief explanation",
+            "key_indicators": ["list", "of", "indicators"]
+        }
+    """
+    logger.info("🔍 Starting pathology report classification with Vertex AI Gemini...")
+
+    # Bytes, local path, Firebase Storage path, Google Drive or direct URL
+    pdf_bytes = load_pdf_bytes(pdf_input)
+
+    logger.info(f"✅ PDF ready for processing ({len(pdf_bytes)} bytes)")
+
+    CLASSIFICATION_PROMPT = build_pathology_classification_prompt()
+
+    logger.info("🤖 Requesting classification from Vertex AI Gemini...")
 
     # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, CLASSIFICATION_PROMPT],
+        classification = get_gemini_client().generate_json(
+            CLASSIFICATION_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="pathology_classification"
         )
         logger.info("✅ Gemini classification complete")
+    except GeminiResponseParseError as e:
+        logger.error(f"❌ Failed to parse Gemini response: {e}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
+        raise
     except Exception as e:
         logger.error(f"❌ API request failed: {e}")
         raise
 
-    # Parse JSON response
-    try:
-        # Extract text from the Vertex AI response
-        response_text = response.text.strip()
-
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
+    logger.info(f"📊 Classification Result: {classification['category']} (confidence: {classification['confidence']})")
+    logger.info(f"💡 Reasoning: {classification['reasoning']}")
 
-        # Clean markdown code blocks if present (handles both ``` and ''')
-        # Try triple backticks first (with or without 'json' label)
-        json_pattern_backticks = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern_backticks, response_text)
+    return classification
 
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🧹 Cleaned markdown code blocks (backticks) from response")
-        else:
-            # Try triple single quotes
-            json_pattern_quotes = r"'''(?:json)?\s*([\s\S]*?)\s*'''"
-            match = re.search(json_pattern_quotes, response_text)
-            if match:
-                response_text = match.group(1).strip()
-                logger.info("🧹 Cleaned markdown code blocks (single quotes) from response")
-            else:
-                response_text = response_text.strip()
-                logger.info("ℹ️  No markdown code blocks found, using response as is")
-
-        classification = json.loads(response_text)
-        logger.info(f"📊 Classification Result: {classification['category']} (confidence: {classification['confidence']})")
-        logger.info(f"💡 Reasoning: {classification['reasoning']}")
-
-        return classification
-
-    except (KeyError, IndexError, json.JSONDecodeError) as e:
-        logger.error(f"❌ Failed to parse Gemini classification response: {e}")
-        logger.error(f"Raw response (first 500 chars): {response_text[:500]}")
-        raise
 
-
-def extract_pathology_summary_with_gemini_api(pdf_input):
+def build_pathology_summary_prompt():
     """
-    Extract pathology summary using Vertex AI Gemini.
-
-    Args:
-        pdf_input: Either bytes (PDF content), local path to PDF file, or Google Drive URL
+    Build the pathology summary extraction prompt.
 
     Returns:
-        Dictionary containing extracted pathology summary data
+        Prompt string (shared by the split and combined extraction modes)
     """
-    logger.info("🔄 Extracting pathology summary using Vertex AI Gemini...")
-
-    # Handle different input types and get PDF bytes
-    if isinstance(pdf_input, bytes):
-        logger.info(f"📤 Using PDF bytes ({len(pdf_input)} bytes)")
-        pdf_bytes = pdf_input
-    elif isinstance(pdf_input, str):
-        if pdf_input.startswith("/api/documents/"):
-            # Handle Firebase Storage paths
-            logger.info(f"📥 Downloading PDF from Firebase Storage: {pdf_input}")
-            try:
-                from Backend.storage_uploader import download_pdf_bytes_from_url
-            except ModuleNotFoundError:
-                from storage_uploader import download_pdf_bytes_from_url
-            pdf_bytes = download_pdf_bytes_from_url(pdf_input)
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        elif "drive.google.com" in pdf_input:
-            # Handle Google Drive URLs
-            logger.info(f"📥 Downloading PDF from Google Drive: {pdf_input}")
-            match = re.search(r'/file/d/([^/]+)', pdf_input)
-            if match:
-                file_id = match.group(1)
-                download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-            else:
-                raise ValueError("Could not extract file ID from Google Drive URL")
-
-            response = requests.get(download_url, allow_redirects=True)
-            response.raise_for_status()
-            pdf_bytes = response.content
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        else:
-            # Assume it's a local file path
-            logger.info(f"📤 Reading PDF from local path: {pdf_input}")
-            with open(pdf_input, "rb") as f:
-                pdf_bytes = f.read()
-    else:
-        raise ValueError("pdf_input must be bytes, a local file path, Firebase Storage path, or a Google Drive URL")
-
-    logger.info(f"✅ PDF ready for processing ({len(pdf_bytes)} bytes)")
-
     # Create detailed prompt for pathology summary extraction
     EXTRACTION_PROMPT = f"""
 You are an Expert Clinical Data Abstractor specialized in extracting structured pathology data for patient dashboards.
@@ -506,108 +408,61 @@ No markdown code blocks (no ```)
 No commentary or preamble.
 Just the pure JSON object following the schema above.
 """
+    return EXTRACTION_PROMPT
 
-    logger.info("🤖 Requesting pathology summary extraction from Vertex AI Gemini...")
 
-    # Initialize model
-    model = GenerativeModel("gemini-2.5-pro")
+def extract_pathology_summary_with_gemini_api(pdf_input):
+    """
+    Extract pathology summary using Vertex AI Gemini.
 
-    # Wrap PDF bytes in Part object
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
+    Args:
+        pdf_input: Either bytes (PDF content), local path to PDF file, or Google Drive URL
+
+    Returns:
+        Dictionary containing extracted pathology summary data
+    """
+    logger.info("🔄 Extracting pathology summary using Vertex AI Gemini...")
+
+    # Bytes, local path, Firebase Storage path, Google Drive or direct URL
+    pdf_bytes = load_pdf_bytes(pdf_input)
+
+    logger.info(f"✅ PDF ready for processing ({len(pdf_bytes)} bytes)")
+
+    EXTRACTION_PROMPT = build_pathology_summary_prompt()
+
+    logger.info("🤖 Requesting pathology summary extraction from Vertex AI Gemini...")
 
     # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, EXTRACTION_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            EXTRACTION_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="pathology_summary"
         )
         logger.info("✅ Gemini extraction complete")
+    except GeminiResponseParseError as e:
+        logger.error(f"❌ Failed to parse Gemini response: {e}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
+        raise
     except Exception as e:
         logger.error(f"❌ API request failed: {e}")
         raise
 
-    # Parse JSON response
-    try:
-        # Extract text from the Vertex AI response
-        response_text = response.text.strip()
-
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
-
-        # Clean markdown code blocks if present
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
-
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🧹 Cleaned markdown code blocks from response")
-        else:
-            response_text = response_text.strip()
-            logger.info("ℹ  No markdown code blocks found, using response as is")
+    logger.info("✅ Pathology summary parsed successfully")
+    return extracted_data
 
-        # Parse JSON
-        extracted_data = json.loads(response_text)
-        logger.info("✅ Pathology summary parsed successfully")
-        return extracted_data
 
-    except (KeyError, IndexError, json.JSONDecodeError) as e:
-        logger.error(f"❌ Failed to parse Gemini response: {e}")
-        logger.error(f"Raw response (first 500 chars): {response_text[:500]}")
-        raise
-
-
-def extract_pathology_markers_with_gemini_api(pdf_input):
+def build_pathology_markers_prompt():
     """
-    Extract pathology markers (IHC and morphology) using Vertex AI Gemini.
-
-    Args:
-        pdf_input: Either bytes (PDF content), local path to PDF file, or Google Drive URL
+    Build the pathology markers extraction prompt.
 
     Returns:
-        Dictionary containing extracted pathology markers data
+        Prompt string (shared by the split and combined extraction modes)
     """
-    logger.info("🔄 Extracting pathology markers using Vertex AI Gemini...")
-
-    # Handle different input types and get PDF bytes
-    if isinstance(pdf_input, bytes):
-        logger.info(f"📤 Using PDF bytes ({len(pdf_input)} bytes)")
-        pdf_bytes = pdf_input
-    elif isinstance(pdf_input, str):
-        if pdf_input.startswith("/api/documents/"):
-            # Handle Firebase Storage paths
-            logger.info(f"📥 Downloading PDF from Firebase Storage: {pdf_input}")
-            try:
-                from Backend.storage_uploader import download_pdf_bytes_from_url
-            except ModuleNotFoundError:
-                from storage_uploader import download_pdf_bytes_from_url
-            pdf_bytes = download_pdf_bytes_from_url(pdf_input)
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        elif "drive.google.com" in pdf_input:
-            # Handle Google Drive URLs
-            logger.info(f"📥 Downloading PDF from Google Drive: {pdf_input}")
-            match = re.search(r'/file/d/([^/]+)', pdf_input)
-            if match:
-                file_id = match.group(1)
-                download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-            else:
-                raise ValueError("Could not extract file ID from Google Drive URL")
-
-            response = requests.get(download_url, allow_redirects=True)
-            response.raise_for_status()
-            pdf_bytes = response.content
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        else:
-            # Assume it's a local file path
-            logger.info(f"📤 Reading PDF from local path: {pdf_input}")
-            with open(pdf_input, "rb") as f:
-                pdf_bytes = f.read()
-    else:
-        raise ValueError("pdf_input must be bytes, a local file path, Firebase Storage path, or a Google Drive URL")
-
-    logger.info(f"✅ PDF ready for processing ({len(pdf_bytes)} bytes)")
-
     # Create detailed prompt for pathology markers extraction
     EXTRACTION_PROMPT = f"""
 You are an Expert Pathologist specialized in extracting advanced morphologic features and immunohistochemistry (IHC) biomarkers from pathology reports for precision oncology dashboards.
@@ -780,59 +635,84 @@ No markdown code blocks (no ```)
 No commentary or preamble.
 Just the pure JSON object following the schema above.
 """
+    return EXTRACTION_PROMPT
 
-    logger.info("🤖 Requesting pathology markers extraction from Vertex AI Gemini...")
 
-    # Initialize model
-    model = GenerativeModel("gemini-2.5-pro")
+def extract_pathology_markers_with_gemini_api(pdf_input):
+    """
+    Extract pathology markers (IHC and morphology) using Vertex AI Gemini.
+
+    Args:
+        pdf_input: Either bytes (PDF content), local path to PDF file, or Google Drive URL
+
+    Returns:
+        Dictionary containing extracted pathology markers data
+    """
+    logger.info("🔄 Extracting pathology markers using Vertex AI Gemini...")
+
+    # Bytes, local path, Firebase Storage path, Google Drive or direct URL
+    pdf_bytes = load_pdf_bytes(pdf_input)
 
-    # Wrap PDF bytes in Part object
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
+    logger.info(f"✅ PDF ready for processing ({len(pdf_bytes)} bytes)")
+
+    EXTRACTION_PROMPT = build_pathology_markers_prompt()
+
+    logger.info("🤖 Requesting pathology markers extraction from Vertex AI Gemini...")
 
     # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, EXTRACTION_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            EXTRACTION_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="pathology_markers"
         )
         logger.info("✅ Gemini extraction complete")
+    except GeminiResponseParseError as e:
+        logger.error(f"❌ Failed to parse Gemini response: {e}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
+        raise
     except Exception as e:
         logger.error(f"❌ API request failed: {e}")
         raise
 
-    # Parse JSON response
-    try:
-        # Extract text from the Vertex AI response
-        response_text = response.text.strip()
+    logger.info("✅ Pathology markers parsed successfully")
+    return extracted_data
 
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
 
-        # Clean markdown code blocks if present
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
+PATHOLOGY_COMBINED_NOTES = """
+COMBINED TASK RULES:
+- Always complete the "classification" task first.
+- If classification.category is "GENOMIC_ALTERATIONS" or "NO_TEST_PERFORMED", set "summary" and "markers" to null.
+- If classification.category is "TYPICAL_PATHOLOGY", "summary" and "markers" MUST be fully populated.
+"""
 
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🧹 Cleaned markdown code blocks from response")
-        else:
-            response_text = response_text.strip()
-            logger.info("ℹ️  No markdown code blocks found, using response as is")
 
-        # Parse JSON
-        extracted_data = json.loads(response_text)
-        logger.info("✅ Pathology markers parsed successfully")
-        return extracted_data
+def extract_pathology_combined(pdf_bytes):
+    """
+    Classify a pathology report and extract its summary and markers with one Gemini call.
 
-    except (KeyError, IndexError, json.JSONDecodeError) as e:
-        logger.error(f"❌ Failed to parse Gemini response: {e}")
-        logger.error(f"Raw response (first 500 chars): {response_text[:500]}")
-        raise
+    Args:
+        pdf_bytes: PDF content
 
+    Returns:
+        Tuple of (classification, summary, markers) - summary and markers are None for
+        non-typical reports - or None if the combined response failed validation
+    """
+    results = extract_sections_combined("pathology", pdf_bytes, [
+        ExtractionSection("classification", build_pathology_classification_prompt(), required_keys=("category", "confidence", "reasoning", "key_indicators")),
+        ExtractionSection("summary", build_pathology_summary_prompt(), required_keys=("pathology_report",), optional=True),
+        ExtractionSection("markers", build_pathology_markers_prompt(), required_keys=("pathology_combined",), optional=True),
+    ], notes=PATHOLOGY_COMBINED_NOTES)
+    if results is None:
+        return None
+    return results["classification"], results["summary"], results["markers"]
 
-def pathology_info(pdf_url, use_gemini_api=False):
+
+def pathology_info(pdf_url, use_gemini_api=False, mode=None):
     """
     Extract pathology information from a pathology report PDF.
 
@@ -851,6 +731,9 @@ def pathology_info(pdf_url, use_gemini_api=False):
         use_gemini_api (bool): Toggle for extraction approach
             - False (default): Use legacy llmresponsedetailed approach with GPT-5
             - True: Use Gemini REST API for extraction
+        mode (str, optional): Gemini approach only - "combined" (classification, summary
+            and markers in one call) or "split" (one call each); defaults to
+            EXTRACTION_MODE_PATHOLOGY / EXTRACTION_MODE
 
     Returns:
         tuple: (patient_pathology_summary, patient_pathology_markers)
@@ -868,13 +751,25 @@ def pathology_info(pdf_url, use_gemini_api=False):
     """
     log_extraction_start(logger, "Pathology Tab - Summary", pdf_url)
 
+    pdf_source = pdf_url
+    use_combined = use_gemini_api and get_extraction_mode("pathology", mode) == "combined"
+    if use_combined:
+        # Download once; the split extractions below reuse the bytes if we fall back
+        pdf_source = load_pdf_bytes(pdf_url)
+
     # Step 1: Classify the report using Gemini
     logger.info("="*80)
     logger.info("STEP 1: CLASSIFYING PATHOLOGY REPORT TYPE")
     logger.info("="*80)
 
+    combined = None
     try:
-        classification = classify_pathology_report_with_gemini(pdf_url)
+        if use_combined:
+            combined = extract_pathology_combined(pdf_source)
+        if combined is not None:
+            classification = combined[0]
+        else:
+            classification = classify_pathology_report_with_gemini(pdf_source)
 
         logger.info(f"📋 Report Type: {classification['category']}")
         logger.info(f"🎯 Confidence: {classification['confidence']}")
@@ -933,12 +828,24 @@ def pathology_info(pdf_url, use_gemini_api=False):
     logger.info("📊 This is a typical pathology report, proceeding with full extraction")
 
     # Toggle between extraction approaches
-    if use_gemini_api:
+    if use_gemini_api and combined is not None and combined[1] is not None and combined[2] is not None:
+        logger.info("🔧 Using Gemini REST API approach for extraction (combined)")
+        patient_pathology_summary, patient_pathology_markers = combined[1], combined[2]
+        patient_pathology_summary['report_type'] = 'TYPICAL_PATHOLOGY'
+        patient_pathology_summary['classification'] = classification
+        log_extraction_output(logger, "Pathology Summary", patient_pathology_summary)
+        log_extraction_output(logger, "Pathology Markers", patient_pathology_markers)
+        log_extraction_complete(logger, "Pathology (combined)", ["summary", "markers"])
+
+    elif use_gemini_api:
         logger.info("🔧 Using Gemini REST API approach for extraction")
+        if combined is not None:
+            logger.warning("⚠️  Combined response classified the report but left summary/markers empty, extracting them separately")
+        record_split_run("pathology")
 
         # Extract using Gemini API
         logger.info("🔄 Extracting pathology summary (1/2) via Gemini API...")
-        patient_pathology_summary = extract_pathology_summary_with_gemini_api(pdf_url)
+        patient_pathology_summary = extract_pathology_summary_with_gemini_api(pdf_source)
 
         # Add classification metadata to the summary
         if isinstance(patient_pathology_summary, dict):
@@ -949,7 +856,7 @@ def pathology_info(pdf_url, use_gemini_api=False):
         log_extraction_complete(logger, "Pathology Summary", patient_pathology_summary.keys() if isinstance(patient_pathology_summary, dict) else None)
 
         logger.info("🔄 Extracting pathology markers (2/2) via Gemini API...")
-        patient_pathology_markers = extract_pathology_markers_with_gemini_api(pdf_url)
+        patient_pathology_markers = extract_pathology_markers_with_gemini_api(pdf_source)
         log_extraction_output(logger, "Pathology Markers", patient_pathology_markers)
         log_extraction_complete(logger, "Pathology Markers", patient_pathology_markers.keys() if isinstance(patient_pathology_markers, dict) else None)
 
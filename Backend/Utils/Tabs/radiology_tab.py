@@ -2,9 +2,6 @@ import sys
 import os
 import json
 import re
-import requests
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
 
 # Add Backend to path for imports
 BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
@@ -12,14 +9,19 @@ if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
 from Utils.Tabs.llmparser import llmresponsedetailed
+try:
+    from Backend.Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from Backend.http_sessions import get_session
+    from Backend.Utils.combined_extraction import ExtractionSection, extract_sections_combined, get_extraction_mode, load_pdf_bytes, record_split_run
+except ModuleNotFoundError:
+    from Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from http_sessions import get_session
+    from Utils.combined_extraction import ExtractionSection, extract_sections_combined, get_extraction_mode, load_pdf_bytes, record_split_run
 from Utils.logger_config import setup_logger, log_extraction_start, log_extraction_complete, log_extraction_output
 
 # Setup logger
 logger = setup_logger(__name__)
 
-# Initialize Vertex AI
-vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
-
 # -------------------------------------------------------------------------
 # SECTION 1: REPORT SUMMARY
 # UI Requirements: Study Type, Study Date, Overall Response, Prior Comparison
@@ -122,54 +124,13 @@ description_imp_RECIST = {
 }
 
 
-def extract_radiology_summary_with_gemini_api(pdf_input):
+def build_radiology_summary_prompt():
     """
-    Extract radiology report summary using Vertex AI SDK.
-
-    Args:
-        pdf_input: Either bytes (PDF content), local path to PDF file, or Google Drive URL
+    Build the radiology summary extraction prompt.
 
     Returns:
-        Dictionary containing extracted radiology summary data
+        Prompt string (shared by the split and combined extraction modes)
     """
-    logger.info("🔄 Extracting radiology summary using Vertex AI SDK...")
-
-    # Handle different input types and get PDF bytes
-    if isinstance(pdf_input, bytes):
-        logger.info(f"📤 Using PDF bytes ({len(pdf_input)} bytes)")
-        pdf_bytes = pdf_input
-    elif isinstance(pdf_input, str):
-        if pdf_input.startswith("/api/documents/"):
-            # Handle Firebase Storage paths
-            logger.info(f"📥 Downloading PDF from Firebase Storage: {pdf_input}")
-            try:
-                from Backend.storage_uploader import download_pdf_bytes_from_url
-            except ModuleNotFoundError:
-                from storage_uploader import download_pdf_bytes_from_url
-            pdf_bytes = download_pdf_bytes_from_url(pdf_input)
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        elif "drive.google.com" in pdf_input:
-            # Handle Google Drive URLs
-            logger.info(f"📥 Downloading PDF from Google Drive: {pdf_input}")
-            match = re.search(r'/file/d/([^/]+)', pdf_input)
-            if match:
-                file_id = match.group(1)
-                download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-            else:
-                raise ValueError("Could not extract file ID from Google Drive URL")
-
-            response = requests.get(download_url, allow_redirects=True)
-            response.raise_for_status()
-            pdf_bytes = response.content
-            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
-        else:
-            # Assume it's a local file path
-            logger.info(f"📤 Reading PDF from local path: {pdf_input}")
-            with open(pdf_input, "rb") as f:
-                pdf_bytes = f.read()
-    else:
-        raise ValueError("pdf_input must be bytes, a local file path, Firebase Storage path, or a Google Drive URL")
-
     # Create detailed prompt for radiology summary extraction
     EXTRACTION_PROMPT = f"""
 You are an Expert Radiological Data Abstractor specialized in extracting structured radiology report data for oncology patient dashboards.
@@ -292,76 +253,20 @@ No markdown code blocks (no ```)
 No commentary or preamble.
 Just the pure JSON object following the schema above.
 """
+    return EXTRACTION_PROMPT
 
-    logger.info("🤖 Requesting radiology summary extraction using Vertex AI SDK...")
-
-    # Initialize model
-    model = GenerativeModel("gemini-2.5-pro")
-
-    # Wrap PDF bytes in Part object
-    pdf_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
-
-    # Make API request
-    try:
-        response = model.generate_content(
-            [pdf_part, EXTRACTION_PROMPT],
-            generation_config={
-                "temperature": 0,
-                "top_p": 1
-            }
-        )
-        logger.info("✅ Gemini extraction complete")
-    except Exception as e:
-        logger.error(f"❌ API request failed: {e}")
-        raise
-
-    # Parse JSON response
-    try:
-        # Extract text from the Vertex AI response
-        response_text = response.text.strip()
-
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
 
-        # Clean markdown code blocks if present (handles both ``` and ''')
-        # Try triple backticks first (with or without 'json' label)
-        json_pattern_backticks = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern_backticks, response_text)
-
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🧹 Cleaned markdown code blocks (backticks) from response")
-        else:
-            # Try triple single quotes
-            json_pattern_quotes = r"'''(?:json)?\s*([\s\S]*?)\s*'''"
-            match = re.search(json_pattern_quotes, response_text)
-            if match:
-                response_text = match.group(1).strip()
-                logger.info("🧹 Cleaned markdown code blocks (single quotes) from response")
-            else:
-                response_text = response_text.strip()
-                logger.info("ℹ️  No markdown code blocks found, using response as is")
-
-        extracted_data = json.loads(response_text)
-        logger.info("✅ Radiology summary parsed successfully")
-        return extracted_data
-
-    except (json.JSONDecodeError, AttributeError) as e:
-        logger.error(f"❌ Failed to parse response: {e}")
-        logger.error(f"Raw response text (first 500 chars): {response_text[:500] if 'response_text' in locals() else 'N/A'}")
-        raise
-
-
-def extract_radiology_imp_recist_with_gemini_api(pdf_input):
+def extract_radiology_summary_with_gemini_api(pdf_input):
     """
-    Extract radiology impression and RECIST measurements using Vertex AI SDK.
+    Extract radiology report summary using Vertex AI SDK.
 
     Args:
         pdf_input: Either bytes (PDF content), local path to PDF file, or Google Drive URL
 
     Returns:
-        Dictionary containing extracted impression and RECIST data
+        Dictionary containing extracted radiology summary data
     """
-    logger.info("🔄 Extracting radiology impression & RECIST using Vertex AI SDK...")
+    logger.info("🔄 Extracting radiology summary using Vertex AI SDK...")
 
     # Handle different input types and get PDF bytes
     if isinstance(pdf_input, bytes):
@@ -387,7 +292,7 @@ def extract_radiology_imp_recist_with_gemini_api(pdf_input):
             else:
                 raise ValueError("Could not extract file ID from Google Drive URL")
 
-            response = requests.get(download_url, allow_redirects=True)
+            response = get_session(download_url).get(download_url, allow_redirects=True)
             response.raise_for_status()
             pdf_bytes = response.content
             logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
@@ -399,6 +304,41 @@ def extract_radiology_imp_recist_with_gemini_api(pdf_input):
     else:
         raise ValueError("pdf_input must be bytes, a local file path, Firebase Storage path, or a Google Drive URL")
 
+    EXTRACTION_PROMPT = build_radiology_summary_prompt()
+
+    logger.info("🤖 Requesting radiology summary extraction using Vertex AI SDK...")
+
+    # Make API request
+    try:
+        extracted_data = get_gemini_client().generate_json(
+            EXTRACTION_PROMPT,
+            pdf_bytes=pdf_bytes,
+            generation_config={
+                "temperature": 0,
+                "top_p": 1
+            },
+            label="radiology_summary"
+        )
+        logger.info("✅ Gemini extraction complete")
+    except GeminiResponseParseError as e:
+        logger.error(f"❌ Failed to parse Gemini response: {e}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
+        raise
+    except Exception as e:
+        logger.error(f"❌ API request failed: {e}")
+        raise
+
+    logger.info("✅ Radiology summary parsed successfully")
+    return extracted_data
+
+
+def build_radiology_imp_recist_prompt():
+    """
+    Build the radiology impression & RECIST extraction prompt.
+
+    Returns:
+        Prompt string (shared by the split and combined extraction modes)
+    """
     # Create detailed prompt for impression and RECIST extraction
     EXTRACTION_PROMPT = f"""
 You are an Expert Radiological Data Abstractor specialized in extracting structured RECIST measurements and clinical impressions from radiology reports for precision oncology dashboards.
@@ -690,66 +630,106 @@ No markdown code blocks (no ```)
 No commentary or preamble.
 Just the pure JSON object following the schema above.
 """
+    return EXTRACTION_PROMPT
 
-    logger.info("🤖 Requesting radiology impression & RECIST extraction using Vertex AI SDK...")
 
-    # Initialize model
-    model = GenerativeModel("gemini-2.5-pro")
+def extract_radiology_imp_recist_with_gemini_api(pdf_input):
+    """
+    Extract radiology impression and RECIST measurements using Vertex AI SDK.
+
+    Args:
+        pdf_input: Either bytes (PDF content), local path to PDF file, or Google Drive URL
+
+    Returns:
+        Dictionary containing extracted impression and RECIST data
+    """
+    logger.info("🔄 Extracting radiology impression & RECIST using Vertex AI SDK...")
+
+    # Handle different input types and get PDF bytes
+    if isinstance(pdf_input, bytes):
+        logger.info(f"📤 Using PDF bytes ({len(pdf_input)} bytes)")
+        pdf_bytes = pdf_input
+    elif isinstance(pdf_input, str):
+        if pdf_input.startswith("/api/documents/"):
+            # Handle Firebase Storage paths
+            logger.info(f"📥 Downloading PDF from Firebase Storage: {pdf_input}")
+            try:
+                from Backend.storage_uploader import download_pdf_bytes_from_url
+            except ModuleNotFoundError:
+                from storage_uploader import download_pdf_bytes_from_url
+            pdf_bytes = download_pdf_bytes_from_url(pdf_input)
+            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
+        elif "drive.google.com" in pdf_input:
+            # Handle Google Drive URLs
+            logger.info(f"📥 Downloading PDF from Google Drive: {pdf_input}")
+            match = re.search(r'/file/d/([^/]+)', pdf_input)
+            if match:
+                file_id = match.group(1)
+                download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
+            else:
+                raise ValueError("Could not extract file ID from Google Drive URL")
+
+            response = get_session(download_url).get(download_url, allow_redirects=True)
+            response.raise_for_status()
+            pdf_bytes = response.content
+            logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
+        else:
+            # Assume it's a local file path
+            logger.info(f"📤 Reading PDF from local path: {pdf_input}")
+            with open(pdf_input, "rb") as f:
+                pdf_bytes = f.read()
+    else:
+        raise ValueError("pdf_input must be bytes, a local file path, Firebase Storage path, or a Google Drive URL")
+
+    EXTRACTION_PROMPT = build_radiology_imp_recist_prompt()
 
-    # Wrap PDF bytes in Part object
-    pdf_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
+    logger.info("🤖 Requesting radiology impression & RECIST extraction using Vertex AI SDK...")
 
     # Make API request
     try:
-        response = model.generate_content(
-            [pdf_part, EXTRACTION_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            EXTRACTION_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="radiology_recist"
         )
         logger.info("✅ Gemini extraction complete")
+    except GeminiResponseParseError as e:
+        logger.error(f"❌ Failed to parse Gemini response: {e}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
+        raise
     except Exception as e:
         logger.error(f"❌ API request failed: {e}")
         raise
 
-    # Parse JSON response
-    try:
-        # Extract text from the Vertex AI response
-        response_text = response.text.strip()
-
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
+    logger.info("✅ Radiology impression & RECIST parsed successfully")
+    return extracted_data
 
-        # Clean markdown code blocks if present (handles both ``` and ''')
-        # Try triple backticks first (with or without 'json' label)
-        json_pattern_backticks = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern_backticks, response_text)
 
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🧹 Cleaned markdown code blocks (backticks) from response")
-        else:
-            # Try triple single quotes
-            json_pattern_quotes = r"'''(?:json)?\s*([\s\S]*?)\s*'''"
-            match = re.search(json_pattern_quotes, response_text)
-            if match:
-                response_text = match.group(1).strip()
-                logger.info("🧹 Cleaned markdown code blocks (single quotes) from response")
-            else:
-                response_text = response_text.strip()
-                logger.info("ℹ️  No markdown code blocks found, using response as is")
+def extract_radiology_combined(pdf_bytes):
+    """
+    Extract radiology summary and impression & RECIST with one Gemini call.
 
-        extracted_data = json.loads(response_text)
-        logger.info("✅ Radiology impression & RECIST parsed successfully")
-        return extracted_data
+    Args:
+        pdf_bytes: PDF content
 
-    except (json.JSONDecodeError, AttributeError) as e:
-        logger.error(f"❌ Failed to parse response: {e}")
-        logger.error(f"Raw response text (first 500 chars): {response_text[:500] if 'response_text' in locals() else 'N/A'}")
-        raise
+    Returns:
+        Tuple of (radiology_summary, radiology_imp_RECIST), or None if the
+        combined response failed validation
+    """
+    results = extract_sections_combined("radiology", pdf_bytes, [
+        ExtractionSection("summary", build_radiology_summary_prompt(), required_keys=("report_summary",)),
+        ExtractionSection("imp_recist", build_radiology_imp_recist_prompt(), required_keys=("impression", "recist_measurements")),
+    ])
+    if results is None:
+        return None
+    return results["summary"], results["imp_recist"]
 
 
-def radiology_info(pdf_url_only_report=None, pdf_input=None, use_gemini_api=False):
+def radiology_info(pdf_url_only_report=None, pdf_input=None, use_gemini_api=False, mode=None):
     """
     Extract radiology information from a radiology report PDF.
 
@@ -764,6 +744,8 @@ def radiology_info(pdf_url_only_report=None, pdf_input=None, use_gemini_api=Fals
         use_gemini_api (bool): Toggle for extraction approach
             - False (default): Use legacy llmresponsedetailed approach with GPT-5
             - True: Use Vertex AI SDK with Gemini for extraction
+        mode (str, optional): Vertex AI approach only - "combined" (one call) or "split"
+            (one call per section); defaults to EXTRACTION_MODE_RADIOLOGY / EXTRACTION_MODE
 
     Returns:
         tuple: (patient_radiology_summary, patient_radiology_imp_RECIST)
@@ -788,9 +770,24 @@ def radiology_info(pdf_url_only_report=None, pdf_input=None, use_gemini_api=Fals
     logger.info("RADIOLOGY REPORT EXTRACTION")
     logger.info("="*80)
 
+    if use_gemini_api and get_extraction_mode("radiology", mode) == "combined":
+        logger.info("🔧 Using Vertex AI SDK approach for extraction (combined)")
+        pdf_source = load_pdf_bytes(pdf_source)
+        combined = extract_radiology_combined(pdf_source)
+        if combined is not None:
+            patient_radiology_summary, patient_radiology_imp_RECIST = combined
+            log_extraction_output(logger, "Radiology Summary", patient_radiology_summary)
+            log_extraction_output(logger, "Radiology Impression & RECIST", patient_radiology_imp_RECIST)
+            log_extraction_complete(logger, "Radiology (combined)", ["summary", "imp_recist"])
+            logger.info("="*80)
+            logger.info("✅ RADIOLOGY EXTRACTION COMPLETE")
+            logger.info("="*80)
+            return patient_radiology_summary, patient_radiology_imp_RECIST
+
     # Toggle between extraction approaches
     if use_gemini_api:
         logger.info("🔧 Using Vertex AI SDK approach for extraction")
+        record_split_run("radiology")
 
         # Extract Report Summary using Vertex AI SDK (supports bytes)
         logger.info("🔄 Extracting radiology summary (1/2) via Vertex AI SDK...")
@@ -845,7 +842,7 @@ def radiology_info(pdf_url_only_report=None, pdf_input=None, use_gemini_api=Fals
 
 
 
-def extract_radiology_details_from_report(radiology_url=None, pdf_input=None, use_gemini_api=False):
+def extract_radiology_details_from_report(radiology_url=None, pdf_input=None, use_gemini_api=False, mode=None):
     """
     Extract radiology details from a single report.
 
@@ -859,6 +856,7 @@ def extract_radiology_details_from_report(radiology_url=None, pdf_input=None, us
         use_gemini_api (bool): Toggle for extraction approach
             - False (default): Use legacy llmresponsedetailed approach with GPT-5
             - True: Use Vertex AI SDK with Gemini for extraction
+        mode (str, optional): "combined" or "split" (see radiology_info)
 
     Returns:
         Tuple of (radiology_summary, radiology_imp_RECIST)
@@ -866,7 +864,8 @@ def extract_radiology_details_from_report(radiology_url=None, pdf_input=None, us
     return radiology_info(
         pdf_url_only_report=radiology_url,
         pdf_input=pdf_input,
-        use_gemini_api=use_gemini_api
+        use_gemini_api=use_gemini_api,
+        mode=mode
     )
 
 
@@ -4,23 +4,20 @@ import sys
 import os
 import json
 import re
-import requests
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
 
 # Add Backend to path for imports
 BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
 if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
+from Backend.Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+from Backend.http_sessions import get_session
+from Backend.Utils.combined_extraction import ExtractionSection, extract_sections_combined, get_extraction_mode, load_pdf_bytes, record_split_run
 from Backend.Utils.logger_config import setup_logger, log_extraction_start, log_extraction_complete, log_extraction_output
 
 # Setup logger
 logger = setup_logger(__name__)
 
-# Initialize Vertex AI
-vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
-
 extracted_instructions_lot = (
     "Extract structured treatment data for a 'Lines of Therapy' timeline UI from the provided clinical notes. "
     "Scope: Include Systemic Therapy (Chemo, Immunotherapy, Targeted), Radiation Therapy, and major Surgeries. "
@@ -192,6 +189,30 @@ description_timeline = {
     ]
 }
 
+def build_lot_prompt():
+    """
+    Build the treatment lines of therapy extraction prompt.
+
+    Returns:
+        Prompt string (shared by the split and combined extraction modes)
+    """
+    # Build prompt from extraction instructions and description
+    GEMINI_PROMPT = f"""
+{extracted_instructions_lot}
+
+OUTPUT SCHEMA (STRICT):
+{json.dumps(description_lot, indent=2)}
+
+OUTPUT FORMAT:
+Return VALID JSON ONLY.
+No explanations.
+No markdown code blocks.
+No commentary.
+Just the JSON object following the schema above.
+"""
+    return GEMINI_PROMPT
+
+
 def extract_lot_with_gemini(pdf_input):
     """
     Extract Lines of Therapy data using Vertex AI Gemini SDK.
@@ -228,7 +249,7 @@ def extract_lot_with_gemini(pdf_input):
         else:
             download_url = pdf_input
 
-        response = requests.get(download_url, allow_redirects=True)
+        response = get_session(download_url).get(download_url, allow_redirects=True)
         response.raise_for_status()
         pdf_bytes = response.content
         logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
@@ -238,66 +259,57 @@ def extract_lot_with_gemini(pdf_input):
         with open(pdf_input, "rb") as f:
             pdf_bytes = f.read()
 
-    # Build prompt from extraction instructions and description
-    GEMINI_PROMPT = f"""
-{extracted_instructions_lot}
-
-OUTPUT SCHEMA (STRICT):
-{json.dumps(description_lot, indent=2)}
-
-OUTPUT FORMAT:
-Return VALID JSON ONLY.
-No explanations.
-No markdown code blocks.
-No commentary.
-Just the JSON object following the schema above.
-"""
+    GEMINI_PROMPT = build_lot_prompt()
 
     logger.info("🤖 Generating treatment LOT extraction with Vertex AI Gemini...")
 
-    # Initialize the model
-    model = GenerativeModel("gemini-2.5-pro")
-
-    # Wrap PDF bytes in Part object
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
-
     # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, GEMINI_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            GEMINI_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="treatment_lot"
         )
         logger.info("✅ Gemini treatment LOT extraction complete")
+    except GeminiResponseParseError as e:
+        logger.error(f"❌ Failed to parse Gemini response: {e}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
+        raise
     except Exception as e:
         logger.error(f"❌ API request failed: {e}")
         raise
 
-    # Parse JSON response
-    try:
-        response_text = response.text.strip()
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
+    logger.info(f"✅ Successfully parsed JSON with {len(extracted_data)} top-level keys")
 
-        # Use regex to extract JSON from markdown code blocks
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
+    return extracted_data
 
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🔍 Extracted JSON from markdown code block")
 
-        # Parse the JSON
-        extracted_data = json.loads(response_text)
-        logger.info(f"✅ Successfully parsed JSON with {len(extracted_data)} top-level keys")
+def build_timeline_prompt():
+    """
+    Build the treatment timeline extraction prompt.
 
-        return extracted_data
+    Returns:
+        Prompt string (shared by the split and combined extraction modes)
+    """
+    # Build prompt from extraction instructions and description
+    GEMINI_PROMPT = f"""
+{extracted_instructions_timeline}
 
-    except json.JSONDecodeError as e:
-        logger.error(f"❌ Failed to parse JSON: {e}")
-        logger.error(f"📄 Response text preview: {response_text[:500]}")
-        raise
+OUTPUT SCHEMA (STRICT):
+{json.dumps(description_timeline, indent=2)}
+
+OUTPUT FORMAT:
+Return VALID JSON ONLY.
+No explanations.
+No markdown code blocks.
+No commentary.
+Just the JSON object following the schema above.
+"""
+    return GEMINI_PROMPT
 
 
 def extract_timeline_with_gemini(pdf_input):
@@ -336,7 +348,7 @@ def extract_timeline_with_gemini(pdf_input):
         else:
             download_url = pdf_input
 
-        response = requests.get(download_url, allow_redirects=True)
+        response = get_session(download_url).get(download_url, allow_redirects=True)
         response.raise_for_status()
         pdf_bytes = response.content
         logger.info(f"✅ Downloaded {len(pdf_bytes)} bytes")
@@ -346,71 +358,93 @@ def extract_timeline_with_gemini(pdf_input):
         with open(pdf_input, "rb") as f:
             pdf_bytes = f.read()
 
-    # Build prompt from extraction instructions and description
-    GEMINI_PROMPT = f"""
-{extracted_instructions_timeline}
-
-OUTPUT SCHEMA (STRICT):
-{json.dumps(description_timeline, indent=2)}
-
-OUTPUT FORMAT:
-Return VALID JSON ONLY.
-No explanations.
-No markdown code blocks.
-No commentary.
-Just the JSON object following the schema above.
-"""
+    GEMINI_PROMPT = build_timeline_prompt()
 
     logger.info("🤖 Generating treatment timeline extraction with Vertex AI Gemini...")
 
-    model = GenerativeModel("gemini-2.5-pro")
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
-
+    # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, GEMINI_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            GEMINI_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="treatment_timeline"
         )
         logger.info("✅ Gemini treatment timeline extraction complete")
+    except GeminiResponseParseError as e:
+        logger.error(f"❌ Failed to parse Gemini response: {e}")
+        logger.error(f"Raw response text (first 500 chars): {e.response_text[:500] or 'N/A'}")
+        raise
     except Exception as e:
         logger.error(f"❌ API request failed: {e}")
         raise
 
-    try:
-        response_text = response.text.strip()
-        logger.info(f"📄 Extracted response text ({len(response_text)} chars)")
+    logger.info(f"✅ Successfully parsed JSON with {len(extracted_data)} top-level keys")
 
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
+    return extracted_data
 
-        if match:
-            response_text = match.group(1).strip()
-            logger.info("🔍 Extracted JSON from markdown code block")
 
-        extracted_data = json.loads(response_text)
-        logger.info(f"✅ Successfully parsed JSON with {len(extracted_data)} top-level keys")
+def extract_treatment_combined(pdf_bytes):
+    """
+    Extract lines of therapy and timeline with one Gemini call.
 
-        return extracted_data
+    Args:
+        pdf_bytes: PDF content
+
+    Returns:
+        Tuple of (treatment_lot, treatment_timeline), or None if the combined
+        response failed validation
+    """
+    results = extract_sections_combined("treatment", pdf_bytes, [
+        ExtractionSection("lot", build_lot_prompt(), required_keys=("treatment_history",)),
+        ExtractionSection("timeline", build_timeline_prompt(), required_keys=("timeline_events",)),
+    ])
+    if results is None:
+        return None
+    return results["lot"], results["timeline"]
 
-    except json.JSONDecodeError as e:
-        logger.error(f"❌ Failed to parse JSON: {e}")
-        logger.error(f"📄 Response text preview: {response_text[:500]}")
-        raise
 
+def extract_treatment_tab_info(pdf_url=None, pdf_bytes=None, mode=None):
+    """
+    Extract treatment lines of therapy and treatment timeline.
+
+    Args:
+        pdf_url: URL/path to the PDF (used if pdf_bytes not provided)
+        pdf_bytes: PDF content already in memory (shared by both extractions)
+        mode: "combined" (one Gemini call) or "split" (one call per component);
+              defaults to EXTRACTION_MODE_TREATMENT / EXTRACTION_MODE
 
-def extract_treatment_tab_info(pdf_url):
+    Returns:
+        Tuple of (treatment_lot, treatment_timeline)
+    """
+    if pdf_bytes is None and pdf_url is None:
+        raise ValueError("Either pdf_bytes or pdf_url must be provided")
+    pdf_input = pdf_bytes if pdf_bytes is not None else pdf_url
+
+    if get_extraction_mode("treatment", mode) == "combined":
+        log_extraction_start(logger, "Treatment Tab (combined)", pdf_url)
+        pdf_input = load_pdf_bytes(pdf_input)
+        combined = extract_treatment_combined(pdf_input)
+        if combined is not None:
+            patient_treatment_lot, patient_treatment_timeline = combined
+            log_extraction_output(logger, "Treatment LOT", patient_treatment_lot)
+            log_extraction_output(logger, "Treatment Timeline", patient_treatment_timeline)
+            log_extraction_complete(logger, "Treatment Tab (combined)", ["lot", "timeline"])
+            return patient_treatment_lot, patient_treatment_timeline
+
+    record_split_run("treatment")
     log_extraction_start(logger, "Treatment Tab (2 components)", pdf_url)
 
     logger.info("🔄 Extracting treatment lines of therapy (1/2)...")
-    patient_treatment_lot = extract_lot_with_gemini(pdf_url)
+    patient_treatment_lot = extract_lot_with_gemini(pdf_input)
     log_extraction_output(logger, "Treatment LOT", patient_treatment_lot)
     log_extraction_complete(logger, "Treatment LOT", patient_treatment_lot.keys() if isinstance(patient_treatment_lot, dict) else None)
 
     logger.info("🔄 Extracting treatment timeline (2/2)...")
-    patient_treatment_timeline = extract_timeline_with_gemini(pdf_url)
+    patient_treatment_timeline = extract_timeline_with_gemini(pdf_input)
     log_extraction_output(logger, "Treatment Timeline", patient_treatment_timeline)
     log_extraction_complete(logger, "Treatment Timeline", patient_treatment_timeline.keys() if isinstance(patient_treatment_timeline, dict) else None)
 
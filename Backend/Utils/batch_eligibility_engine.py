@@ -13,7 +13,7 @@ import json
 import time
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import sys
 import os
@@ -32,10 +32,26 @@ from data_pool import get_data_pool
 from Utils.Tabs.clinical_trials_tab import (
     fetch_trials_from_api,
     process_single_trial,
-    build_patient_context,
+    prefilter_trial_result,
+    prefilter_rejection_result,
+    compute_trial_features,
+    drop_stale_trial_features,
+    build_patient_match_context,
+    patient_data_fingerprint,
+    PatientMatchContext,
     build_search_queries_from_patient
 )
 
+try:
+    from Backend.Utils.eligibility_events import get_eligibility_event_broker
+except ModuleNotFoundError:
+    from Utils.eligibility_events import get_eligibility_event_broker
+
+try:
+    from Backend.Utils.trial_prefilter import TrialPrefilterIndex
+except ModuleNotFoundError:
+    from Utils.trial_prefilter import TrialPrefilterIndex
+
 
 class BatchEligibilityEngine:
     """
@@ -51,6 +67,7 @@ class BatchEligibilityEngine:
         """
         self.data_pool = get_data_pool()
         self.max_workers = max_workers
+        self.events = get_eligibility_event_broker()
 
     def sync_trials(self, search_queries: List[str] = None, max_per_query: int = 100,
                     status: str = "RECRUITING", db_type: str = None) -> Dict:
@@ -177,8 +194,13 @@ class BatchEligibilityEngine:
         return summary
 
     def _normalize_trial_data(self, trial: Dict) -> Dict:
-        """Normalize trial data for storage - preserves all fields needed for eligibility matching."""
-        return {
+        """
+        Normalize trial data for storage - preserves all fields needed for eligibility matching.
+
+        Also precomputes the trial features record (parsed criteria, age range,
+        sex, ECOG limits, disease tags) that matching reads for every patient.
+        """
+        normalized = {
             "nct_id": trial.get("nct_id", ""),
             "title": trial.get("title", ""),
             "phase": trial.get("phase", ""),
@@ -205,6 +227,8 @@ class BatchEligibilityEngine:
             "last_updated_on_api": trial.get("last_update_posted", ""),
             "is_active": True
         }
+        normalized["features"] = compute_trial_features(normalized)
+        return normalized
 
     def compute_eligibility_matrix(self, patient_mrns: List[str] = None,
                                    trial_nct_ids: List[str] = None,
@@ -267,6 +291,10 @@ class BatchEligibilityEngine:
                 db_type=db_type
             )
 
+        stale_features = drop_stale_trial_features(trials)
+        if stale_features:
+            logger.info(f"Recomputing features of {stale_features} trials changed since sync")
+
         trial_load_elapsed = time.time() - trial_load_start
         logger.info(f"Loaded {len(trials)} trials in {trial_load_elapsed:.2f}s")
         print(f"Trials to process: {len(trials)}")
@@ -289,6 +317,17 @@ class BatchEligibilityEngine:
         start_time = time.time()
         logger.info(f"Starting eligibility computation at {datetime.now().isoformat()}")
 
+        # Patient context + derived facts for this run, by patient content fingerprint
+        match_contexts = {}
+
+        # Trial features as columns, so each patient is prefiltered against all trials at once
+        # (list_all_trials only returns RECRUITING trials; keep it that way for cached features)
+        prefilter_start = time.time()
+        prefilter_index = TrialPrefilterIndex([self._trial_for_processing(t) for t in trials],
+                                              recruiting_only=not trial_nct_ids)
+        logger.info(f"Built prefilter index for {len(trials)} trials in {time.time() - prefilter_start:.3f}s "
+                    f"(vectorized={prefilter_index.vectorized})")
+
         for patient_idx, patient in enumerate(patients, 1):
             patient_data = patient["data"]
             patient_mrn = patient["mrn"]
@@ -299,11 +338,23 @@ class BatchEligibilityEngine:
 
             # Start progress tracking
             self.data_pool.start_computation_progress(patient_mrn, len(trials), db_type=db_type)
+            self.events.publish(patient_mrn, db_type, "progress", {
+                "status": "computing", "trials_total": len(trials), "trials_completed": 0,
+                "trials_eligible": 0, "trials_error": 0
+            })
 
             try:
+                match_context = self._get_patient_match_context(patient_mrn, patient_data, match_contexts)
+
+                candidate_nct_ids, rejections = prefilter_index.prefilter(patient_data)
+                candidate_nct_ids = set(candidate_nct_ids)
+                logger.info(f"[Patient {patient_idx}/{len(patients)}] Prefilter: {len(candidate_nct_ids)}/{len(trials)} "
+                            f"trials need criteria matching")
+
                 # Process trials in parallel — results stored incrementally per-trial
                 batch_results = self._process_patient_trials_batch(
-                    patient_mrn, patient_data, trials, db_type
+                    patient_mrn, patient_data, trials, db_type, match_context=match_context,
+                    candidate_nct_ids=candidate_nct_ids, rejections=rejections
                 )
 
                 results.extend(batch_results)
@@ -312,6 +363,9 @@ class BatchEligibilityEngine:
 
                 # Mark computation complete
                 self.data_pool.complete_computation_progress(patient_mrn, db_type=db_type)
+                self.events.publish(patient_mrn, db_type, "complete", {
+                    "status": "completed", "trials_total": len(trials), "error_message": None
+                })
 
                 patient_elapsed = time.time() - patient_start_time
                 avg_per_trial = patient_elapsed / len(trials) if len(trials) > 0 else 0
@@ -321,6 +375,9 @@ class BatchEligibilityEngine:
                 logger.error(f"[Patient {patient_idx}/{len(patients)}] Error processing patient {patient_mrn} after {patient_elapsed:.2f}s: {e}")
                 print(f"   Error processing patient {patient_mrn}: {e}")
                 self.data_pool.complete_computation_progress(patient_mrn, error_message=str(e), db_type=db_type)
+                self.events.publish(patient_mrn, db_type, "complete", {
+                    "status": "error", "trials_total": len(trials), "error_message": str(e)
+                })
                 processed += len(trials)
                 errors += len(trials)
 
@@ -362,6 +419,7 @@ class BatchEligibilityEngine:
             "errors": errors,
             "elapsed_seconds": round(elapsed, 2),
             "avg_time_per_combination": round(avg_time_per_combo, 3),
+            "prefilter": prefilter_index.get_stats(),
             "timestamp": datetime.now().isoformat()
         }
 
@@ -373,146 +431,260 @@ class BatchEligibilityEngine:
 
         return summary
 
+    def _get_patient_match_context(self, patient_mrn: str, patient_data: Dict,
+                                   match_contexts: Dict[str, PatientMatchContext]) -> PatientMatchContext:
+        """
+        Get the patient's match context, building it on first use in this run.
+
+        Args:
+            patient_mrn: Patient MRN (for logging)
+            patient_data: Patient data dictionary
+            match_contexts: Contexts built so far in this run, by patient fingerprint
+
+        Returns:
+            PatientMatchContext
+        """
+        fingerprint = patient_data_fingerprint(patient_data)
+        match_context = match_contexts.get(fingerprint)
+        if match_context is None:
+            build_start = time.time()
+            match_context = build_patient_match_context(patient_data, fingerprint)
+            match_contexts[fingerprint] = match_context
+            logger.info(f"[MRN: {patient_mrn}] Built patient context in {time.time() - build_start:.3f}s "
+                        f"(fingerprint {fingerprint[:12]})")
+        return match_context
+
     def _process_patient_trials_batch(self, patient_mrn: str, patient_data: Dict,
-                                      trials: List[Dict], db_type: str = None) -> List[Dict]:
+                                      trials: List[Dict], db_type: str = None,
+                                      match_context: Optional[PatientMatchContext] = None,
+                                      candidate_nct_ids: Optional[set] = None,
+                                      rejections: Optional[Dict[str, Optional[Tuple[str, str]]]] = None) -> List[Dict]:
         """
         Process eligibility for a patient against multiple trials in parallel.
 
+        Trials outside candidate_nct_ids failed the prefilter (TrialPrefilterIndex);
+        their NOT_ELIGIBLE results are built inline instead of on the worker pool,
+        from the index's rejection reasons when given. Candidates skip the
+        prefilter in process_single_trial.
+
         Args:
             patient_mrn: Patient MRN
             patient_data: Patient data dictionary
             trials: List of trial dictionaries
             db_type: Hospital type ('demo' or 'astera'). Defaults to None.
+            match_context: Patient context and derived facts (built here if not given)
+            candidate_nct_ids: Trials that passed the prefilter (None = all trials)
+            rejections: {nct_id: (check, reason)} of the other trials, from
+                TrialPrefilterIndex.prefilter (None = re-run the checks per trial)
 
         Returns:
             List of eligibility results
         """
+        if match_context is None:
+            match_context = build_patient_match_context(patient_data)
+
         results = []
         completed_count = 0
         eligible_count = 0
+        error_count = 0
+
+        def publish_progress():
+            self.events.publish(patient_mrn, db_type, "progress", {
+                "status": "computing",
+                "trials_total": len(trials),
+                "trials_completed": completed_count,
+                "trials_eligible": eligible_count,
+                "trials_error": error_count
+            })
 
         logger.info(f"[MRN: {patient_mrn}] Starting parallel processing of {len(trials)} trials with {self.max_workers} workers")
 
+        trial_by_nct = {trial["nct_id"]: trial for trial in trials}
+
+        def handle_result(nct_id: str, get_result):
+            nonlocal completed_count, eligible_count, error_count
+            completed_count += 1
+            try:
+                result = get_result()
+                if result:
+                    # process_single_trial returns: {eligibility: {status, percentage, ...}, criteria_results: {...}}
+                    eligibility_info = result.get("eligibility", {}) or {}
+                    criteria_results = result.get("criteria_results", {}) or {}
+
+                    # Extract key criteria for quick reference
+                    inclusion_results = criteria_results.get("inclusion", [])
+                    exclusion_results = criteria_results.get("exclusion", [])
+
+                    # Get matching inclusion criteria (met=True)
+                    key_matching = [
+                        c.get("criterion_text", "")[:100]
+                        for c in inclusion_results
+                        if c.get("met") is True
+                    ][:5]  # Limit to 5
+
+                    # Get exclusion reasons (violated exclusions where met=True means BAD)
+                    key_exclusions = [
+                        c.get("criterion_text", "")[:100]
+                        for c in exclusion_results
+                        if c.get("met") is True
+                    ][:5]  # Limit to 5
+
+                    result_dict = {
+                        "trial_nct_id": nct_id,
+                        "patient_mrn": patient_mrn,
+                        "status": eligibility_info.get("status", "Unknown"),
+                        "percentage": eligibility_info.get("percentage", 0),
+                        "criteria_results": criteria_results,
+                        "key_matching_criteria": key_matching,
+                        "key_exclusion_reasons": key_exclusions
+                    }
+                    results.append(result_dict)
+
+                    # Store immediately to DB (progressive loading)
+                    self.data_pool.store_eligibility(nct_id, patient_mrn, result_dict, trial_data=trial_by_nct[nct_id], db_type=db_type)
+
+                    # Update progress counter
+                    is_eligible = eligibility_info.get("status") in (
+                        "LIKELY_ELIGIBLE", "POTENTIALLY_ELIGIBLE"
+                    )
+                    if is_eligible:
+                        eligible_count += 1
+                        logger.info(f"[MRN: {patient_mrn}] Trial {nct_id}: {eligibility_info.get('status')} ({eligibility_info.get('percentage', 0)}%)")
+
+                    self.data_pool.increment_computation_progress(
+                        patient_mrn, is_eligible=is_eligible, db_type=db_type
+                    )
+                    self.events.publish(patient_mrn, db_type, "trial_result", {
+                        **result_dict,
+                        "trial_title": trial_by_nct[nct_id].get("title")
+                    })
+                    publish_progress()
+
+                    # Log progress every 50 trials
+                    if completed_count % 50 == 0:
+                        logger.info(f"[MRN: {patient_mrn}] Progress: {completed_count}/{len(trials)} trials completed, {eligible_count} eligible so far")
+                else:
+                    # Trial returned None (skipped by pre-filter)
+                    self.data_pool.increment_computation_progress(patient_mrn, db_type=db_type)
+                    publish_progress()
+            except Exception as e:
+                logger.error(f"[MRN: {patient_mrn}] Error processing trial {nct_id}: {e}")
+                print(f"      Error processing {nct_id}: {e}")
+                error_count += 1
+                self.data_pool.increment_computation_progress(
+                    patient_mrn, is_error=True, db_type=db_type
+                )
+                publish_progress()
+
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             futures = {}
+            rejected = []
             for trial in trials:
+                if candidate_nct_ids is not None and trial["nct_id"] not in candidate_nct_ids:
+                    rejected.append(trial)
+                    continue
                 future = executor.submit(
                     self._compute_single_eligibility,
-                    patient_data, trial
+                    patient_data, trial, match_context, candidate_nct_ids is not None
                 )
                 futures[future] = trial["nct_id"]
 
-            for future in as_completed(futures):
-                nct_id = futures[future]
-                completed_count += 1
-                try:
-                    result = future.result()
-                    if result:
-                        # process_single_trial returns: {eligibility: {status, percentage, ...}, criteria_results: {...}}
-                        eligibility_info = result.get("eligibility", {}) or {}
-                        criteria_results = result.get("criteria_results", {}) or {}
-
-                        # Extract key criteria for quick reference
-                        inclusion_results = criteria_results.get("inclusion", [])
-                        exclusion_results = criteria_results.get("exclusion", [])
-
-                        # Get matching inclusion criteria (met=True)
-                        key_matching = [
-                            c.get("criterion_text", "")[:100]
-                            for c in inclusion_results
-                            if c.get("met") is True
-                        ][:5]  # Limit to 5
-
-                        # Get exclusion reasons (violated exclusions where met=True means BAD)
-                        key_exclusions = [
-                            c.get("criterion_text", "")[:100]
-                            for c in exclusion_results
-                            if c.get("met") is True
-                        ][:5]  # Limit to 5
-
-                        result_dict = {
-                            "trial_nct_id": nct_id,
-                            "patient_mrn": patient_mrn,
-                            "status": eligibility_info.get("status", "Unknown"),
-                            "percentage": eligibility_info.get("percentage", 0),
-                            "criteria_results": criteria_results,
-                            "key_matching_criteria": key_matching,
-                            "key_exclusion_reasons": key_exclusions
-                        }
-                        results.append(result_dict)
-
-                        # Store immediately to DB (progressive loading)
-                        self.data_pool.store_eligibility(nct_id, patient_mrn, result_dict, trial_data=trial, db_type=db_type)
-
-                        # Update progress counter
-                        is_eligible = eligibility_info.get("status") in (
-                            "LIKELY_ELIGIBLE", "POTENTIALLY_ELIGIBLE"
-                        )
-                        if is_eligible:
-                            eligible_count += 1
-                            logger.info(f"[MRN: {patient_mrn}] Trial {nct_id}: {eligibility_info.get('status')} ({eligibility_info.get('percentage', 0)}%)")
-
-                        self.data_pool.increment_computation_progress(
-                            patient_mrn, is_eligible=is_eligible, db_type=db_type
-                        )
-
-                        # Log progress every 50 trials
-                        if completed_count % 50 == 0:
-                            logger.info(f"[MRN: {patient_mrn}] Progress: {completed_count}/{len(trials)} trials completed, {eligible_count} eligible so far")
-                    else:
-                        # Trial returned None (skipped by pre-filter)
-                        self.data_pool.increment_computation_progress(patient_mrn, db_type=db_type)
-                except Exception as e:
-                    logger.error(f"[MRN: {patient_mrn}] Error processing trial {nct_id}: {e}")
-                    print(f"      Error processing {nct_id}: {e}")
-                    self.data_pool.increment_computation_progress(
-                        patient_mrn, is_error=True, db_type=db_type
+            # Prefilter rejections need no LLM calls; record them while the candidates run
+            for trial in rejected:
+                if rejections is not None:
+                    compute = lambda trial=trial: self._build_prefilter_rejection(
+                        patient_data, trial, rejections.get(trial["nct_id"])
                     )
-                    continue
+                else:
+                    compute = lambda trial=trial: self._compute_prefilter_rejection(patient_data, trial)
+                handle_result(trial["nct_id"], compute)
+
+            for future in as_completed(futures):
+                handle_result(futures[future], future.result)
 
         logger.info(f"[MRN: {patient_mrn}] Completed all {len(trials)} trials: {len(results)} successful, {eligible_count} eligible")
         return results
 
-    def _compute_single_eligibility(self, patient_data: Dict, trial: Dict) -> Optional[Dict]:
+    def _trial_for_processing(self, trial: Dict) -> Dict:
+        """Transform cached trial data to the format expected by process_single_trial()."""
+        # The cached data may use different field names
+        return {
+            "nct_id": trial.get("nct_id", ""),
+            "title": trial.get("title", ""),
+            "phase": trial.get("phase", ""),
+            "status": trial.get("status", ""),
+            "study_type": trial.get("study_type", "Interventional"),  # Default if missing
+            "brief_summary": trial.get("brief_summary", ""),
+            # Use eligibility_criteria_text (expected by process_single_trial)
+            "eligibility_criteria_text": trial.get("eligibility_criteria_text",
+                                                   trial.get("eligibility_criteria", "")),
+            "minimum_age": trial.get("minimum_age", ""),
+            "maximum_age": trial.get("maximum_age", ""),
+            "sex": trial.get("sex", "ALL"),
+            "healthy_volunteers": trial.get("healthy_volunteers", False),
+            "locations": trial.get("locations", []),
+            "contact": trial.get("contact", {}),
+            # Include conditions for disease matching
+            "conditions": trial.get("conditions", trial.get("cancer_types", [])),
+            "cancer_types": trial.get("cancer_types", trial.get("conditions", [])),
+            # Matching features precomputed at sync time (recomputed if absent)
+            "features": trial.get("features")
+        }
+
+    def _compute_prefilter_rejection(self, patient_data: Dict, trial: Dict) -> Optional[Dict]:
+        """
+        NOT_ELIGIBLE result for a pair the prefilter rejected (no LLM calls).
+
+        Args:
+            patient_data: Patient data dictionary
+            trial: Trial dictionary (from cache, may need field transformation)
+
+        Returns:
+            Eligibility result, or None if the trial was only dropped for its status
+        """
+        return prefilter_trial_result(self._trial_for_processing(trial), patient_data)
+
+    def _build_prefilter_rejection(self, patient_data: Dict, trial: Dict,
+                                   rejection: Optional[Tuple[str, str]]) -> Optional[Dict]:
+        """
+        NOT_ELIGIBLE result for a pair the prefilter index rejected, from its reason.
+
+        Args:
+            patient_data: Patient data dictionary
+            trial: Trial dictionary (from cache, may need field transformation)
+            rejection: (check, reason) from TrialPrefilterIndex.prefilter
+
+        Returns:
+            Eligibility result, or None if the trial was only dropped for its status
+        """
+        if rejection is None:
+            return None
+        check, reason = rejection
+        return prefilter_rejection_result(self._trial_for_processing(trial), patient_data, check, reason)
+
+    def _compute_single_eligibility(self, patient_data: Dict, trial: Dict,
+                                    match_context: PatientMatchContext,
+                                    prefiltered: bool = False) -> Optional[Dict]:
         """
         Compute eligibility for a single patient-trial pair.
 
         Args:
             patient_data: Patient data dictionary
             trial: Trial dictionary (from cache, may need field transformation)
+            match_context: Patient context and derived facts shared by all trials
+            prefiltered: Trial already passed the prefilter index for this patient
 
         Returns:
             Eligibility result or None
         """
         try:
-            # Build patient context for LLM
-            patient_context = build_patient_context(patient_data)
-
-            # Transform cached trial data to format expected by process_single_trial()
-            # The cached data may use different field names
-            trial_for_processing = {
-                "nct_id": trial.get("nct_id", ""),
-                "title": trial.get("title", ""),
-                "phase": trial.get("phase", ""),
-                "status": trial.get("status", ""),
-                "study_type": trial.get("study_type", "Interventional"),  # Default if missing
-                "brief_summary": trial.get("brief_summary", ""),
-                # Use eligibility_criteria_text (expected by process_single_trial)
-                "eligibility_criteria_text": trial.get("eligibility_criteria_text",
-                                                       trial.get("eligibility_criteria", "")),
-                "minimum_age": trial.get("minimum_age", ""),
-                "maximum_age": trial.get("maximum_age", ""),
-                "sex": trial.get("sex", "ALL"),
-                "healthy_volunteers": trial.get("healthy_volunteers", False),
-                "locations": trial.get("locations", []),
-                "contact": trial.get("contact", {}),
-                # Include conditions for disease matching
-                "conditions": trial.get("conditions", trial.get("cancer_types", [])),
-                "cancer_types": trial.get("cancer_types", trial.get("conditions", []))
-            }
+            trial_for_processing = self._trial_for_processing(trial)
 
             # Process the trial - this returns the full eligibility result
-            result = process_single_trial(trial_for_processing, patient_context, patient_data)
+            result = process_single_trial(
+                trial_for_processing, match_context.patient_context, patient_data, match_context.derived_facts,
+                prefiltered=prefiltered
+            )
             return result
         except Exception as e:
             print(f"      LLM error: {e}")
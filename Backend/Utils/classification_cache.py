@@ -47,9 +47,12 @@ class ClassificationCache:
         Initialize classification cache.
 
         Args:
-            cache_dir: Directory to store cache files (default: Backend/cache/classifications)
+            cache_dir: Directory to store cache files (default: CLASSIFICATION_CACHE_DIR,
+                then Backend/cache/classifications)
             ttl_days: Time-to-live in days for cached classifications (default: 30)
         """
+        if cache_dir is None:
+            cache_dir = os.environ.get("CLASSIFICATION_CACHE_DIR")
         if cache_dir is None:
             backend_dir = Path(__file__).parent.parent
             cache_dir = backend_dir / "cache" / "classifications"
@@ -0,0 +1,251 @@
+"""
+Combined (single-call) extraction of several tab sections from one document
+
+Each tab used to send the same PDF to Gemini once per section:
+- diagnosis: header, evolution timeline, footer (3 calls)
+- treatment: lines of therapy, timeline (2 calls)
+- radiology: summary, impression & RECIST (2 calls)
+- pathology: classification, summary, markers (3 calls)
+
+In combined mode the section prompts are wrapped into one request that asks
+for a single JSON object with one key per section. The document and the
+shared preamble are only sent (and billed) once. Each section's result is
+validated against the top-level keys its split prompt asks for; if the call
+fails to parse or any section is missing, the tab falls back to the split
+prompts, so combined mode never returns less than split mode would.
+
+Configuration (environment variables):
+- EXTRACTION_MODE: "combined" (default) or "split" for every tab
+- EXTRACTION_MODE_<TAB>: per-tab override, e.g. EXTRACTION_MODE_PATHOLOGY=split
+
+Usage:
+    sections = [
+        ExtractionSection("lot", build_lot_prompt(), required_keys=("treatment_history",)),
+        ExtractionSection("timeline", build_timeline_prompt(), required_keys=("timeline_events",)),
+    ]
+    results = extract_sections_combined("treatment", pdf_bytes, sections)
+    if results is None:
+        ...  # run the split extractions
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    from Backend.Utils.gemini_client import DEFAULT_MODEL, GeminiResponseParseError, get_gemini_client
+    from Backend.Utils.logger_config import setup_logger
+    from Backend.Utils.pdf_url_handler import get_pdf_bytes_from_url
+except ModuleNotFoundError:
+    from Utils.gemini_client import DEFAULT_MODEL, GeminiResponseParseError, get_gemini_client
+    from Utils.logger_config import setup_logger
+    from Utils.pdf_url_handler import get_pdf_bytes_from_url
+
+logger = setup_logger(__name__)
+
+EXTRACTION_MODES = ("combined", "split")
+
+
+@dataclass
+class ExtractionSection:
+    """One section of a combined request: its key in the response, its split prompt and its shape check."""
+    key: str
+    prompt: str
+    required_keys: Sequence[str] = ()
+    optional: bool = False
+
+
+def get_extraction_mode(tab: str, mode: Optional[str] = None) -> str:
+    """
+    Resolve the extraction mode for a tab.
+
+    Args:
+        tab: Tab name ("diagnosis", "treatment", "radiology", "pathology")
+        mode: Explicit mode from the caller (takes precedence over the environment)
+
+    Returns:
+        "combined" or "split"
+    """
+    resolved = (
+        mode
+        or os.environ.get(f"EXTRACTION_MODE_{tab.upper()}")
+        or os.environ.get("EXTRACTION_MODE")
+        or "combined"
+    ).lower()
+    if resolved not in EXTRACTION_MODES:
+        logger.warning(f"⚠️  Unknown extraction mode '{resolved}' for {tab}, using split")
+        return "split"
+    return resolved
+
+
+def load_pdf_bytes(pdf_input) -> bytes:
+    """
+    Get PDF bytes from bytes, a local path, or any URL handled by pdf_url_handler.
+
+    Args:
+        pdf_input: PDF bytes, local file path, Firebase Storage path, Google Drive or direct URL
+
+    Returns:
+        PDF content as bytes
+    """
+    if isinstance(pdf_input, bytes):
+        return pdf_input
+    if not isinstance(pdf_input, str):
+        raise ValueError(f"Invalid pdf_input type: {type(pdf_input)}. Expected bytes or string.")
+    if os.path.isfile(pdf_input):
+        with open(pdf_input, "rb") as f:
+            return f.read()
+    return get_pdf_bytes_from_url(pdf_input)
+
+
+def build_combined_prompt(sections: List[ExtractionSection], notes: str = "") -> str:
+    """
+    Wrap several section prompts into one request for a keyed JSON object.
+
+    Args:
+        sections: Sections to extract, in order
+        notes: Extra tab-specific rules appended after the sections
+
+    Returns:
+        Combined prompt string
+    """
+    keys = ", ".join(f'"{section.key}"' for section in sections)
+    parts = [
+        "You will perform several independent extraction tasks on the SAME attached document.",
+        "Each task below has its own instructions and output schema. Apply each task's instructions "
+        "exactly as if it were the only task; do not let one task's rules change another task's output.",
+        "",
+        f"Return ONE JSON object with exactly these top-level keys: {keys}.",
+        "The value of each key is the JSON object that task asks for. Any 'return JSON only' "
+        "wording inside a task refers to the value of that task's key.",
+    ]
+    for section in sections:
+        parts += [
+            "",
+            f'######## TASK "{section.key}" ########',
+            section.prompt.strip(),
+            f'######## END OF TASK "{section.key}" ########',
+        ]
+    if notes:
+        parts += ["", notes.strip()]
+    parts += [
+        "",
+        "OUTPUT FORMAT:",
+        f"Return VALID JSON ONLY: a single object with the keys {keys}.",
+        "No explanations.",
+        "No markdown code blocks.",
+        "No commentary.",
+    ]
+    return "\n".join(parts)
+
+
+def validate_combined_response(data: Any, sections: List[ExtractionSection]) -> List[str]:
+    """
+    Check that every section is present and has its required top-level keys.
+
+    Args:
+        data: Parsed combined response
+        sections: Sections that were requested
+
+    Returns:
+        List of problems (empty if the response is usable)
+    """
+    if not isinstance(data, dict):
+        return [f"response is {type(data).__name__}, expected object"]
+    problems = []
+    for section in sections:
+        value = data.get(section.key)
+        if value is None and section.optional:
+            continue
+        if not isinstance(value, dict):
+            problems.append(f"section '{section.key}' missing or not an object")
+            continue
+        missing = [key for key in section.required_keys if key not in value]
+        if missing:
+            problems.append(f"section '{section.key}' missing keys {missing}")
+    return problems
+
+
+class CombinedExtractionStats:
+    """Thread-safe per-tab counters for combined extractions and their fallbacks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tabs: Dict[str, Dict[str, int]] = {}
+
+    def record(self, tab: str, name: str):
+        with self._lock:
+            stats = self._tabs.setdefault(tab, {"combined_calls": 0, "combined_ok": 0, "fallbacks": 0, "split_runs": 0})
+            stats[name] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {tab: dict(stats) for tab, stats in self._tabs.items()}
+
+
+_stats = CombinedExtractionStats()
+
+
+def record_split_run(tab: str):
+    """Count a tab extraction that ran in split mode (configured or fallback)."""
+    _stats.record(tab, "split_runs")
+
+
+def get_combined_extraction_stats() -> Dict:
+    """Get per-tab combined extraction statistics."""
+    return _stats.get_stats()
+
+
+def extract_sections_combined(
+    tab: str,
+    pdf_bytes: bytes,
+    sections: List[ExtractionSection],
+    notes: str = "",
+    model: str = DEFAULT_MODEL,
+    generation_config: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Extract several sections of a tab with one Gemini call.
+
+    Args:
+        tab: Tab name (for logs, metrics and the Gemini label "<tab>_combined")
+        pdf_bytes: Document content
+        sections: Sections to extract
+        notes: Extra tab-specific rules for the combined prompt
+        model: Vertex AI model name
+        generation_config: Generation config (default: temperature 0, top_p 1)
+
+    Returns:
+        Dictionary of section key -> parsed section, or None if the response could
+        not be parsed or validated (the caller should fall back to split prompts)
+
+    Raises:
+        The Gemini API error if the call itself failed after retries
+    """
+    _stats.record(tab, "combined_calls")
+    prompt = build_combined_prompt(sections, notes)
+    logger.info(f"🤖 Requesting combined {tab} extraction ({len(sections)} sections, 1 call)...")
+
+    try:
+        data = get_gemini_client().generate_json(
+            prompt,
+            pdf_bytes=pdf_bytes,
+            model=model,
+            generation_config=generation_config or {"temperature": 0, "top_p": 1},
+            label=f"{tab}_combined",
+        )
+    except GeminiResponseParseError as e:
+        logger.warning(f"⚠️  Combined {tab} extraction returned unparsable JSON ({e}), falling back to split prompts")
+        _stats.record(tab, "fallbacks")
+        return None
+
+    problems = validate_combined_response(data, sections)
+    if problems:
+        logger.warning(f"⚠️  Combined {tab} extraction failed validation ({'; '.join(problems)}), falling back to split prompts")
+        _stats.record(tab, "fallbacks")
+        return None
+
+    _stats.record(tab, "combined_ok")
+    logger.info(f"✅ Combined {tab} extraction complete")
+    return {section.key: data.get(section.key) for section in sections}
@@ -1,6 +1,10 @@
-import requests
 import json
 
+try:
+    from Backend.http_sessions import get_session
+except ModuleNotFoundError:
+    from http_sessions import get_session
+
 def llmresponse(pdfurl, extraction_instructions):
 
   url = "https://api.risalabs.ai/medical-necessity/v1/pdf-extraction/send-prompt"
@@ -14,6 +18,6 @@ def llmresponse(pdfurl, extraction_instructions):
     'Authorization': 'Bearer {{bearerToken}}'
   }
 
-  response = requests.request("POST", url, headers=headers, data=payload)
+  response = get_session(url).request("POST", url, headers=headers, data=payload)
 
   return response
@@ -18,19 +18,19 @@ import sys
 import os
 import json
 import re
-import requests
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
 import datetime
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../"))
 sys.path.append(PROJECT_ROOT)
 
+try:
+    from Backend.Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from Backend.http_sessions import get_session
+except ModuleNotFoundError:
+    from Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from http_sessions import get_session
 from Utils.components import parser
 
-# Initialize Vertex AI
-vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
-
 
 def normalize_patient_name(name):
     """
@@ -103,7 +103,7 @@ def extract_demographics_with_gemini(pdf_input):
         else:
             download_url = pdf_input
 
-        response = requests.get(download_url, allow_redirects=True)
+        response = get_session(download_url).get(download_url, allow_redirects=True)
         response.raise_for_status()
         pdf_bytes = response.content
     else:
@@ -203,56 +203,37 @@ IMPORTANT:
 - Just the JSON object
 """
 
-    # Initialize the model
-    model = GenerativeModel("gemini-2.5-pro")
-
-    # Wrap PDF bytes in Part object
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
-
     # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, GEMINI_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            GEMINI_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="demographics"
         )
+    except GeminiResponseParseError as e:
+        raise Exception(f"Failed to parse Gemini response: {e}")
     except Exception as e:
         raise Exception(f"Gemini API request failed: {e}")
 
-    # Parse JSON response
-    try:
-        response_text = response.text.strip()
-
-        # Use regex to extract JSON from markdown code blocks
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
-
-        if match:
-            response_text = match.group(1).strip()
-        else:
-            response_text = response_text.strip()
-
-        extracted_data = json.loads(response_text)
+    # Normalize patient name to proper capitalization
+    if 'Patient Name' in extracted_data and extracted_data['Patient Name']:
+        extracted_data['Patient Name'] = normalize_patient_name(extracted_data['Patient Name'])
 
-        # Normalize patient name to proper capitalization
-        if 'Patient Name' in extracted_data and extracted_data['Patient Name']:
-            extracted_data['Patient Name'] = normalize_patient_name(extracted_data['Patient Name'])
+    return extracted_data
 
-        return extracted_data
-
-    except (json.JSONDecodeError, AttributeError) as e:
-        raise Exception(f"Failed to parse Gemini response: {e}")
 
-
-def extract_patient_demographics(pdf_url, use_gemini=True):
+def extract_patient_demographics(pdf_url=None, use_gemini=True, pdf_bytes=None):
     """
     Extract patient demographics from a PDF document.
 
     Args:
         pdf_url (str): URL to the PDF document (Google Drive or direct link)
         use_gemini (bool): If True (default), uses Vertex AI Gemini SDK. If False, uses legacy parser.
+        pdf_bytes (bytes, optional): PDF content already in memory; skips the download (Gemini only)
 
     Returns:
         dict: Extracted demographics data containing:
@@ -269,10 +250,16 @@ def extract_patient_demographics(pdf_url, use_gemini=True):
     Raises:
         Exception: If API call fails or returns an error
     """
+    if pdf_bytes is None and pdf_url is None:
+        raise ValueError("Either pdf_bytes or pdf_url must be provided")
+
     if use_gemini:
         # Gemini pipeline
-        return extract_demographics_with_gemini(pdf_url)
+        return extract_demographics_with_gemini(pdf_bytes if pdf_bytes is not None else pdf_url)
     else:
+        if pdf_url is None:
+            raise ValueError("pdf_url is required when use_gemini=False")
+
         # Legacy pipeline using parser.llmresponse
         extraction_instructions = (
             "Extract the following patient demographic and clinical information from the medical document:"
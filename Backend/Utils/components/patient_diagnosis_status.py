@@ -15,15 +15,15 @@ Extracts clinical disease information from patient medical documents:
 
 Source: Most recent MD Notes
 """
-import os
-import requests
 import json
 import re
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
 
-# Initialize Vertex AI
-vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
+try:
+    from Backend.Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from Backend.http_sessions import get_session
+except ModuleNotFoundError:
+    from Utils.gemini_client import get_gemini_client, GeminiResponseParseError
+    from http_sessions import get_session
 
 
 def extract_diagnosis_status_with_gemini(pdf_input):
@@ -58,7 +58,7 @@ def extract_diagnosis_status_with_gemini(pdf_input):
         else:
             download_url = pdf_input
 
-        response = requests.get(download_url, allow_redirects=True)
+        response = get_session(download_url).get(download_url, allow_redirects=True)
         response.raise_for_status()
         pdf_bytes = response.content
     else:
@@ -238,45 +238,26 @@ No commentary.
 Just the JSON object following the schema above.
 """
 
-    # Initialize the model
-    model = GenerativeModel("gemini-2.5-pro")
-
-    # Wrap PDF bytes in Part object
-    doc_part = Part.from_data(data=pdf_bytes, mime_type="application/pdf")
-
     # Make API request
     try:
-        response = model.generate_content(
-            [doc_part, GEMINI_PROMPT],
+        extracted_data = get_gemini_client().generate_json(
+            GEMINI_PROMPT,
+            pdf_bytes=pdf_bytes,
             generation_config={
                 "temperature": 0,
                 "top_p": 1
-            }
+            },
+            label="diagnosis_status"
         )
+    except GeminiResponseParseError as e:
+        raise Exception(f"Failed to parse Gemini response: {e}")
     except Exception as e:
         raise Exception(f"Gemini API request failed: {e}")
 
-    # Parse JSON response
-    try:
-        response_text = response.text.strip()
-
-        # Use regex to extract JSON from markdown code blocks
-        json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        match = re.search(json_pattern, response_text)
+    return extracted_data
 
-        if match:
-            response_text = match.group(1).strip()
-        else:
-            response_text = response_text.strip()
 
-        extracted_data = json.loads(response_text)
-        return extracted_data
-
-    except (json.JSONDecodeError, AttributeError) as e:
-        raise Exception(f"Failed to parse Gemini response: {e}")
-
-
-def extract_diagnosis_status(pdf_url, model="claude-sonnet-4-0", use_gemini=True):
+def extract_diagnosis_status(pdf_url=None, model="claude-sonnet-4-0", use_gemini=True, pdf_bytes=None):
     """
     Extract patient diagnosis and disease status from a PDF document.
 
@@ -284,6 +265,7 @@ def extract_diagnosis_status(pdf_url, model="claude-sonnet-4-0", use_gemini=True
         pdf_url (str): URL to the PDF document (Google Drive or direct link)
         model (str): AI model to use for extraction (default: claude-sonnet-4-0) - only used when use_gemini=False
         use_gemini (bool): If True (default), uses Vertex AI Gemini SDK. If False, uses legacy API.
+        pdf_bytes (bytes, optional): PDF content already in memory; skips the download (Gemini only)
 
     Returns:
         dict: Extracted diagnosis data containing:
@@ -300,10 +282,16 @@ def extract_diagnosis_status(pdf_url, model="claude-sonnet-4-0", use_gemini=True
     Raises:
         Exception: If API call fails or returns an error
     """
+    if pdf_bytes is None and pdf_url is None:
+        raise ValueError("Either pdf_bytes or pdf_url must be provided")
+
     if use_gemini:
         # Gemini pipeline
-        return extract_diagnosis_status_with_gemini(pdf_url)
+        return extract_diagnosis_status_with_gemini(pdf_bytes if pdf_bytes is not None else pdf_url)
     else:
+        if pdf_url is None:
+            raise ValueError("pdf_url is required when use_gemini=False")
+
         # Legacy pipeline using REST API
         url = "https://apis-dev.risalabs.ai/ai-service/commons/pdf-extraction/extract"
 
@@ -368,7 +356,7 @@ def extract_diagnosis_status(pdf_url, model="claude-sonnet-4-0", use_gemini=True
             "Authorization": "Bearer {{bearerToken}}"
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = get_session(url).post(url, headers=headers, json=payload)
 
         # Parse the response
         try:
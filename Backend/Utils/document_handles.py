@@ -0,0 +1,318 @@
+"""
+Upload-once document handles for Gemini calls
+
+Every extractor used to attach the PDF inline (Part.from_data), so one ingest
+sent the MD note to Vertex AI about ten times (demographics, diagnosis status,
+comorbidities, treatment, diagnosis tab, genomics) and each radiology or
+pathology report two or three times. Inside a document scope, GeminiClient
+uploads each distinct PDF once and attaches a reference to it instead
+(Part.from_uri on a gs:// object). All handles are deleted when the scope
+ends.
+
+Scopes:
+- The ingest opens a scope around its stage graph. StageGraph copies the
+  caller's context into its worker threads, so every extractor the graph runs
+  (including nested graphs) sees the same scope.
+- Opening a scope while one is already active reuses the outer scope.
+- Outside a scope (single-tab endpoints, scripts), PDFs are sent inline as
+  before.
+- Handles are keyed by SHA-256, so the same PDF reached through different
+  URLs is uploaded once. Concurrent extractors wait for the first upload.
+- If an upload fails, or Vertex AI rejects the reference, that call and
+  later calls for the same PDF send it inline.
+
+Stores:
+- "gcs": objects under GEMINI_DOCUMENT_HANDLE_PREFIX in the storage bucket
+  (storage_uploader), referenced as gs:// URIs.
+- "memory": in-process stand-in for tests. It counts uploads and reuses the
+  same way, but parts are still built from the stored bytes.
+
+Configuration (environment variables):
+- GEMINI_DOCUMENT_HANDLES: "gcs" (default), "memory" or "off"
+- GEMINI_DOCUMENT_HANDLE_MIN_BYTES: smaller PDFs are always sent inline (default: 65536)
+- GEMINI_DOCUMENT_HANDLE_PREFIX: blob prefix for the gcs store (default: "gemini-documents/")
+
+Usage:
+    with document_scope(f"ingest-{mrn}"):
+        graph.run()
+"""
+
+import contextvars
+import hashlib
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+try:
+    from Backend.Utils.logger_config import setup_logger
+except ModuleNotFoundError:
+    from Utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class DocumentHandle:
+    """A document uploaded once and referenced by URI in later Gemini calls."""
+    sha256: str
+    uri: str
+    mime_type: str
+    size_bytes: int
+    uses: int = 0
+
+
+class InMemoryDocumentStore:
+    """Stand-in store that keeps uploaded documents in process (tests and local runs)."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._objects: Dict[str, bytes] = {}
+
+    def upload(self, scope_id: str, sha256: str, data: bytes, mime_type: str) -> str:
+        uri = f"memory://{scope_id}/{sha256}"
+        with self._lock:
+            self._objects[uri] = data
+        return uri
+
+    def delete(self, uri: str):
+        with self._lock:
+            self._objects.pop(uri, None)
+
+    def to_part(self, handle: DocumentHandle):
+        from vertexai.generative_models import Part
+        with self._lock:
+            data = self._objects[handle.uri]
+        return Part.from_data(data=data, mime_type=handle.mime_type)
+
+    def object_count(self) -> int:
+        with self._lock:
+            return len(self._objects)
+
+
+class GCSDocumentStore:
+    """Store that uploads documents to the storage bucket and references them by gs:// URI."""
+
+    name = "gcs"
+
+    def __init__(self, prefix: str = "gemini-documents/"):
+        self.prefix = prefix
+
+    def upload(self, scope_id: str, sha256: str, data: bytes, mime_type: str) -> str:
+        try:
+            from Backend.storage_uploader import upload_bytes_to_gcs
+        except ModuleNotFoundError:
+            from storage_uploader import upload_bytes_to_gcs
+        return upload_bytes_to_gcs(data, f"{self.prefix}{scope_id}/{sha256}", content_type=mime_type)
+
+    def delete(self, uri: str):
+        try:
+            from Backend.storage_uploader import delete_blob
+        except ModuleNotFoundError:
+            from storage_uploader import delete_blob
+        blob_path = uri.split("/", 3)[3]
+        delete_blob(blob_path)
+
+    def to_part(self, handle: DocumentHandle):
+        from vertexai.generative_models import Part
+        return Part.from_uri(uri=handle.uri, mime_type=handle.mime_type)
+
+
+_stats_lock = threading.Lock()
+_stats = {
+    "scopes_opened": 0,
+    "active_scopes": 0,
+    "uploads": 0,
+    "upload_failures": 0,
+    "rejected": 0,
+    "reuses": 0,
+    "bytes_uploaded": 0,
+    "inline_bytes_avoided": 0,
+    "released": 0,
+    "release_failures": 0,
+}
+
+
+def _count(**values):
+    with _stats_lock:
+        for name, value in values.items():
+            _stats[name] += value
+
+
+class DocumentScope:
+    """
+    Handles uploaded during one ingest. Thread-safe; close() deletes every handle.
+    """
+
+    def __init__(self, name: str, store, min_bytes: int = 65536):
+        """
+        Initialize document scope.
+
+        Args:
+            name: Scope name for logs (e.g. "ingest-<mrn>")
+            store: Document store (GCSDocumentStore or InMemoryDocumentStore)
+            min_bytes: PDFs smaller than this are sent inline
+        """
+        self.name = name
+        self.store = store
+        self.min_bytes = min_bytes
+        self.scope_id = f"{name}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._handles: Dict[str, Optional[DocumentHandle]] = {}
+        self._upload_locks: Dict[str, threading.Lock] = {}
+        self._closed = False
+
+    def acquire(self, data: bytes, mime_type: str = "application/pdf") -> Optional[DocumentHandle]:
+        """
+        Get the handle for a document, uploading it on first use.
+
+        Args:
+            data: Document bytes
+            mime_type: MIME type
+
+        Returns:
+            DocumentHandle, or None if the document should be sent inline
+        """
+        if len(data) < self.min_bytes:
+            return None
+        sha256 = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if self._closed:
+                return None
+            upload_lock = self._upload_locks.setdefault(sha256, threading.Lock())
+
+        with upload_lock:
+            with self._lock:
+                if self._closed:
+                    return None
+                if sha256 in self._handles:
+                    handle = self._handles[sha256]
+                    if handle is not None:
+                        handle.uses += 1
+                        _count(reuses=1, inline_bytes_avoided=handle.size_bytes)
+                    return handle
+            try:
+                uri = self.store.upload(self.scope_id, sha256, data, mime_type)
+                handle = DocumentHandle(sha256=sha256, uri=uri, mime_type=mime_type, size_bytes=len(data), uses=1)
+                _count(uploads=1, bytes_uploaded=len(data))
+                logger.info(f"📎 [{self.name}] Uploaded document {sha256[:12]} ({len(data)} bytes) for reuse")
+            except Exception as e:
+                handle = None
+                _count(upload_failures=1)
+                logger.warning(f"⚠️  [{self.name}] Document upload failed, sending inline: {e}")
+            with self._lock:
+                closed = self._closed
+                if not closed:
+                    self._handles[sha256] = handle
+            if closed and handle is not None:
+                # close() ran during the upload and cannot see this handle
+                self._delete(handle)
+                return None
+            return handle
+
+    def to_part(self, handle: DocumentHandle):
+        """Vertex AI Part referencing the handle."""
+        return self.store.to_part(handle)
+
+    def reject(self, handle: DocumentHandle):
+        """
+        Stop using a handle the model refused; later acquire() calls for the document return None.
+
+        Args:
+            handle: Handle returned by acquire()
+        """
+        with self._lock:
+            if self._handles.get(handle.sha256) is not handle:
+                return
+            self._handles[handle.sha256] = None
+        _count(rejected=1)
+        self._delete(handle)
+
+    def _delete(self, handle: DocumentHandle):
+        try:
+            self.store.delete(handle.uri)
+            _count(released=1)
+        except Exception as e:
+            _count(release_failures=1)
+            logger.warning(f"⚠️  [{self.name}] Failed to delete document handle {handle.uri}: {e}")
+
+    def close(self):
+        """Delete every uploaded handle. Later acquire() calls send documents inline."""
+        with self._lock:
+            self._closed = True
+            handles = [handle for handle in self._handles.values() if handle is not None]
+            self._handles.clear()
+        for handle in handles:
+            self._delete(handle)
+        if handles:
+            reused = sum(handle.uses - 1 for handle in handles)
+            logger.info(f"🧹 [{self.name}] Released {len(handles)} document handles ({reused} reuses)")
+
+
+def create_document_store(kind: Optional[str] = None):
+    """
+    Create the configured document store.
+
+    Args:
+        kind: "gcs", "memory" or "off" (default: GEMINI_DOCUMENT_HANDLES, then "gcs")
+
+    Returns:
+        Store instance, or None if handles are disabled
+    """
+    kind = (kind or os.environ.get("GEMINI_DOCUMENT_HANDLES", "gcs")).lower()
+    if kind == "off":
+        return None
+    if kind == "memory":
+        return InMemoryDocumentStore()
+    return GCSDocumentStore(prefix=os.environ.get("GEMINI_DOCUMENT_HANDLE_PREFIX", "gemini-documents/"))
+
+
+_current_scope: contextvars.ContextVar = contextvars.ContextVar("document_scope", default=None)
+
+
+def current_document_scope() -> Optional[DocumentScope]:
+    """The document scope active in this context, or None."""
+    return _current_scope.get()
+
+
+@contextmanager
+def document_scope(name: str, store=None):
+    """
+    Open a document scope for the duration of the block (e.g. one ingest).
+
+    Args:
+        name: Scope name for logs
+        store: Store to use (default: create_document_store())
+
+    Yields:
+        The active DocumentScope, or None if handles are disabled
+    """
+    outer = _current_scope.get()
+    if outer is not None:
+        yield outer
+        return
+
+    store = store if store is not None else create_document_store()
+    if store is None:
+        yield None
+        return
+
+    scope = DocumentScope(name, store, min_bytes=int(os.environ.get("GEMINI_DOCUMENT_HANDLE_MIN_BYTES", 65536)))
+    token = _current_scope.set(scope)
+    _count(scopes_opened=1, active_scopes=1)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+        scope.close()
+        _count(active_scopes=-1)
+
+
+def get_document_handle_stats() -> Dict:
+    """Get document handle statistics."""
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,175 @@
+"""
+In-process event broker for eligibility computation progress
+
+The frontend used to poll /api/patients/{mrn}/eligibility-progress and
+/api/patients/{mrn}/eligible-trials while a computation ran; every poll
+re-read all eligibility documents. BatchEligibilityEngine now publishes an
+event for each stored trial result and progress change, and the SSE endpoint
+(/api/patients/{mrn}/eligibility-events) forwards them to subscribers.
+
+Events (per (db_type, MRN) key):
+- "progress":     {status, trials_total, trials_completed, trials_eligible, trials_error}
+- "trial_result": the eligibility record that was just stored
+- "complete":     {status: "completed" | "error", error_message, ...counters}
+
+Publishers are worker threads; subscribers are asyncio queues on the
+FastAPI event loop, fed with loop.call_soon_threadsafe. A progress event
+replaces a progress event still waiting at the end of the queue; when a queue
+is full, trial_result events are dropped, and progress / complete evict the
+oldest queued trial_result (or superseded progress) instead, so a slow client
+always sees the run finish.
+
+Usage:
+    broker = get_eligibility_event_broker()
+    queue, snapshot = broker.subscribe(mrn, db_type, asyncio.get_running_loop())
+    ...
+    broker.unsubscribe(mrn, db_type, queue)
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _event_key(mrn: str, db_type: Optional[str]) -> Tuple[str, str]:
+    return (db_type or "demo", mrn)
+
+
+class EventQueue(asyncio.Queue):
+    """Subscriber queue that can replace or evict events still waiting to be read."""
+
+    def replace_last_progress(self, event: Dict[str, Any]) -> bool:
+        """Replace a progress event at the end of the queue (it is superseded)."""
+        if self._queue and self._queue[-1]["event"] == "progress":
+            self._queue[-1] = event
+            return True
+        return False
+
+    def evict(self) -> bool:
+        """Drop the oldest trial_result, else the oldest progress event, to make room."""
+        for event_type in ("trial_result", "progress"):
+            for queued in self._queue:
+                if queued["event"] == event_type:
+                    self._queue.remove(queued)
+                    return True
+        return False
+
+
+class EligibilityEventBroker:
+    """
+    Thread-safe fan-out of eligibility events to asyncio subscribers.
+    """
+
+    def __init__(self, max_queue_size: int = 1000):
+        """
+        Initialize event broker.
+
+        Args:
+            max_queue_size: Events buffered per subscriber before trial_result
+                            events are dropped for it
+        """
+        self.max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[Tuple[str, str], List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._progress: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._stats = {"published": 0, "delivered": 0, "merged": 0, "evicted": 0, "dropped": 0}
+
+    def subscribe(self, mrn: str, db_type: Optional[str], loop: asyncio.AbstractEventLoop):
+        """
+        Subscribe to events for one patient.
+
+        Returns:
+            (queue, progress_snapshot) - snapshot is the last published progress, or None
+        """
+        queue = EventQueue(maxsize=self.max_queue_size)
+        key = _event_key(mrn, db_type)
+        with self._lock:
+            self._subscribers.setdefault(key, []).append((loop, queue))
+            snapshot = dict(self._progress[key]) if key in self._progress else None
+        return queue, snapshot
+
+    def unsubscribe(self, mrn: str, db_type: Optional[str], queue: asyncio.Queue):
+        """Remove a subscriber queue."""
+        key = _event_key(mrn, db_type)
+        with self._lock:
+            subscribers = [entry for entry in self._subscribers.get(key, []) if entry[1] is not queue]
+            if subscribers:
+                self._subscribers[key] = subscribers
+            else:
+                self._subscribers.pop(key, None)
+
+    def has_subscribers(self, mrn: str, db_type: Optional[str] = None) -> bool:
+        """True if anyone is listening for this patient (lets publishers skip work)."""
+        with self._lock:
+            return bool(self._subscribers.get(_event_key(mrn, db_type)))
+
+    def publish(self, mrn: str, db_type: Optional[str], event_type: str, data: Dict[str, Any]):
+        """
+        Publish an event to every subscriber of a patient. Safe to call from any thread.
+
+        Args:
+            mrn: Patient MRN
+            db_type: Hospital type
+            event_type: "progress", "trial_result" or "complete"
+            data: JSON-serializable payload
+        """
+        key = _event_key(mrn, db_type)
+        event = {"event": event_type, "data": data}
+        with self._lock:
+            self._stats["published"] += 1
+            if event_type == "progress":
+                self._progress[key] = dict(data, status=data.get("status", "computing"))
+            elif event_type == "complete":
+                # Later subscribers read the final state from the progress store
+                self._progress.pop(key, None)
+            subscribers = list(self._subscribers.get(key, []))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Subscriber's loop is closed; it will be unsubscribed by its endpoint
+                pass
+
+    def _deliver(self, queue: EventQueue, event: Dict[str, Any]):
+        # Runs on the subscriber's loop, the only thread touching its queue
+        if event["event"] == "progress" and queue.replace_last_progress(event):
+            outcome = "merged"
+        elif not queue.full():
+            queue.put_nowait(event)
+            outcome = "delivered"
+        elif event["event"] != "trial_result" and queue.evict():
+            # A slow client misses individual results but never the progress
+            # and complete events
+            queue.put_nowait(event)
+            outcome = "evicted"
+        else:
+            outcome = "dropped"
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def get_stats(self) -> Dict:
+        """Get broker statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["subscribers"] = sum(len(entries) for entries in self._subscribers.values())
+            return stats
+
+
+# Global broker instance
+_broker_instance = None
+_broker_lock = threading.Lock()
+
+
+def get_eligibility_event_broker() -> EligibilityEventBroker:
+    """
+    Get global eligibility event broker (singleton pattern).
+
+    Returns:
+        EligibilityEventBroker instance
+    """
+    global _broker_instance
+    with _broker_lock:
+        if _broker_instance is None:
+            _broker_instance = EligibilityEventBroker()
+        return _broker_instance
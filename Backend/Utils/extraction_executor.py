@@ -0,0 +1,224 @@
+"""
+Bounded executors for blocking work called from async FastAPI endpoints
+
+All of the extraction endpoints in app.py are declared ``async def`` but the
+work they do (FHIR calls, Drive uploads, Gemini calls, SQLite reads) is
+blocking. Calling that work directly on the event loop stalls every other
+request, including cheap cached reads from the data pool.
+
+This module provides two process-wide thread pools:
+- Extraction pool: long-running ingest/extraction work. Its size is the
+  concurrency budget for cold extractions (EXTRACTION_MAX_CONCURRENCY).
+- Read pool: short data pool reads/writes. Kept separate so cached reads are
+  never queued behind a saturated extraction pool (CACHE_READ_MAX_WORKERS).
+
+Usage:
+    result = await run_extraction(extract_patient_data, mrn, False)
+    cached = await run_cached_read(data_pool.get_patient_data, mrn, db_type)
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict
+
+try:
+    from Backend.Utils.logger_config import setup_logger
+except ModuleNotFoundError:
+    from Utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+DEFAULT_EXTRACTION_MAX_CONCURRENCY = 4
+DEFAULT_CACHE_READ_MAX_WORKERS = 8
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a fixed concurrency budget and simple usage counters.
+
+    Work beyond the budget queues inside the pool instead of spawning new
+    threads, so a burst of cold extractions cannot exhaust memory or the
+    upstream API quotas.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        """
+        Initialize bounded executor.
+
+        Args:
+            name: Name used for thread names and log messages
+            max_workers: Maximum number of jobs running at the same time
+        """
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=name
+        )
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    def _wrap(self, fn: Callable, enqueued_at: float) -> Callable:
+        def runner():
+            started_at = time.monotonic()
+            with self._lock:
+                self._running += 1
+                self._total_wait += started_at - enqueued_at
+            ok = False
+            try:
+                result = fn()
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._total_run += time.monotonic() - started_at
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+        return runner
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Submit blocking work without awaiting it (fire-and-forget background jobs).
+
+        Returns:
+            concurrent.futures.Future for the submitted work
+        """
+        with self._lock:
+            self._submitted += 1
+        call = functools.partial(fn, *args, **kwargs)
+        return self._executor.submit(self._wrap(call, time.monotonic()))
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Run blocking work in the pool and await its result from the event loop.
+
+        Exceptions raised by ``fn`` propagate to the awaiting coroutine.
+        """
+        with self._lock:
+            self._submitted += 1
+        call = functools.partial(fn, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._wrap(call, time.monotonic()))
+
+    def get_stats(self) -> Dict:
+        """Get executor usage statistics."""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "submitted": self._submitted,
+                "running": self._running,
+                "queued": max(0, self._submitted - finished - self._running),
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_seconds": round(self._total_wait / finished, 3) if finished else 0.0,
+                "avg_run_seconds": round(self._total_run / finished, 3) if finished else 0.0,
+            }
+
+    def shutdown(self, wait: bool = False):
+        """Shut down the underlying thread pool."""
+        self._executor.shutdown(wait=wait)
+
+
+# Global executor instances
+_extraction_executor = None
+_read_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_extraction_executor() -> BoundedExecutor:
+    """
+    Get global extraction executor (singleton pattern).
+
+    The concurrency budget is read from EXTRACTION_MAX_CONCURRENCY.
+
+    Returns:
+        BoundedExecutor instance
+    """
+    global _extraction_executor
+    with _executor_lock:
+        if _extraction_executor is None:
+            max_workers = int(os.environ.get("EXTRACTION_MAX_CONCURRENCY", DEFAULT_EXTRACTION_MAX_CONCURRENCY))
+            _extraction_executor = BoundedExecutor("extraction", max_workers)
+            logger.info(f"Extraction executor started with concurrency budget {_extraction_executor.max_workers}")
+        return _extraction_executor
+
+
+def get_read_executor() -> BoundedExecutor:
+    """
+    Get global cached-read executor (singleton pattern).
+
+    The pool size is read from CACHE_READ_MAX_WORKERS.
+
+    Returns:
+        BoundedExecutor instance
+    """
+    global _read_executor
+    with _executor_lock:
+        if _read_executor is None:
+            max_workers = int(os.environ.get("CACHE_READ_MAX_WORKERS", DEFAULT_CACHE_READ_MAX_WORKERS))
+            _read_executor = BoundedExecutor("cache-read", max_workers)
+        return _read_executor
+
+
+# Convenience functions
+async def run_extraction(fn: Callable, *args, **kwargs):
+    """Run blocking extraction work on the bounded extraction pool."""
+    return await get_extraction_executor().run(fn, *args, **kwargs)
+
+
+async def run_cached_read(fn: Callable, *args, **kwargs):
+    """Run a short blocking data pool call on the read pool."""
+    return await get_read_executor().run(fn, *args, **kwargs)
+
+
+def submit_background_extraction(fn: Callable, *args, **kwargs) -> Future:
+    """Submit background extraction work without awaiting it."""
+    return get_extraction_executor().submit(fn, *args, **kwargs)
+
+
+def get_executor_stats() -> Dict:
+    """Get statistics for both executors."""
+    return {
+        "extraction": get_extraction_executor().get_stats(),
+        "cache_read": get_read_executor().get_stats(),
+    }
+
+
+def shutdown_executors(wait: bool = False):
+    """Shut down both executors (called from the FastAPI lifespan handler)."""
+    global _extraction_executor, _read_executor
+    with _executor_lock:
+        for executor in (_extraction_executor, _read_executor):
+            if executor is not None:
+                executor.shutdown(wait=wait)
+        _extraction_executor = None
+        _read_executor = None
+
+
+if __name__ == "__main__":
+    # Example usage
+    async def _demo():
+        def slow_square(x):
+            time.sleep(0.2)
+            return x * x
+
+        results = await asyncio.gather(*(run_extraction(slow_square, i) for i in range(8)))
+        print(f"Results: {results}")
+        print(f"Stats: {get_executor_stats()}")
+
+    asyncio.run(_demo())
@@ -0,0 +1,590 @@
+"""
+Shared Vertex AI Gemini client
+
+Every extractor used to build its own GenerativeModel("gemini-2.5-pro"), wrap
+the PDF in Part.from_data, call generate_content with no retry, and strip
+markdown fences before json.loads. Concurrent ingests therefore had no shared
+limit on in-flight Gemini calls, and a single 429 failed the whole stage.
+
+This module is the one place extractors call Gemini through:
+- Model handles are created once per (model, system instruction) and reused.
+- Per-model limits shared by all threads: a concurrency cap (semaphore) and a
+  QPS budget (AdaptiveRateLimiter from rate_limiter.py, which also backs off
+  its rate on 429s).
+- 429 / 5xx / timeout errors are retried with exponential backoff and jitter
+  (same schedule as lab_postprocessor.exponential_retry).
+- JSON extraction tries json.loads on the raw text first (responses requested
+  with response_mime_type="application/json" need nothing else), then a
+  fenced ```json (or ''') block, then the outermost {...} / [...] span.
+- Per-model and per-label metrics: calls, errors, retries, latency and token
+  counts from usage_metadata. Exposed on /health as "gemini".
+- Responses are cached on disk (llm_response_cache.py) keyed by document
+  hash, prompt hash, model and generation config, so re-running an unchanged
+  extraction makes no Gemini call. Pass use_cache=False to force a live call.
+- Inside a document scope (document_handles.py, opened per ingest), each PDF
+  is uploaded once and later calls attach a reference to it instead of the
+  inline bytes. If Vertex AI rejects the reference, the call is retried once
+  with the bytes inline.
+- With a cassette active (cassettes.py, CASSETTE_MODE=record|replay), calls
+  are recorded to or answered from the cassette file, under the same limits
+  and metrics. The response cache is bypassed so every call reaches it.
+
+Configuration (environment variables):
+- GEMINI_MAX_CONCURRENCY: in-flight calls per model (default: 8)
+- GEMINI_QPS: initial calls per second per model (default: 4.0)
+- GEMINI_MAX_QPS: upper bound for the adaptive rate (default: 20.0)
+- GEMINI_MODEL_LIMITS: per-model overrides, "model=concurrency/qps,..."
+  (e.g. "gemini-2.5-pro=4/2,gemini-2.5-flash=16/10")
+- GEMINI_MAX_RETRIES: retries after the first attempt (default: 5)
+- GEMINI_RETRY_BASE_DELAY / GEMINI_RETRY_MAX_DELAY: backoff in seconds (default: 1 / 60)
+
+Usage:
+    from Backend.Utils.gemini_client import get_gemini_client
+    data = get_gemini_client().generate_json(
+        prompt, pdf_bytes=pdf_bytes, label="lab_extraction",
+        generation_config={"temperature": 0, "top_p": 1},
+    )
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from Backend.cassettes import get_cassette
+    from Backend.rate_limiter import AdaptiveRateLimiter
+    from Backend.Utils.document_handles import current_document_scope
+    from Backend.Utils.llm_response_cache import LLMResponseCache, build_cache_key, get_llm_response_cache
+    from Backend.Utils.logger_config import setup_logger
+except ModuleNotFoundError:
+    from cassettes import get_cassette
+    from rate_limiter import AdaptiveRateLimiter
+    from Utils.document_handles import current_document_scope
+    from Utils.llm_response_cache import LLMResponseCache, build_cache_key, get_llm_response_cache
+    from Utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_MODEL = "gemini-2.5-pro"
+
+_FENCED_JSON_PATTERN = re.compile(r"(?:```|''')(?:json)?\s*([\s\S]*?)\s*(?:```|''')")
+
+
+class GeminiResponseParseError(ValueError):
+    """The model answered, but no JSON could be parsed from the response."""
+
+    def __init__(self, message: str, response: Any = None, response_text: str = ""):
+        super().__init__(message)
+        self.response = response
+        self.response_text = response_text or ""
+
+
+def extract_json(text: str) -> Any:
+    """
+    Parse JSON from a model response.
+
+    Args:
+        text: Response text (raw JSON, a fenced ```json block, or JSON with surrounding prose)
+
+    Returns:
+        Parsed JSON value
+
+    Raises:
+        json.JSONDecodeError: If no JSON can be parsed
+    """
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        first_error = e
+
+    match = _FENCED_JSON_PATTERN.search(text)
+    if match:
+        try:
+            return json.loads(match.group(1))
+        except json.JSONDecodeError:
+            pass
+
+    for opener, closer in (("{", "}"), ("[", "]")):
+        start = text.find(opener)
+        end = text.rfind(closer)
+        if start != -1 and end > start:
+            try:
+                return json.loads(text[start:end + 1])
+            except json.JSONDecodeError:
+                continue
+
+    raise first_error
+
+
+class CachedResponse:
+    """Stand-in for a GenerationResponse served from the response cache or a cassette."""
+
+    usage_metadata = None
+
+    def __init__(self, text: str, usage: Optional[Dict[str, int]] = None):
+        self.text = text
+        if usage:
+            self.usage_metadata = SimpleNamespace(**usage)
+
+
+def _is_throttle(error: Exception) -> bool:
+    code = getattr(error, "code", None)
+    if code == 429 or getattr(code, "value", None) == 429:
+        return True
+    message = str(error)
+    return "429" in message or "Resource exhausted" in message or "RESOURCE_EXHAUSTED" in message
+
+
+def _finish_reason(response) -> Optional[str]:
+    """Finish reason name of the first candidate (e.g. "STOP", "MAX_TOKENS"), or None if unknown."""
+    try:
+        reason = response.candidates[0].finish_reason
+    except (AttributeError, IndexError, TypeError):
+        return None
+    return getattr(reason, "name", None) or str(reason)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if _is_throttle(error):
+        return True
+    code = getattr(error, "code", None)
+    if code in (500, 502, 503, 504):
+        return True
+    message = str(error).lower()
+    return (
+        "503" in message
+        or "unavailable" in message
+        or "deadline exceeded" in message
+        or "timeout" in message
+        or "connection" in message
+    )
+
+
+def _parse_model_limits(value: str) -> Dict[str, Tuple[int, float]]:
+    limits = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        model, _, spec = item.partition("=")
+        concurrency, _, qps = spec.partition("/")
+        try:
+            limits[model.strip()] = (int(concurrency), float(qps) if qps else None)
+        except ValueError:
+            logger.warning(f"⚠️  Ignoring invalid GEMINI_MODEL_LIMITS entry: {item}")
+    return limits
+
+
+class GeminiClient:
+    """
+    Thread-safe Gemini client with shared model handles, limits, retries and metrics.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        qps: float = 4.0,
+        max_qps: float = 20.0,
+        model_limits: Optional[Dict[str, Tuple[int, Optional[float]]]] = None,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        response_cache: Optional[LLMResponseCache] = None
+    ):
+        """
+        Initialize Gemini client.
+
+        Args:
+            max_concurrency: Default in-flight calls per model
+            qps: Default initial calls per second per model
+            max_qps: Upper bound for the adaptive per-model rate
+            model_limits: Per-model (concurrency, qps) overrides
+            max_retries: Retries after the first attempt for retryable errors
+            base_delay: Initial backoff delay in seconds
+            max_delay: Maximum backoff delay in seconds
+            response_cache: Optional on-disk cache of response text
+        """
+        self.max_concurrency = max_concurrency
+        self.qps = qps
+        self.max_qps = max_qps
+        self.model_limits = model_limits or {}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.response_cache = response_cache
+
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._models: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._limiters: Dict[str, AdaptiveRateLimiter] = {}
+        self._model_stats: Dict[str, Dict[str, float]] = {}
+        self._label_stats: Dict[str, Dict[str, float]] = {}
+
+    def _init_vertexai(self):
+        with self._lock:
+            if self._initialized:
+                return
+            import vertexai
+            vertexai.init(project=os.environ.get("VERTEX_PROJECT", "rapids-platform"), location="us-central1")
+            self._initialized = True
+
+    def get_model(self, model_name: str = DEFAULT_MODEL, system_instruction: Optional[str] = None):
+        """
+        Get a cached GenerativeModel handle.
+
+        Args:
+            model_name: Vertex AI model name
+            system_instruction: Optional system instruction bound to the handle
+
+        Returns:
+            vertexai GenerativeModel
+        """
+        self._init_vertexai()
+        key = (model_name, system_instruction)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                from vertexai.generative_models import GenerativeModel
+                if system_instruction:
+                    model = GenerativeModel(model_name, system_instruction=system_instruction)
+                else:
+                    model = GenerativeModel(model_name)
+                self._models[key] = model
+            return model
+
+    def _limits_for(self, model_name: str) -> Tuple[threading.BoundedSemaphore, AdaptiveRateLimiter]:
+        with self._lock:
+            semaphore = self._semaphores.get(model_name)
+            if semaphore is None:
+                concurrency, qps = self.model_limits.get(model_name, (self.max_concurrency, self.qps))
+                qps = qps or self.qps
+                semaphore = threading.BoundedSemaphore(max(1, concurrency))
+                self._semaphores[model_name] = semaphore
+                self._limiters[model_name] = AdaptiveRateLimiter(
+                    name=model_name,
+                    initial_rate=qps,
+                    min_rate=min(qps, 0.1),
+                    max_rate=max(qps, self.max_qps),
+                    burst=max(1, concurrency),
+                )
+            return semaphore, self._limiters[model_name]
+
+    def _record(self, model_name: str, label: Optional[str], **values):
+        with self._lock:
+            targets = [self._model_stats.setdefault(model_name, {})]
+            if label:
+                targets.append(self._label_stats.setdefault(label, {}))
+            for stats in targets:
+                for name, value in values.items():
+                    if name == "max_latency_seconds":
+                        stats[name] = max(stats.get(name, 0.0), value)
+                    else:
+                        stats[name] = stats.get(name, 0) + value
+
+    @staticmethod
+    def _document_handle(pdf_bytes: Optional[bytes], mime_type: str):
+        """Scope and handle for pdf_bytes in the active document scope, or (None, None) to send inline."""
+        scope = current_document_scope()
+        if pdf_bytes is None or scope is None:
+            return None, None
+        handle = scope.acquire(pdf_bytes, mime_type)
+        return (scope, handle) if handle is not None else (None, None)
+
+    @staticmethod
+    def _build_contents(contents, pdf_bytes: Optional[bytes], mime_type: str, scope=None, handle=None):
+        parts = list(contents) if isinstance(contents, (list, tuple)) else [contents]
+        if handle is not None:
+            parts.insert(0, scope.to_part(handle))
+        elif pdf_bytes is not None:
+            from vertexai.generative_models import Part
+            parts.insert(0, Part.from_data(data=pdf_bytes, mime_type=mime_type))
+        return parts
+
+    def _cache_key(
+        self,
+        contents,
+        model: str = DEFAULT_MODEL,
+        generation_config: Optional[Dict[str, Any]] = None,
+        pdf_bytes: Optional[bytes] = None,
+        mime_type: str = "application/pdf",
+        system_instruction: Optional[str] = None,
+        cache_version: Optional[str] = None,
+        **_
+    ) -> Optional[str]:
+        """Cache key for a request, or None if the cache is off or a part can't be hashed."""
+        if self.response_cache is None:
+            return None
+        parts = list(contents) if isinstance(contents, (list, tuple)) else [contents]
+        if not all(isinstance(part, str) for part in parts):
+            return None
+        config = dict(generation_config or {})
+        if pdf_bytes is not None:
+            config["_mime_type"] = mime_type
+        return build_cache_key(
+            parts,
+            model=model,
+            generation_config=config,
+            document_bytes=pdf_bytes,
+            system_instruction=system_instruction,
+            version=cache_version,
+        )
+
+    def generate(
+        self,
+        contents,
+        model: str = DEFAULT_MODEL,
+        generation_config: Optional[Dict[str, Any]] = None,
+        pdf_bytes: Optional[bytes] = None,
+        mime_type: str = "application/pdf",
+        system_instruction: Optional[str] = None,
+        label: Optional[str] = None,
+        use_cache: bool = True,
+        cache_version: Optional[str] = None
+    ):
+        """
+        Call generate_content under the model's limits, retrying throttling and transient errors.
+
+        Args:
+            contents: Prompt string or list of parts
+            model: Vertex AI model name
+            generation_config: Generation config dict
+            pdf_bytes: Optional document, sent as the first part
+            mime_type: MIME type of pdf_bytes
+            system_instruction: Optional system instruction
+            label: Caller name for per-label metrics (e.g. "lab_extraction")
+            use_cache: Read and write the response cache (False forces a live call)
+            cache_version: Optional version string mixed into the cache key
+
+        Returns:
+            Vertex AI GenerationResponse, or a CachedResponse on a cache hit or cassette replay
+
+        Raises:
+            The last API error if it is not retryable or retries are exhausted
+        """
+        cassette = get_cassette()
+        cassette_request = None
+        if cassette is not None:
+            cassette_request = cassette.llm_request(
+                list(contents) if isinstance(contents, (list, tuple)) else [contents],
+                model, generation_config, pdf_bytes, system_instruction, label,
+            )
+            use_cache = False
+
+        cache_key = None
+        if use_cache:
+            cache_key = self._cache_key(
+                contents, model=model, generation_config=generation_config, pdf_bytes=pdf_bytes,
+                mime_type=mime_type, system_instruction=system_instruction, cache_version=cache_version,
+            )
+        if cache_key is not None:
+            try:
+                cached_text = self.response_cache.get(cache_key)
+            except Exception as e:
+                # A locked or corrupt cache must not fail the call; treat it as a miss
+                logger.warning(f"⚠️  Failed to read Gemini response cache: {e}")
+                self._record(model, label, cache_errors=1)
+                cached_text = None
+            if cached_text is not None:
+                self._record(model, label, cache_hits=1)
+                logger.info(f"💾 Gemini {model}{f' [{label}]' if label else ''} served from response cache")
+                return CachedResponse(cached_text)
+            self._record(model, label, cache_misses=1)
+
+        if cassette is not None and cassette.replaying:
+            gemini_model = parts = handle = None
+        else:
+            gemini_model = self.get_model(model, system_instruction)
+            scope, handle = self._document_handle(pdf_bytes, mime_type)
+            if handle is not None:
+                self._record(model, label, document_handle_calls=1)
+            parts = self._build_contents(contents, pdf_bytes, mime_type, scope, handle)
+        semaphore, limiter = self._limits_for(model)
+
+        attempt = 0
+        while True:
+            limiter.acquire()
+            started = time.perf_counter()
+            with semaphore:
+                try:
+                    if gemini_model is None:
+                        recorded = cassette.replay_llm(cassette_request)
+                        response = CachedResponse(recorded.get("text"), recorded.get("usage"))
+                    elif generation_config is not None:
+                        response = gemini_model.generate_content(parts, generation_config=generation_config)
+                    else:
+                        response = gemini_model.generate_content(parts)
+                    error = None
+                except Exception as e:
+                    error = e
+            latency = time.perf_counter() - started
+
+            if error is None:
+                limiter.on_success()
+                usage = getattr(response, "usage_metadata", None)
+                self._record(
+                    model, label,
+                    calls=1,
+                    latency_seconds=latency,
+                    max_latency_seconds=latency,
+                    prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+                    output_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+                    total_tokens=getattr(usage, "total_token_count", 0) or 0,
+                )
+                logger.info(
+                    f"🤖 Gemini {model}{f' [{label}]' if label else ''} responded in {latency:.2f}s "
+                    f"(tokens: {getattr(usage, 'prompt_token_count', '?')} in / "
+                    f"{getattr(usage, 'candidates_token_count', '?')} out)"
+                )
+                if cache_key is not None:
+                    self._store_response(cache_key, response, model, label)
+                if cassette is not None and cassette.recording:
+                    cassette.record_llm(cassette_request, response, latency)
+                return response
+
+            throttled = _is_throttle(error)
+            if throttled:
+                limiter.on_throttle()
+            if handle is not None and not _is_retryable(error):
+                self._record(model, label, document_handle_fallbacks=1)
+                logger.warning(
+                    f"⚠️  Gemini {model}{f' [{label}]' if label else ''} rejected document reference "
+                    f"{handle.uri}: {error}. Retrying with the document inline"
+                )
+                # Later calls for the same document go inline without a failed attempt
+                scope.reject(handle)
+                handle = None
+                parts = self._build_contents(contents, pdf_bytes, mime_type)
+                continue
+            if not _is_retryable(error) or attempt >= self.max_retries:
+                self._record(model, label, errors=1, throttled=1 if throttled else 0)
+                raise error
+
+            delay = min(self.base_delay * (2 ** attempt), self.max_delay)
+            delay += delay * 0.25 * random.random()
+            self._record(model, label, retries=1, throttled=1 if throttled else 0)
+            logger.warning(
+                f"⚠️  Gemini {model}{f' [{label}]' if label else ''} attempt {attempt + 1} failed: {error}. "
+                f"Retrying in {delay:.1f}s ({self.max_retries - attempt} retries remaining)"
+            )
+            time.sleep(delay)
+            attempt += 1
+
+    def _store_response(self, cache_key: str, response, model: str, label: Optional[str]):
+        # Truncated (MAX_TOKENS) or filtered (SAFETY, RECITATION) output must not be replayed for 30 days
+        finish_reason = _finish_reason(response)
+        if finish_reason is not None and finish_reason != "STOP":
+            logger.info(f"💾 Not caching Gemini {model}{f' [{label}]' if label else ''} response "
+                        f"(finish reason {finish_reason})")
+            return
+        try:
+            response_text = response.text
+        except (AttributeError, ValueError):
+            return
+        if not response_text or not response_text.strip():
+            return
+        try:
+            self.response_cache.put(cache_key, response_text, model=model, label=label)
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to write Gemini response cache: {e}")
+            self._record(model, label, cache_errors=1)
+
+    def invalidate_cached_response(self, contents, **kwargs):
+        """
+        Drop the cached response of a request, e.g. after the caller failed to parse it.
+
+        Args:
+            contents: Prompt string or list of parts, as passed to generate()
+            **kwargs: The generate() keyword arguments of the request
+        """
+        if not kwargs.get("use_cache", True):
+            return
+        cache_key = self._cache_key(contents, **kwargs)
+        if cache_key is not None:
+            try:
+                self.response_cache.invalidate(cache_key)
+            except Exception as e:
+                logger.warning(f"⚠️  Failed to invalidate Gemini response cache entry: {e}")
+
+    def generate_json(self, contents, **kwargs) -> Any:
+        """
+        Call generate() and parse the response text as JSON.
+
+        Args:
+            contents: Prompt string or list of parts
+            **kwargs: Passed to generate()
+
+        Returns:
+            Parsed JSON value
+
+        Raises:
+            GeminiResponseParseError: If the response has no text or no parsable JSON
+        """
+        response = self.generate(contents, **kwargs)
+        try:
+            response_text = response.text
+        except (AttributeError, ValueError) as e:
+            raise GeminiResponseParseError(f"Gemini response has no text: {e}", response=response)
+        if not response_text or not response_text.strip():
+            raise GeminiResponseParseError("Empty response from Gemini", response=response)
+        try:
+            return extract_json(response_text)
+        except json.JSONDecodeError as e:
+            # Don't let a retry by the caller replay the unparsable text from the cache
+            self.invalidate_cached_response(contents, **kwargs)
+            raise GeminiResponseParseError(
+                f"Failed to parse Gemini response as JSON: {e}",
+                response=response,
+                response_text=response_text,
+            )
+
+    def get_stats(self) -> Dict:
+        """Get per-model and per-label call statistics."""
+        with self._lock:
+            models = {name: dict(stats) for name, stats in self._model_stats.items()}
+            labels = {name: dict(stats) for name, stats in self._label_stats.items()}
+            limiters = list(self._limiters.items())
+        for stats in list(models.values()) + list(labels.values()):
+            calls = stats.get("calls", 0)
+            stats["avg_latency_seconds"] = round(stats.get("latency_seconds", 0.0) / calls, 3) if calls else 0.0
+            stats["latency_seconds"] = round(stats.get("latency_seconds", 0.0), 3)
+            stats["max_latency_seconds"] = round(stats.get("max_latency_seconds", 0.0), 3)
+        for name, limiter in limiters:
+            models.setdefault(name, {})["limiter"] = limiter.get_stats()
+        stats = {"models": models, "labels": labels}
+        if self.response_cache is not None:
+            stats["response_cache"] = self.response_cache.get_stats()
+        return stats
+
+
+# Global client instance
+_gemini_client_instance = None
+_gemini_client_lock = threading.Lock()
+
+
+def get_gemini_client() -> GeminiClient:
+    """
+    Get global Gemini client instance (singleton pattern).
+
+    Returns:
+        GeminiClient instance
+    """
+    global _gemini_client_instance
+    with _gemini_client_lock:
+        if _gemini_client_instance is None:
+            _gemini_client_instance = GeminiClient(
+                max_concurrency=int(os.environ.get("GEMINI_MAX_CONCURRENCY", 8)),
+                qps=float(os.environ.get("GEMINI_QPS", 4.0)),
+                max_qps=float(os.environ.get("GEMINI_MAX_QPS", 20.0)),
+                model_limits=_parse_model_limits(os.environ.get("GEMINI_MODEL_LIMITS", "")),
+                max_retries=int(os.environ.get("GEMINI_MAX_RETRIES", 5)),
+                base_delay=float(os.environ.get("GEMINI_RETRY_BASE_DELAY", 1.0)),
+                max_delay=float(os.environ.get("GEMINI_RETRY_MAX_DELAY", 60.0)),
+                response_cache=get_llm_response_cache(),
+            )
+        return _gemini_client_instance
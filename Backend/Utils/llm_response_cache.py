@@ -0,0 +1,267 @@
+"""
+Persistent LLM Response Cache
+
+Re-ingesting a patient, calling the /api/test/* endpoints or refreshing
+eligibility sends the same PDFs and prompts to Gemini again and pays for
+every call. This cache stores Gemini response text in SQLite so an identical
+request is answered from disk.
+
+Key: SHA-256 over
+- SHA-256 of the document bytes (if a document is attached)
+- SHA-256 of the prompt text (any prompt template change is a new key)
+- model name, system instruction and generation config
+- an optional caller-supplied version string
+
+Entries expire after a TTL, and the least recently used entries are evicted
+when the total stored size exceeds the budget.
+
+Configuration (environment variables):
+- LLM_CACHE_ENABLED: "false" disables the cache (default: true)
+- LLM_CACHE_PATH: SQLite file (default: Backend/cache/llm_responses/responses.db)
+- LLM_CACHE_MAX_BYTES: size budget for stored responses (default: 268435456 = 256 MB)
+- LLM_CACHE_TTL_SECONDS: entry lifetime (default: 2592000 = 30 days)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def build_cache_key(
+    prompt_parts: List[str],
+    model: str,
+    generation_config: Optional[Dict[str, Any]] = None,
+    document_bytes: Optional[bytes] = None,
+    system_instruction: Optional[str] = None,
+    version: Optional[str] = None
+) -> str:
+    """
+    Build the cache key for one Gemini request.
+
+    Args:
+        prompt_parts: Text parts of the request, in order
+        model: Model name
+        generation_config: Generation config dict
+        document_bytes: Attached document bytes, if any
+        system_instruction: System instruction, if any
+        version: Optional caller version string (bump to invalidate old entries)
+
+    Returns:
+        Hex SHA-256 key
+    """
+    key_material = {
+        "document": hashlib.sha256(document_bytes).hexdigest() if document_bytes is not None else None,
+        "prompt": hashlib.sha256("\x00".join(prompt_parts).encode("utf-8")).hexdigest(),
+        "model": model,
+        "generation_config": generation_config or {},
+        "system_instruction": system_instruction,
+        "version": version,
+    }
+    encoded = json.dumps(key_material, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Thread-safe SQLite cache of LLM response text with TTL and size-based LRU eviction.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = 256 * 1024 * 1024, ttl_seconds: float = 30 * 24 * 3600):
+        """
+        Initialize response cache.
+
+        Args:
+            db_path: Path to the SQLite file (parent directory is created)
+            max_bytes: Maximum total size of stored responses
+            ttl_seconds: Time-to-live for entries
+        """
+        self.db_path = str(db_path)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "expired": 0,
+            "invalidations": 0,
+        }
+
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    cache_key TEXT PRIMARY KEY,
+                    model TEXT,
+                    label TEXT,
+                    response_text TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_access ON llm_responses(last_access)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def get(self, cache_key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            cache_key: Key from build_cache_key
+
+        Returns:
+            Response text, or None on a miss or expired entry
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT response_text, created_at FROM llm_responses WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            if now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (cache_key,))
+                conn.commit()
+                self._count("expired")
+                self._count("misses")
+                return None
+            conn.execute(
+                "UPDATE llm_responses SET last_access = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+                (now, cache_key)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._count("hits")
+        return row[0]
+
+    def put(self, cache_key: str, response_text: str, model: str = None, label: str = None):
+        """
+        Store a response, evicting least recently used entries over the size budget.
+
+        Args:
+            cache_key: Key from build_cache_key
+            response_text: Response text to cache
+            model: Model name (informational)
+            label: Caller label (informational)
+        """
+        size = len(response_text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("""
+                INSERT OR REPLACE INTO llm_responses
+                (cache_key, model, label, response_text, size_bytes, created_at, last_access, hit_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+            """, (cache_key, model, label, response_text, size, now, now))
+
+            expired = conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+
+            total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM llm_responses").fetchone()[0]
+            evicted = 0
+            if total > self.max_bytes:
+                for old_key, old_size in conn.execute(
+                    "SELECT cache_key, size_bytes FROM llm_responses WHERE cache_key != ? ORDER BY last_access",
+                    (cache_key,)
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (old_key,))
+                    total -= old_size
+                    evicted += 1
+            conn.commit()
+        finally:
+            conn.close()
+        self._count("writes")
+        if expired:
+            self._count("expired", expired)
+        if evicted:
+            self._count("evictions", evicted)
+
+    def invalidate(self, cache_key: Optional[str] = None):
+        """
+        Drop one entry, or every entry if cache_key is None.
+        """
+        conn = self._connect()
+        try:
+            if cache_key is None:
+                conn.execute("DELETE FROM llm_responses")
+            else:
+                conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (cache_key,))
+            conn.commit()
+        finally:
+            conn.close()
+        self._count("invalidations")
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        try:
+            conn = self._connect()
+            try:
+                entries, total = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_responses"
+                ).fetchone()
+            finally:
+                conn.close()
+            stats["entries"] = entries
+            stats["stored_bytes"] = total
+        except sqlite3.Error:
+            pass
+        return stats
+
+
+# Global cache instance
+_llm_cache_instance = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> Optional[LLMResponseCache]:
+    """
+    Get global LLM response cache instance (singleton pattern).
+
+    Returns:
+        LLMResponseCache instance, or None if disabled with LLM_CACHE_ENABLED=false
+    """
+    global _llm_cache_instance
+    if os.environ.get("LLM_CACHE_ENABLED", "true").lower() == "false":
+        return None
+    with _llm_cache_lock:
+        if _llm_cache_instance is None:
+            default_path = Path(__file__).parent.parent / "cache" / "llm_responses" / "responses.db"
+            _llm_cache_instance = LLMResponseCache(
+                db_path=os.environ.get("LLM_CACHE_PATH") or str(default_path),
+                max_bytes=int(os.environ.get("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+                ttl_seconds=float(os.environ.get("LLM_CACHE_TTL_SECONDS", 30 * 24 * 3600)),
+            )
+        return _llm_cache_instance
@@ -16,6 +16,13 @@ try:
 except ModuleNotFoundError:
     from storage_uploader import download_pdf_bytes_from_url as download_pdf_bytes_from_drive_url
 
+try:
+    from Backend.pdf_byte_cache import get_pdf_byte_cache, url_key
+    from Backend.http_sessions import get_session
+except ModuleNotFoundError:
+    from pdf_byte_cache import get_pdf_byte_cache, url_key
+    from http_sessions import get_session
+
 
 def is_google_drive_url(url):
     """
@@ -78,12 +85,14 @@ def get_pdf_bytes_from_url(pdf_url):
         print(f"Detected Google Drive URL, downloading via Drive API...")
         return download_pdf_bytes_from_drive_url(pdf_url)
     else:
-        # For non-Google Drive URLs, download via HTTP request
-        import requests
-        print(f"Downloading PDF from URL: {pdf_url}")
-        response = requests.get(pdf_url)
-        response.raise_for_status()
-        return response.content
+        # For non-Google Drive URLs, download via HTTP request (once per URL)
+        def download():
+            print(f"Downloading PDF from URL: {pdf_url}")
+            response = get_session(pdf_url).get(pdf_url)
+            response.raise_for_status()
+            return response.content
+
+        return get_pdf_byte_cache().get_or_fetch(url_key(pdf_url), download)
 
 
 def handle_pdf_input(pdf_url=None, pdf_bytes=None):
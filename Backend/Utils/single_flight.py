@@ -0,0 +1,140 @@
+"""
+Single-flight request coalescing for async endpoints
+
+If two clinicians open the same uncached patient at once (or the startup
+demo seeding overlaps with a user), each request used to run the full
+multi-minute extraction and pay for every Gemini call. With single-flight,
+the first request for a key does the work and concurrent requests for the
+same key await that same in-flight result.
+
+Semantics:
+- Result: every caller in a flight gets the same result object. Callers must
+  treat it as read-only.
+- Errors: if the work raises (including HTTPException), every caller in the
+  flight gets that exception. Failures are not cached; the flight ends when
+  the work finishes, so the next request for the key starts fresh work.
+- Caller cancellation: a caller that is cancelled (e.g. client disconnect)
+  only stops waiting. The shared work keeps running for the other callers
+  and, for ingest, still stores its result in the data pool.
+- Work cancellation: if the shared work itself is cancelled (shutdown),
+  every waiting caller gets CancelledError.
+
+Usage:
+    @app.post("/api/patient/all")
+    @coalesce_requests(lambda request: ("patient_all", request.db_type or "demo", request.mrn))
+    async def get_patient_data(request: MRNRequest):
+        ...
+"""
+
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+try:
+    from Backend.Utils.logger_config import setup_logger
+except ModuleNotFoundError:
+    from Utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent async calls that share a key into one execution.
+
+    Must be used from a single event loop (the FastAPI loop).
+    """
+
+    def __init__(self):
+        """Initialize single-flight group."""
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {
+            "flights": 0,
+            "joined": 0,
+            "errors": 0,
+            "cancelled_waiters": 0,
+        }
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run factory() once per key at a time and return its result.
+
+        Args:
+            key: Hashable key identifying the work (e.g. (scope, db_type, mrn))
+            factory: Zero-argument function returning the awaitable to run
+
+        Returns:
+            Result of the shared work
+
+        Raises:
+            Whatever the shared work raised
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            self._stats["flights"] += 1
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(functools.partial(self._finish, key))
+        else:
+            self._stats["joined"] += 1
+            logger.info(f"🔗 Joining in-flight request for {key}")
+
+        try:
+            # Shield so one caller's cancellation does not cancel the shared work
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                self._stats["cancelled_waiters"] += 1
+            raise
+
+    def _finish(self, key: Hashable, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["errors"] += 1
+
+    def in_flight_keys(self):
+        """Keys with work currently running."""
+        return list(self._in_flight.keys())
+
+    def get_stats(self) -> Dict:
+        """Get coalescing statistics."""
+        stats = dict(self._stats)
+        stats["in_flight"] = len(self._in_flight)
+        return stats
+
+
+# Global single-flight group
+_single_flight_instance = None
+
+
+def get_single_flight() -> SingleFlight:
+    """
+    Get global single-flight group (singleton pattern).
+
+    Returns:
+        SingleFlight instance
+    """
+    global _single_flight_instance
+    if _single_flight_instance is None:
+        _single_flight_instance = SingleFlight()
+    return _single_flight_instance
+
+
+def coalesce_requests(key_fn: Callable[..., Hashable]):
+    """
+    Decorator for async endpoints: concurrent calls with the same key share one execution.
+
+    Args:
+        key_fn: Called with the endpoint's keyword arguments; returns the flight key
+
+    Returns:
+        Decorator preserving the endpoint signature (FastAPI reads it via __wrapped__)
+    """
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            key = key_fn(*args, **kwargs)
+            return await get_single_flight().run(key, lambda: endpoint(*args, **kwargs))
+        return wrapper
+    return decorator
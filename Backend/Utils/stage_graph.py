@@ -0,0 +1,195 @@
+"""
+Dependency-graph scheduler for extraction stages
+
+The patient ingest used to run in fixed waves: "Pipeline 1" (patient, lab,
+pathology) had to finish completely before "Pipeline 2" (genomics,
+radiology) started, even though only genomics needs pathology's cached
+classifications. Here each stage declares the stages it depends on. A stage
+starts as soon as all of its dependencies have finished, so independent work
+(radiology) no longer waits for the slowest stage of an earlier wave.
+
+Semantics:
+- A stage function is called with one keyword argument per dependency, set
+  to that dependency's return value (None if the dependency failed).
+- A failing stage does not cancel the graph. Its exception is recorded in
+  ``errors`` and its dependents still run, because most dependencies here
+  are "run after" orderings (e.g. genomics reuses cached classifications
+  when pathology succeeded and re-classifies otherwise).
+- Per-stage timing is recorded: start offset, duration, and the time between
+  the graph starting and the stage becoming ready.
+- Stages run in a copy of the caller's context, so context variables set
+  around graph.run() (e.g. the ingest's document scope) are visible inside
+  stages and nested graphs.
+
+Usage:
+    graph = StageGraph("ingest")
+    graph.add("pathology", run_pathology)
+    graph.add("genomics", lambda pathology: run_genomics(), depends_on=["pathology"])
+    graph.add("radiology", run_radiology)
+    run = graph.run()
+    run.results["genomics"], run.errors, run.timings
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    from Backend.Utils.logger_config import setup_logger
+except ModuleNotFoundError:
+    from Utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class Stage:
+    """A named unit of work and the stages whose results it needs."""
+    name: str
+    fn: Callable[..., Any]
+    depends_on: Sequence[str] = ()
+
+
+@dataclass
+class StageGraphRun:
+    """Results of one StageGraph.run()."""
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    timings: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+
+    def error_list(self) -> List[str]:
+        """Errors as "stage: message" strings (order of completion)."""
+        return [f"{name}: {message}" for name, message in self.errors.items()]
+
+
+class StageGraph:
+    """
+    Runs stages on a thread pool in dependency order, each as early as possible.
+    """
+
+    def __init__(self, name: str, max_workers: Optional[int] = None):
+        """
+        Initialize stage graph.
+
+        Args:
+            name: Name used in log messages and thread names
+            max_workers: Threads used to run stages (default: one per stage)
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self._stages: Dict[str, Stage] = {}
+
+    def add(self, name: str, fn: Callable[..., Any], depends_on: Sequence[str] = ()) -> "StageGraph":
+        """
+        Add a stage.
+
+        Args:
+            name: Unique stage name (also the key in the run results)
+            fn: Function called with one keyword argument per dependency
+            depends_on: Names of stages that must finish first
+
+        Returns:
+            The graph, for chaining
+
+        Raises:
+            ValueError: If the name is already used
+        """
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' already added to graph '{self.name}'")
+        self._stages[name] = Stage(name=name, fn=fn, depends_on=tuple(depends_on))
+        return self
+
+    def _validate(self):
+        for stage in self._stages.values():
+            for dependency in stage.depends_on:
+                if dependency not in self._stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+
+        # Kahn's algorithm: anything left over is part of a cycle
+        remaining = {name: set(stage.depends_on) for name, stage in self._stages.items()}
+        while True:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        if remaining:
+            raise ValueError(f"Dependency cycle in graph '{self.name}': {sorted(remaining)}")
+
+    def run(self, on_stage_done: Optional[Callable[[str, Any, Optional[str], Dict[str, float]], None]] = None) -> StageGraphRun:
+        """
+        Run every stage and wait for all of them.
+
+        Args:
+            on_stage_done: Optional callback(name, result, error, timing) called from the
+                           worker thread as each stage finishes (before its dependents
+                           start). Exceptions it raises are logged and ignored.
+
+        Returns:
+            StageGraphRun with results, errors and per-stage timings
+
+        Raises:
+            ValueError: If a dependency is unknown or the graph has a cycle
+        """
+        self._validate()
+        run = StageGraphRun()
+        lock = threading.Lock()
+        started = time.perf_counter()
+        pending = dict(self._stages)
+        finished = set()
+        ready_at: Dict[str, float] = {}
+
+        def execute(stage: Stage):
+            stage_start = time.perf_counter()
+            with lock:
+                kwargs = {dep: run.results.get(dep) for dep in stage.depends_on}
+            try:
+                value = stage.fn(**kwargs)
+                error = None
+            except Exception as e:
+                value = None
+                error = str(e) or e.__class__.__name__
+            stage_end = time.perf_counter()
+            with lock:
+                if error is None:
+                    run.results[stage.name] = value
+                else:
+                    run.errors[stage.name] = error
+                timing = {
+                    "ready_at": round(ready_at[stage.name] - started, 3),
+                    "started_at": round(stage_start - started, 3),
+                    "seconds": round(stage_end - stage_start, 3),
+                }
+                run.timings[stage.name] = timing
+            if error is None:
+                logger.info(f"✅ [{self.name}] {stage.name} completed in {stage_end - stage_start:.2f}s")
+            else:
+                logger.error(f"⚠️  [{self.name}] {stage.name} failed after {stage_end - stage_start:.2f}s: {error}")
+            if on_stage_done is not None:
+                try:
+                    on_stage_done(stage.name, value, error, timing)
+                except Exception as e:
+                    logger.error(f"⚠️  [{self.name}] on_stage_done failed for {stage.name}: {e}")
+
+        max_workers = self.max_workers or max(1, len(self._stages))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"stage-{self.name}") as executor:
+            in_flight = {}
+            while pending or in_flight:
+                for name in [n for n, stage in pending.items() if finished.issuperset(stage.depends_on)]:
+                    stage = pending.pop(name)
+                    ready_at[name] = time.perf_counter()
+                    logger.info(f"🚀 [{self.name}] Starting {name}")
+                    in_flight[executor.submit(contextvars.copy_context().run, execute, stage)] = name
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished.add(in_flight.pop(future))
+
+        run.wall_seconds = round(time.perf_counter() - started, 3)
+        return run
@@ -0,0 +1,358 @@
+"""
+Columnar patient x trial prefilter
+
+compute_eligibility_matrix used to send every (patient, trial) pair to the
+thread pool, where process_single_trial ran check_disease_match and
+pre_filter_trial one pair at a time before any LLM work. TrialPrefilterIndex
+loads the trial features (see compute_trial_features) of a whole catalog into
+NumPy columns once per run:
+- age bounds, sex, ECOG limits
+- disease-family bitmasks (cancer keywords in the conditions / title,
+  non-oncology terms) and the oncology / basket markers
+- recruiting status
+
+and evaluates one patient against all trials in a single vectorized pass,
+returning the NCT IDs that pass both checks. The result is exactly what the
+scalar checks decide; the few trials whose outcome depends on a free-text
+comparison (a condition with no cancer keyword that may appear in the
+patient's diagnosis) are resolved with check_disease_match. For the other
+trials, prefilter() reports which check failed with the scalar reason, worded
+from the failing column and the trial's limits.
+
+NumPy is optional: without it (or with more than 64 keywords per bitmask) the
+index falls back to the scalar checks.
+
+Usage:
+    index = TrialPrefilterIndex(trials, recruiting_only=True)
+    candidate_ids, rejections = index.prefilter(patient_data)
+"""
+
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from Backend.Utils.Tabs.clinical_trials_tab import (
+        CANCER_KEYWORDS,
+        NON_ONCOLOGY_CONDITIONS,
+        _FIRST_DIGIT_PATTERN,
+        _FIRST_NUMBER_PATTERN,
+        _first_int,
+        _patient_cancer_terms,
+        check_disease_match,
+        pre_filter_trial,
+        get_trial_match_features,
+    )
+except ModuleNotFoundError:
+    from Utils.Tabs.clinical_trials_tab import (
+        CANCER_KEYWORDS,
+        NON_ONCOLOGY_CONDITIONS,
+        _FIRST_DIGIT_PATTERN,
+        _FIRST_NUMBER_PATTERN,
+        _first_int,
+        _patient_cancer_terms,
+        check_disease_match,
+        pre_filter_trial,
+        get_trial_match_features,
+    )
+
+# The disease columns hold one bit per keyword in a uint64; longer keyword
+# lists use the scalar checks
+_BITMASKS_FIT = len(CANCER_KEYWORDS) <= 64 and len(NON_ONCOLOGY_CONDITIONS) <= 64
+
+_CANCER_BITS = {term: 1 << i for i, term in enumerate(CANCER_KEYWORDS)}
+_NON_ONCOLOGY_BITS = {term: 1 << i for i, term in enumerate(NON_ONCOLOGY_CONDITIONS)}
+
+# Trial sex codes (anything other than MALE / FEMALE is not restricted)
+_SEX_ANY, _SEX_MALE, _SEX_FEMALE = 0, 1, 2
+
+# (check, reason) of a rejected trial, as taken by prefilter_rejection_result
+Rejection = Optional[Tuple[str, str]]
+
+
+def _bitmask(terms, bits: Dict[str, int]) -> int:
+    mask = 0
+    for term in terms:
+        mask |= bits.get(term, 0)
+    return mask
+
+
+def _int_or_nan(value) -> float:
+    return float("nan") if value is None else float(value)
+
+
+class TrialPrefilterIndex:
+    """
+    Trial features of a catalog as NumPy columns, for vectorized prefiltering.
+    """
+
+    def __init__(self, trials: List[Dict], recruiting_only: bool = False):
+        """
+        Build the index.
+
+        Args:
+            trials: Trial dictionaries (trial["features"] is used when present)
+            recruiting_only: Also drop trials whose status is not RECRUITING
+        """
+        self.trials = trials
+        self.nct_ids = [trial.get("nct_id", "") for trial in trials]
+        self.recruiting_only = recruiting_only
+        self.vectorized = np is not None and _BITMASKS_FIT
+        self._lock = threading.Lock()
+        self._stats = {"patients": 0, "pairs": 0, "candidates": 0, "scalar_checks": 0, "seconds": 0.0}
+
+        if not self.vectorized:
+            return
+
+        build_start = time.time()
+        # Kept to word the rejection reasons of the trials a patient fails
+        self.features = features = [get_trial_match_features(trial) for trial in trials]
+        self.min_age = np.array([_int_or_nan(f["min_age"]) for f in features], dtype=np.float64)
+        self.max_age = np.array([_int_or_nan(f["max_age"]) for f in features], dtype=np.float64)
+        self.sex = np.array([
+            _SEX_MALE if f["sex"] == "MALE" else _SEX_FEMALE if f["sex"] == "FEMALE" else _SEX_ANY
+            for f in features
+        ], dtype=np.int8)
+        self.ecog_min = np.array([_int_or_nan(f["ecog_min"]) for f in features], dtype=np.float64)
+        self.ecog_max = np.array([_int_or_nan(f["ecog_max"]) for f in features], dtype=np.float64)
+        self.recruiting = np.array([(trial.get("status") or "") == "RECRUITING" for trial in trials], dtype=bool)
+
+        self.oncology = np.array([bool(f["oncology"]) for f in features], dtype=bool)
+        self.basket = np.array([bool(f["basket"]) for f in features], dtype=bool)
+        self.has_conditions = np.array([bool(f["conditions"]) for f in features], dtype=bool)
+        self.disease_tags = np.array([_bitmask(f["disease_tags"], _CANCER_BITS) for f in features], dtype=np.uint64)
+        self.title_tags = np.array([_bitmask(f["title_cancer_terms"], _CANCER_BITS) for f in features], dtype=np.uint64)
+        self.non_oncology = np.array([_bitmask(f["non_oncology_terms"], _NON_ONCOLOGY_BITS) for f in features],
+                                     dtype=np.uint64)
+        # A condition without any cancer keyword can still match by appearing in the
+        # patient's diagnosis text; those rows are settled by check_disease_match
+        self.untagged_condition = np.array([
+            any(not any(term in cond for term in CANCER_KEYWORDS) for cond in f["conditions"])
+            for f in features
+        ], dtype=bool)
+        self.build_seconds = time.time() - build_start
+
+    def __len__(self) -> int:
+        return len(self.trials)
+
+    def candidate_mask(self, patient_data: Dict):
+        """
+        Evaluate check_disease_match and pre_filter_trial for one patient against every trial.
+
+        Args:
+            patient_data: Patient data dictionary
+
+        Returns:
+            Boolean NumPy array (list of bools without NumPy), aligned with self.trials
+        """
+        return self._evaluate(patient_data, with_reasons=False)[0]
+
+    def candidates(self, patient_data: Dict) -> List[str]:
+        """
+        Get the NCT IDs of the trials that pass the prefilter for a patient.
+
+        Args:
+            patient_data: Patient data dictionary
+
+        Returns:
+            NCT IDs, in catalog order
+        """
+        mask = self.candidate_mask(patient_data)
+        return [nct_id for nct_id, passes in zip(self.nct_ids, mask) if passes]
+
+    def prefilter(self, patient_data: Dict) -> Tuple[List[str], Dict[str, Rejection]]:
+        """
+        Get the candidate trials of a patient and why every other trial was rejected.
+
+        The reasons are the ones check_disease_match / pre_filter_trial give,
+        so callers can build the NOT_ELIGIBLE results with
+        prefilter_rejection_result instead of re-running the checks per pair.
+
+        Args:
+            patient_data: Patient data dictionary
+
+        Returns:
+            (candidate NCT IDs in catalog order,
+             {nct_id: (check, reason)} for the other trials - check is "disease" or
+             "prefilter"; None for trials only dropped by recruiting_only)
+        """
+        mask, rejections = self._evaluate(patient_data, with_reasons=True)
+        return [nct_id for nct_id, passes in zip(self.nct_ids, mask) if passes], rejections
+
+    def _evaluate(self, patient_data: Dict, with_reasons: bool):
+        start = time.time()
+        if self.vectorized:
+            mask, rejections, scalar_checks = self._vectorized_mask(patient_data, with_reasons)
+            candidate_count = int(np.count_nonzero(mask))
+        else:
+            mask, rejections, scalar_checks = self._scalar_mask(patient_data, with_reasons)
+            candidate_count = sum(mask)
+
+        with self._lock:
+            self._stats["patients"] += 1
+            self._stats["pairs"] += len(self.trials)
+            self._stats["candidates"] += candidate_count
+            self._stats["scalar_checks"] += scalar_checks
+            self._stats["seconds"] += time.time() - start
+        return mask, rejections
+
+    def _scalar_mask(self, patient_data: Dict, with_reasons: bool):
+        mask, rejections = [], {}
+        for nct_id, trial in zip(self.nct_ids, self.trials):
+            recruiting = not self.recruiting_only or (trial.get("status") or "") == "RECRUITING"
+            if not recruiting and not with_reasons:
+                mask.append(False)
+                continue
+            rejection = None
+            disease_matches, reason = check_disease_match(trial, patient_data)
+            if not disease_matches:
+                rejection = ("disease", reason)
+            else:
+                passes, reason = pre_filter_trial(trial, patient_data)
+                if not passes:
+                    rejection = ("prefilter", reason)
+            mask.append(recruiting and rejection is None)
+            if with_reasons and not mask[-1]:
+                rejections[nct_id] = rejection
+        return mask, rejections, len(self.trials)
+
+    def _vectorized_mask(self, patient_data: Dict, with_reasons: bool):
+        n = len(self.trials)
+        recruiting = self.recruiting if self.recruiting_only else np.ones(n, dtype=bool)
+        no_trials = np.zeros(n, dtype=bool)
+
+        # === DISEASE MATCH (check_disease_match) ===
+        diagnosis = patient_data.get("diagnosis", {})
+        patient_cancer = (diagnosis.get("cancer_type") or "").lower()
+        patient_histology = (diagnosis.get("histology") or "").lower()
+        non_oncology_miss = condition_miss = title_miss = no_trials
+        uncertain = None
+
+        if patient_cancer or patient_histology:
+            patient_non_oncology = np.uint64(_bitmask(
+                (t for t in NON_ONCOLOGY_CONDITIONS if t in patient_cancer or t in patient_histology),
+                _NON_ONCOLOGY_BITS
+            ))
+            # Non-oncology trial targeting a condition the patient does not have
+            non_oncology_miss = ~self.oncology & ((self.non_oncology & ~patient_non_oncology) != 0)
+
+            patient_terms = np.uint64(_bitmask(
+                (t for t in CANCER_KEYWORDS if t in patient_cancer or t in patient_histology), _CANCER_BITS
+            ))
+            if patient_terms:
+                specific = ~self.basket
+                # Structured conditions that share no cancer keyword with the patient
+                no_shared_keyword = specific & self.has_conditions & ((self.disease_tags & patient_terms) == 0)
+                uncertain = no_shared_keyword & self.untagged_condition
+                condition_miss = no_shared_keyword & ~uncertain
+                # No conditions: title names other cancer types only
+                title_miss = (specific & ~self.has_conditions & (self.title_tags != 0) &
+                              ((self.title_tags & patient_terms) == 0))
+
+        # === AGE / GENDER / ECOG (pre_filter_trial) ===
+        demographics = patient_data.get("demographics", {})
+        patient_age = _first_int(_FIRST_NUMBER_PATTERN, demographics.get("Age", ""))
+        below_min_age = above_max_age = no_trials
+        if patient_age:
+            # NaN limits never reject
+            below_min_age = patient_age < self.min_age
+            above_max_age = patient_age > self.max_age
+
+        patient_gender = (demographics.get("Gender") or demographics.get("Sex") or "").upper()
+        sex_miss = no_trials
+        if patient_gender:
+            patient_is_male = "MALE" in patient_gender and "FEMALE" not in patient_gender
+            patient_is_female = "FEMALE" in patient_gender
+            sex_miss = ((self.sex == _SEX_MALE) & (not patient_is_male)) | \
+                       ((self.sex == _SEX_FEMALE) & (not patient_is_female))
+
+        ecog_data = patient_data.get("comorbidities", {}).get("ecog_performance_status", {})
+        patient_ecog = _first_int(_FIRST_DIGIT_PATTERN, ecog_data.get("score", "") if ecog_data else "")
+        ecog_miss = no_trials
+        if patient_ecog is not None:
+            # NaN limits (no ECOG requirement, or no minimum) never reject
+            ecog_miss = (patient_ecog > self.ecog_max) | (patient_ecog < self.ecog_min)
+
+        prefilter_miss = below_min_age | above_max_age | sex_miss | ecog_miss
+        passes = recruiting & ~(non_oncology_miss | condition_miss | title_miss | prefilter_miss)
+
+        # Settle the free-text condition comparisons with the scalar check. The
+        # disease check comes first, so a trial's reason needs it even when a
+        # later check rejects the trial.
+        scalar_checks = 0
+        scalar_reasons = {}
+        if uncertain is not None:
+            to_check = uncertain & ~non_oncology_miss if with_reasons else uncertain & passes
+            condition_miss = condition_miss.copy()
+            for i in np.flatnonzero(to_check):
+                matches, reason = check_disease_match(self.trials[i], patient_data)
+                scalar_checks += 1
+                if not matches:
+                    condition_miss[i] = True
+                    passes[i] = False
+                    scalar_reasons[i] = reason
+
+        if not with_reasons:
+            return passes, None, scalar_checks
+
+        rejections = {}
+        patient = {
+            "cancer": patient_cancer, "histology": patient_histology, "age": patient_age,
+            "gender": patient_gender, "ecog": patient_ecog,
+        }
+        for i in np.flatnonzero(~passes):
+            if non_oncology_miss[i] or title_miss[i]:
+                rejection = ("disease", self._disease_reason(i, patient, bool(title_miss[i])))
+            elif condition_miss[i]:
+                rejection = ("disease", scalar_reasons.get(i) or self._disease_reason(i, patient, False))
+            elif prefilter_miss[i]:
+                rejection = ("prefilter", self._prefilter_reason(
+                    i, patient, bool(below_min_age[i]), bool(above_max_age[i]), bool(sex_miss[i])
+                ))
+            else:
+                rejection = None  # only dropped by recruiting_only
+            rejections[self.nct_ids[i]] = rejection
+        return passes, rejections, scalar_checks
+
+    def _disease_reason(self, i: int, patient: Dict, title: bool) -> str:
+        """check_disease_match's reason for trial i (non-oncology, conditions or title mismatch)."""
+        features = self.features[i]
+        cancer, histology = patient["cancer"], patient["histology"]
+        if features["non_oncology_terms"] and not features["oncology"]:
+            for term in features["non_oncology_terms"]:
+                if term not in cancer and term not in histology:
+                    return f"Trial targets '{term}' but patient has '{cancer}'"
+        if title:
+            return (f"Trial title targets {list(features['title_cancer_terms'])} "
+                    f"but patient has {list(_patient_cancer_terms(cancer, histology))}")
+        return f"Trial conditions {list(features['conditions'][:3])} don't match patient cancer [{cancer}]"
+
+    def _prefilter_reason(self, i: int, patient: Dict, below_min_age: bool, above_max_age: bool,
+                          sex_miss: bool) -> str:
+        """pre_filter_trial's reason for trial i (age, sex, then ECOG)."""
+        features = self.features[i]
+        if below_min_age:
+            return f"Patient age ({patient['age']}) below minimum ({features['min_age']})"
+        if above_max_age:
+            return f"Patient age ({patient['age']}) above maximum ({features['max_age']})"
+        if sex_miss:
+            required = "Male" if features["sex"] == "MALE" else "Female"
+            return f"Trial requires {required}, patient is {patient['gender']}"
+        if features["ecog_min"] is None:
+            return f"Patient ECOG ({patient['ecog']}) exceeds trial max ({features['ecog_max']})"
+        return (f"Patient ECOG ({patient['ecog']}) outside trial range "
+                f"({features['ecog_min']}-{features['ecog_max']})")
+
+    def get_stats(self) -> Dict:
+        """Get prefilter statistics."""
+        with self._lock:
+            stats = dict(self._stats, trials=len(self.trials), vectorized=self.vectorized)
+        stats["seconds"] = round(stats["seconds"], 4)
+        if self.vectorized:
+            stats["build_seconds"] = round(self.build_seconds, 4)
+        return stats
@@ -15,7 +15,7 @@ from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 import asyncio
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import uuid
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.background import BackgroundScheduler
 
@@ -49,7 +49,13 @@ from Backend.bytes_extractor import (
     get_document_bytes
 )
 from Backend.storage_uploader import upload_and_share_pdf_bytes
+from Backend.documents_reference import get_fhir_token_cache
+from Backend.rate_limiter import get_rate_limiter_stats
+from Backend.http_sessions import get_session_stats
+from Backend.document_bundle_cache import get_document_bundle_cache
+from Backend.pdf_byte_cache import get_pdf_byte_cache
 from Backend.data_pool import get_data_pool
+from Backend.computation_store import ComputationRegistry, ingest_lease_key
 from Backend.Utils.Tabs.pathology_tab import pathology_info
 from Backend.Utils.Tabs.radiology_tab import extract_radiology_details_from_report
 from Backend.Utils.components.patient_demographics import extract_patient_demographics
@@ -57,8 +63,21 @@ from Backend.Utils.components.patient_diagnosis_status import extract_diagnosis_
 from Backend.Utils.Tabs.comorbidities import extract_comorbidities_status
 from Backend.Utils.Tabs.treatment_tab import extract_treatment_tab_info
 from Backend.Utils.Tabs.diagnosis_tab import diagnosis_extraction
-from Backend.Utils.Tabs.clinical_trials_tab import extract_clinical_trials
+from Backend.Utils.Tabs.clinical_trials_tab import extract_clinical_trials, get_trial_feature_cache
 from Backend.Utils.logger_config import setup_logger
+from Backend.Utils.stage_graph import StageGraph
+from Backend.Utils.single_flight import coalesce_requests, get_single_flight
+from Backend.Utils.eligibility_events import get_eligibility_event_broker
+from Backend.Utils.gemini_client import get_gemini_client
+from Backend.Utils.combined_extraction import get_combined_extraction_stats
+from Backend.Utils.document_handles import document_scope, get_document_handle_stats
+from Backend.Utils.extraction_executor import (
+    run_extraction,
+    run_cached_read,
+    submit_background_extraction,
+    get_executor_stats,
+    shutdown_executors,
+)
 
 # Setup logger
 logger = setup_logger(__name__)
@@ -121,9 +140,13 @@ data_pool = get_data_pool()
 
 _sync_lock = threading.Lock()
 
-# Track active eligibility computations for stale detection after server restart
-_active_computations = {}   # mrn → threading.Thread
-_computation_lock = threading.Lock()
+# Track active eligibility computations with leases in the shared computation
+# store, so every instance sees them (stale detection, duplicate prevention)
+computation_registry = ComputationRegistry(
+    data_pool.computation_store,
+    lease_seconds=float(os.environ.get("COMPUTATION_LEASE_SECONDS", 60)),
+    heartbeat_seconds=float(os.environ.get("COMPUTATION_HEARTBEAT_SECONDS", 15)),
+)
 
 def scheduled_trial_sync():
     """Nightly job: sync trials and recompute eligibility for all patients."""
@@ -169,6 +192,18 @@ async def lifespan(app):
     except Exception as e:
         logger.error(f"Error checking trials cache on startup: {e}")
 
+    # Ingest jobs left running by a previous process cannot finish; report them
+    interrupted_jobs = data_pool.mark_interrupted_ingest_jobs()
+    if interrupted_jobs:
+        logger.warning(f"{len(interrupted_jobs)} ingest job(s) were interrupted by a restart")
+        if os.environ.get("INGEST_JOBS_RESUME_ON_STARTUP", "false").lower() == "true":
+            for job in interrupted_jobs:
+                if not computation_registry.hold(ingest_lease_key(job["patient_mrn"], job["db_type"])):
+                    continue
+                data_pool.update_ingest_job_status(job["job_id"], "queued")
+                _start_ingest_job(job["job_id"], MRNRequest(mrn=job["patient_mrn"], db_type=job["db_type"]))
+                logger.info(f"Resumed ingest job {job['job_id']} for MRN {job['patient_mrn']}")
+
     # Auto-seed demo patients if pool is empty
     try:
         patient_count = len(data_pool.list_all_patients())
@@ -202,12 +237,17 @@ async def lifespan(app):
                 for mrn in demo_mrns:
                     try:
                         if not data_pool.patient_exists(mrn):
-                            resp = req.post(
-                                f"{base}/api/patient/all",
-                                json={"mrn": mrn},
-                                timeout=300,
-                            )
-                            logger.info(f"Seeded patient {mrn}: {resp.status_code}")
+                            # Submit an ingest job and poll it instead of holding a request open
+                            resp = req.post(f"{base}/api/jobs/ingest", json={"mrn": mrn}, timeout=30)
+                            resp.raise_for_status()
+                            job_id = resp.json()["job_id"]
+                            job_status = "queued"
+                            for _ in range(360):
+                                time.sleep(5)
+                                job_status = req.get(f"{base}/api/jobs/ingest/{job_id}", timeout=30).json()["status"]
+                                if job_status not in ("queued", "running"):
+                                    break
+                            logger.info(f"Seeded patient {mrn}: job {job_id} {job_status}")
                         else:
                             logger.info(f"Patient {mrn} already exists, skipping")
                     except Exception as e:
@@ -227,6 +267,7 @@ async def lifespan(app):
     # SHUTDOWN
     scheduler.shutdown(wait=False)
     logger.info("APScheduler shut down")
+    shutdown_executors(wait=False)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -469,7 +510,23 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "executors": get_executor_stats(),
+        "fhir_tokens": get_fhir_token_cache().get_stats(),
+        "rate_limiters": get_rate_limiter_stats(),
+        "http_sessions": get_session_stats(),
+        "document_bundles": get_document_bundle_cache().get_stats(),
+        "pdf_bytes": get_pdf_byte_cache().get_stats(),
+        "single_flight": get_single_flight().get_stats(),
+        "eligibility_events": get_eligibility_event_broker().get_stats(),
+        "gemini": get_gemini_client().get_stats(),
+        "combined_extraction": get_combined_extraction_stats(),
+        "document_handles": get_document_handle_stats(),
+        "trial_features": get_trial_feature_cache().get_stats(),
+        "computations": dict(computation_registry.get_stats(),
+                             progress_writes=data_pool.computation_progress.get_stats())
+    }
 
 
 # ============================================================================
@@ -497,11 +554,35 @@ async def validate_mrn(request: MRNRequest):
     }
 
 
+# ============================================================================
+# Request Coalescing
+# ============================================================================
+
+def mrn_flight_key(scope: str):
+    """Single-flight key function: one in-flight request per (scope, db_type, MRN)."""
+    return lambda request: (scope, request.db_type or "demo", request.mrn)
+
+
+async def run_patient_extraction_once(request: MRNRequest):
+    """
+    Run extract_patient_data for the per-component endpoints, sharing one run per (db_type, MRN).
+
+    Demographics, diagnosis status, comorbidities, treatment and diagnosis tab
+    all read from the same extraction, so concurrent calls for one patient
+    wait for a single run instead of each starting their own.
+    """
+    return await get_single_flight().run(
+        ("extract_patient_data", request.db_type or "demo", request.mrn),
+        lambda: run_extraction(extract_patient_data, mrn=request.mrn, verbose=False)
+    )
+
+
 # ============================================================================
 # Constant Components Routes (Demographics, Diagnosis Status, etc.)
 # ============================================================================
 
 @app.post("/api/patient/all", response_model=PatientDataResponse, tags=["Patient Data"])
+@coalesce_requests(mrn_flight_key("patient_all"))
 async def get_patient_data(request: MRNRequest):
     """
     Get all patient constant component data (demographics, diagnosis, comorbidities, treatment, diagnosis tab).
@@ -518,73 +599,91 @@ async def get_patient_data(request: MRNRequest):
 
     The fetched data is automatically stored in the data pool for later retrieval.
     If data already exists in the pool, it returns the cached data instead of re-fetching.
+
+    For cold patients this can take minutes; POST /api/jobs/ingest returns a
+    job id immediately and exposes each tab's result as soon as it is ready.
+    """
+    return await ingest_patient_data(request)
+
+
+async def ingest_patient_data(request: MRNRequest, on_stage_done=None):
+    """
+    Return pooled patient data, or run the full ingest graph and store the result.
+
+    Shared by /api/patient/all and ingest jobs.
+
+    Args:
+        request: MRN and db_type
+        on_stage_done: Optional StageGraph callback(name, result, error, timing),
+                       called from worker threads as each extraction stage finishes
+
+    Returns:
+        Merged patient data (same shape as /api/patient/all)
     """
     try:
         # Check if patient data already exists in pool
-        cached_data = data_pool.get_patient_data(request.mrn, request.db_type)
+        cached_data = await run_cached_read(data_pool.get_patient_data, request.mrn, request.db_type)
         logger.info(f"Cache check for MRN {request.mrn} in {request.db_type or 'demo'} hospital: {'HIT' if cached_data is not None else 'MISS'} (db_path={data_pool.db_path})")
         if cached_data is not None:
             logger.info(f"Returning cached data for MRN: {request.mrn} from {request.db_type or 'demo'} hospital")
             return cached_data
 
-        # If not in cache, fetch fresh data with TWO SEQUENTIAL PIPELINES
+        # If not in cache, fetch fresh data with a stage dependency graph
         logger.info("="*80)
-        logger.info(f"🚀 STARTING DUAL PIPELINE EXTRACTION for MRN: {request.mrn}")
+        logger.info(f"🚀 STARTING INGEST GRAPH EXTRACTION for MRN: {request.mrn}")
         logger.info("="*80)
-        logger.info("⚡ Running 2 pipelines SEQUENTIALLY (to optimize classification caching):")
-        logger.info("   📊 PIPELINE 1 (3 tasks in parallel):")
+        logger.info("⚡ Each stage starts as soon as its dependencies finish:")
         logger.info("      1️⃣  Patient Data (Demographics, Diagnosis, Treatment, etc.)")
         logger.info("      2️⃣  Lab Results")
         logger.info("      3️⃣  Pathology (classifies & caches reports)")
-        logger.info("   🧬 PIPELINE 2 (2 tasks in parallel - uses cached classifications):")
-        logger.info("      4️⃣  Genomics (reuses cached classifications - no duplicate API calls)")
+        logger.info("      4️⃣  Genomics (after Pathology - reuses cached classifications)")
         logger.info("      5️⃣  Radiology")
         logger.info("="*80)
 
         # Define extraction tasks
         def extract_patient_task():
             try:
-                logger.info(f"📋 [Pipeline 1] Starting patient data extraction for MRN: {request.mrn}...")
+                logger.info(f"📋 Starting patient data extraction for MRN: {request.mrn}...")
                 result = extract_patient_data(request.mrn, False)
-                logger.info(f"✅ [Pipeline 1] Patient data extraction completed")
+                logger.info(f"✅ Patient data extraction completed")
                 return ('patient', result, None)
             except Exception as e:
-                logger.error(f"❌ [Pipeline 1] Patient data extraction failed: {str(e)}")
+                logger.error(f"❌ Patient data extraction failed: {str(e)}")
                 return ('patient', None, str(e))
 
         def extract_lab_task():
             try:
-                logger.info(f"🧪 [Pipeline 1] Starting lab results extraction for MRN: {request.mrn}...")
+                logger.info(f"🧪 Starting lab results extraction for MRN: {request.mrn}...")
                 lab_result = lab_tab_info(request.mrn, False)
-                logger.info(f"✅ [Pipeline 1] Lab results extraction completed")
+                logger.info(f"✅ Lab results extraction completed")
                 return ('lab', lab_result, None)
             except Exception as e:
-                logger.error(f"❌ [Pipeline 1] Lab results extraction failed: {str(e)}")
+                logger.error(f"❌ Lab results extraction failed: {str(e)}")
                 return ('lab', None, str(e))
 
         def extract_genomics_task():
             try:
-                logger.info(f"🧬 [Pipeline 2] Starting genomics extraction for MRN: {request.mrn}...")
+                logger.info(f"🧬 Starting genomics extraction for MRN: {request.mrn}...")
                 genomics_result = genomics_tab_info(request.mrn, True)
-                logger.info(f"✅ [Pipeline 2] Genomics extraction completed")
+                logger.info(f"✅ Genomics extraction completed")
                 return ('genomics', genomics_result, None)
             except Exception as e:
-                logger.error(f"❌ [Pipeline 2] Genomics extraction failed: {str(e)}")
+                logger.error(f"❌ Genomics extraction failed: {str(e)}")
                 return ('genomics', None, str(e))
 
         def extract_pathology_task():
             try:
-                logger.info(f"🔬 [Pipeline 1] Starting pathology extraction for MRN: {request.mrn}...")
+                logger.info(f"🔬 Starting pathology extraction for MRN: {request.mrn}...")
                 pathology_result = pathology_tab_info_pipeline(request.mrn, False, True)
-                logger.info(f"✅ [Pipeline 1] Pathology extraction completed")
+                logger.info(f"✅ Pathology extraction completed")
                 return ('pathology', pathology_result, None)
             except Exception as e:
-                logger.error(f"❌ [Pipeline 1] Pathology extraction failed: {str(e)}")
+                logger.error(f"❌ Pathology extraction failed: {str(e)}")
                 return ('pathology', None, str(e))
 
         def extract_radiology_task():
             try:
-                logger.info(f"🏥 [Pipeline 2] Starting radiology extraction for MRN: {request.mrn}...")
+                logger.info(f"🏥 Starting radiology extraction for MRN: {request.mrn}...")
                 radiology_reports = upload_individual_radiology_reports_with_MD_notes_to_drive(
                     mrn=request.mrn
                 )
@@ -609,7 +708,7 @@ async def get_patient_data(request: MRNRequest):
                                 "radiology_imp_RECIST": radiology_imp_RECIST
                             })
                         except Exception as e:
-                            logger.warning(f"[Pipeline 2] Failed to extract radiology details for {report['document_id']}: {str(e)}")
+                            logger.warning(f"Failed to extract radiology details for {report['document_id']}: {str(e)}")
                             detailed_radiology_reports.append({
                                 "drive_url": report['drive_url'],
                                 "drive_file_id": report['drive_file_id'],
@@ -624,111 +723,55 @@ async def get_patient_data(request: MRNRequest):
 
                     # Sort by date
                     detailed_radiology_reports = sort_reports_by_date(detailed_radiology_reports, descending=True)
-                    logger.info(f"✅ [Pipeline 2] Radiology extraction completed: {len(detailed_radiology_reports)} reports")
+                    logger.info(f"✅ Radiology extraction completed: {len(detailed_radiology_reports)} reports")
                     return ('radiology', {'radiology_reports': detailed_radiology_reports}, None)
                 else:
-                    logger.info(f"✅ [Pipeline 2] Radiology extraction completed: No reports found")
+                    logger.info(f"✅ Radiology extraction completed: No reports found")
                     return ('radiology', {'radiology_reports': []}, None)
             except Exception as e:
-                logger.error(f"❌ [Pipeline 2] Radiology extraction failed: {str(e)}")
+                logger.error(f"❌ Radiology extraction failed: {str(e)}")
                 return ('radiology', {'radiology_reports': []}, str(e))
 
-        # Define pipeline runners
-        def run_pipeline_1():
-            """Run Pipeline 1: Patient Data, Lab, Pathology in parallel
-
-            NOTE: Pathology runs in Pipeline 1 to classify and cache reports first.
-            This allows Genomics in Pipeline 2 to reuse cached classifications.
-            """
-            logger.info("🚀 [Pipeline 1] Starting parallel execution...")
-            tasks = [extract_patient_task, extract_lab_task, extract_pathology_task]
-            results = {}
-            errors = []
-
-            with ThreadPoolExecutor(max_workers=3) as executor:
-                future_to_task = {executor.submit(task): task.__name__ for task in tasks}
-
-                for future in as_completed(future_to_task):
-                    task_name = future_to_task[future]
-                    try:
-                        data_type, data, error = future.result()
-                        if error:
-                            errors.append(f"{data_type}: {error}")
-                            logger.error(f"⚠️  [Pipeline 1] {data_type} extraction had errors: {error}")
-                        else:
-                            results[data_type] = data
-                    except Exception as e:
-                        logger.error(f"⚠️  [Pipeline 1] Task {task_name} failed unexpectedly: {str(e)}")
-                        errors.append(f"{task_name}: {str(e)}")
-
-            logger.info("✅ [Pipeline 1] All parallel tasks completed")
-            return results, errors
-
-        def run_pipeline_2():
-            """Run Pipeline 2: Genomics and Radiology in parallel
-
-            NOTE: Genomics runs in Pipeline 2 to reuse cached classifications from Pipeline 1.
-            This eliminates duplicate Gemini API calls and reduces processing time by ~50%.
-            """
-            logger.info("🚀 [Pipeline 2] Starting parallel execution...")
-            tasks = [extract_genomics_task, extract_radiology_task]
-            results = {}
-            errors = []
-
-            with ThreadPoolExecutor(max_workers=2) as executor:
-                future_to_task = {executor.submit(task): task.__name__ for task in tasks}
-
-                for future in as_completed(future_to_task):
-                    task_name = future_to_task[future]
-                    try:
-                        data_type, data, error = future.result()
-                        if error:
-                            errors.append(f"{data_type}: {error}")
-                            logger.error(f"⚠️  [Pipeline 2] {data_type} extraction had errors: {error}")
-                        else:
-                            results[data_type] = data
-                    except Exception as e:
-                        logger.error(f"⚠️  [Pipeline 2] Task {task_name} failed unexpectedly: {str(e)}")
-                        errors.append(f"{task_name}: {str(e)}")
-
-            logger.info("✅ [Pipeline 2] All parallel tasks completed")
-            return results, errors
-
-        # Execute pipelines SEQUENTIALLY (Pipeline 1 then Pipeline 2)
-        # This ensures Pathology classifies first, then Genomics reuses cached classifications
-        logger.info("🔄 Launching Pipeline 1 first (Patient + Lab + Pathology)...")
-
-        pipeline1_results = {}
-        pipeline2_results = {}
-        all_errors = []
-
-        # Run Pipeline 1 first
-        pipeline1_results, pipeline1_errors = run_pipeline_1()
-        all_errors.extend(pipeline1_errors)
-
-        logger.info("✅ Pipeline 1 completed. Classifications cached for Pipeline 2.")
-
-        # Run Pipeline 2 second (Genomics will use cached classifications)
-        logger.info("🔄 Launching Pipeline 2 (Genomics + Radiology)...")
-        pipeline2_results, pipeline2_errors = run_pipeline_2()
-        all_errors.extend(pipeline2_errors)
-
-        # Combine results from both pipelines
-        result = pipeline1_results.get('patient')
-        lab_result = pipeline1_results.get('lab')
-        pathology_result = pipeline1_results.get('pathology')  # Now in Pipeline 1
-        genomics_result = pipeline2_results.get('genomics')    # Now in Pipeline 2
-        radiology_result = pipeline2_results.get('radiology')
-        errors = all_errors
+        def as_stage(task):
+            """Adapt a (data_type, data, error) task to a graph stage that raises on error."""
+            def run_stage(**upstream):
+                data_type, data, error = task()
+                if error:
+                    raise RuntimeError(error)
+                return data
+            return run_stage
+
+        # Genomics waits for Pathology so it can reuse the cached classifications
+        # (no duplicate Gemini calls); everything else starts immediately.
+        graph = StageGraph(f"ingest-{request.mrn}")
+        graph.add('patient', as_stage(extract_patient_task))
+        graph.add('lab', as_stage(extract_lab_task))
+        graph.add('pathology', as_stage(extract_pathology_task))
+        graph.add('genomics', as_stage(extract_genomics_task), depends_on=['pathology'])
+        graph.add('radiology', as_stage(extract_radiology_task))
+
+        def run_graph():
+            # Each PDF is uploaded once for every Gemini call in the ingest, then released
+            with document_scope(f"ingest-{request.mrn}"):
+                return graph.run(on_stage_done)
+
+        graph_run = await run_extraction(run_graph)
+
+        result = graph_run.results.get('patient')
+        lab_result = graph_run.results.get('lab')
+        pathology_result = graph_run.results.get('pathology')
+        genomics_result = graph_run.results.get('genomics')
+        radiology_result = graph_run.results.get('radiology')
+        errors = graph_run.error_list()
 
         # Check if we got the essential patient data
         if result is None:
             raise Exception(f"Failed to extract patient data. Errors: {', '.join(errors)}")
 
         logger.info("="*80)
-        logger.info(f"✅ DUAL PIPELINE EXTRACTION COMPLETED for MRN: {request.mrn}")
-        logger.info(f"   📊 Pipeline 1 (Parallel): Patient Data, Lab, Pathology")
-        logger.info(f"   🧬 Pipeline 2 (Parallel): Genomics, Radiology")
+        logger.info(f"✅ INGEST GRAPH EXTRACTION COMPLETED for MRN: {request.mrn} in {graph_run.wall_seconds:.1f}s")
+        for stage_name, timing in graph_run.timings.items():
+            logger.info(f"   ⏱️  {stage_name}: started at +{timing['started_at']:.1f}s, took {timing['seconds']:.1f}s")
         if errors:
             logger.warning(f"⚠️  Some extractions had errors: {', '.join(errors)}")
         logger.info("="*80)
@@ -821,12 +864,12 @@ async def get_patient_data(request: MRNRequest):
 
         # Auto-store in data pool
         logger.info(f"Storing patient {request.mrn} in data pool for {request.db_type or 'demo'} hospital (db_path={data_pool.db_path}, result_keys={list(result.keys()) if result else 'None'})")
-        store_ok = data_pool.store_patient_data(mrn=request.mrn, data=result, db_type=request.db_type)
+        store_ok = await run_cached_read(data_pool.store_patient_data, mrn=request.mrn, data=result, db_type=request.db_type)
         logger.info(f"Store result for {request.mrn} in {request.db_type or 'demo'} hospital: {store_ok}")
 
         # Auto-compute eligibility for this patient against all cached trials (background)
         try:
-            trials_count = data_pool.get_trials_count()
+            trials_count = await run_cached_read(data_pool.get_trials_count)
             if trials_count > 0:
                 print(f"\n{'='*60}")
                 print(f"AUTO-COMPUTING ELIGIBILITY for new patient {request.mrn}")
@@ -850,24 +893,14 @@ async def get_patient_data(request: MRNRequest):
                             data_pool.complete_computation_progress(mrn, error_message=str(e))
                         except:
                             pass
-                    finally:
-                        with _computation_lock:
-                            _active_computations.pop(mrn, None)
-
-                import threading
-                thread = threading.Thread(
-                    target=compute_eligibility_background,
-                    args=(request.mrn, result, request.db_type)
-                )
-                thread.daemon = True
 
-                # Register thread for stale detection
-                with _computation_lock:
-                    _active_computations[request.mrn] = thread
-
-                thread.start()
+                # Runs under a lease on the MRN; skipped if any instance is already computing it
+                thread = await run_cached_read(
+                    computation_registry.start, request.mrn, compute_eligibility_background,
+                    request.mrn, result, request.db_type
+                )
 
-                result['eligibility_computation'] = "started_in_background"
+                result['eligibility_computation'] = "started_in_background" if thread else "already_running"
             else:
                 result['eligibility_computation'] = "skipped_no_trials_cached"
         except Exception as e:
@@ -889,6 +922,218 @@ async def get_patient_data(request: MRNRequest):
         )
 
 
+# ============================================================================
+# Ingest Job Routes (asynchronous /api/patient/all)
+# ============================================================================
+
+# Stages whose results can be fetched while a job runs; "patient_all" is the
+# merged /api/patient/all payload, stored when the job completes.
+INGEST_JOB_STAGES = ("patient", "lab", "pathology", "genomics", "radiology", "patient_all")
+
+_ingest_job_tasks = {}   # job_id → asyncio.Task (keeps running jobs referenced)
+
+
+async def _run_ingest_job(job_id: str, request: MRNRequest):
+    """
+    Run one ingest job, persisting each stage's result as soon as it finishes.
+
+    The caller holds the job's ingest lease (ingest_lease_key); it is released
+    when the job ends. The ingest shares the /api/patient/all single-flight key,
+    so a concurrent synchronous request for the same patient joins this run
+    (stage results are then stored together when it finishes).
+    """
+    await run_cached_read(data_pool.update_ingest_job_status, job_id, "running")
+
+    def on_stage_done(stage_name, value, error, timing):
+        data_pool.store_ingest_job_stage(job_id, stage_name, value, error, timing)
+
+    try:
+        result = await get_single_flight().run(
+            mrn_flight_key("patient_all")(request),
+            lambda: ingest_patient_data(request, on_stage_done=on_stage_done)
+        )
+        await run_cached_read(data_pool.store_ingest_job_stage, job_id, "patient_all", result)
+        if isinstance(result, dict) and result.get('success') is False:
+            await run_cached_read(data_pool.update_ingest_job_status, job_id, "error",
+                                  result.get('error', 'Patient data extraction failed'))
+        else:
+            await run_cached_read(data_pool.update_ingest_job_status, job_id, "completed")
+    except asyncio.CancelledError:
+        await run_cached_read(data_pool.update_ingest_job_status, job_id, "interrupted", "Job cancelled")
+        raise
+    except HTTPException as e:
+        await run_cached_read(data_pool.update_ingest_job_status, job_id, "error", str(e.detail))
+    except Exception as e:
+        await run_cached_read(data_pool.update_ingest_job_status, job_id, "error", str(e))
+    finally:
+        _ingest_job_tasks.pop(job_id, None)
+        await run_cached_read(computation_registry.release, ingest_lease_key(request.mrn, request.db_type))
+
+
+def _start_ingest_job(job_id: str, request: MRNRequest):
+    _ingest_job_tasks[job_id] = asyncio.ensure_future(_run_ingest_job(job_id, request))
+
+
+def _ingest_job_response(job: dict, deduplicated: bool = False) -> dict:
+    return {
+        **job,
+        "deduplicated": deduplicated,
+        "available_results": [
+            stage for stage, info in job.get("stages", {}).items() if info.get("status") == "completed"
+        ],
+        "status_url": f"/api/jobs/ingest/{job['job_id']}",
+        "results_url": f"/api/jobs/ingest/{job['job_id']}/results/{{stage}}",
+    }
+
+
+@app.post("/api/jobs/ingest", status_code=status.HTTP_202_ACCEPTED, tags=["Ingest Jobs"])
+async def submit_ingest_job(request: MRNRequest):
+    """
+    Start an asynchronous patient ingest and return a job id immediately.
+
+    Poll GET /api/jobs/ingest/{job_id} for status; each stage's result
+    (patient, lab, pathology, genomics, radiology) can be fetched from
+    GET /api/jobs/ingest/{job_id}/results/{stage} as soon as it finishes.
+    If a job for the same (db_type, MRN) is already running on this instance,
+    that job is returned. Jobs are stored per instance, so a job running on
+    another instance cannot be returned: the response is 409 with the instance
+    that holds the patient's ingest lease (lease_holder); retry after it finishes.
+    """
+    # Concurrent submits on this instance share one check-and-create; the
+    # ingest lease decides between instances
+    return await get_single_flight().run(
+        mrn_flight_key("ingest_job_submit")(request), lambda: _submit_ingest_job(request)
+    )
+
+
+async def _ingest_lease_conflict(lease_key: str) -> HTTPException:
+    """409 for an ingest whose lease another instance holds (its jobs are not readable here)."""
+    holder = await run_cached_read(computation_registry.lease_holder, lease_key)
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "An ingest job for this patient is running on another instance; retry after it finishes",
+            "lease_holder": holder,
+        }
+    )
+
+
+async def _submit_ingest_job(request: MRNRequest) -> dict:
+    lease_key = ingest_lease_key(request.mrn, request.db_type)
+    if not await run_cached_read(computation_registry.hold, lease_key):
+        raise await _ingest_lease_conflict(lease_key)
+
+    # The lease is counted per hold; a job already running here keeps its own
+    active = await run_cached_read(data_pool.get_active_ingest_job, request.mrn, request.db_type)
+    if active and active["job_id"] in _ingest_job_tasks:
+        await run_cached_read(computation_registry.release, lease_key)
+        return _ingest_job_response(active, deduplicated=True)
+
+    job_id = uuid.uuid4().hex
+    if not await run_cached_read(data_pool.create_ingest_job, job_id, request.mrn, request.db_type):
+        await run_cached_read(computation_registry.release, lease_key)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create ingest job"
+        )
+    _start_ingest_job(job_id, request)
+    logger.info(f"Submitted ingest job {job_id} for MRN {request.mrn} ({request.db_type or 'demo'})")
+    job = await run_cached_read(data_pool.get_ingest_job, job_id)
+    return _ingest_job_response(job)
+
+
+@app.get("/api/jobs/ingest", tags=["Ingest Jobs"])
+async def list_ingest_jobs(status_filter: Optional[str] = None, limit: int = 100):
+    """List recent ingest jobs, optionally filtered by status."""
+    jobs = await run_cached_read(data_pool.list_ingest_jobs, status_filter, limit)
+    return {"jobs": [_ingest_job_response(job) for job in jobs]}
+
+
+@app.get("/api/jobs/ingest/{job_id}", tags=["Ingest Jobs"])
+async def get_ingest_job(job_id: str):
+    """
+    Get ingest job status.
+
+    status is one of: queued, running, completed, error, interrupted
+    (the server restarted before the job finished; see the resume endpoint).
+    """
+    job = await run_cached_read(data_pool.get_ingest_job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ingest job {job_id} not found")
+    return _ingest_job_response(job)
+
+
+@app.get("/api/jobs/ingest/{job_id}/results/{stage}", tags=["Ingest Jobs"])
+async def get_ingest_job_result(job_id: str, stage: str):
+    """
+    Get one stage's result for an ingest job.
+
+    Returns 202 while the stage is still pending and 404 if the job finished
+    without producing it.
+    """
+    if stage not in INGEST_JOB_STAGES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown stage '{stage}'. Valid stages: {', '.join(INGEST_JOB_STAGES)}"
+        )
+    job = await run_cached_read(data_pool.get_ingest_job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ingest job {job_id} not found")
+
+    found, data = await run_cached_read(data_pool.get_ingest_job_result, job_id, stage)
+    stage_info = job["stages"].get(stage, {})
+    if found:
+        return {"job_id": job_id, "stage": stage, "status": stage_info.get("status", "completed"),
+                "error": stage_info.get("error"), "data": data}
+    if job["status"] in ("queued", "running"):
+        from fastapi.responses import JSONResponse
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED,
+                            content={"job_id": job_id, "stage": stage, "status": "pending"})
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Stage '{stage}' has no result; job status is '{job['status']}'"
+    )
+
+
+@app.post("/api/jobs/ingest/{job_id}/resume", status_code=status.HTTP_202_ACCEPTED, tags=["Ingest Jobs"])
+async def resume_ingest_job(job_id: str):
+    """
+    Re-run an interrupted or failed ingest job under the same job id.
+
+    Stages already finished are stored in the data pool, so a resumed job whose
+    patient was stored before the restart completes straight from the pool.
+    Returns 409 if an ingest for the patient is running on another instance
+    (with its lease_holder) or as another job on this one.
+    """
+    job = await run_cached_read(data_pool.get_ingest_job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ingest job {job_id} not found")
+    if job_id in _ingest_job_tasks:
+        return _ingest_job_response(job, deduplicated=True)
+    if job["status"] not in ("interrupted", "error"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Only interrupted or failed jobs can be resumed (status is '{job['status']}')"
+        )
+
+    # Same lease as a submit; _run_ingest_job releases it when the job ends
+    lease_key = ingest_lease_key(job["patient_mrn"], job["db_type"])
+    if not await run_cached_read(computation_registry.hold, lease_key):
+        raise await _ingest_lease_conflict(lease_key)
+    active = await run_cached_read(data_pool.get_active_ingest_job, job["patient_mrn"], job["db_type"])
+    if active and active["job_id"] in _ingest_job_tasks:
+        await run_cached_read(computation_registry.release, lease_key)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ingest job {active['job_id']} is already running for this patient"
+        )
+
+    await run_cached_read(data_pool.update_ingest_job_status, job_id, "queued")
+    _start_ingest_job(job_id, MRNRequest(mrn=job["patient_mrn"], db_type=job["db_type"]))
+    job = await run_cached_read(data_pool.get_ingest_job, job_id)
+    return _ingest_job_response(job)
+
+
 @app.post("/api/patient/demographics", tags=["Patient Data"])
 async def get_demographics(request: MRNRequest):
     """
@@ -906,7 +1151,7 @@ async def get_demographics(request: MRNRequest):
     - Last Visit date
     """
     try:
-        result = extract_patient_data(mrn=request.mrn, verbose=False)
+        result = await run_patient_extraction_once(request)
 
         if not result['success']:
             raise HTTPException(
@@ -945,7 +1190,7 @@ async def get_diagnosis_status(request: MRNRequest):
     - disease_status
     """
     try:
-        result = extract_patient_data(mrn=request.mrn, verbose=False)
+        result = await run_patient_extraction_once(request)
 
         if not result['success']:
             raise HTTPException(
@@ -974,7 +1219,7 @@ async def get_comorbidities(request: MRNRequest):
     Get patient comorbidities information.
     """
     try:
-        result = extract_patient_data(mrn=request.mrn, verbose=False)
+        result = await run_patient_extraction_once(request)
 
         if not result['success']:
             raise HTTPException(
@@ -1010,7 +1255,7 @@ async def get_treatment_tab(request: MRNRequest):
     - treatment_tab_info_timeline: Treatment timeline
     """
     try:
-        result = extract_patient_data(mrn=request.mrn, verbose=False)
+        result = await run_patient_extraction_once(request)
 
         if not result['success']:
             raise HTTPException(
@@ -1044,7 +1289,7 @@ async def get_diagnosis_tab(request: MRNRequest):
     - diagnosis_footer: Footer with duration information
     """
     try:
-        result = extract_patient_data(mrn=request.mrn, verbose=False)
+        result = await run_patient_extraction_once(request)
 
         if not result['success']:
             raise HTTPException(
@@ -1069,6 +1314,7 @@ async def get_diagnosis_tab(request: MRNRequest):
 
 
 @app.post("/api/tabs/lab", response_model=LabDataResponse, tags=["Tabs"])
+@coalesce_requests(mrn_flight_key("tabs_lab"))
 async def get_lab_tab(request: MRNRequest):
     """
     Get lab tab information using Gemini individual processing.
@@ -1089,7 +1335,7 @@ async def get_lab_tab(request: MRNRequest):
         - Metabolic panel (Creatinine, ALT, AST, Total Bilirubin)
     """
     try:
-        result = lab_tab_info(mrn=request.mrn, verbose=False)
+        result = await run_extraction(lab_tab_info, mrn=request.mrn, verbose=False)
         return result
     except Exception as e:
         raise HTTPException(
@@ -1098,6 +1344,7 @@ async def get_lab_tab(request: MRNRequest):
         )
 
 @app.post('/api/tabs/pathology_reports_extraction', tags = ["Tabs"])
+@coalesce_requests(mrn_flight_key("tabs_pathology_reports_extraction"))
 async def get_pathology_reports(request : MRNRequest):
     """
     Get pathology report URLs from the last 6 months, uploaded to Google Drive.
@@ -1111,7 +1358,8 @@ async def get_pathology_reports(request : MRNRequest):
     - List of documents with Google Drive URLs
     """
     try:
-        result = upload_individual_reports_to_drive(
+        result = await run_extraction(
+            upload_individual_reports_to_drive,
             mrn=request.mrn,
             report_type='pathology'
         )
@@ -1146,6 +1394,7 @@ async def get_pathology_reports(request : MRNRequest):
         )
 
 @app.post('/api/tabs/radiology_reports_extraction', tags = ["Tabs"])
+@coalesce_requests(mrn_flight_key("tabs_radiology_reports_extraction"))
 async def get_radiology_reports(request : MRNRequest):
     """
     Get radiology report URLs from the last 6 months, uploaded to Google Drive.
@@ -1159,7 +1408,8 @@ async def get_radiology_reports(request : MRNRequest):
     - List of documents with Google Drive URLs
     """
     try:
-        result = upload_individual_reports_to_drive(
+        result = await run_extraction(
+            upload_individual_reports_to_drive,
             mrn=request.mrn,
             report_type='radiology'
         )
@@ -1194,6 +1444,7 @@ async def get_radiology_reports(request : MRNRequest):
         )
 
 @app.post('/api/tabs/radiology_reports', tags = ["Tabs"])
+@coalesce_requests(mrn_flight_key("tabs_radiology_reports"))
 async def get_radiology_reports_cached(request: MRNRequest):
     """
     Get cached radiology reports for a patient.
@@ -1208,7 +1459,7 @@ async def get_radiology_reports_cached(request: MRNRequest):
     """
     try:
         # Get cached patient data from data pool
-        cached_patient_data = data_pool.get_patient_data(request.mrn)
+        cached_patient_data = await run_cached_read(data_pool.get_patient_data, request.mrn)
 
         if not cached_patient_data:
             raise HTTPException(
@@ -1234,6 +1485,7 @@ async def get_radiology_reports_cached(request: MRNRequest):
 
 
 @app.post('/api/tabs/pathology_details_extraction', tags = ["Tabs"])
+@coalesce_requests(mrn_flight_key("tabs_pathology_details_extraction"))
 async def get_pathology_details(request: MRNRequest):
     """
     Get detailed pathology information for each pathology report (lazy loading).
@@ -1253,7 +1505,7 @@ async def get_pathology_details(request: MRNRequest):
     """
     try:
         # Step 1: Check if pathology reports are already cached
-        cached_patient_data = data_pool.get_patient_data(request.mrn)
+        cached_patient_data = await run_cached_read(data_pool.get_patient_data, request.mrn)
 
         if cached_patient_data and cached_patient_data.get('pathology_reports') is not None:
             print(f"Returning cached pathology reports for MRN: {request.mrn}")
@@ -1266,7 +1518,8 @@ async def get_pathology_details(request: MRNRequest):
 
         # Step 2: If not cached, fetch and extract pathology reports
         print(f"Extracting pathology reports for MRN: {request.mrn}")
-        reports = upload_individual_reports_to_drive(
+        reports = await run_extraction(
+            upload_individual_reports_to_drive,
             mrn=request.mrn,
             report_type='pathology'
         )
@@ -1275,7 +1528,7 @@ async def get_pathology_details(request: MRNRequest):
             # Cache empty result
             if cached_patient_data:
                 cached_patient_data['pathology_reports'] = []
-                data_pool.store_patient_data(mrn=request.mrn, data=cached_patient_data)
+                await run_cached_read(data_pool.store_patient_data, mrn=request.mrn, data=cached_patient_data)
 
             return {
                 "success": True,
@@ -1292,7 +1545,7 @@ async def get_pathology_details(request: MRNRequest):
         for report in reports:
             try:
                 # Extract pathology information from the Drive URL
-                pathology_summary, pathology_markers = pathology_info(pdf_url=report['drive_url'], use_gemini_api=True)
+                pathology_summary, pathology_markers = await run_extraction(pathology_info, pdf_url=report['drive_url'], use_gemini_api=True)
 
                 # Check report type and classify accordingly
                 if isinstance(pathology_summary, dict):
@@ -1367,7 +1620,7 @@ async def get_pathology_details(request: MRNRequest):
             cached_patient_data['pathology_reports'] = detailed_reports
             cached_patient_data['genomic_alterations_reports'] = genomic_alterations_reports
             cached_patient_data['no_test_performed_reports'] = no_test_performed_reports
-            data_pool.store_patient_data(mrn=request.mrn, data=cached_patient_data)
+            await run_cached_read(data_pool.store_patient_data, mrn=request.mrn, data=cached_patient_data)
 
         return {
             "success": True,
@@ -1387,6 +1640,7 @@ async def get_pathology_details(request: MRNRequest):
     
 
 @app.post("/api/tabs/genomics", tags=["Tabs"])
+@coalesce_requests(mrn_flight_key("tabs_genomics"))
 async def get_genomics_tab(request: MRNRequest):
     """
     Get genomics tab information.
@@ -1400,7 +1654,7 @@ async def get_genomics_tab(request: MRNRequest):
     6. Extracts genomic information
     """
     try:
-        result = genomics_tab_info(mrn=request.mrn, verbose=False)
+        result = await run_extraction(genomics_tab_info, mrn=request.mrn, verbose=False)
         return result
     except Exception as e:
         raise HTTPException(
@@ -1410,6 +1664,7 @@ async def get_genomics_tab(request: MRNRequest):
 
 
 @app.post("/api/tabs/pathology", tags=["Tabs"])
+@coalesce_requests(mrn_flight_key("tabs_pathology"))
 async def get_pathology_tab(request: MRNRequest):
     """
     Get pathology tab information.
@@ -1423,7 +1678,7 @@ async def get_pathology_tab(request: MRNRequest):
     6. Extracts pathology summary and markers
     """
     try:
-        result = pathology_tab_info_pipeline(mrn=request.mrn, verbose=False, use_gemini_api=True)
+        result = await run_extraction(pathology_tab_info_pipeline, mrn=request.mrn, verbose=False, use_gemini_api=True)
         return result
     except Exception as e:
         raise HTTPException(
@@ -1433,6 +1688,7 @@ async def get_pathology_tab(request: MRNRequest):
 
 
 @app.post("/api/tabs/clinical-trials", tags=["Tabs"])
+@coalesce_requests(mrn_flight_key("tabs_clinical_trials"))
 async def get_clinical_trials(request: MRNRequest):
     """
     Get matched clinical trials for a patient using smart multi-query search.
@@ -1453,7 +1709,7 @@ async def get_clinical_trials(request: MRNRequest):
     """
     try:
         # Get patient data from pool
-        patient_data = data_pool.get_patient_data(request.mrn, request.db_type)
+        patient_data = await run_cached_read(data_pool.get_patient_data, request.mrn, request.db_type)
 
         if not patient_data:
             raise HTTPException(
@@ -1463,7 +1719,7 @@ async def get_clinical_trials(request: MRNRequest):
 
         # Extract clinical trials matches using smart multi-query strategy
         # Limit to 50 total trials to prevent timeouts (each trial takes ~1-2 seconds for LLM analysis)
-        result = extract_clinical_trials(patient_data, max_trials_per_query=50, max_pages=1, db_type=request.db_type, limit_total_trials=50)
+        result = await run_extraction(extract_clinical_trials, patient_data, max_trials_per_query=50, max_pages=1, db_type=request.db_type, limit_total_trials=50)
 
         return {
             "success": result.get("success", False),
@@ -1552,7 +1808,7 @@ async def get_patient_from_pool(mrn: str, db_type: Optional[str] = None):
     Use this endpoint in your static UI to fetch patient data without
     making expensive API calls to the EMR system.
     """
-    patient_data = data_pool.get_patient_data(mrn, db_type)
+    patient_data = await run_cached_read(data_pool.get_patient_data, mrn, db_type)
 
     if patient_data is None:
         raise HTTPException(
@@ -1574,7 +1830,7 @@ async def list_patients_in_pool(db_type: Optional[str] = None):
     Returns a list of all patients currently stored in the pool
     with their MRN and timestamp information.
     """
-    patients = data_pool.list_all_patients(db_type)
+    patients = await run_cached_read(data_pool.list_all_patients, db_type)
 
     return {
         "success": True,
@@ -2017,38 +2273,40 @@ async def get_eligible_trials_for_patient_cached(
     """
     try:
         # Check if patient exists
-        if not data_pool.patient_exists(mrn, db_type):
+        if not await run_cached_read(data_pool.patient_exists, mrn, db_type):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Patient {mrn} not found in {db_type or 'demo'} hospital data pool"
             )
 
-        trials = data_pool.get_eligible_trials_for_patient(
-            mrn=mrn,
-            status_filter=eligibility_status,
-            db_type=db_type
-        )
+        def load_trials():
+            trials = data_pool.get_eligible_trials_for_patient(
+                mrn=mrn,
+                status_filter=eligibility_status,
+                db_type=db_type
+            )
+
+            # Classify unknown criteria on the fly for old data missing review_type
+            from Backend.Utils.Tabs.clinical_trials_tab import classify_unknown_criteria, add_suggested_tests
+            for trial in trials:
+                cr = trial.get("criteria_results")
+                if cr and isinstance(cr, dict):
+                    all_cr = cr.get("inclusion", []) + cr.get("exclusion", [])
+                    classify_unknown_criteria(all_cr)
+                    add_suggested_tests(all_cr)
+            return trials
 
-        # Classify unknown criteria on the fly for old data missing review_type
-        from Backend.Utils.Tabs.clinical_trials_tab import classify_unknown_criteria, add_suggested_tests
-        for trial in trials:
-            cr = trial.get("criteria_results")
-            if cr and isinstance(cr, dict):
-                all_cr = cr.get("inclusion", []) + cr.get("exclusion", [])
-                classify_unknown_criteria(all_cr)
-                add_suggested_tests(all_cr)
+        trials = await run_cached_read(load_trials)
 
         # Include computation progress so frontend knows if more results are coming
-        progress = data_pool.get_computation_progress(mrn)
+        progress = await run_cached_read(data_pool.get_computation_progress, mrn)
         computation_status = "not_started"
         computation_progress = None
         if progress:
             computation_status = progress["status"]
             if computation_status == "computing":
-                with _computation_lock:
-                    thread = _active_computations.get(mrn)
-                    if thread is None or not thread.is_alive():
-                        computation_status = "stale"
+                if not await run_cached_read(computation_registry.is_active, mrn):
+                    computation_status = "stale"
             computation_progress = {
                 "trials_total": progress["trials_total"],
                 "trials_completed": progress["trials_completed"],
@@ -2081,7 +2339,7 @@ async def get_eligibility_progress(mrn: str, db_type: str = None):
     - db_type: Hospital type ('demo' or 'astera'). Defaults to 'demo'.
     """
     try:
-        progress = data_pool.get_computation_progress(mrn, db_type=db_type)
+        progress = await run_cached_read(data_pool.get_computation_progress, mrn, db_type=db_type)
 
         if progress is None:
             return {
@@ -2096,10 +2354,8 @@ async def get_eligibility_progress(mrn: str, db_type: str = None):
 
         comp_status = progress["status"]
         if comp_status == "computing":
-            with _computation_lock:
-                thread = _active_computations.get(mrn)
-                if thread is None or not thread.is_alive():
-                    comp_status = "stale"
+            if not await run_cached_read(computation_registry.is_active, mrn):
+                comp_status = "stale"
 
         return {
             "success": True,
@@ -2121,6 +2377,143 @@ async def get_eligibility_progress(mrn: str, db_type: str = None):
         )
 
 
+def _format_sse(event_type: str, data: dict, event_id: int = None) -> str:
+    """Format one server-sent event."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@app.get("/api/patients/{mrn}/eligibility-events", tags=["Clinical Trials"])
+async def stream_eligibility_events(mrn: str, request: Request, db_type: str = None):
+    """
+    Stream eligibility computation progress as server-sent events.
+
+    Replaces polling eligibility-progress / eligible-trials while a
+    computation runs. Events:
+    - progress: {status, trials_total, trials_completed, trials_eligible, trials_error}
+    - trial_result: each eligibility record as soon as it is stored
+    - complete: final status; the stream closes after it
+
+    If no computation is running, the current progress is sent followed by
+    complete. Load existing results once from eligible-trials, then apply
+    trial_result events.
+
+    Events are published in-process; when the computation runs on another
+    instance, the shared progress store is polled instead (every
+    SSE_POLL_SECONDS) and only progress / complete are sent, so reload
+    eligible-trials on complete.
+
+    Query parameters:
+    - db_type: Hospital type ('demo' or 'astera'). Defaults to 'demo'.
+    """
+    from fastapi.responses import StreamingResponse
+
+    broker = get_eligibility_event_broker()
+    keepalive_seconds = float(os.environ.get("SSE_KEEPALIVE_SECONDS", 15))
+    poll_seconds = float(os.environ.get("SSE_POLL_SECONDS", 2))
+
+    async def read_progress(snapshot=None):
+        progress = await run_cached_read(data_pool.get_computation_progress, mrn, db_type=db_type)
+        if progress is None:
+            return {"status": "not_started", "trials_total": 0, "trials_completed": 0,
+                    "trials_eligible": 0, "trials_error": 0}
+        comp_status = progress["status"]
+        if comp_status == "computing":
+            if not await run_cached_read(computation_registry.is_active, mrn):
+                comp_status = "stale"
+        initial = {
+            "status": comp_status,
+            "trials_total": progress["trials_total"],
+            "trials_completed": progress["trials_completed"],
+            "trials_eligible": progress["trials_eligible"],
+            "trials_error": progress["trials_error"],
+        }
+        # In-process counters may be ahead of the stored ones
+        if snapshot and comp_status == "computing" and snapshot.get("trials_completed", 0) > initial["trials_completed"]:
+            initial.update(snapshot)
+        if comp_status != "computing":
+            initial["error_message"] = progress.get("error_message")
+        return initial
+
+    async def follow_remote(last):
+        """Follow a computation leased by another instance through the progress store."""
+        idle = 0.0
+        while True:
+            await asyncio.sleep(poll_seconds)
+            if await request.is_disconnected():
+                return
+            current = await read_progress()
+            if current["status"] != "computing":
+                yield "complete", current
+                return
+            if current != last:
+                last, idle = current, 0.0
+                yield "progress", current
+                continue
+            idle += poll_seconds
+            if idle >= keepalive_seconds:
+                idle = 0.0
+                yield None, None
+
+    async def event_stream():
+        # Subscribe only once the stream is iterated (a response that is never
+        # sent must not leave a queue behind), and before reading the snapshot
+        # so no event between the two is lost
+        queue, snapshot = broker.subscribe(mrn, db_type, asyncio.get_running_loop())
+        event_id = 0
+        try:
+            initial = await read_progress(snapshot)
+            event_id += 1
+            yield _format_sse("progress", initial, event_id)
+            if initial["status"] != "computing":
+                event_id += 1
+                yield _format_sse("complete", initial, event_id)
+                return
+
+            if not computation_registry.is_local(mrn):
+                # The broker never sees events of another instance's computation
+                async for event_type, data in follow_remote(initial):
+                    if event_type is None:
+                        yield ": keepalive\n\n"
+                        continue
+                    event_id += 1
+                    yield _format_sse(event_type, data, event_id)
+                return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive_seconds)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # The run may have finished without its complete event reaching us
+                    current = await read_progress()
+                    if current["status"] != "computing":
+                        event_id += 1
+                        yield _format_sse("complete", current, event_id)
+                        return
+                    # SSE comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+
+                event_id += 1
+                yield _format_sse(event["event"], event["data"], event_id)
+                if event["event"] == "complete":
+                    return
+        finally:
+            broker.unsubscribe(mrn, db_type, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ── Bucket 2: Manual criterion resolution ──────────────────────────────────
 
 class CriterionResolution(BaseModel):
@@ -2247,11 +2640,10 @@ async def refresh_single_trial_eligibility(mrn: str, nct_id: str, db_type: str =
     import json
     import sqlite3
     from datetime import datetime
-    from concurrent.futures import ThreadPoolExecutor
 
     try:
         # 1. Get patient data
-        patient_data = data_pool.get_patient_data(mrn, db_type)
+        patient_data = await run_cached_read(data_pool.get_patient_data, mrn, db_type)
         if patient_data is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -2259,7 +2651,7 @@ async def refresh_single_trial_eligibility(mrn: str, nct_id: str, db_type: str =
             )
 
         # 2. Get trial data
-        trial = data_pool.get_trial(nct_id, db_type=db_type)
+        trial = await run_cached_read(data_pool.get_trial, nct_id, db_type=db_type)
         if trial is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -2273,16 +2665,13 @@ async def refresh_single_trial_eligibility(mrn: str, nct_id: str, db_type: str =
             classify_unknown_criteria, add_suggested_tests,
         )
 
-        patient_context = build_patient_context(patient_data)
+        def refresh_trial():
+            patient_context = build_patient_context(patient_data)
+            return process_single_trial(trial, patient_context, patient_data)
 
-        # Run the (blocking) LLM call in a thread so we don't block the event loop
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=1) as pool:
-            result = await loop.run_in_executor(
-                pool,
-                process_single_trial,
-                trial, patient_context, patient_data
-            )
+        # Build the context and run the (blocking) LLM calls on the extraction
+        # pool so we don't block the event loop
+        result = await run_extraction(refresh_trial)
 
         if result is None:
             raise HTTPException(
@@ -2673,10 +3062,8 @@ async def sync_trials_batch(
             return sync_result
 
         if background:
-            # Run in background using thread pool
-            loop = asyncio.get_event_loop()
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                loop.run_in_executor(executor, sync_and_compute)
+            # Run in background on the extraction pool (not awaited)
+            submit_background_extraction(sync_and_compute)
 
             return {
                 "success": True,
@@ -2684,7 +3071,7 @@ async def sync_trials_batch(
                 "max_per_query": max_per_query
             }
         else:
-            result = sync_and_compute()
+            result = await run_extraction(sync_and_compute)
             return {
                 "success": True,
                 "result": result
@@ -2728,21 +3115,9 @@ async def compute_eligibility_batch(
         trial_nct_ids = [trial_nct_id] if trial_nct_id else None
 
         if background:
-            # Prevent duplicate computations for the same patient
+            # Prevent duplicate computations for the same patient (on any instance)
             computation_key = patient_mrn or trial_nct_id or "all"
-            with _computation_lock:
-                existing = _active_computations.get(computation_key)
-                if existing and existing.is_alive():
-                    return {
-                        "success": True,
-                        "message": "Eligibility computation already in progress",
-                        "already_running": True,
-                        "limit_trials": limit_trials,
-                        "patient_mrn": patient_mrn,
-                        "trial_nct_id": trial_nct_id
-                    }
-
-            import threading
+
             def _run_eligibility():
                 try:
                     engine.compute_eligibility_matrix(
@@ -2753,15 +3128,17 @@ async def compute_eligibility_batch(
                     )
                 except Exception as e:
                     print(f"Background eligibility computation failed: {e}")
-                finally:
-                    with _computation_lock:
-                        _active_computations.pop(computation_key, None)
 
-            thread = threading.Thread(target=_run_eligibility, daemon=True)
-            thread.start()
-
-            with _computation_lock:
-                _active_computations[computation_key] = thread
+            thread = await run_cached_read(computation_registry.start, computation_key, _run_eligibility)
+            if thread is None:
+                return {
+                    "success": True,
+                    "message": "Eligibility computation already in progress",
+                    "already_running": True,
+                    "limit_trials": limit_trials,
+                    "patient_mrn": patient_mrn,
+                    "trial_nct_id": trial_nct_id
+                }
 
             return {
                 "success": True,
@@ -2771,7 +3148,8 @@ async def compute_eligibility_batch(
                 "trial_nct_id": trial_nct_id
             }
         else:
-            result = engine.compute_eligibility_matrix(
+            result = await run_extraction(
+                engine.compute_eligibility_matrix,
                 patient_mrns=patient_mrns,
                 trial_nct_ids=trial_nct_ids,
                 limit_trials=limit_trials,
@@ -2823,9 +3201,7 @@ async def full_sync_batch(
                     db_type=db_type
                 )
 
-            loop = asyncio.get_event_loop()
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                loop.run_in_executor(executor, run_full_sync)
+            submit_background_extraction(run_full_sync)
 
             return {
                 "success": True,
@@ -2835,7 +3211,8 @@ async def full_sync_batch(
                 "db_type": db_type or "demo"
             }
         else:
-            result = engine.full_sync(
+            result = await run_extraction(
+                engine.full_sync,
                 max_trials_per_query=max_trials_per_query,
                 limit_trials=limit_trials,
                 db_type=db_type
@@ -2922,10 +3299,10 @@ async def test_demographics_tab(request: MRNRequest):
     """
     try:
         # Fetch MD note and upload
-        pdf_url = _test_get_md_note_url(request.mrn)
+        pdf_url = await run_extraction(_test_get_md_note_url, request.mrn)
 
         # Extract demographics
-        demographics = extract_patient_demographics(pdf_url=pdf_url)
+        demographics = await run_extraction(extract_patient_demographics, pdf_url=pdf_url)
 
         return {
             "success": True,
@@ -2959,10 +3336,10 @@ async def test_diagnosis_tab(request: MRNRequest):
     """
     try:
         # Fetch MD note and upload
-        pdf_url = _test_get_md_note_url(request.mrn)
+        pdf_url = await run_extraction(_test_get_md_note_url, request.mrn)
 
         # Extract diagnosis status
-        diagnosis = extract_diagnosis_status(pdf_url=pdf_url)
+        diagnosis = await run_extraction(extract_diagnosis_status, pdf_url=pdf_url)
 
         return {
             "success": True,
@@ -2996,10 +3373,10 @@ async def test_comorbidities_tab(request: MRNRequest):
     """
     try:
         # Fetch MD note and upload
-        pdf_url = _test_get_md_note_url(request.mrn)
+        pdf_url = await run_extraction(_test_get_md_note_url, request.mrn)
 
         # Extract comorbidities
-        comorbidities = extract_comorbidities_status(pdf_url=pdf_url)
+        comorbidities = await run_extraction(extract_comorbidities_status, pdf_url=pdf_url)
 
         return {
             "success": True,
@@ -3033,10 +3410,10 @@ async def test_treatment_tab(request: MRNRequest):
     """
     try:
         # Fetch MD note and upload
-        pdf_url = _test_get_md_note_url(request.mrn)
+        pdf_url = await run_extraction(_test_get_md_note_url, request.mrn)
 
         # Extract treatment info (returns 2 parts)
-        treatment_lot, treatment_timeline = extract_treatment_tab_info(pdf_url=pdf_url)
+        treatment_lot, treatment_timeline = await run_extraction(extract_treatment_tab_info, pdf_url=pdf_url)
 
         return {
             "success": True,
@@ -3073,10 +3450,10 @@ async def test_diagnosis_tab_full(request: MRNRequest):
     """
     try:
         # Fetch MD note and upload
-        pdf_url = _test_get_md_note_url(request.mrn)
+        pdf_url = await run_extraction(_test_get_md_note_url, request.mrn)
 
         # Extract diagnosis tab info (returns 3 parts)
-        diagnosis_header, diagnosis_evolution_timeline, diagnosis_footer = diagnosis_extraction(pdf_input=pdf_url)
+        diagnosis_header, diagnosis_evolution_timeline, diagnosis_footer = await run_extraction(diagnosis_extraction, pdf_input=pdf_url)
 
         return {
             "success": True,
@@ -3115,7 +3492,7 @@ async def test_lab_tab(request: MRNRequest):
     """
     try:
         # Run the lab pipeline (already handles fetching, combining, uploading)
-        result = lab_tab_info(mrn=request.mrn, verbose=False)
+        result = await run_extraction(lab_tab_info, mrn=request.mrn, verbose=False)
 
         if not result['success']:
             raise ValueError(result.get('error', 'Lab extraction failed'))
@@ -3156,7 +3533,7 @@ async def test_genomics_tab(request: MRNRequest):
     """
     try:
         # Run the genomics pipeline
-        result = genomics_tab_info(mrn=request.mrn, verbose=False)
+        result = await run_extraction(genomics_tab_info, mrn=request.mrn, verbose=False)
 
         if not result['success']:
             raise ValueError(result.get('error', 'Genomics extraction failed'))
@@ -3196,7 +3573,8 @@ async def test_pathology_tab(request: MRNRequest):
     try:
         # Fetch individual pathology reports
         print(f"Fetching individual pathology reports for MRN: {request.mrn}")
-        pathology_reports = upload_individual_reports_to_drive(
+        pathology_reports = await run_extraction(
+            upload_individual_reports_to_drive,
             mrn=request.mrn,
             report_type='pathology'
         )
@@ -3226,7 +3604,8 @@ async def test_pathology_tab(request: MRNRequest):
         for report in pathology_reports:
             try:
                 # Extract pathology information
-                pathology_summary, pathology_markers = pathology_info(
+                pathology_summary, pathology_markers = await run_extraction(
+                    pathology_info,
                     pdf_url=report['drive_url'],
                     use_gemini_api=True
                 )
@@ -3344,7 +3723,8 @@ async def test_radiology_tab(request: MRNRequest):
     """
     try:
         # Upload individual reports to Drive
-        radiology_reports = upload_individual_radiology_reports_with_MD_notes_to_drive(
+        radiology_reports = await run_extraction(
+            upload_individual_radiology_reports_with_MD_notes_to_drive,
             mrn=request.mrn
         )
 
@@ -3364,7 +3744,8 @@ async def test_radiology_tab(request: MRNRequest):
         detailed_reports = []
         for report in radiology_reports:
             try:
-                radiology_summary, radiology_imp_RECIST = extract_radiology_details_from_report(
+                radiology_summary, radiology_imp_RECIST = await run_extraction(
+                    extract_radiology_details_from_report,
                     radiology_url=report['drive_url']
                 )
                 detailed_reports.append({
@@ -3430,22 +3811,22 @@ async def test_patient_all_tabs(request: MRNRequest):
 
         # Step 1: Extract patient data
         logger.info(f"🧪 Step 1/4: Extracting patient data for MRN: {request.mrn}...")
-        result = extract_patient_data(request.mrn, False)
+        result = await run_extraction(extract_patient_data, request.mrn, False)
         logger.info("🧪 ✅ Patient data extraction completed!")
 
         # Step 2: Extract lab results
         logger.info(f"🧪 Step 2/4: Extracting lab results for MRN: {request.mrn}...")
-        lab_result = lab_tab_info(request.mrn, False)
+        lab_result = await run_extraction(lab_tab_info, request.mrn, False)
         logger.info("🧪 ✅ Lab results extraction completed!")
 
         # Step 3: Extract genomics data
         logger.info(f"🧪 Step 3/4: Extracting genomics data for MRN: {request.mrn}...")
-        genomics_result = genomics_tab_info(request.mrn, False)
+        genomics_result = await run_extraction(genomics_tab_info, request.mrn, False)
         logger.info("🧪 ✅ Genomics data extraction completed!")
 
         # Step 4: Extract pathology data
         logger.info(f"🧪 Step 4/4: Extracting pathology data for MRN: {request.mrn}...")
-        pathology_result = pathology_tab_info_pipeline(request.mrn, False, True)  # use_gemini_api=True
+        pathology_result = await run_extraction(pathology_tab_info_pipeline, request.mrn, False, True)  # use_gemini_api=True
         logger.info("🧪 ✅ Pathology data extraction completed!")
 
         # Combine results
@@ -3509,7 +3890,8 @@ async def test_patient_all_tabs(request: MRNRequest):
         # Extract individual radiology reports
         logger.info(f"🧪 Extracting individual radiology reports for MRN: {request.mrn}")
         try:
-            radiology_reports = upload_individual_radiology_reports_with_MD_notes_to_drive(
+            radiology_reports = await run_extraction(
+                upload_individual_radiology_reports_with_MD_notes_to_drive,
                 mrn=request.mrn
             )
 
@@ -3517,7 +3899,8 @@ async def test_patient_all_tabs(request: MRNRequest):
                 detailed_radiology_reports = []
                 for report in radiology_reports:
                     try:
-                        radiology_summary, radiology_imp_RECIST = extract_radiology_details_from_report(
+                        radiology_summary, radiology_imp_RECIST = await run_extraction(
+                            extract_radiology_details_from_report,
                             radiology_url=report['drive_url_with_MD'],
                             use_gemini_api=True
                         )
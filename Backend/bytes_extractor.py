@@ -8,26 +8,20 @@ Supports filtering by:
 - Date ranges (e.g., last 6 months)
 - Content type (default: application/pdf)
 """
+import os
 import re
-import time
 import gc
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Any, Union
 from datetime import datetime, timedelta
 try:
-    from Backend.documents_reference import (
-        generate_bearer_token,
-        generate_onco_emr_token,
-        get_patient_id_from_mrn,
-        get_document_references,
-    )
+    from Backend.documents_reference import get_fhir_tokens, fhir_get, fetch_attachment
+    from Backend.document_bundle_cache import get_cached_document_bundle
+    from Backend.pdf_byte_cache import get_pdf_byte_cache, document_reference_key
 except ModuleNotFoundError:
-    from documents_reference import (
-        generate_bearer_token,
-        generate_onco_emr_token,
-        get_patient_id_from_mrn,
-        get_document_references,
-    )
-import requests
+    from documents_reference import get_fhir_tokens, fhir_get, fetch_attachment
+    from document_bundle_cache import get_cached_document_bundle
+    from pdf_byte_cache import get_pdf_byte_cache, document_reference_key
 import base64
 from PyPDF2 import PdfMerger
 from io import BytesIO
@@ -47,6 +41,112 @@ LOINC_CODES = {
     "lab_results": "26436-6",         # Laboratory studies
 }
 
+# Documents fetched/uploaded in parallel per call. FHIR requests still go
+# through the shared per-host rate limiter in fhir_get.
+DOCUMENT_FETCH_MAX_WORKERS = int(os.environ.get("DOCUMENT_FETCH_MAX_WORKERS", 4))
+
+
+def _process_documents_in_parallel(
+    items: List[Any],
+    worker,
+    max_workers: Optional[int] = None
+) -> List[tuple]:
+    """
+    Run worker(idx, item) for each item with bounded concurrency.
+
+    Args:
+        items: Items to process (e.g. FHIR URLs or document dicts)
+        worker: Callable taking (1-based index, item)
+        max_workers: Maximum parallel workers (default: DOCUMENT_FETCH_MAX_WORKERS)
+
+    Returns:
+        List of (result, error) tuples in the same order as items. Exceptions
+        raised by worker are captured per item so one failure does not abort the rest.
+    """
+    if max_workers is None:
+        max_workers = DOCUMENT_FETCH_MAX_WORKERS
+
+    def run(index):
+        try:
+            return worker(index + 1, items[index]), None
+        except Exception as e:
+            return None, e
+
+    if len(items) <= 1 or max_workers <= 1:
+        return [run(index) for index in range(len(items))]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(run, range(len(items))))
+
+
+# Lab results and reports are taken from this many days before the newest one;
+# the DocumentReference search is only read that far back (newest first)
+RECENT_WINDOW_DAYS = 180
+
+_MD_NOTE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'\bMD\b.*\bvisit\b',
+        r'\bMD\b.*\bnote\b',
+        r'\bphysician\b.*\bvisit\b',
+        r'\bphysician\b.*\bnote\b',
+        r'\bprogress\b.*\bnote\b',
+    )
+]
+
+
+def _is_dated_document(entry: Dict[str, Any], content_type: str) -> bool:
+    """Entry with a fullUrl, a date and an attachment of content_type."""
+    resource = entry.get("resource", {})
+    return bool(entry.get("fullUrl")) and bool(resource.get("date")) and any(
+        content.get("attachment", {}).get("contentType") == content_type
+        for content in resource.get("content", [])
+    )
+
+
+def _is_lab_result_entry(entry: Dict[str, Any], content_type: str = "application/pdf") -> bool:
+    """Lab result document as selected by extract_lab_results_data_md_notes_combined."""
+    document_type = entry.get("resource", {}).get("type", {}).get("text", "")
+    return document_type.startswith("Lab Results") and _is_dated_document(entry, content_type)
+
+
+def _is_report_entry(entry: Dict[str, Any], report_type: str, content_type: str = "application/pdf") -> bool:
+    """Report document as selected by extract_report_with_MD."""
+    document_type = entry.get("resource", {}).get("type", {}).get("text", "").lower()
+    if report_type == "molecular":
+        molecular_keywords = ["molecular result", "genomic testing", "ngs panel", "ngs result"]
+        matches = any(keyword in document_type for keyword in molecular_keywords)
+    else:
+        matches = report_type in document_type
+    return matches and _is_dated_document(entry, content_type)
+
+
+def _is_md_note_entry(entry: Dict[str, Any], content_type: str = "application/pdf") -> bool:
+    """MD note document (matched on resource.type.text)."""
+    document_type = entry.get("resource", {}).get("type", {}).get("text", "")
+    return any(pattern.search(document_type) for pattern in _MD_NOTE_PATTERNS) and \
+        _is_dated_document(entry, content_type)
+
+
+def _get_recent_window_bundle(mrn: str, loinc_code: Optional[str], is_match) -> Dict[str, Any]:
+    """
+    Get the cached bundle read back to RECENT_WINDOW_DAYS before the newest matching document.
+
+    Args:
+        mrn: Patient's Medical Record Number
+        loinc_code: LOINC code filter (None for all types)
+        is_match: Predicate selecting the documents the caller wants
+
+    Returns:
+        Bundle dict (may also contain older entries)
+    """
+    bundle = get_cached_document_bundle(mrn, loinc_code, until=is_match)
+    dates = [entry["resource"]["date"] for entry in bundle.get("entry", []) if is_match(entry)]
+    if not dates:
+        return bundle
+    newest = datetime.fromisoformat(max(dates).replace('Z', '+00:00'))
+    return get_cached_document_bundle(mrn, loinc_code, date_from=newest - timedelta(days=RECENT_WINDOW_DAYS))
+
+
 def get_documents(
     mrn: str,
     loinc_code: Optional[str] = None,
@@ -77,17 +177,16 @@ def get_documents(
         - If most_recent_only=True: Single URL string or None if no matches
         - If most_recent_only=False: List of URL strings (empty list if no matches)
     """
-    # Step 1: Authenticate
-    bearer_token = generate_bearer_token()
-    onco_emr_token = generate_onco_emr_token(bearer_token)
-
-    # Step 2: Get patient ID
-    patient_id, _ = get_patient_id_from_mrn(mrn, onco_emr_token)
-
-    # Step 3: Get document references from FHIR API
-    document_bundle = get_document_references(patient_id, onco_emr_token, loinc_code)
+    # Step 1: Get document references (cached per MRN, LOINC-filtered in memory),
+    # read back to date_from, or only to the newest match for most_recent_only
+    until = None
+    if most_recent_only:
+        until = lambda entry: _extract_documents_from_bundle(
+            {"entry": [entry]}, description_patterns, date_from, date_to, True, content_type
+        ) is not None
+    document_bundle = get_cached_document_bundle(mrn, loinc_code, date_from=date_from, until=until)
 
-    # Step 4: Extract and filter documents
+    # Step 2: Extract and filter documents
     return _extract_documents_from_bundle(
         document_bundle=document_bundle,
         description_patterns=description_patterns,
@@ -240,20 +339,11 @@ def get_document_bytes(
         return None
 
     # Authenticate and get PDF bytes
-    bearer_token = generate_bearer_token()
-    onco_emr_token = generate_onco_emr_token(bearer_token)
+    bearer_token, onco_emr_token = get_fhir_tokens()
 
-    headers = {
-        "Authorization": f"Bearer {onco_emr_token}",
-        "Accept": "application/fhir+json"
-    }
-
-    response = requests.get(document_url, headers=headers)
+    response = fhir_get(document_url, onco_emr_token)
     response.raise_for_status()
 
-    # Add rate limiting delay to avoid 429 errors
-    time.sleep(1.5)
-
     document_data = response.json()
 
     # Extract PDF from content
@@ -269,7 +359,7 @@ def get_document_bytes(
 
     # Download PDF from URL or decode base64
     if pdf_url:
-        pdf_response = requests.get(pdf_url, headers=headers)
+        pdf_response = fetch_attachment(pdf_url, onco_emr_token)
         pdf_response.raise_for_status()
         pdf_bytes = pdf_response.content
     elif pdf_data:
@@ -302,17 +392,12 @@ def extract_lab_results_data_md_notes_combined(
                    Returns empty list if no lab results found
 
     """
-    # Step 1: Authenticate
-    bearer_token = generate_bearer_token()
-    onco_emr_token = generate_onco_emr_token(bearer_token)
-
-    # Step 2: Get patient ID
-    patient_id, _ = get_patient_id_from_mrn(mrn, onco_emr_token)
-
-    # Step 3: Get document references from FHIR API
-    document_bundle = get_document_references(patient_id, onco_emr_token, loinc_code)
+    # Step 1: Get document references (cached per MRN, LOINC-filtered in memory)
+    document_bundle = _get_recent_window_bundle(
+        mrn, loinc_code, lambda entry: _is_lab_result_entry(entry, content_type)
+    )
 
-    # Step 4: Filter for lab results with application/pdf content type
+    # Step 2: Filter for lab results with application/pdf content type
     lab_results = []
 
     if "entry" not in document_bundle or not document_bundle["entry"]:
@@ -354,12 +439,12 @@ def extract_lab_results_data_md_notes_combined(
     if not lab_results:
         return []
 
-    # Step 5: Get most recent date and calculate 6 months before
+    # Step 3: Get most recent date and calculate 6 months before
     most_recent_date_str = lab_results[0]["date"]
     most_recent_date = datetime.fromisoformat(most_recent_date_str.replace('Z', '+00:00'))
-    six_months_before = most_recent_date - timedelta(days=180)
+    six_months_before = most_recent_date - timedelta(days=RECENT_WINDOW_DAYS)
 
-    # Step 6: Filter for documents within 6 months of most recent
+    # Step 4: Filter for documents within 6 months of most recent
     filtered_results = []
     for doc in lab_results:
         doc_date = datetime.fromisoformat(doc["date"].replace('Z', '+00:00'))
@@ -375,8 +460,8 @@ def extract_lab_results_data_md_notes_combined(
             r'\bprogress\b.*\bnote\b'
         ]
 
-    # Fetch MD note bundle to get full document metadata
-    md_note_bundle = get_document_references(patient_id, onco_emr_token, loinc_type=None)
+    # Fetch MD note bundle to get full document metadata (read back to the newest MD note)
+    md_note_bundle = get_cached_document_bundle(mrn, until=lambda entry: _is_md_note_entry(entry, content_type))
 
     # Extract MD note document with metadata using the same logic
     md_note_docs = _extract_documents_from_bundle(
@@ -455,17 +540,12 @@ def extract_report_with_MD(
                    Returns empty list if no reports found
 
     """
-    # Step 1: Authenticate
-    bearer_token = generate_bearer_token()
-    onco_emr_token = generate_onco_emr_token(bearer_token)
-
-    # Step 2: Get patient ID
-    patient_id, _ = get_patient_id_from_mrn(mrn, onco_emr_token)
-
-    # Step 3: Get document references from FHIR API
-    document_bundle = get_document_references(patient_id, onco_emr_token, loinc_code)
+    # Step 1: Get document references (cached per MRN, LOINC-filtered in memory)
+    document_bundle = _get_recent_window_bundle(
+        mrn, loinc_code, lambda entry: _is_report_entry(entry, report_type, content_type)
+    )
 
-    # Step 4: Filter for pathology reports with application/pdf content type
+    # Step 2: Filter for pathology reports with application/pdf content type
     reports = []
 
     if "entry" not in document_bundle or not document_bundle["entry"]:
@@ -517,19 +597,19 @@ def extract_report_with_MD(
     if not reports:
         return []
 
-    # Step 5: Get most recent date and calculate 6 months before
+    # Step 3: Get most recent date and calculate 6 months before
     most_recent_date_str = reports[0]["date"]
     most_recent_date = datetime.fromisoformat(most_recent_date_str.replace('Z', '+00:00'))
-    six_months_before = most_recent_date - timedelta(days=180)
+    six_months_before = most_recent_date - timedelta(days=RECENT_WINDOW_DAYS)
 
-    # Step 6: Filter for documents within 6 months of most recent
+    # Step 4: Filter for documents within 6 months of most recent
     filtered_results = []
     for doc in reports:
         doc_date = datetime.fromisoformat(doc["date"].replace('Z', '+00:00'))
         if six_months_before <= doc_date <= most_recent_date:
             filtered_results.append(doc)
 
-    # Step 7: Add the most recent MD note to filtered_results (only if include_md_notes is True)
+    # Step 5: Add the most recent MD note to filtered_results (only if include_md_notes is True)
     if include_md_notes:
         document_type_patterns = [
             r'\bMD\b.*\bvisit\b',
@@ -539,8 +619,8 @@ def extract_report_with_MD(
             r'\bprogress\b.*\bnote\b'
         ]
 
-        # Fetch MD note bundle to get full document metadata
-        md_note_bundle = get_document_references(patient_id, onco_emr_token, loinc_type=None)
+        # Fetch MD note bundle to get full document metadata (read back to the newest MD note)
+        md_note_bundle = get_cached_document_bundle(mrn, until=lambda entry: _is_md_note_entry(entry, content_type))
         compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in document_type_patterns]
 
         for entry in md_note_bundle.get("entry", []):
@@ -597,22 +677,21 @@ def fetch_pdf_bytes_from_fhir_url(fhir_url: str, bearer_token: Optional[str] = N
         >>> pdf_bytes = fetch_pdf_bytes_from_fhir_url("https://fhir-api.com/DocumentReference/12345")
         >>> print(f"Fetched {len(pdf_bytes)} bytes")
     """
-    # Authenticate if tokens not provided
-    if not bearer_token:
-        bearer_token = generate_bearer_token()
-    if not onco_emr_token:
-        onco_emr_token = generate_onco_emr_token(bearer_token)
-
-    headers = {
-        "Authorization": f"Bearer {onco_emr_token}",
-        "Accept": "application/fhir+json"
-    }
+    # Reuse bytes another pipeline already downloaded for this document
+    return get_pdf_byte_cache().get_or_fetch(
+        document_reference_key(fhir_url),
+        lambda: _download_pdf_bytes_from_fhir_url(fhir_url, bearer_token, onco_emr_token)
+    )
 
-    # Add rate limiting delay to avoid 429 errors
-    time.sleep(1.5)
+
+def _download_pdf_bytes_from_fhir_url(fhir_url: str, bearer_token: Optional[str] = None, onco_emr_token: Optional[str] = None) -> Optional[bytes]:
+    """Download PDF bytes for a FHIR DocumentReference URL (uncached)."""
+    # Use cached tokens if not provided
+    if not bearer_token or not onco_emr_token:
+        bearer_token, onco_emr_token = get_fhir_tokens()
 
     # Get document data from FHIR URL
-    response = requests.get(fhir_url, headers=headers)
+    response = fhir_get(fhir_url, onco_emr_token)
     response.raise_for_status()
     document_data = response.json()
 
@@ -629,7 +708,7 @@ def fetch_pdf_bytes_from_fhir_url(fhir_url: str, bearer_token: Optional[str] = N
 
     # Download PDF from URL or decode base64
     if pdf_url:
-        pdf_response = requests.get(pdf_url, headers=headers)
+        pdf_response = fetch_attachment(pdf_url, onco_emr_token)
         pdf_response.raise_for_status()
         pdf_bytes = pdf_response.content
     elif pdf_data:
@@ -684,59 +763,28 @@ def fetch_and_combine_pdfs_from_urls(
 
     # Step 1: Authenticate
     print(f"Authenticating with FHIR API...")
-    bearer_token = generate_bearer_token()
-    onco_emr_token = generate_onco_emr_token(bearer_token)
-
-    headers = {
-        "Authorization": f"Bearer {onco_emr_token}",
-        "Accept": "application/fhir+json"
-    }
+    bearer_token, onco_emr_token = get_fhir_tokens()
 
-    # Step 2: Fetch PDF bytes from each URL
+    # Step 2: Fetch PDF bytes from each URL (in parallel, order preserved)
     print(f"Fetching {len(fhir_urls)} documents...")
-    pdf_bytes_list = []
 
-    for idx, url in enumerate(fhir_urls, 1):
+    def fetch_document(idx, url):
         print(f"  Fetching document {idx}/{len(fhir_urls)}: {url}")
+        pdf_bytes = fetch_pdf_bytes_from_fhir_url(url, bearer_token, onco_emr_token)
+        if pdf_bytes is None:
+            print(f"  Warning: No PDF content found in document {idx}, skipping...")
+            return None
+        print(f"  Successfully fetched document {idx} ({len(pdf_bytes)} bytes)")
+        return pdf_bytes
 
-        try:
-            # Add rate limiting delay to avoid 429 errors
-            time.sleep(1.5)
-
-            # Get document data from FHIR URL
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            document_data = response.json()
-
-            # Extract PDF from content
-            pdf_url = None
-            pdf_data = None
-
-            for content in document_data.get("content", []):
-                attachment = content.get("attachment", {})
-                if attachment.get("contentType") == "application/pdf":
-                    pdf_url = attachment.get("url")
-                    pdf_data = attachment.get("data")
-                    break
-
-            # Download PDF from URL or decode base64
-            if pdf_url:
-                pdf_response = requests.get(pdf_url, headers=headers)
-                pdf_response.raise_for_status()
-                pdf_bytes = pdf_response.content
-            elif pdf_data:
-                pdf_bytes = base64.b64decode(pdf_data)
-            else:
-                print(f"  Warning: No PDF content found in document {idx}, skipping...")
-                continue
-
-            pdf_bytes_list.append(pdf_bytes)
-            print(f"  Successfully fetched document {idx} ({len(pdf_bytes)} bytes)")
-
-        except Exception as e:
-            print(f"  Error fetching document {idx}: {str(e)}")
+    pdf_bytes_list = []
+    for idx, (pdf_bytes, error) in enumerate(_process_documents_in_parallel(fhir_urls, fetch_document), 1):
+        if error is not None:
+            print(f"  Error fetching document {idx}: {str(error)}")
             # Continue with other documents instead of failing completely
             continue
+        if pdf_bytes is not None:
+            pdf_bytes_list.append(pdf_bytes)
 
     if not pdf_bytes_list:
         raise ValueError("No PDFs were successfully fetched from the provided URLs")
@@ -940,17 +988,10 @@ def get_md_notes(
         Dict with MD note metadata (url, date, document_type, description, document_id)
         or None if no MD notes found
     """
-    # Step 1: Authenticate
-    bearer_token = generate_bearer_token()
-    onco_emr_token = generate_onco_emr_token(bearer_token)
-
-    # Step 2: Get patient ID
-    patient_id, _ = get_patient_id_from_mrn(mrn, onco_emr_token)
-
-    # Step 3: Get document references from FHIR API
-    document_bundle = get_document_references(patient_id, onco_emr_token, loinc_type=None)
+    # Step 1: Get document references (cached per MRN)
+    document_bundle = get_cached_document_bundle(mrn)
 
-    # Step 4: Define MD note patterns
+    # Step 2: Define MD note patterns
     document_type_patterns = [
         r'\bMD\b.*\bvisit\b',
         r'\bMD\b.*\bnote\b',
@@ -961,7 +1002,7 @@ def get_md_notes(
 
     compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in document_type_patterns]
 
-    # Step 5: Extract MD notes from bundle
+    # Step 3: Extract MD notes from bundle
     md_notes = []
 
     if "entry" not in document_bundle or not document_bundle["entry"]:
@@ -1074,84 +1115,55 @@ def upload_individual_reports_to_drive(
     folder_id = create_or_get_folder(folder_name)
 
     # Step 3: Authenticate with FHIR API
-    bearer_token = generate_bearer_token()
-    onco_emr_token = generate_onco_emr_token(bearer_token)
+    bearer_token, onco_emr_token = get_fhir_tokens()
 
-    headers = {
-        "Authorization": f"Bearer {onco_emr_token}",
-        "Accept": "application/fhir+json"
-    }
-
-    # Step 4: Upload each report individually to Google Drive
-    uploaded_docs = []
-
-    for idx, doc in enumerate(report_docs, 1):
+    # Step 4: Upload each report individually to Google Drive (in parallel, order preserved)
+    def upload_report(idx, doc):
         fhir_url = doc['url']
         print(f"\nProcessing report {idx}/{len(report_docs)}: {doc['document_type']}")
 
-        try:
-            # Add rate limiting delay to avoid 429 errors
-            time.sleep(1.5)
-
-            # Fetch PDF from FHIR URL
-            print(f"  Fetching from FHIR...")
-            response = requests.get(fhir_url, headers=headers)
-            response.raise_for_status()
-            document_data = response.json()
-
-            # Extract PDF bytes
-            pdf_url = None
-            pdf_data = None
-
-            for content in document_data.get("content", []):
-                attachment = content.get("attachment", {})
-                if attachment.get("contentType") == "application/pdf":
-                    pdf_url = attachment.get("url")
-                    pdf_data = attachment.get("data")
-                    break
-
-            # Download PDF from URL or decode base64
-            if pdf_url:
-                pdf_response = requests.get(pdf_url, headers=headers)
-                pdf_response.raise_for_status()
-                pdf_bytes = pdf_response.content
-            elif pdf_data:
-                pdf_bytes = base64.b64decode(pdf_data)
-            else:
-                print(f"  Warning: No PDF content found, skipping...")
-                continue
-
-            print(f"  Fetched PDF ({len(pdf_bytes)} bytes)")
-
-            # Generate file name based on document metadata
-            date_str = doc['date'].split('T')[0]  # Extract date part (YYYY-MM-DD)
-            file_name = f"{mrn}_{report_type}_{date_str}_{doc['document_id']}.pdf"
-
-            # Upload to Google Drive
-            print(f"  Uploading to Google Drive as: {file_name}")
-            upload_result = upload_and_share_pdf_bytes(
-                pdf_bytes=pdf_bytes,
-                file_name=file_name,
-                folder_id=folder_id
-            )
+        # Fetch PDF from FHIR URL
+        print(f"  [{idx}] Fetching from FHIR...")
+        pdf_bytes = fetch_pdf_bytes_from_fhir_url(fhir_url, bearer_token, onco_emr_token)
+        if pdf_bytes is None:
+            print(f"  [{idx}] Warning: No PDF content found, skipping...")
+            return None
+
+        print(f"  [{idx}] Fetched PDF ({len(pdf_bytes)} bytes)")
+
+        # Generate file name based on document metadata
+        date_str = doc['date'].split('T')[0]  # Extract date part (YYYY-MM-DD)
+        file_name = f"{mrn}_{report_type}_{date_str}_{doc['document_id']}.pdf"
+
+        # Upload to Google Drive
+        print(f"  [{idx}] Uploading to Google Drive as: {file_name}")
+        upload_result = upload_and_share_pdf_bytes(
+            pdf_bytes=pdf_bytes,
+            file_name=file_name,
+            folder_id=folder_id
+        )
 
-            # Add to results with both original and Drive URLs
-            uploaded_docs.append({
-                "original_url": fhir_url,
-                "drive_url": upload_result['shareable_url'],
-                "drive_file_id": upload_result['file_id'],
-                "date": doc['date'],
-                "document_type": doc['document_type'],
-                "description": doc['description'],
-                "document_id": doc['document_id']
-            })
+        print(f"  [{idx}] Successfully uploaded! Drive URL: {upload_result['shareable_url']}")
 
-            print(f"  Successfully uploaded! Drive URL: {upload_result['shareable_url']}")
+        # Add to results with both original and Drive URLs
+        return {
+            "original_url": fhir_url,
+            "drive_url": upload_result['shareable_url'],
+            "drive_file_id": upload_result['file_id'],
+            "date": doc['date'],
+            "document_type": doc['document_type'],
+            "description": doc['description'],
+            "document_id": doc['document_id']
+        }
 
-        except Exception as e:
-            print(f"  Error processing report {idx}: {str(e)}")
+    uploaded_docs = []
+    for idx, (uploaded, error) in enumerate(_process_documents_in_parallel(report_docs, upload_report), 1):
+        if error is not None:
+            print(f"  Error processing report {idx}: {str(error)}")
             # Continue with other documents instead of failing completely
             continue
+        if uploaded is not None:
+            uploaded_docs.append(uploaded)
 
     print(f"\n{'='*60}")
     print(f"Upload Summary: {len(uploaded_docs)}/{len(report_docs)} reports uploaded successfully")
@@ -1212,87 +1224,59 @@ def upload_individual_radiology_reports_with_MD_notes_to_drive(
     print(f"Found {len(radiology_docs)} radiology report(s)")
 
     # Step 2: Authenticate for FHIR API
-    bearer_token = generate_bearer_token()
-    onco_emr_token = generate_onco_emr_token(bearer_token)
-    headers = {
-        "Authorization": f"Bearer {onco_emr_token}",
-        "Accept": "application/fhir+json"
-    }
+    bearer_token, onco_emr_token = get_fhir_tokens()
 
     # Step 3: Create or get Google Drive folder
     folder_name = "Radiology Reports"
     print(f"\nCreating/getting Google Drive folder: {folder_name}")
     folder_id = create_or_get_folder(folder_name)
 
-    # Step 4: Process each radiology report
-    uploaded_docs = []
-
-    for idx, doc in enumerate(radiology_docs, 1):
+    # Step 4: Process each radiology report (in parallel, order preserved)
+    def upload_radiology_report(idx, doc):
         fhir_url = doc['url']
         print(f"\nProcessing report {idx}/{len(radiology_docs)}: {doc['document_type']}")
 
-        try:
-            # Add rate limiting delay to avoid 429 errors
-            time.sleep(1.5)
-
-            # Fetch radiology report PDF
-            print(f"  Fetching radiology report from FHIR...")
-            response = requests.get(fhir_url, headers=headers)
-            response.raise_for_status()
-            document_data = response.json()
-
-            # Extract PDF bytes
-            pdf_url = None
-            pdf_data = None
-
-            for content in document_data.get("content", []):
-                attachment = content.get("attachment", {})
-                if attachment.get("contentType") == "application/pdf":
-                    pdf_url = attachment.get("url")
-                    pdf_data = attachment.get("data")
-                    break
-
-            # Download radiology PDF
-            if pdf_url:
-                pdf_response = requests.get(pdf_url, headers=headers)
-                pdf_response.raise_for_status()
-                radiology_pdf_bytes = pdf_response.content
-            elif pdf_data:
-                radiology_pdf_bytes = base64.b64decode(pdf_data)
-            else:
-                print(f"  Warning: No PDF content found, skipping...")
-                continue
+        # Fetch radiology report PDF
+        print(f"  [{idx}] Fetching radiology report from FHIR...")
+        radiology_pdf_bytes = fetch_pdf_bytes_from_fhir_url(fhir_url, bearer_token, onco_emr_token)
+        if radiology_pdf_bytes is None:
+            print(f"  [{idx}] Warning: No PDF content found, skipping...")
+            return None
 
-            print(f"  Fetched radiology PDF ({len(radiology_pdf_bytes)} bytes)")
+        print(f"  [{idx}] Fetched radiology PDF ({len(radiology_pdf_bytes)} bytes)")
 
-            # Upload radiology report to Google Drive
-            date_str = doc['date'].split('T')[0]
-            radiology_file_name = f"{mrn}_radiology_{date_str}_{doc['document_id']}.pdf"
+        # Upload radiology report to Google Drive
+        date_str = doc['date'].split('T')[0]
+        radiology_file_name = f"{mrn}_radiology_{date_str}_{doc['document_id']}.pdf"
 
-            print(f"  Uploading radiology report to Google Drive...")
-            upload_result = upload_and_share_pdf_bytes(
-                pdf_bytes=radiology_pdf_bytes,
-                file_name=radiology_file_name,
-                folder_id=folder_id
-            )
+        print(f"  [{idx}] Uploading radiology report to Google Drive...")
+        upload_result = upload_and_share_pdf_bytes(
+            pdf_bytes=radiology_pdf_bytes,
+            file_name=radiology_file_name,
+            folder_id=folder_id
+        )
 
-            # Add to results - include bytes for direct extraction (no MD notes)
-            uploaded_docs.append({
-                "original_url": fhir_url,
-                "drive_url": upload_result['shareable_url'],
-                "drive_file_id": upload_result['file_id'],
-                "pdf_bytes": radiology_pdf_bytes,  # For direct LLM extraction
-                "date": doc['date'],
-                "document_type": doc['document_type'],
-                "description": doc['description'],
-                "document_id": doc['document_id']
-            })
+        print(f"  [{idx}] Successfully uploaded: {upload_result['shareable_url']}")
 
-            print(f"  Successfully uploaded: {upload_result['shareable_url']}")
+        # Add to results - include bytes for direct extraction (no MD notes)
+        return {
+            "original_url": fhir_url,
+            "drive_url": upload_result['shareable_url'],
+            "drive_file_id": upload_result['file_id'],
+            "pdf_bytes": radiology_pdf_bytes,  # For direct LLM extraction
+            "date": doc['date'],
+            "document_type": doc['document_type'],
+            "description": doc['description'],
+            "document_id": doc['document_id']
+        }
 
-        except Exception as e:
-            print(f"  Error processing report {idx}: {str(e)}")
+    uploaded_docs = []
+    for idx, (uploaded, error) in enumerate(_process_documents_in_parallel(radiology_docs, upload_radiology_report), 1):
+        if error is not None:
+            print(f"  Error processing report {idx}: {str(error)}")
             continue
+        if uploaded is not None:
+            uploaded_docs.append(uploaded)
 
     print(f"\n{'='*60}")
     print(f"Upload Summary: {len(uploaded_docs)}/{len(radiology_docs)} reports uploaded successfully")
@@ -0,0 +1,459 @@
+"""
+Record/Replay Cassettes for Gemini and HTTP Calls
+
+Every pipeline in this repo talks to Vertex AI, the FHIR API and
+ClinicalTrials.gov, so nothing could be run or timed without live access.
+A cassette is a JSON file of recorded interactions. The shared clients
+(GeminiClient.generate and PooledSession.request) consult it:
+
+- "record": calls go out as usual; every response is added to the cassette,
+  which is written on save() and at interpreter exit.
+- "replay": nothing goes out. Each call is answered from the cassette, after
+  an optional injected latency; a call with no recorded answer raises
+  CassetteMissError.
+
+Matching:
+- Gemini calls are matched on label, model and document hash (SHA-256 of
+  pdf_bytes); HTTP calls on method, URL and query parameters. A recorded
+  interaction matches when every field it recorded equals the request's
+  (recorded query parameters must be a subset of the request's), so
+  hand-written fixtures can record only the fields that identify them.
+- The hash of the full request (prompt and config, or request body) is
+  preferred but not required, so a prompt edit still replays. With
+  CASSETTE_MATCH=strict it is required as well.
+- Among several matches the most specific one wins.
+
+Recorded cassettes never contain request headers or request bodies (only
+their hashes), and token fields in responses are redacted.
+
+Configuration (environment variables):
+- CASSETTE_MODE: "off" (default), "record" or "replay"
+- CASSETTE_PATH: cassette file (default: Backend/cassettes/default.json)
+- CASSETTE_MATCH: "loose" (default) or "strict"
+- CASSETTE_LATENCY_MS: injected replay latency, e.g. "llm=1500,http=40" or
+  per Gemini label "llm=1500,lab_extraction=4000"
+- CASSETTE_LATENCY_SCALE: without a configured latency, sleep the recorded
+  latency times this factor (default: 0, no sleep)
+
+Usage:
+    CASSETTE_MODE=record CASSETTE_PATH=run.json python main.py
+    CASSETTE_MODE=replay CASSETTE_PATH=run.json CASSETTE_LATENCY_MS=llm=1500 python main.py
+"""
+
+import atexit
+import base64
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CASSETTE_VERSION = 1
+CASSETTE_MODES = ("off", "record", "replay")
+
+# Preferred, not required, in loose matching
+REQUEST_HASH_FIELDS = ("request_sha256", "body_sha256")
+
+# Response headers worth keeping (the rest is transport noise)
+RECORDED_HEADERS = ("Content-Type", "Retry-After", "Link")
+
+REDACTED_FIELDS = ("access_token", "refresh_token", "id_token")
+
+
+class CassetteMissError(RuntimeError):
+    """Raised in replay mode when a call has no recorded interaction."""
+
+
+def sha256_hex(data) -> Optional[str]:
+    """SHA-256 of bytes or str, or None."""
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _split_url(url: str, params=None):
+    """Normalize a URL and its params into (url without query, {param: value})."""
+    parts = urlsplit(url)
+    merged = dict(parse_qsl(parts.query, keep_blank_values=True))
+    for key, value in (params or {}).items():
+        if value is None:
+            continue
+        merged[str(key)] = ",".join(map(str, value)) if isinstance(value, (list, tuple)) else str(value)
+    base = urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+    return base, merged
+
+
+def _body_hash(kwargs: Dict) -> Optional[str]:
+    if kwargs.get("json") is not None:
+        return sha256_hex(json.dumps(kwargs["json"], sort_keys=True, default=str))
+    data = kwargs.get("data")
+    if data is None:
+        return None
+    if isinstance(data, dict):
+        return sha256_hex(json.dumps(data, sort_keys=True, default=str))
+    return sha256_hex(data)
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return {k: ("cassette-redacted" if k in REDACTED_FIELDS else _redact(v)) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+def encode_body(content: bytes, content_type: str = "") -> Dict[str, Any]:
+    """Store JSON bodies readably and anything else as base64."""
+    if "json" in (content_type or "").lower():
+        try:
+            return {"json": _redact(json.loads(content))}
+        except ValueError:
+            pass
+    return {"base64": base64.b64encode(content).decode("ascii")}
+
+
+def decode_body(response: Dict[str, Any]) -> bytes:
+    if "json" in response:
+        return json.dumps(response["json"]).encode("utf-8")
+    if "text" in response:
+        return response["text"].encode("utf-8")
+    return base64.b64decode(response.get("base64", ""))
+
+
+def build_http_response(recorded: Dict[str, Any], method: str, url: str) -> requests.Response:
+    """Turn a recorded HTTP response into a requests.Response."""
+    response = requests.Response()
+    response.status_code = recorded.get("status", 200)
+    response.reason = http.client.responses.get(response.status_code, "")
+    response.headers = CaseInsensitiveDict(recorded.get("headers") or {})
+    if "json" in recorded:
+        response.headers.setdefault("Content-Type", "application/json")
+    response._content = decode_body(recorded)
+    response.encoding = "utf-8"
+    response.url = url
+    response.request = requests.Request(method, url).prepare()
+    return response
+
+
+def parse_latency_ms(value: str) -> Dict[str, float]:
+    """
+    Parse "llm=1500,http=40,lab_extraction=4000" (milliseconds) into seconds per key.
+
+    A bare number applies to both llm and http.
+    """
+    latencies = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "=" in item:
+            key, ms = item.split("=", 1)
+            latencies[key.strip()] = float(ms) / 1000.0
+        else:
+            latencies["llm"] = latencies["http"] = float(item) / 1000.0
+    return latencies
+
+
+class Cassette:
+    """
+    Thread-safe set of recorded interactions with record and replay modes.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        mode: str = "replay",
+        match: str = "loose",
+        latency: Optional[Dict[str, float]] = None,
+        latency_scale: float = 0.0,
+        interactions: Optional[List[Dict]] = None
+    ):
+        """
+        Initialize cassette.
+
+        Args:
+            path: Cassette file (loaded if it exists; written by save())
+            mode: "record" or "replay"
+            match: "loose" or "strict" (see module docstring)
+            latency: Injected replay latency in seconds per label or kind ("llm", "http")
+            latency_scale: Factor applied to recorded latencies when no latency is configured
+            interactions: Interactions to start with instead of loading path
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.match = match
+        self.latency = latency or {}
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._stats = {
+            "llm_replayed": 0,
+            "http_replayed": 0,
+            "loose_matches": 0,
+            "misses": 0,
+            "recorded": 0,
+            "injected_latency_seconds": 0.0,
+        }
+        if interactions is None and path and os.path.exists(path):
+            with open(path, "r") as f:
+                interactions = json.load(f).get("interactions", [])
+        self._interactions: List[Dict] = list(interactions or [])
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    # ------------------------------------------------------------------
+    # Matching
+    # ------------------------------------------------------------------
+
+    def _find(self, kind: str, request: Dict[str, Any]) -> Optional[Dict]:
+        best, best_score, best_exact = None, -1, False
+        with self._lock:
+            interactions = [i for i in self._interactions if i.get("kind") == kind]
+        for interaction in interactions:
+            score, exact = 0, True
+            for field, expected in interaction.get("match", {}).items():
+                actual = request.get(field)
+                if field == "params":
+                    if any(actual.get(k) != v for k, v in expected.items()):
+                        break
+                    score += len(expected)
+                elif actual != expected:
+                    if field in REQUEST_HASH_FIELDS and self.match != "strict":
+                        exact = False
+                        continue
+                    break
+                else:
+                    score += 1
+            else:
+                if score > best_score:
+                    best, best_score, best_exact = interaction, score, exact
+        if best is not None and not best_exact:
+            self._count(loose_matches=1)
+        return best
+
+    def _count(self, **values):
+        with self._lock:
+            for name, value in values.items():
+                self._stats[name] += value
+
+    def _replay_delay(self, kind: str, label: Optional[str], recorded_latency: float):
+        if label and label in self.latency:
+            delay = self.latency[label]
+        elif kind in self.latency:
+            delay = self.latency[kind]
+        else:
+            delay = recorded_latency * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+            self._count(injected_latency_seconds=delay)
+
+    def add(self, interaction: Dict):
+        """Add an interaction (recorded or hand-built)."""
+        with self._lock:
+            self._interactions.append(interaction)
+            self._dirty = True
+
+    # ------------------------------------------------------------------
+    # Gemini
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def llm_request(
+        parts: List[Any],
+        model: str,
+        generation_config: Optional[Dict[str, Any]],
+        pdf_bytes: Optional[bytes],
+        system_instruction: Optional[str],
+        label: Optional[str]
+    ) -> Dict[str, Any]:
+        """Describe a Gemini call for matching."""
+        payload = json.dumps({
+            "parts": [part if isinstance(part, str) else repr(part) for part in parts],
+            "model": model,
+            "generation_config": generation_config or {},
+            "system_instruction": system_instruction,
+            "document_sha256": sha256_hex(pdf_bytes),
+        }, sort_keys=True, default=str)
+        return {
+            "label": label,
+            "model": model,
+            "document_sha256": sha256_hex(pdf_bytes),
+            "request_sha256": sha256_hex(payload),
+        }
+
+    def replay_llm(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Recorded response for a Gemini call (after the injected latency).
+
+        Returns:
+            Dict with "text" and optional "usage" (prompt/candidates/total token counts)
+
+        Raises:
+            CassetteMissError: If nothing matches
+        """
+        interaction = self._find("llm", request)
+        if interaction is None:
+            self._count(misses=1)
+            raise CassetteMissError(
+                f"No recorded Gemini response for label={request.get('label')} "
+                f"document={str(request.get('document_sha256'))[:12]} in {self.path}"
+            )
+        self._replay_delay("llm", request.get("label"), interaction.get("latency_seconds", 0.0))
+        self._count(llm_replayed=1)
+        return interaction["response"]
+
+    def record_llm(self, request: Dict[str, Any], response, latency: float):
+        """Record a live Gemini response."""
+        try:
+            text = response.text
+        except (AttributeError, ValueError):
+            text = None
+        usage = getattr(response, "usage_metadata", None)
+        self.add({
+            "kind": "llm",
+            "match": request,
+            "response": {
+                "text": text,
+                "usage": {
+                    "prompt_token_count": getattr(usage, "prompt_token_count", 0) or 0,
+                    "candidates_token_count": getattr(usage, "candidates_token_count", 0) or 0,
+                    "total_token_count": getattr(usage, "total_token_count", 0) or 0,
+                },
+            },
+            "latency_seconds": round(latency, 3),
+        })
+        self._count(recorded=1)
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    def http_request(self, send: Callable, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send (record mode) or replay (replay mode) an HTTP request.
+
+        Args:
+            send: The real Session.request
+            method: HTTP method
+            url: Request URL
+            **kwargs: Session.request keyword arguments
+
+        Returns:
+            requests.Response
+        """
+        base, params = _split_url(url, kwargs.get("params"))
+        request = {"method": method.upper(), "url": base, "params": params, "body_sha256": _body_hash(kwargs)}
+
+        if self.recording:
+            started = time.perf_counter()
+            response = send(method, url, **kwargs)
+            recorded = {"status": response.status_code}
+            recorded.update(encode_body(response.content, response.headers.get("Content-Type", "")))
+            headers = {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}
+            if headers:
+                recorded["headers"] = headers
+            self.add({
+                "kind": "http",
+                "match": {key: value for key, value in request.items() if value is not None},
+                "response": recorded,
+                "latency_seconds": round(time.perf_counter() - started, 3),
+            })
+            self._count(recorded=1)
+            return response
+
+        interaction = self._find("http", request)
+        if interaction is None:
+            self._count(misses=1)
+            raise CassetteMissError(f"No recorded HTTP response for {method.upper()} {base} {params} in {self.path}")
+        self._replay_delay("http", None, interaction.get("latency_seconds", 0.0))
+        self._count(http_replayed=1)
+        return build_http_response(interaction["response"], method.upper(), url)
+
+    # ------------------------------------------------------------------
+
+    def save(self, path: Optional[str] = None):
+        """Write the cassette to path (default: the cassette's own path)."""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            interactions = list(self._interactions)
+            self._dirty = False
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": CASSETTE_VERSION, "interactions": interactions}, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def save_if_dirty(self):
+        if self._dirty:
+            self.save()
+
+    def get_stats(self) -> Dict:
+        """Get replay/record statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["interactions"] = len(self._interactions)
+        stats["mode"] = self.mode
+        stats["injected_latency_seconds"] = round(stats["injected_latency_seconds"], 3)
+        return stats
+
+
+# Global cassette instance
+_cassette_instance = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """
+    Get the global cassette (singleton pattern).
+
+    Returns:
+        Cassette instance, or None if CASSETTE_MODE is off
+    """
+    global _cassette_instance, _cassette_loaded
+    if _cassette_loaded:
+        return _cassette_instance
+    with _cassette_lock:
+        if not _cassette_loaded:
+            mode = os.environ.get("CASSETTE_MODE", "off").lower()
+            if mode in ("record", "replay"):
+                path = os.environ.get("CASSETTE_PATH") or os.path.join(
+                    os.path.dirname(os.path.abspath(__file__)), "cassettes", "default.json"
+                )
+                _cassette_instance = Cassette(
+                    path,
+                    mode=mode,
+                    match=os.environ.get("CASSETTE_MATCH", "loose").lower(),
+                    latency=parse_latency_ms(os.environ.get("CASSETTE_LATENCY_MS", "")),
+                    latency_scale=float(os.environ.get("CASSETTE_LATENCY_SCALE", 0)),
+                )
+                if _cassette_instance.recording:
+                    atexit.register(_cassette_instance.save_if_dirty)
+            _cassette_loaded = True
+        return _cassette_instance
+
+
+def set_cassette(cassette: Optional[Cassette]):
+    """Install a cassette (or None to turn record/replay off), overriding CASSETTE_MODE."""
+    global _cassette_instance, _cassette_loaded
+    with _cassette_lock:
+        _cassette_instance = cassette
+        _cassette_loaded = True
@@ -0,0 +1,705 @@
+"""
+Shared Eligibility Computation Progress and Lease Store
+
+Computation progress used to live in a per-process dictionary on DataPool,
+and the "is a computation running?" check in app.py looked at a per-process
+dictionary of threads. With more than one Cloud Run instance, a progress poll
+that landed on another instance reported "not_started" or "stale", and a
+second instance happily started a duplicate computation.
+
+This module keeps both in a store every instance can see:
+- Progress records (status + counters), updated with atomic increments.
+- Leases: a computation holds a lease on its key while it runs and renews it
+  with a heartbeat. Another instance can only start the same computation once
+  the lease is released or has expired (the holder died).
+
+Backends:
+- FirestoreComputationStore: used when Firestore is available (shared across
+  instances). Increments use firestore.Increment; leases use transactions.
+- SQLiteComputationStore: fallback on the data pool SQLite file in WAL mode.
+  Shared by processes on one host, so it covers local multi-worker runs.
+
+Progress writes are coalesced by ComputationProgressTracker: increments are
+buffered in process and flushed every N trials or T seconds (and always on
+completion), so progress tracking adds a handful of writes per computation
+instead of one per trial. Reads on the computing instance include the
+unflushed deltas.
+
+Configuration (environment variables):
+- COMPUTATION_STORE: "firestore", "sqlite" or unset (auto: Firestore if available)
+- COMPUTATION_PROGRESS_FLUSH_EVERY: trials buffered before a write (default: 10)
+- COMPUTATION_PROGRESS_FLUSH_SECONDS: max age of buffered progress (default: 2)
+- COMPUTATION_LEASE_SECONDS: lease lifetime without a heartbeat (default: 60)
+- COMPUTATION_HEARTBEAT_SECONDS: lease renewal interval (default: 15)
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def progress_key(patient_mrn: str, db_type: str = None) -> str:
+    """Store key for a patient's computation progress."""
+    return f"{db_type or 'demo'}:{patient_mrn}"
+
+
+def ingest_lease_key(patient_mrn: str, db_type: str = None) -> str:
+    """Lease key held by the instance running a patient's ingest job."""
+    return f"ingest:{progress_key(patient_mrn, db_type)}"
+
+
+def _new_progress(patient_mrn: str, db_type: Optional[str], trials_total: int) -> Dict[str, Any]:
+    now = datetime.now().isoformat()
+    return {
+        "patient_mrn": patient_mrn,
+        "db_type": db_type,
+        "status": "computing",
+        "trials_total": trials_total,
+        "trials_completed": 0,
+        "trials_eligible": 0,
+        "trials_error": 0,
+        "started_at": now,
+        "updated_at": now,
+        "completed_at": None,
+        "error_message": None,
+    }
+
+
+class SQLiteComputationStore:
+    """
+    Progress and lease store on a SQLite file (WAL mode).
+    """
+
+    PROGRESS_COLUMNS = (
+        "patient_mrn", "db_type", "status", "trials_total", "trials_completed",
+        "trials_eligible", "trials_error", "started_at", "updated_at",
+        "completed_at", "error_message",
+    )
+
+    def __init__(self, db_path: str):
+        """
+        Initialize SQLite store.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS computation_progress_shared (
+                    progress_key TEXT PRIMARY KEY,
+                    patient_mrn TEXT NOT NULL,
+                    db_type TEXT,
+                    status TEXT NOT NULL DEFAULT 'computing',
+                    trials_total INTEGER NOT NULL DEFAULT 0,
+                    trials_completed INTEGER NOT NULL DEFAULT 0,
+                    trials_eligible INTEGER NOT NULL DEFAULT 0,
+                    trials_error INTEGER NOT NULL DEFAULT 0,
+                    started_at TIMESTAMP,
+                    updated_at TIMESTAMP,
+                    completed_at TIMESTAMP,
+                    error_message TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS computation_leases (
+                    lease_key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    acquired_at REAL NOT NULL,
+                    heartbeat_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def start(self, key: str, record: Dict[str, Any]):
+        """Create or reset the progress record for key."""
+        conn = self._connect()
+        try:
+            conn.execute(f"""
+                INSERT OR REPLACE INTO computation_progress_shared
+                (progress_key, {", ".join(self.PROGRESS_COLUMNS)})
+                VALUES (?, {", ".join("?" for _ in self.PROGRESS_COLUMNS)})
+            """, (key, *[record[column] for column in self.PROGRESS_COLUMNS]))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def add_progress(self, key: str, completed: int, eligible: int, error: int):
+        """Atomically add to the counters of a running computation."""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                UPDATE computation_progress_shared
+                SET trials_completed = trials_completed + ?,
+                    trials_eligible = trials_eligible + ?,
+                    trials_error = trials_error + ?,
+                    updated_at = ?
+                WHERE progress_key = ? AND status = 'computing'
+            """, (completed, eligible, error, datetime.now().isoformat(), key))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def complete(self, key: str, error_message: str = None) -> bool:
+        """Mark a computation completed or errored. Returns False if there is no record."""
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        try:
+            cursor = conn.execute("""
+                UPDATE computation_progress_shared
+                SET status = ?, completed_at = ?, updated_at = ?,
+                    error_message = COALESCE(?, error_message)
+                WHERE progress_key = ?
+            """, ("error" if error_message else "completed", now, now, error_message, key))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get the progress record for key, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute(f"""
+                SELECT {", ".join(self.PROGRESS_COLUMNS)}
+                FROM computation_progress_shared WHERE progress_key = ?
+            """, (key,)).fetchone()
+        finally:
+            conn.close()
+        return dict(zip(self.PROGRESS_COLUMNS, row)) if row else None
+
+    def acquire_lease(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        """Take the lease on key if it is free, expired, or already ours."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute("""
+                INSERT INTO computation_leases (lease_key, owner, acquired_at, heartbeat_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(lease_key) DO UPDATE SET
+                    owner = excluded.owner,
+                    acquired_at = excluded.acquired_at,
+                    heartbeat_at = excluded.heartbeat_at,
+                    expires_at = excluded.expires_at
+                WHERE computation_leases.expires_at < ? OR computation_leases.owner = excluded.owner
+            """, (key, owner, now, now, now + ttl_seconds, now))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def renew_lease(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        """Extend our lease on key. Returns False if it is no longer ours."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute("""
+                UPDATE computation_leases SET heartbeat_at = ?, expires_at = ?
+                WHERE lease_key = ? AND owner = ?
+            """, (now, now + ttl_seconds, key, owner))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def release_lease(self, key: str, owner: str):
+        """Drop our lease on key (no-op if another owner holds it)."""
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM computation_leases WHERE lease_key = ? AND owner = ?", (key, owner))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_lease(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get the unexpired lease on key, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute("""
+                SELECT owner, heartbeat_at, expires_at FROM computation_leases
+                WHERE lease_key = ? AND expires_at >= ?
+            """, (key, time.time())).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        return {"owner": row[0], "heartbeat_at": row[1], "expires_at": row[2]}
+
+
+class FirestoreComputationStore:
+    """
+    Progress and lease store on Firestore (shared by all instances).
+    """
+
+    PROGRESS_COLLECTION = "computation_progress"
+    LEASE_COLLECTION = "computation_leases"
+
+    def __init__(self, client):
+        """
+        Initialize Firestore store.
+
+        Args:
+            client: google.cloud.firestore.Client
+        """
+        from google.cloud import firestore
+        self._firestore_module = firestore
+        self._client = client
+
+    def _progress_ref(self, key: str):
+        return self._client.collection(self.PROGRESS_COLLECTION).document(key)
+
+    def _lease_ref(self, key: str):
+        return self._client.collection(self.LEASE_COLLECTION).document(key)
+
+    def start(self, key: str, record: Dict[str, Any]):
+        """Create or reset the progress record for key."""
+        self._progress_ref(key).set(record)
+
+    def add_progress(self, key: str, completed: int, eligible: int, error: int):
+        """Atomically add to the counters of a running computation."""
+        increment = self._firestore_module.Increment
+        self._progress_ref(key).update({
+            "trials_completed": increment(completed),
+            "trials_eligible": increment(eligible),
+            "trials_error": increment(error),
+            "updated_at": datetime.now().isoformat(),
+        })
+
+    def complete(self, key: str, error_message: str = None) -> bool:
+        """Mark a computation completed or errored. Returns False if there is no record."""
+        ref = self._progress_ref(key)
+        if not ref.get().exists:
+            return False
+        now = datetime.now().isoformat()
+        update = {
+            "status": "error" if error_message else "completed",
+            "completed_at": now,
+            "updated_at": now,
+        }
+        if error_message:
+            update["error_message"] = error_message
+        ref.update(update)
+        return True
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get the progress record for key, or None."""
+        snapshot = self._progress_ref(key).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def _lease_transaction(self, key: str, decide: Callable[[Optional[Dict[str, Any]], float], Optional[Dict[str, Any]]]) -> bool:
+        """Read the lease in a transaction and write decide(current, now) unless it returns None."""
+        firestore = self._firestore_module
+        ref = self._lease_ref(key)
+
+        @firestore.transactional
+        def _run(transaction):
+            snapshot = ref.get(transaction=transaction)
+            current = snapshot.to_dict() if snapshot.exists else None
+            new_value = decide(current, time.time())
+            if new_value is None:
+                return False
+            transaction.set(ref, new_value)
+            return True
+
+        return _run(self._client.transaction())
+
+    def acquire_lease(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        """Take the lease on key if it is free, expired, or already ours."""
+        def decide(current, now):
+            if current and current.get("owner") != owner and current.get("expires_at", 0) >= now:
+                return None
+            return {"owner": owner, "acquired_at": now, "heartbeat_at": now, "expires_at": now + ttl_seconds}
+        return self._lease_transaction(key, decide)
+
+    def renew_lease(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        """Extend our lease on key. Returns False if it is no longer ours."""
+        def decide(current, now):
+            if not current or current.get("owner") != owner:
+                return None
+            return dict(current, heartbeat_at=now, expires_at=now + ttl_seconds)
+        return self._lease_transaction(key, decide)
+
+    def release_lease(self, key: str, owner: str):
+        """Drop our lease on key (no-op if another owner holds it)."""
+        firestore = self._firestore_module
+        ref = self._lease_ref(key)
+
+        @firestore.transactional
+        def _run(transaction):
+            snapshot = ref.get(transaction=transaction)
+            if snapshot.exists and snapshot.to_dict().get("owner") == owner:
+                transaction.delete(ref)
+
+        _run(self._client.transaction())
+
+    def get_lease(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get the unexpired lease on key, or None."""
+        snapshot = self._lease_ref(key).get()
+        if not snapshot.exists:
+            return None
+        lease = snapshot.to_dict()
+        if lease.get("expires_at", 0) < time.time():
+            return None
+        return {"owner": lease.get("owner"), "heartbeat_at": lease.get("heartbeat_at"),
+                "expires_at": lease.get("expires_at")}
+
+
+def create_computation_store(firestore_client=None, db_path: str = None):
+    """
+    Create the computation store for this deployment.
+
+    Args:
+        firestore_client: Firestore client, or None if unavailable
+        db_path: SQLite file used when Firestore is not used
+
+    Returns:
+        FirestoreComputationStore or SQLiteComputationStore
+    """
+    backend = os.environ.get("COMPUTATION_STORE", "").lower()
+    if firestore_client is not None and backend != "sqlite":
+        try:
+            return FirestoreComputationStore(firestore_client)
+        except Exception as e:
+            logger.warning(f"[ComputationStore] Firestore store unavailable, using SQLite: {e}")
+    return SQLiteComputationStore(db_path)
+
+
+class ComputationProgressTracker:
+    """
+    Coalesces per-trial progress increments into periodic store writes.
+
+    Increments are written every flush_every trials, and a background flusher
+    writes any that are flush_seconds old, so other instances and SSE followers
+    see progress while a slow trial runs.
+    """
+
+    def __init__(self, store, flush_every: int = 10, flush_seconds: float = 2.0):
+        """
+        Initialize progress tracker.
+
+        Args:
+            store: SQLiteComputationStore or FirestoreComputationStore
+            flush_every: Buffered trials that trigger a write
+            flush_seconds: Maximum age of buffered increments before a write
+        """
+        self.store = store
+        self.flush_every = max(1, flush_every)
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        # key -> {"completed", "eligible", "error", "since"}
+        self._pending: Dict[str, Dict[str, float]] = {}
+        self._flusher_thread: Optional[threading.Thread] = None
+        self._stats = {"increments": 0, "writes": 0, "timed_flushes": 0}
+
+    def start(self, patient_mrn: str, trials_total: int, db_type: str = None):
+        """Create (or reset) the progress record for a patient."""
+        key = progress_key(patient_mrn, db_type)
+        with self._lock:
+            self._pending.pop(key, None)
+        self.store.start(key, _new_progress(patient_mrn, db_type, trials_total))
+        with self._lock:
+            self._stats["writes"] += 1
+
+    def increment(self, patient_mrn: str, is_eligible: bool = False, is_error: bool = False,
+                  db_type: str = None):
+        """Record one finished trial; writes only when the buffer is due."""
+        key = progress_key(patient_mrn, db_type)
+        now = time.monotonic()
+        with self._lock:
+            self._stats["increments"] += 1
+            pending = self._pending.setdefault(key, {"completed": 0, "eligible": 0, "error": 0, "since": now})
+            pending["completed"] += 1
+            pending["eligible"] += 1 if is_eligible else 0
+            pending["error"] += 1 if is_error else 0
+            due = pending["completed"] >= self.flush_every or now - pending["since"] >= self.flush_seconds
+        if due:
+            self.flush(patient_mrn, db_type)
+        else:
+            self._ensure_flusher()
+
+    def flush(self, patient_mrn: str, db_type: str = None):
+        """Write buffered increments for a patient now."""
+        self._flush_key(progress_key(patient_mrn, db_type))
+
+    def _flush_key(self, key: str):
+        with self._lock:
+            pending = self._pending.pop(key, None)
+        if not pending or not pending["completed"]:
+            return
+        try:
+            self.store.add_progress(key, int(pending["completed"]), int(pending["eligible"]), int(pending["error"]))
+            with self._lock:
+                self._stats["writes"] += 1
+        except Exception:
+            # Put the deltas back so the next flush retries them
+            with self._lock:
+                current = self._pending.setdefault(key, {"completed": 0, "eligible": 0, "error": 0, "since": pending["since"]})
+                for field in ("completed", "eligible", "error"):
+                    current[field] += pending[field]
+            raise
+
+    def _ensure_flusher(self):
+        with self._lock:
+            if self._flusher_thread is not None and self._flusher_thread.is_alive():
+                return
+            self._flusher_thread = threading.Thread(
+                target=self._flush_loop, daemon=True, name="progress-flusher"
+            )
+            self._flusher_thread.start()
+
+    def _flush_loop(self):
+        failed = False
+        while True:
+            with self._lock:
+                if not self._pending:
+                    # Decided under the lock, so the next increment() sees no
+                    # flusher thread and starts a new one
+                    self._flusher_thread = None
+                    return
+                oldest = min(pending["since"] for pending in self._pending.values())
+            # Re-queued deltas keep their age; don't retry a failing store at once
+            wait = self.flush_seconds if failed else oldest + self.flush_seconds - time.monotonic()
+            time.sleep(max(0.05, wait))
+            failed = False
+            now = time.monotonic()
+            with self._lock:
+                due = [key for key, pending in self._pending.items()
+                       if now - pending["since"] >= self.flush_seconds]
+            for key in due:
+                try:
+                    self._flush_key(key)
+                    with self._lock:
+                        self._stats["timed_flushes"] += 1
+                except Exception as e:
+                    failed = True
+                    logger.warning(f"[ComputationProgressTracker] Progress flush failed for {key}: {e}")
+
+    def complete(self, patient_mrn: str, error_message: str = None, db_type: str = None) -> bool:
+        """Flush buffered increments and mark the computation finished."""
+        self.flush(patient_mrn, db_type)
+        completed = self.store.complete(progress_key(patient_mrn, db_type), error_message=error_message)
+        with self._lock:
+            self._stats["writes"] += 1
+        return completed
+
+    def get(self, patient_mrn: str, db_type: str = None) -> Optional[Dict[str, Any]]:
+        """Stored progress plus this instance's unflushed increments."""
+        key = progress_key(patient_mrn, db_type)
+        progress = self.store.get(key)
+        if progress is None:
+            return None
+        with self._lock:
+            pending = dict(self._pending.get(key) or {})
+        if pending and progress.get("status") == "computing":
+            progress["trials_completed"] += int(pending["completed"])
+            progress["trials_eligible"] += int(pending["eligible"])
+            progress["trials_error"] += int(pending["error"])
+        return progress
+
+    def get_stats(self) -> Dict:
+        """Get write-coalescing statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending_keys"] = len(self._pending)
+            return stats
+
+
+class ComputationRegistry:
+    """
+    Runs background computations under a store lease, renewed by a heartbeat.
+
+    Replaces the per-process mrn -> Thread dictionary: a key is "active" while
+    any instance holds an unexpired lease on it.
+    """
+
+    def __init__(self, store, lease_seconds: float = 60, heartbeat_seconds: float = 15,
+                 owner: str = None):
+        """
+        Initialize registry.
+
+        Args:
+            store: SQLiteComputationStore or FirestoreComputationStore
+            lease_seconds: Lease lifetime without a heartbeat
+            heartbeat_seconds: How often held leases are renewed
+            owner: Lease owner id (default: hostname-pid-random)
+        """
+        self.store = store
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._threads: Dict[str, threading.Thread] = {}
+        # Leases taken with hold() for work that is not a registry thread: key → hold count
+        self._held: Dict[str, int] = {}
+        # Orders the store acquire / release of held keys against each other
+        self._hold_lock = threading.Lock()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._stats = {"started": 0, "rejected": 0, "heartbeats": 0, "lost_leases": 0}
+
+    def start(self, key: str, target: Callable, *args, **kwargs) -> Optional[threading.Thread]:
+        """
+        Start target(*args, **kwargs) in a daemon thread if no instance is running key.
+
+        Args:
+            key: Computation key (e.g. the patient MRN)
+            target: Function to run
+
+        Returns:
+            The started thread, or None if the computation is already running
+        """
+        with self._lock:
+            if key in self._threads:
+                self._stats["rejected"] += 1
+                return None
+
+        if not self.store.acquire_lease(key, self.owner, self.lease_seconds):
+            with self._lock:
+                self._stats["rejected"] += 1
+            logger.info(f"[ComputationRegistry] {key} is already running on another instance")
+            return None
+
+        def run():
+            try:
+                target(*args, **kwargs)
+            finally:
+                with self._lock:
+                    if self._threads.get(key) is threading.current_thread():
+                        del self._threads[key]
+                try:
+                    self.store.release_lease(key, self.owner)
+                except Exception as e:
+                    logger.warning(f"[ComputationRegistry] Could not release lease for {key}: {e}")
+
+        thread = threading.Thread(target=run, daemon=True, name=f"computation-{key}")
+        with self._lock:
+            self._threads[key] = thread
+            self._stats["started"] += 1
+        thread.start()
+        self._ensure_heartbeat()
+        return thread
+
+    def hold(self, key: str) -> bool:
+        """
+        Take the lease on key for work that is not a registry thread (e.g. an asyncio task).
+
+        The heartbeat renews the lease until every hold() on key is matched
+        by a release(key).
+
+        Args:
+            key: Lease key (e.g. ingest_lease_key(mrn, db_type))
+
+        Returns:
+            True if the lease is now ours, False if another instance holds it
+        """
+        with self._hold_lock:
+            if not self.store.acquire_lease(key, self.owner, self.lease_seconds):
+                with self._lock:
+                    self._stats["rejected"] += 1
+                logger.info(f"[ComputationRegistry] {key} is already held by another instance")
+                return False
+            with self._lock:
+                self._held[key] = self._held.get(key, 0) + 1
+                self._stats["started"] += 1
+        self._ensure_heartbeat()
+        return True
+
+    def release(self, key: str):
+        """Match one hold(key); the lease is dropped when the last hold is released."""
+        with self._hold_lock:
+            with self._lock:
+                count = self._held.get(key, 0)
+                if count > 1:
+                    self._held[key] = count - 1
+                    return
+                if self._held.pop(key, None) is None:
+                    return
+            try:
+                self.store.release_lease(key, self.owner)
+            except Exception as e:
+                logger.warning(f"[ComputationRegistry] Could not release lease for {key}: {e}")
+
+    def is_active(self, key: str) -> bool:
+        """True if this or any other instance is running key."""
+        if self.is_local(key):
+            return True
+        try:
+            return self.store.get_lease(key) is not None
+        except Exception as e:
+            logger.warning(f"[ComputationRegistry] Lease lookup failed for {key}: {e}")
+            return False
+
+    def lease_holder(self, key: str) -> Optional[str]:
+        """Owner (instance id) of the unexpired lease on key, or None."""
+        if self.is_local(key):
+            return self.owner
+        try:
+            lease = self.store.get_lease(key)
+        except Exception as e:
+            logger.warning(f"[ComputationRegistry] Lease lookup failed for {key}: {e}")
+            return None
+        return lease["owner"] if lease else None
+
+    def is_local(self, key: str) -> bool:
+        """True if key is running on this instance (a registry thread or a hold())."""
+        with self._lock:
+            return key in self._held or key in self._threads
+
+    def _ensure_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_thread is not None and self._heartbeat_thread.is_alive():
+                return
+            self._heartbeat_thread = threading.Thread(
+                target=self._heartbeat_loop, daemon=True, name="computation-heartbeat"
+            )
+            self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            # A key stays in _threads from start() until its thread finishes, so
+            # a thread that has not started yet is still renewed
+            with self._lock:
+                keys = list(self._threads) + list(self._held)
+                if not keys:
+                    # Decided under the lock, so the next start() / hold() sees
+                    # no heartbeat thread and starts a new one
+                    self._heartbeat_thread = None
+                    return
+            for key in keys:
+                try:
+                    renewed = self.store.renew_lease(key, self.owner, self.lease_seconds)
+                except Exception as e:
+                    logger.warning(f"[ComputationRegistry] Heartbeat failed for {key}: {e}")
+                    continue
+                with self._lock:
+                    if renewed:
+                        self._stats["heartbeats"] += 1
+                    else:
+                        self._stats["lost_leases"] += 1
+                if not renewed:
+                    logger.warning(f"[ComputationRegistry] Lost lease for {key}")
+
+    def get_stats(self) -> Dict:
+        """Get registry statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["running"] = len(self._threads)
+            stats["held"] = len(self._held)
+            stats["owner"] = self.owner
+            return stats
@@ -15,11 +15,36 @@ from typing import Optional, List, Dict
 from pathlib import Path
 import os
 
+try:
+    from Backend.computation_store import (
+        ComputationProgressTracker,
+        create_computation_store,
+        ingest_lease_key,
+        progress_key,
+    )
+except ModuleNotFoundError:
+    from computation_store import (
+        ComputationProgressTracker,
+        create_computation_store,
+        ingest_lease_key,
+        progress_key,
+    )
+
 logger = logging.getLogger(__name__)
 
 
+def _json_default_without_bytes(value):
+    """json.dumps default: drop raw bytes, stringify anything else unknown."""
+    if isinstance(value, (bytes, bytearray)):
+        return None
+    return str(value)
+
+
 def _get_firestore_client():
-    """Get a Firestore client, or None if unavailable."""
+    """Get a Firestore client, or None if unavailable or disabled (FIRESTORE_ENABLED=false)."""
+    if os.environ.get("FIRESTORE_ENABLED", "true").lower() == "false":
+        logger.info("[DataPool] Firestore disabled by FIRESTORE_ENABLED=false")
+        return None
     try:
         from google.cloud import firestore
         project = os.environ.get("GCP_PROJECT_ID", "rapids-platform")
@@ -37,7 +62,7 @@ class DataPool:
     Eligibility results → Firestore (permanent, survives deploys)
     Patient review tokens → Firestore (permanent, survives deploys)
     Trials cache → Firestore (permanent, survives deploys)
-    Computation progress → In-memory cache (ephemeral, per-instance)
+    Computation progress + leases → Firestore, or SQLite (WAL) without Firestore
     Sync logs → SQLite (ephemeral, operational)
     """
 
@@ -82,8 +107,13 @@ class DataPool:
         self.db_path = str(db_path)
         self.init_database()
 
-        # In-memory computation progress tracking (ephemeral)
-        self._computation_progress: Dict[str, Dict] = {}
+        # Computation progress and leases, shared across instances
+        self.computation_store = create_computation_store(self._firestore, self.db_path)
+        self.computation_progress = ComputationProgressTracker(
+            self.computation_store,
+            flush_every=int(os.environ.get("COMPUTATION_PROGRESS_FLUSH_EVERY", 10)),
+            flush_seconds=float(os.environ.get("COMPUTATION_PROGRESS_FLUSH_SECONDS", 2)),
+        )
 
         # One-time migration: copy patients from SQLite → Firestore
         if self._firestore:
@@ -260,21 +290,30 @@ class DataPool:
             )
         """)
 
-        # Create computation progress table - tracks per-patient eligibility computation
+        # Create ingest jobs table - tracks asynchronous /api/jobs/ingest runs
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS computation_progress (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            CREATE TABLE IF NOT EXISTS ingest_jobs (
+                job_id TEXT PRIMARY KEY,
                 patient_mrn TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'computing',
-                trials_total INTEGER NOT NULL DEFAULT 0,
-                trials_completed INTEGER NOT NULL DEFAULT 0,
-                trials_eligible INTEGER NOT NULL DEFAULT 0,
-                trials_error INTEGER NOT NULL DEFAULT 0,
-                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                db_type TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                stages TEXT NOT NULL DEFAULT '{}',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 completed_at TIMESTAMP,
-                error_message TEXT,
-                UNIQUE(patient_mrn)
+                error_message TEXT
+            )
+        """)
+
+        # Create ingest job results table - one row per finished stage of a job
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_job_results (
+                job_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                data TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (job_id, stage),
+                FOREIGN KEY (job_id) REFERENCES ingest_jobs(job_id)
             )
         """)
 
@@ -311,6 +350,9 @@ class DataPool:
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_eligibility_status ON eligibility_matrix(eligibility_status)
         """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ingest_jobs_patient ON ingest_jobs(patient_mrn, status)
+        """)
 
         conn.commit()
         conn.close()
@@ -751,7 +793,9 @@ class DataPool:
                 "detailed_description": trial_data.get("detailed_description", ""),
                 "last_updated_on_api": trial_data.get("last_updated_on_api", ""),
                 "fetched_at": datetime.now().isoformat(),
-                "is_active": trial_data.get("is_active", True)
+                "is_active": trial_data.get("is_active", True),
+                # Precomputed matching features (compute_trial_features), if provided
+                "features": trial_data.get("features")
             }
 
             # Store in Firestore using nct_id as document ID
@@ -829,7 +873,9 @@ class DataPool:
                         "detailed_description": trial.get("detailed_description", ""),
                         "last_updated_on_api": trial.get("last_updated_on_api", ""),
                         "fetched_at": datetime.now().isoformat(),
-                        "is_active": trial.get("is_active", True)
+                        "is_active": trial.get("is_active", True),
+                        # Precomputed matching features (compute_trial_features), if provided
+                        "features": trial.get("features")
                     }
 
                     # Use nct_id as document ID for easy retrieval
@@ -1179,106 +1225,214 @@ class DataPool:
 
         return stored_count
 
-    # ── Computation Progress Tracking ─────────────────────────────────────────
+    # ── Ingest Jobs ────────────────────────────────────────────────────────
 
-    def start_computation_progress(self, patient_mrn: str, trials_total: int) -> bool:
-        """Record that eligibility computation has started for a patient."""
+    INGEST_JOB_ACTIVE_STATUSES = ("queued", "running")
+
+    def create_ingest_job(self, job_id: str, patient_mrn: str, db_type: str = None) -> bool:
+        """Record a newly submitted ingest job."""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
+            now = datetime.now().isoformat()
             cursor.execute("""
-                INSERT OR REPLACE INTO computation_progress
-                (patient_mrn, status, trials_total, trials_completed,
-                 trials_eligible, trials_error, started_at, updated_at, completed_at, error_message)
-                VALUES (?, 'computing', ?, 0, 0, 0, ?, ?, NULL, NULL)
-            """, (patient_mrn, trials_total,
-                  datetime.now().isoformat(), datetime.now().isoformat()))
+                INSERT INTO ingest_jobs
+                (job_id, patient_mrn, db_type, status, stages, created_at, updated_at)
+                VALUES (?, ?, ?, 'queued', '{}', ?, ?)
+            """, (job_id, patient_mrn, db_type, now, now))
             conn.commit()
             conn.close()
             return True
         except Exception as e:
-            print(f"Error starting computation progress: {e}")
+            print(f"Error creating ingest job: {e}")
             return False
 
-    def increment_computation_progress(self, patient_mrn: str,
-                                        is_eligible: bool = False,
-                                        is_error: bool = False) -> bool:
-        """Increment progress counter after a single trial completes."""
+    def get_active_ingest_job(self, patient_mrn: str, db_type: str = None) -> Optional[Dict]:
+        """Get the queued/running ingest job for a patient, if any."""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
-            eligible_inc = 1 if is_eligible else 0
-            error_inc = 1 if is_error else 0
             cursor.execute("""
-                UPDATE computation_progress
-                SET trials_completed = trials_completed + 1,
-                    trials_eligible = trials_eligible + ?,
-                    trials_error = trials_error + ?,
-                    updated_at = ?
-                WHERE patient_mrn = ? AND status = 'computing'
-            """, (eligible_inc, error_inc, datetime.now().isoformat(), patient_mrn))
+                SELECT job_id FROM ingest_jobs
+                WHERE patient_mrn = ? AND IFNULL(db_type, 'demo') = ? AND status IN ('queued', 'running')
+                ORDER BY created_at DESC LIMIT 1
+            """, (patient_mrn, db_type or "demo"))
+            row = cursor.fetchone()
+            conn.close()
+            return self.get_ingest_job(row[0]) if row else None
+        except Exception as e:
+            print(f"Error getting active ingest job: {e}")
+            return None
+
+    def update_ingest_job_status(self, job_id: str, status: str, error_message: str = None) -> bool:
+        """Set the status of an ingest job ('running', 'completed', 'error', 'interrupted')."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            now = datetime.now().isoformat()
+            completed_at = None if status in self.INGEST_JOB_ACTIVE_STATUSES else now
+            cursor.execute("""
+                UPDATE ingest_jobs
+                SET status = ?, updated_at = ?, completed_at = ?, error_message = ?
+                WHERE job_id = ?
+            """, (status, now, completed_at, error_message, job_id))
             conn.commit()
             conn.close()
             return True
         except Exception as e:
-            print(f"Error incrementing computation progress: {e}")
+            print(f"Error updating ingest job status: {e}")
             return False
 
-    def complete_computation_progress(self, patient_mrn: str,
-                                       error_message: str = None) -> bool:
-        """Mark computation as completed or errored."""
+    def store_ingest_job_stage(self, job_id: str, stage: str, data=None,
+                               error_message: str = None, timing: Dict = None) -> bool:
+        """
+        Record one finished stage of an ingest job and store its result.
+
+        Bytes inside the result (e.g. cached PDF bytes) are not persisted.
+        """
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
-            new_status = "error" if error_message else "completed"
+            now = datetime.now().isoformat()
+            stage_info = {
+                "status": "error" if error_message else "completed",
+                "error": error_message,
+                "finished_at": now,
+            }
+            if timing:
+                stage_info.update(timing)
+            cursor.execute("""
+                INSERT OR REPLACE INTO ingest_job_results (job_id, stage, data, created_at)
+                VALUES (?, ?, ?, ?)
+            """, (job_id, stage, json.dumps(data, default=_json_default_without_bytes), now))
+            # json_set keeps the per-stage summary atomic under concurrent stage completions
             cursor.execute("""
-                UPDATE computation_progress
-                SET status = ?,
-                    completed_at = ?,
-                    updated_at = ?,
-                    error_message = ?
-                WHERE patient_mrn = ?
-            """, (new_status, datetime.now().isoformat(),
-                  datetime.now().isoformat(), error_message, patient_mrn))
+                UPDATE ingest_jobs
+                SET stages = json_set(stages, ?, json(?)), updated_at = ?
+                WHERE job_id = ?
+            """, (f'$."{stage}"', json.dumps(stage_info), now, job_id))
             conn.commit()
             conn.close()
             return True
         except Exception as e:
-            print(f"Error completing computation progress: {e}")
+            print(f"Error storing ingest job stage: {e}")
             return False
 
-    def get_computation_progress(self, patient_mrn: str):
-        """Get current computation progress for a patient."""
+    def get_ingest_job(self, job_id: str) -> Optional[Dict]:
+        """Get status and per-stage summary of an ingest job."""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT patient_mrn, status, trials_total, trials_completed,
-                       trials_eligible, trials_error, started_at, updated_at,
-                       completed_at, error_message
-                FROM computation_progress
-                WHERE patient_mrn = ?
-            """, (patient_mrn,))
+                SELECT job_id, patient_mrn, db_type, status, stages,
+                       created_at, updated_at, completed_at, error_message
+                FROM ingest_jobs
+                WHERE job_id = ?
+            """, (job_id,))
             row = cursor.fetchone()
             conn.close()
             if row:
                 return {
-                    "patient_mrn": row[0],
-                    "status": row[1],
-                    "trials_total": row[2],
-                    "trials_completed": row[3],
-                    "trials_eligible": row[4],
-                    "trials_error": row[5],
-                    "started_at": row[6],
-                    "updated_at": row[7],
-                    "completed_at": row[8],
-                    "error_message": row[9]
+                    "job_id": row[0],
+                    "patient_mrn": row[1],
+                    "db_type": row[2],
+                    "status": row[3],
+                    "stages": json.loads(row[4]) if row[4] else {},
+                    "created_at": row[5],
+                    "updated_at": row[6],
+                    "completed_at": row[7],
+                    "error_message": row[8]
                 }
             return None
         except Exception as e:
-            print(f"Error getting computation progress: {e}")
+            print(f"Error getting ingest job: {e}")
             return None
 
+    def get_ingest_job_result(self, job_id: str, stage: str):
+        """
+        Get the stored result of one stage of an ingest job.
+
+        Returns:
+            (found, data) - found is False if the stage has not finished yet
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT data FROM ingest_job_results
+                WHERE job_id = ? AND stage = ?
+            """, (job_id, stage))
+            row = cursor.fetchone()
+            conn.close()
+            if row is None:
+                return False, None
+            return True, json.loads(row[0]) if row[0] else None
+        except Exception as e:
+            print(f"Error getting ingest job result: {e}")
+            return False, None
+
+    def list_ingest_jobs(self, status: str = None, limit: int = 100) -> List[Dict]:
+        """List ingest jobs (most recent first), optionally filtered by status."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            if status:
+                cursor.execute("""
+                    SELECT job_id FROM ingest_jobs WHERE status = ?
+                    ORDER BY created_at DESC LIMIT ?
+                """, (status, limit))
+            else:
+                cursor.execute("""
+                    SELECT job_id FROM ingest_jobs ORDER BY created_at DESC LIMIT ?
+                """, (limit,))
+            job_ids = [row[0] for row in cursor.fetchall()]
+            conn.close()
+            return [job for job in (self.get_ingest_job(job_id) for job_id in job_ids) if job]
+        except Exception as e:
+            print(f"Error listing ingest jobs: {e}")
+            return []
+
+    def mark_interrupted_ingest_jobs(self) -> List[Dict]:
+        """
+        Mark jobs left queued/running by a dead process as 'interrupted'.
+
+        Called once at startup. A running job holds its ingest lease (see
+        ingest_lease_key) on the instance running it; jobs whose lease is still
+        live belong to another instance and are left alone. Stage results
+        already stored are kept, so clients can still read them and the job
+        can be resumed.
+
+        Returns:
+            The jobs that were marked interrupted
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT job_id, patient_mrn, db_type FROM ingest_jobs WHERE status IN ('queued', 'running')
+            """)
+            rows = cursor.fetchall()
+            job_ids = []
+            for job_id, patient_mrn, db_type in rows:
+                if self.computation_store.get_lease(ingest_lease_key(patient_mrn, db_type)):
+                    continue
+                cursor.execute("""
+                    UPDATE ingest_jobs
+                    SET status = 'interrupted', updated_at = ?,
+                        error_message = 'Server restarted before the job finished'
+                    WHERE job_id = ? AND status IN ('queued', 'running')
+                """, (datetime.now().isoformat(), job_id))
+                if cursor.rowcount:
+                    job_ids.append(job_id)
+            conn.commit()
+            conn.close()
+            if len(job_ids) < len(rows):
+                logger.info(f"Left {len(rows) - len(job_ids)} ingest job(s) running on other instances")
+            return [job for job in (self.get_ingest_job(job_id) for job_id in job_ids) if job]
+        except Exception as e:
+            print(f"Error marking interrupted ingest jobs: {e}")
+            return []
+
     # ── Patient Review Tokens ──────────────────────────────────────────────
 
     def create_review_token(self, token: str, patient_mrn: str, trial_nct_id: str,
@@ -1697,11 +1851,11 @@ class DataPool:
             print(f"Error getting last sync: {e}")
             return None
 
-    # ==================== COMPUTATION PROGRESS METHODS (IN-MEMORY) ====================
+    # ==================== COMPUTATION PROGRESS METHODS (SHARED STORE) ====================
 
     def start_computation_progress(self, patient_mrn: str, trials_total: int, db_type: str = None) -> bool:
         """
-        Record that eligibility computation has started for a patient (in-memory).
+        Record that eligibility computation has started for a patient.
 
         Args:
             patient_mrn: Patient MRN
@@ -1712,21 +1866,8 @@ class DataPool:
             True if successful
         """
         try:
-            key = f"{db_type or 'demo'}:{patient_mrn}"
-            self._computation_progress[key] = {
-                "patient_mrn": patient_mrn,
-                "db_type": db_type,
-                "status": "computing",
-                "trials_total": trials_total,
-                "trials_completed": 0,
-                "trials_eligible": 0,
-                "trials_error": 0,
-                "started_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat(),
-                "completed_at": None,
-                "error_message": None
-            }
-            logger.info(f"[start_computation_progress] Started tracking for {key}: {trials_total} trials")
+            self.computation_progress.start(patient_mrn, trials_total, db_type=db_type)
+            logger.info(f"[start_computation_progress] Started tracking for {progress_key(patient_mrn, db_type)}: {trials_total} trials")
             return True
         except Exception as e:
             logger.error(f"[start_computation_progress] Error: {e}")
@@ -1735,7 +1876,10 @@ class DataPool:
     def increment_computation_progress(self, patient_mrn: str, is_eligible: bool = False,
                                         is_error: bool = False, db_type: str = None) -> bool:
         """
-        Increment progress counter after a single trial completes (in-memory).
+        Increment progress counter after a single trial completes.
+
+        Increments are buffered and written every few trials or seconds
+        (see ComputationProgressTracker).
 
         Args:
             patient_mrn: Patient MRN
@@ -1747,19 +1891,8 @@ class DataPool:
             True if successful
         """
         try:
-            key = f"{db_type or 'demo'}:{patient_mrn}"
-            if key not in self._computation_progress:
-                logger.warning(f"[increment_computation_progress] No progress record for {key}")
-                return False
-
-            progress = self._computation_progress[key]
-            progress["trials_completed"] += 1
-            if is_eligible:
-                progress["trials_eligible"] += 1
-            if is_error:
-                progress["trials_error"] += 1
-            progress["updated_at"] = datetime.now().isoformat()
-
+            self.computation_progress.increment(patient_mrn, is_eligible=is_eligible,
+                                                is_error=is_error, db_type=db_type)
             return True
         except Exception as e:
             logger.error(f"[increment_computation_progress] Error: {e}")
@@ -1768,7 +1901,7 @@ class DataPool:
     def complete_computation_progress(self, patient_mrn: str, error_message: str = None,
                                        db_type: str = None) -> bool:
         """
-        Mark computation as completed or errored (in-memory).
+        Mark computation as completed or errored.
 
         Args:
             patient_mrn: Patient MRN
@@ -1779,19 +1912,12 @@ class DataPool:
             True if successful
         """
         try:
-            key = f"{db_type or 'demo'}:{patient_mrn}"
-            if key not in self._computation_progress:
+            key = progress_key(patient_mrn, db_type)
+            if not self.computation_progress.complete(patient_mrn, error_message=error_message, db_type=db_type):
                 logger.warning(f"[complete_computation_progress] No progress record for {key}")
                 return False
 
-            progress = self._computation_progress[key]
-            progress["status"] = "error" if error_message else "completed"
-            progress["completed_at"] = datetime.now().isoformat()
-            progress["updated_at"] = datetime.now().isoformat()
-            if error_message:
-                progress["error_message"] = error_message
-
-            logger.info(f"[complete_computation_progress] Completed tracking for {key}: {progress['status']}")
+            logger.info(f"[complete_computation_progress] Completed tracking for {key}: {'error' if error_message else 'completed'}")
             return True
         except Exception as e:
             logger.error(f"[complete_computation_progress] Error: {e}")
@@ -1799,7 +1925,7 @@ class DataPool:
 
     def get_computation_progress(self, patient_mrn: str, db_type: str = None) -> Optional[Dict]:
         """
-        Get current computation progress for a patient (in-memory).
+        Get current computation progress for a patient.
 
         Args:
             patient_mrn: Patient MRN
@@ -1809,8 +1935,7 @@ class DataPool:
             Progress dictionary or None if not found
         """
         try:
-            key = f"{db_type or 'demo'}:{patient_mrn}"
-            return self._computation_progress.get(key)
+            return self.computation_progress.get(patient_mrn, db_type=db_type)
         except Exception as e:
             logger.error(f"[get_computation_progress] Error: {e}")
             return None
@@ -0,0 +1,361 @@
+"""
+Per-MRN DocumentReference Bundle Cache
+
+One ingest used to call /Patient and /DocumentReference once per filter
+function: MD notes, lab results, pathology, radiology and molecular lookups
+each re-fetched the same bundle, sometimes twice. This cache keeps the
+patient ID and the (unfiltered) DocumentReference search for each MRN for
+a short TTL. The bytes_extractor filter functions read from it and filter in
+memory.
+
+The search is requested newest-first and read one page at a time, only as
+far back as a caller needs: callers pass a lower date bound (date_from)
+and/or a predicate (until) for the document they are looking for, and pages
+are read until the loaded entries reach past the bound or contain a match.
+Later callers reuse the pages already read and continue from there. If the
+server does not return newest-first pages, every page is read.
+
+Concurrent pipelines asking for the same MRN share one fetch: a per-MRN lock
+makes later callers wait for the first fetch instead of repeating it. The
+lock is dropped once no caller holds or waits on it, and expired entries are
+pruned whenever a new one is stored, so memory stays bounded by the MRNs
+fetched within one TTL.
+
+Configuration (environment variables):
+- DOCUMENT_BUNDLE_TTL_SECONDS: how long a bundle stays cached (default: 300)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from Backend.documents_reference import (
+        get_fhir_tokens,
+        get_patient_id_from_mrn,
+        iter_document_reference_pages,
+        _entry_date,
+    )
+except ModuleNotFoundError:
+    from documents_reference import (
+        get_fhir_tokens,
+        get_patient_id_from_mrn,
+        iter_document_reference_pages,
+        _entry_date,
+    )
+
+
+def filter_bundle_by_loinc(document_bundle: Dict[str, Any], loinc_code: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Filter a DocumentReference bundle by LOINC code in memory.
+
+    Mirrors the server-side ``type`` search parameter: an entry matches if any
+    resource.type.coding code equals loinc_code. "UNK"/"none"/None return the
+    bundle unchanged.
+
+    Args:
+        document_bundle: Full FHIR DocumentReference bundle
+        loinc_code: LOINC code to keep
+
+    Returns:
+        Bundle dict with only the matching entries
+    """
+    if not loinc_code or loinc_code == "UNK" or loinc_code.lower() == "none":
+        return document_bundle
+
+    entries = [
+        entry for entry in document_bundle.get("entry", [])
+        if any(
+            coding.get("code") == loinc_code
+            for coding in entry.get("resource", {}).get("type", {}).get("coding", [])
+        )
+    ]
+    filtered = {key: value for key, value in document_bundle.items() if key != "entry"}
+    filtered["entry"] = entries
+    filtered["total"] = len(entries)
+    return filtered
+
+
+def _matches_loinc(entry: Dict[str, Any], loinc_code: Optional[str]) -> bool:
+    return bool(filter_bundle_by_loinc({"entry": [entry]}, loinc_code)["entry"])
+
+
+class PagedDocumentBundle:
+    """
+    One MRN's DocumentReference search, read page by page (newest first) on demand.
+    """
+
+    def __init__(self, pages: Iterator[Dict[str, Any]]):
+        """
+        Initialize paged bundle.
+
+        Args:
+            pages: Bundle pages, e.g. iter_document_reference_pages(..., newest_first=True)
+        """
+        self._pages = pages
+        self._header: Optional[Dict[str, Any]] = None
+        self._oldest: Optional[datetime] = None
+        self.entries: List[Dict[str, Any]] = []
+        self.pages_read = 0
+        self.complete = False
+        # Cleared once a page is not newest-first; bounds are then ignored
+        self.newest_first = True
+
+    def read_page(self):
+        """Read the next page (marks the bundle complete after the last one)."""
+        page = next(self._pages, None)
+        if page is None:
+            self.complete = True
+            return
+        if self._header is None:
+            self._header = {key: value for key, value in page.items() if key not in ("entry", "link", "total")}
+
+        page_entries = page.get("entry", [])
+        dates = [d for d in (_entry_date(e) for e in page_entries) if d is not None]
+        if self._oldest is not None:
+            dates.insert(0, self._oldest)
+        if not all(a >= b for a, b in zip(dates, dates[1:])):
+            self.newest_first = False
+        if dates:
+            self._oldest = dates[-1]
+        self.entries.extend(page_entries)
+        self.pages_read += 1
+
+    def covers(
+        self,
+        date_from: Optional[datetime] = None,
+        until: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> bool:
+        """
+        Check whether the loaded entries are enough for a caller.
+
+        Args:
+            date_from: Every entry on or after this date is needed
+            until: The newest entry accepted by this predicate is needed
+
+        Returns:
+            True if no further page can change the caller's result
+        """
+        if self.complete:
+            return True
+        if not self.newest_first or (date_from is None and until is None):
+            return False
+        if date_from is not None and self._oldest is not None and self._oldest < date_from:
+            return True
+        return until is not None and any(until(entry) for entry in self.entries)
+
+    def bundle(self) -> Dict[str, Any]:
+        """Get the loaded entries as a searchset bundle."""
+        bundle = dict(self._header or {"resourceType": "Bundle", "type": "searchset"})
+        bundle["entry"] = list(self.entries)
+        bundle["total"] = len(self.entries)
+        return bundle
+
+
+class DocumentBundleCache:
+    """
+    Thread-safe TTL cache of patient IDs and DocumentReference bundles by MRN.
+    """
+
+    def __init__(self, ttl_seconds: float = 300):
+        """
+        Initialize bundle cache.
+
+        Args:
+            ttl_seconds: Time-to-live for cached bundles (default: 300)
+        """
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # MRN -> [lock, callers holding or waiting on it]
+        self._mrn_locks: Dict[str, list] = {}
+        self._patients: Dict[str, Tuple[float, str, Dict[str, Any]]] = {}
+        self._bundles: Dict[str, Tuple[float, PagedDocumentBundle]] = {}
+        self._stats = {
+            "patient_hits": 0,
+            "patient_misses": 0,
+            "bundle_hits": 0,
+            "bundle_misses": 0,
+            "pages_read": 0,
+        }
+
+    @contextmanager
+    def _mrn_lock(self, mrn: str):
+        with self._lock:
+            entry = self._mrn_locks.get(mrn)
+            if entry is None:
+                entry = [threading.Lock(), 0]
+                self._mrn_locks[mrn] = entry
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0 and self._mrn_locks.get(mrn) is entry:
+                    del self._mrn_locks[mrn]
+
+    def _is_fresh(self, cached_at: float) -> bool:
+        return time.monotonic() - cached_at < self.ttl_seconds
+
+    def _evict_expired_locked(self):
+        for cache in (self._patients, self._bundles):
+            for mrn in [mrn for mrn, cached in cache.items() if not self._is_fresh(cached[0])]:
+                del cache[mrn]
+
+    def get_patient(self, mrn: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Get (patient_id, patient_resource) for an MRN, calling /Patient at most once per TTL.
+
+        Raises:
+            ValueError: If no patient found for the MRN
+        """
+        with self._mrn_lock(mrn):
+            cached = self._patients.get(mrn)
+            if cached and self._is_fresh(cached[0]):
+                with self._lock:
+                    self._stats["patient_hits"] += 1
+                return cached[1], cached[2]
+
+            with self._lock:
+                self._stats["patient_misses"] += 1
+            _, onco_emr_token = get_fhir_tokens()
+            patient_id, patient_resource = get_patient_id_from_mrn(mrn, onco_emr_token)
+            with self._lock:
+                self._evict_expired_locked()
+                self._patients[mrn] = (time.monotonic(), patient_id, patient_resource)
+            return patient_id, patient_resource
+
+    def get_patient_id(self, mrn: str) -> str:
+        """Get the FHIR patient ID for an MRN."""
+        return self.get_patient(mrn)[0]
+
+    def get_bundle(
+        self,
+        mrn: str,
+        date_from: Optional[datetime] = None,
+        until: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get the (unfiltered) DocumentReference bundle for an MRN, read as far back as needed.
+
+        Starts one /DocumentReference search per TTL; concurrent callers for
+        the same MRN wait for the in-flight page instead of fetching it again.
+
+        Args:
+            mrn: Patient MRN
+            date_from: Read until every entry on or after this date is loaded
+            until: Read until the newest entry accepted by this predicate is loaded
+                   (without date_from or until, every page is read)
+
+        Returns:
+            Bundle of the loaded entries, newest first when the server sorts
+        """
+        if date_from is not None and date_from.tzinfo is None:
+            date_from = date_from.replace(tzinfo=timezone.utc)
+        patient_id = self.get_patient_id(mrn)
+        with self._mrn_lock(mrn):
+            cached = self._bundles.get(mrn)
+            if cached and self._is_fresh(cached[0]):
+                paged = cached[1]
+                with self._lock:
+                    self._stats["bundle_hits"] += 1
+            else:
+                _, onco_emr_token = get_fhir_tokens()
+                paged = PagedDocumentBundle(iter_document_reference_pages(
+                    patient_id, onco_emr_token, loinc_type=None, newest_first=True
+                ))
+                with self._lock:
+                    self._stats["bundle_misses"] += 1
+                    self._evict_expired_locked()
+                    self._bundles[mrn] = (time.monotonic(), paged)
+
+            pages_before = paged.pages_read
+            try:
+                while not paged.covers(date_from, until):
+                    paged.read_page()
+            except Exception:
+                # The page iterator is finished after an error; start over next time
+                with self._lock:
+                    if self._bundles.get(mrn, (None, None))[1] is paged:
+                        del self._bundles[mrn]
+                raise
+            finally:
+                with self._lock:
+                    self._stats["pages_read"] += paged.pages_read - pages_before
+            return paged.bundle()
+
+    def invalidate(self, mrn: Optional[str] = None):
+        """
+        Drop cached data for one MRN, or for all MRNs if mrn is None.
+        """
+        with self._lock:
+            if mrn is None:
+                self._patients.clear()
+                self._bundles.clear()
+            else:
+                self._patients.pop(mrn, None)
+                self._bundles.pop(mrn, None)
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_mrns"] = len(self._bundles)
+            stats["mrn_locks"] = len(self._mrn_locks)
+            return stats
+
+
+# Global cache instance
+_bundle_cache_instance = None
+_bundle_cache_lock = threading.Lock()
+
+
+def get_document_bundle_cache() -> DocumentBundleCache:
+    """
+    Get global document bundle cache instance (singleton pattern).
+
+    Returns:
+        DocumentBundleCache instance
+    """
+    global _bundle_cache_instance
+    with _bundle_cache_lock:
+        if _bundle_cache_instance is None:
+            _bundle_cache_instance = DocumentBundleCache(
+                ttl_seconds=float(os.environ.get("DOCUMENT_BUNDLE_TTL_SECONDS", 300))
+            )
+        return _bundle_cache_instance
+
+
+# Convenience functions
+def get_cached_patient_id(mrn: str) -> str:
+    """Get the FHIR patient ID for an MRN from the cache."""
+    return get_document_bundle_cache().get_patient_id(mrn)
+
+
+def get_cached_document_bundle(
+    mrn: str,
+    loinc_code: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    until: Optional[Callable[[Dict[str, Any]], bool]] = None
+) -> Dict[str, Any]:
+    """
+    Get the patient's DocumentReference bundle from the cache, filtered by LOINC in memory.
+
+    Args:
+        mrn: Patient MRN
+        loinc_code: LOINC code to keep (None for all types)
+        date_from: Lower date bound the caller needs (see DocumentBundleCache.get_bundle)
+        until: Predicate for the newest document the caller needs (applied to LOINC matches)
+
+    Returns:
+        Bundle dict; may contain entries older than date_from
+    """
+    loinc_until = None
+    if until is not None:
+        loinc_until = lambda entry: _matches_loinc(entry, loinc_code) and until(entry)
+    bundle = get_document_bundle_cache().get_bundle(mrn, date_from=date_from, until=loinc_until)
+    return filter_bundle_by_loinc(bundle, loinc_code)
@@ -4,6 +4,14 @@ Data Ingestion Module for OncoEMR FHIR API
 This module provides functions to authenticate and retrieve patient documents
 from the OncoEMR FHIR API.
 
+Configuration (environment variables):
+- FHIR_BASE_URL: FHIR API base URL (default: https://fhir.prod.flatiron.io/fhir)
+- RISA_AUTH_TOKEN_URL: Risa Labs bearer token endpoint
+- ONCO_EMR_TOKEN_URL: OncoEMR token endpoint
+
+All three point at the local stand-in from fhir_stub_server.py with
+server.client_env().
+
 Usage:
     from dataingestion import get_document_url_by_type
 
@@ -17,8 +25,46 @@ Usage:
 
 import requests
 import base64
+import json
+import os
+import threading
 import time
-from typing import Optional, List, Dict, Any # For data validation
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Tuple, Iterator # For data validation
+from urllib.parse import urlparse
+try:
+    from Backend.rate_limiter import get_rate_limiter, parse_retry_after, THROTTLE_STATUS_CODES
+    from Backend.http_sessions import get_session
+except ModuleNotFoundError:
+    from rate_limiter import get_rate_limiter, parse_retry_after, THROTTLE_STATUS_CODES
+    from http_sessions import get_session
+
+
+# ============================================================================
+# Endpoints
+# ============================================================================
+
+# Overridable so the client can run against a local stand-in
+# (see fhir_stub_server.py), e.g. FHIR_BASE_URL=http://127.0.0.1:8790/fhir
+DEFAULT_FHIR_BASE_URL = "https://fhir.prod.flatiron.io/fhir"
+DEFAULT_AUTH_TOKEN_URL = "https://authentication.risalabs.ai/api/v1/user-auth/token"
+DEFAULT_ONCO_EMR_TOKEN_URL = "https://apis.risalabs.ai/pa-order-creation/commons/emr/get-flatiron-token/tPvNbDprUnrXIJlDXyxs"
+
+
+def fhir_url(path: str = "") -> str:
+    """
+    Build a FHIR API URL under the configured base URL.
+
+    FHIR_BASE_URL is read on every call, so it can be changed after import.
+
+    Args:
+        path: Resource path, e.g. "Patient" or "DocumentReference/123"
+
+    Returns:
+        Absolute URL
+    """
+    base_url = os.environ.get("FHIR_BASE_URL", DEFAULT_FHIR_BASE_URL).rstrip("/")
+    return f"{base_url}/{path.lstrip('/')}" if path else base_url
 
 
 # ============================================================================
@@ -28,14 +74,14 @@ from typing import Optional, List, Dict, Any # For data validation
 
 ## Generating bearer tokens
 def generate_bearer_token(
-    url: str = "https://authentication.risalabs.ai/api/v1/user-auth/token",
+    url: Optional[str] = None,
     headers: Optional[Dict] = None
 ) -> str:
     """
     Generate bearer token for Risa Labs API authentication.
 
     Args:
-        url: Authentication endpoint URL
+        url: Authentication endpoint URL (default: RISA_AUTH_TOKEN_URL, then the production endpoint)
         headers: Optional additional headers
 
     Returns:
@@ -46,9 +92,10 @@ def generate_bearer_token(
     """
     if headers is None:
         headers = {}
+    url = url or os.environ.get("RISA_AUTH_TOKEN_URL", DEFAULT_AUTH_TOKEN_URL)
 
     payload = "{\n    \"username\": \"risa_front_end_user\",\n    \"password\": \"e4Itc/E[df~z\"\n}"
-    response = requests.post(url, headers=headers, data=payload)
+    response = get_session(url).post(url, headers=headers, data=payload)
     response.raise_for_status()
 
     data = response.json()
@@ -59,14 +106,14 @@ def generate_bearer_token(
 ## The code for Astera = tPvNbDprUnrXIJlDXyxs
 def generate_onco_emr_token(
     bearer_token: str,
-    url: str = "https://apis.risalabs.ai/pa-order-creation/commons/emr/get-flatiron-token/tPvNbDprUnrXIJlDXyxs"
+    url: Optional[str] = None
 ) -> str:
     """
     Generate OncoEMR token using bearer token.
 
     Args:
         bearer_token: Bearer token from Risa Labs authentication
-        url: OncoEMR token endpoint URL
+        url: OncoEMR token endpoint URL (default: ONCO_EMR_TOKEN_URL, then the production endpoint)
 
     Returns:
         OncoEMR access token string
@@ -74,16 +121,268 @@ def generate_onco_emr_token(
     Raises:
         requests.RequestException: If token generation fails
     """
+    url = url or os.environ.get("ONCO_EMR_TOKEN_URL", DEFAULT_ONCO_EMR_TOKEN_URL)
     headers = {
         'Authorization': f'Bearer {bearer_token}'
     }
-    response = requests.get(url, headers=headers)
+    response = get_session(url).get(url, headers=headers)
     response.raise_for_status()
 
     data = response.json()
     return data['access_token']
 
 
+# ============================================================================
+# Token Cache
+# ============================================================================
+
+def _get_token_expiry(token: str, default_ttl_seconds: int) -> float:
+    """
+    Get the expiry time (epoch seconds) of a token.
+
+    Reads the 'exp' claim when the token is a JWT; otherwise falls back to
+    now + default_ttl_seconds.
+    """
+    try:
+        payload_segment = token.split(".")[1]
+        payload_segment += "=" * (-len(payload_segment) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(payload_segment))
+        if "exp" in payload:
+            return float(payload["exp"])
+    except (IndexError, ValueError, TypeError, AttributeError):
+        pass
+    return time.time() + default_ttl_seconds
+
+
+class FHIRTokenCache:
+    """
+    Process-wide, thread-safe cache for the Risa bearer token and OncoEMR token.
+
+    Every document fetch used to re-authenticate (two HTTP round trips). The
+    cache hands out the same tokens until shortly before they expire, and
+    refreshes them once (under a lock) when they do or when the FHIR API
+    answers 401.
+    """
+
+    def __init__(self, refresh_margin_seconds: int = 60, default_ttl_seconds: int = 1800):
+        """
+        Initialize token cache.
+
+        Args:
+            refresh_margin_seconds: Refresh tokens this many seconds before they expire
+            default_ttl_seconds: Lifetime assumed for tokens without an 'exp' claim
+        """
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.default_ttl_seconds = default_ttl_seconds
+        self._lock = threading.Lock()
+        self._bearer_token = None
+        self._bearer_expires_at = 0.0
+        self._onco_emr_token = None
+        self._onco_emr_expires_at = 0.0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "bearer_refreshes": 0,
+            "onco_emr_refreshes": 0,
+            "unauthorized_refreshes": 0,
+        }
+
+    def _is_fresh(self, token: Optional[str], expires_at: float) -> bool:
+        return token is not None and time.time() < expires_at - self.refresh_margin_seconds
+
+    def _refresh_bearer_locked(self):
+        self._bearer_token = generate_bearer_token()
+        self._bearer_expires_at = _get_token_expiry(self._bearer_token, self.default_ttl_seconds)
+        self._stats["bearer_refreshes"] += 1
+
+    def _refresh_onco_emr_locked(self):
+        try:
+            self._onco_emr_token = generate_onco_emr_token(self._bearer_token)
+        except requests.HTTPError as e:
+            # Bearer token rejected before its expiry - get a new one and retry once
+            if e.response is None or e.response.status_code != 401:
+                raise
+            self._refresh_bearer_locked()
+            self._onco_emr_token = generate_onco_emr_token(self._bearer_token)
+        self._onco_emr_expires_at = _get_token_expiry(self._onco_emr_token, self.default_ttl_seconds)
+        self._stats["onco_emr_refreshes"] += 1
+
+    def get_tokens(self) -> Tuple[str, str]:
+        """
+        Get (bearer_token, onco_emr_token), refreshing whichever is expired.
+
+        Returns:
+            Tuple of (bearer_token, onco_emr_token)
+        """
+        with self._lock:
+            if (self._is_fresh(self._bearer_token, self._bearer_expires_at) and
+                    self._is_fresh(self._onco_emr_token, self._onco_emr_expires_at)):
+                self._stats["hits"] += 1
+                return self._bearer_token, self._onco_emr_token
+
+            self._stats["misses"] += 1
+            if not self._is_fresh(self._bearer_token, self._bearer_expires_at):
+                self._refresh_bearer_locked()
+                # A new bearer token invalidates the OncoEMR token derived from the old one
+                self._onco_emr_token = None
+            if not self._is_fresh(self._onco_emr_token, self._onco_emr_expires_at):
+                self._refresh_onco_emr_locked()
+            return self._bearer_token, self._onco_emr_token
+
+    def refresh_after_unauthorized(self, stale_onco_emr_token: Optional[str]) -> Tuple[str, str]:
+        """
+        Refresh the OncoEMR token after the FHIR API rejected it with 401.
+
+        If another thread already replaced the stale token, the current tokens
+        are returned without another round trip.
+
+        Args:
+            stale_onco_emr_token: The token that was rejected
+
+        Returns:
+            Tuple of (bearer_token, onco_emr_token)
+        """
+        with self._lock:
+            if self._onco_emr_token is None or self._onco_emr_token == stale_onco_emr_token:
+                self._stats["unauthorized_refreshes"] += 1
+                if not self._is_fresh(self._bearer_token, self._bearer_expires_at):
+                    self._refresh_bearer_locked()
+                self._refresh_onco_emr_locked()
+            return self._bearer_token, self._onco_emr_token
+
+    def invalidate(self):
+        """Drop both cached tokens."""
+        with self._lock:
+            self._bearer_token = None
+            self._bearer_expires_at = 0.0
+            self._onco_emr_token = None
+            self._onco_emr_expires_at = 0.0
+
+    def get_stats(self) -> Dict:
+        """Get token cache statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            total = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = f"{(stats['hits'] / total * 100):.1f}%" if total > 0 else "0.0%"
+            return stats
+
+
+# Global token cache instance
+_token_cache_instance = None
+_token_cache_lock = threading.Lock()
+
+
+def get_fhir_token_cache() -> FHIRTokenCache:
+    """
+    Get global FHIR token cache instance (singleton pattern).
+
+    Returns:
+        FHIRTokenCache instance
+    """
+    global _token_cache_instance
+    with _token_cache_lock:
+        if _token_cache_instance is None:
+            _token_cache_instance = FHIRTokenCache(
+                refresh_margin_seconds=int(os.environ.get("FHIR_TOKEN_REFRESH_MARGIN_SECONDS", 60)),
+                default_ttl_seconds=int(os.environ.get("FHIR_TOKEN_TTL_SECONDS", 1800)),
+            )
+        return _token_cache_instance
+
+
+def get_fhir_tokens() -> Tuple[str, str]:
+    """Get cached (bearer_token, onco_emr_token), refreshing if needed."""
+    return get_fhir_token_cache().get_tokens()
+
+
+def fhir_get(
+    url: str,
+    onco_emr_token: Optional[str] = None,
+    params: Optional[Dict] = None,
+    accept: str = "application/fhir+json",
+    max_throttle_retries: int = 5,
+    **kwargs
+) -> requests.Response:
+    """
+    GET a FHIR resource through the shared per-host rate limiter.
+
+    - Waits for the host's adaptive rate limiter before every request
+    - On 429/503, backs the limiter off (honouring Retry-After) and retries
+    - On 401, refreshes the OncoEMR token once and retries
+
+    Args:
+        url: FHIR resource URL
+        onco_emr_token: Token to use (defaults to the cached token)
+        params: Optional query parameters
+        accept: Accept header value
+        max_throttle_retries: Maximum retries after throttled responses
+        **kwargs: Extra arguments passed to Session.get
+
+    Returns:
+        requests.Response (caller is responsible for raise_for_status)
+    """
+    if not onco_emr_token:
+        _, onco_emr_token = get_fhir_tokens()
+
+    headers = {
+        "Authorization": f"Bearer {onco_emr_token}",
+        "Accept": accept
+    }
+    limiter = get_rate_limiter(urlparse(url).netloc)
+    session = get_session(url)
+    token_refreshed = False
+    throttle_retries = 0
+
+    while True:
+        limiter.acquire()
+        response = session.get(url, headers=headers, params=params, **kwargs)
+
+        if response.status_code == 401 and not token_refreshed:
+            token_refreshed = True
+            _, fresh_token = get_fhir_token_cache().refresh_after_unauthorized(onco_emr_token)
+            headers["Authorization"] = f"Bearer {fresh_token}"
+            continue
+
+        if response.status_code in THROTTLE_STATUS_CODES:
+            limiter.on_throttle(parse_retry_after(response.headers.get("Retry-After")))
+            if throttle_retries < max_throttle_retries:
+                throttle_retries += 1
+                print(f"FHIR rate limit hit ({response.status_code}), retry {throttle_retries}/{max_throttle_retries} "
+                      f"at {limiter.rate:.2f} req/s")
+                continue
+            return response
+
+        limiter.on_success()
+        return response
+
+
+def is_fhir_url(url: str) -> bool:
+    """Check whether a URL points under the configured FHIR base URL."""
+    base_url = fhir_url()
+    return url == base_url or url.startswith(base_url + "/")
+
+
+def fetch_attachment(url: str, onco_emr_token: Optional[str] = None, **kwargs) -> requests.Response:
+    """
+    GET a DocumentReference attachment URL.
+
+    Attachments served by the FHIR API go through fhir_get (token, rate limiter,
+    throttle retries). Any other host gets a plain pooled request: the OncoEMR
+    bearer token is never sent outside the FHIR base URL.
+
+    Args:
+        url: Attachment URL
+        onco_emr_token: Token to use for FHIR-hosted attachments
+        **kwargs: Extra arguments passed to fhir_get / Session.get
+
+    Returns:
+        requests.Response (caller is responsible for raise_for_status)
+    """
+    if is_fhir_url(url):
+        return fhir_get(url, onco_emr_token, **kwargs)
+    kwargs.pop("max_throttle_retries", None)
+    return get_session(url).get(url, **kwargs)
+
+
 # ============================================================================
 # Patient and Document Retrieval Functions
 # ============================================================================
@@ -92,7 +391,7 @@ def generate_onco_emr_token(
 def get_patient_id_from_mrn(
     mrn: str,
     onco_emr_token: str,
-    url: str = "https://fhir.prod.flatiron.io/fhir/Patient"
+    url: Optional[str] = None
 ) -> tuple[str, Dict[str, Any]]:
     """
     Get patient ID and details using MRN (Medical Record Number).
@@ -100,7 +399,7 @@ def get_patient_id_from_mrn(
     Args:
         mrn: Patient's Medical Record Number
         onco_emr_token: OncoEMR access token
-        url: FHIR Patient endpoint URL
+        url: FHIR Patient endpoint URL (default: Patient under FHIR_BASE_URL)
 
     Returns:
         Tuple of (patient_id, patient_resource_dict)
@@ -109,13 +408,10 @@ def get_patient_id_from_mrn(
         ValueError: If no patient found for given MRN
         requests.RequestException: If API request fails
     """
+    url = url or fhir_url("Patient")
     params = {"identifier": mrn}
-    headers = {
-        "Authorization": f"Bearer {onco_emr_token}",
-        "Accept": "application/fhir+json"
-    }
 
-    response = requests.get(url, headers=headers, params=params)
+    response = fhir_get(url, onco_emr_token, params=params)
     response.raise_for_status()
 
     data = response.json()
@@ -129,6 +425,95 @@ def get_patient_id_from_mrn(
     return patient_id, patient_resource
 
 
+def _entry_date(entry: Dict[str, Any]) -> Optional[datetime]:
+    """Parse resource.date of a bundle entry (None if missing or unparseable)."""
+    date_str = entry.get("resource", {}).get("date")
+    if not date_str:
+        return None
+    try:
+        parsed = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def iter_document_reference_pages(
+    patient_id: str,
+    onco_emr_token: str,
+    loinc_type: str = "UNK",
+    url: Optional[str] = None,
+    page_size: int = 100,
+    date_from: Optional[datetime] = None,
+    newest_first: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream DocumentReference bundle pages for a patient.
+
+    Requests pages of ``_count`` entries and follows ``link[rel=next]`` until
+    the server has no more pages.
+
+    If date_from is given, results are requested newest-first (``_sort=-date``)
+    and paging stops after the first page whose oldest entry is before
+    date_from. Early stop only happens if the page really is sorted newest-first,
+    so a server that ignores ``_sort`` still returns every page.
+
+    Pages are fetched only as the caller iterates, so a consumer can stop
+    early itself (see document_bundle_cache).
+
+    Args:
+        patient_id: FHIR patient ID
+        onco_emr_token: OncoEMR access token
+        loinc_type: LOINC code for document type
+        url: FHIR DocumentReference endpoint URL (default: DocumentReference under FHIR_BASE_URL)
+        page_size: Entries requested per page (``_count``)
+        date_from: Optional lower date bound used for early stop
+        newest_first: Request newest-first order (``_sort=-date``) without a date bound
+
+    Yields:
+        FHIR DocumentReference bundle pages (dict)
+
+    Raises:
+        requests.RequestException: If API request fails
+    """
+    url = url or fhir_url("DocumentReference")
+    params = {
+        "patient": patient_id,
+        "_summary": "true",
+        "_count": page_size
+    }
+
+    # Only include type filter if a valid LOINC code is provided
+    if loinc_type and loinc_type != "UNK" and loinc_type.lower() != "none":
+        params["type"] = loinc_type
+
+    if date_from is not None or newest_first:
+        params["_sort"] = "-date"
+    if date_from is not None:
+        if date_from.tzinfo is None:
+            date_from = date_from.replace(tzinfo=timezone.utc)
+
+    current_url = url
+    while current_url:
+        # The next link already carries the query string
+        response = fhir_get(current_url, onco_emr_token, params=params if current_url == url else None)
+        response.raise_for_status()
+        page = response.json()
+        yield page
+
+        if date_from is not None:
+            dates = [d for d in (_entry_date(e) for e in page.get("entry", [])) if d is not None]
+            is_newest_first = all(a >= b for a, b in zip(dates, dates[1:]))
+            if dates and is_newest_first and dates[-1] < date_from:
+                break
+
+        current_url = next(
+            (link.get("url") for link in page.get("link", []) if link.get("relation") == "next"),
+            None
+        )
+
+
 ## Need to get the document references for the patient type
 ## The documents are fetched basis the lonic code:- For MD notes lonic code = 11506-3
 ## The following function gives all the docs info as bundle
@@ -136,11 +521,16 @@ def get_document_references(
     patient_id: str,
     onco_emr_token: str,
     loinc_type: str = "UNK",
-    url: str = "https://fhir.prod.flatiron.io/fhir/DocumentReference"
+    url: Optional[str] = None,
+    page_size: int = 100,
+    date_from: Optional[datetime] = None
 ) -> Dict[str, Any]:
     """
     Get document references for a patient filtered by LOINC type.
 
+    Reads every page (see iter_document_reference_pages) and returns a single
+    bundle with all entries, so callers see the same shape as before.
+
     Common LOINC types:
         - "11506-3": Progress notes (includes MD notes, nurse notes, etc.)
         - "18842-5": Discharge summary
@@ -151,7 +541,10 @@ def get_document_references(
         patient_id: FHIR patient ID
         onco_emr_token: OncoEMR access token
         loinc_type: LOINC code for document type
-        url: FHIR DocumentReference endpoint URL
+        url: FHIR DocumentReference endpoint URL (default: DocumentReference under FHIR_BASE_URL)
+        page_size: Entries requested per page (``_count``)
+        date_from: Optional lower date bound; paging stops early once past it.
+                   Entries older than date_from may still be present.
 
     Returns:
         FHIR DocumentReference bundle (dict)
@@ -159,24 +552,15 @@ def get_document_references(
     Raises:
         requests.RequestException: If API request fails
     """
-    params = {
-        "patient": patient_id,
-        "_summary": "true"
-    }
-
-    # Only include type filter if a valid LOINC code is provided
-    if loinc_type and loinc_type != "UNK" and loinc_type.lower() != "none":
-        params["type"] = loinc_type
-
-    headers = {
-        "Authorization": f"Bearer {onco_emr_token}",
-        "Accept": "application/fhir+json"
-    }
-
-    response = requests.get(url, headers=headers, params=params)
-    response.raise_for_status()
-
-    # Add rate limiting delay to avoid 429 errors (1.5 seconds between API calls)
-    time.sleep(1.5)
-
-    return response.json()
\ No newline at end of file
+    bundle = None
+    entries = []
+
+    for page in iter_document_reference_pages(patient_id, onco_emr_token, loinc_type, url, page_size, date_from):
+        if bundle is None:
+            bundle = {key: value for key, value in page.items() if key not in ("entry", "link")}
+        entries.extend(page.get("entry", []))
+
+    bundle = bundle or {"resourceType": "Bundle", "type": "searchset"}
+    bundle["entry"] = entries
+    bundle.setdefault("total", len(entries))
+    return bundle
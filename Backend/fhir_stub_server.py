@@ -0,0 +1,640 @@
+"""
+Local FHIR Stand-in Server for Load and Concurrency Testing
+
+Rate limits, worker counts and caches in bytes_extractor.py and
+fhir_lab_integration.py can only be tuned against an upstream that answers
+like the OncoEMR FHIR API. This server does, for synthetic patients built
+from fixtures/offline_patients.json:
+
+- POST /auth/token and GET /emr/token: bearer and OncoEMR tokens (JWTs with
+  an exp claim; expired or unknown tokens get 401 on FHIR endpoints)
+- GET /fhir/Patient?identifier=<mrn> and /fhir/Patient/<id>
+- GET /fhir/DocumentReference?patient=<id>[&type=<loinc>][&_sort=-date]: paged
+  searchset bundles (_count, capped by max_page_size) linked with next URLs
+- GET /fhir/DocumentReference/<id> and /fhir/Binary/<id> (the PDF attachment)
+- GET /fhir/Observation?patient=<id>[&category=laboratory]: paged bundles
+- GET /_stats: request and connection counters (also available as server.get_stats())
+
+Upstream behaviour is configurable: per-request latency (separately for
+Binary downloads) with jitter, a server-side QPS budget and a random
+throttle rate, both answered with 429 and a Retry-After header.
+
+The client is pointed at the server through environment variables
+(server.client_env()): FHIR_BASE_URL, RISA_AUTH_TOKEN_URL and
+ONCO_EMR_TOKEN_URL (see documents_reference.py).
+
+Usage:
+    python fhir_stub_server.py --port 8790 --patients 50 --latency-ms 80 --max-qps 5
+
+    server = FHIRStubServer(synthetic_patients(load_fixture(), 20), max_qps=5.0)
+    server.start()
+    os.environ.update(server.client_env())
+    ...
+    server.shutdown()
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "offline_patients.json")
+
+LOINC_SYSTEM = "http://loinc.org"
+
+
+# ============================================================================
+# Synthetic patients and FHIR resources
+# ============================================================================
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(lines: List[str], pad_kb: int = 0) -> bytes:
+    """
+    Build a one-page PDF showing the given text lines.
+
+    pad_kb adds PDF comment lines to the page content so documents have
+    realistic sizes (the padding survives PDF merging).
+    """
+    content = ["BT", "/F1 10 Tf", "14 TL", "50 760 Td"]
+    for line in lines:
+        content.append(f"({_pdf_escape(line)}) Tj T*")
+    content.append("ET")
+    seed = hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+    for i in range(pad_kb * 1024 // 80):
+        content.append(f"% {seed[i % 32:i % 32 + 32]} {i:08d} {seed}"[:78])
+    stream = "\n".join(content).encode("latin-1", "replace")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        pdf += f"{offset:010d} 00000 n \n".encode()
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(pdf)
+
+
+def load_fixture(path: Optional[str] = None) -> Dict[str, Any]:
+    """Load the synthetic patient fixture (default: fixtures/offline_patients.json)."""
+    with open(path or DEFAULT_FIXTURE, "r") as f:
+        return json.load(f)
+
+
+def synthetic_patients(fixture: Dict[str, Any], count: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Fixture patients, cycled up to count.
+
+    Copies get suffixed MRNs, FHIR IDs and document IDs, and one extra text
+    line so their PDFs differ from the original's.
+
+    Args:
+        fixture: Loaded fixture (see load_fixture)
+        count: Number of patients (default: the fixture's own patients)
+
+    Returns:
+        List of patient dicts (mrn, fhir_id, documents, observations)
+    """
+    patients = fixture.get("patients", [])
+    if not count or count <= len(patients):
+        return patients[:count or len(patients)]
+    result = []
+    for index in range(count):
+        patient = patients[index % len(patients)]
+        copy = index // len(patients)
+        if copy == 0:
+            result.append(patient)
+            continue
+        suffix = f"-{copy}"
+        result.append({
+            "mrn": f"{patient['mrn']}{suffix}",
+            "fhir_id": f"{patient['fhir_id']}{suffix}",
+            "documents": [
+                dict(document, id=f"{document['id']}{suffix}",
+                     text=document["text"] + [f"Synthetic copy {copy}"])
+                for document in patient.get("documents", [])
+            ],
+            "observations": patient.get("observations", []),
+        })
+    return result
+
+
+def patient_resource(patient: Dict[str, Any]) -> Dict[str, Any]:
+    """FHIR Patient resource for a synthetic patient."""
+    return {
+        "resourceType": "Patient",
+        "id": patient["fhir_id"],
+        "identifier": [{"value": patient["mrn"]}],
+    }
+
+
+def document_reference_resource(document: Dict[str, Any], patient_id: str, base_url: str) -> Dict[str, Any]:
+    """FHIR DocumentReference for a fixture document, with its PDF at <base_url>/Binary/<id>."""
+    doc_type = {"text": document["type"]}
+    if document.get("loinc"):
+        doc_type["coding"] = [{"system": LOINC_SYSTEM, "code": document["loinc"]}]
+    return {
+        "resourceType": "DocumentReference",
+        "id": document["id"],
+        "status": "current",
+        "type": doc_type,
+        "date": document["date"],
+        "description": document.get("description", ""),
+        "subject": {"reference": f"Patient/{patient_id}"},
+        "content": [{"attachment": {"contentType": "application/pdf", "url": f"{base_url}/Binary/{document['id']}"}}],
+    }
+
+
+def observation_resource(patient_id: str, index: int, row: List[Any]) -> Dict[str, Any]:
+    """FHIR laboratory Observation from a fixture row [name, value, unit, date, low, high]."""
+    name, value, unit, date, low, high = row
+    return {
+        "resourceType": "Observation",
+        "id": f"{patient_id}-obs-{index}",
+        "status": "final",
+        "category": [{"coding": [{"code": "laboratory"}]}],
+        "code": {"text": name, "coding": [{"display": name}]},
+        "effectiveDateTime": f"{date}T08:00:00Z",
+        "valueQuantity": {"value": value, "unit": unit},
+        "referenceRange": [{"low": {"value": low, "unit": unit}, "high": {"value": high, "unit": unit}}],
+    }
+
+
+def searchset_page(
+    url: str,
+    resources: List[Dict[str, Any]],
+    search_params: Dict[str, Any],
+    page_number: int,
+    page_size: int
+) -> Dict[str, Any]:
+    """
+    One page of a searchset bundle.
+
+    The next link repeats the search parameters with _page=<page_number + 1>.
+
+    Args:
+        url: Search endpoint URL (e.g. <base>/Observation)
+        resources: All matching resources
+        search_params: Search parameters of the request (without _page)
+        page_number: 1-based page number
+        page_size: Entries per page
+
+    Returns:
+        FHIR Bundle (dict)
+    """
+    start = (page_number - 1) * page_size
+    links = [{"relation": "self", "url": f"{url}?{urlencode(dict(search_params, _page=page_number))}"}]
+    if start + page_size < len(resources):
+        links.append({"relation": "next", "url": f"{url}?{urlencode(dict(search_params, _page=page_number + 1))}"})
+    return {
+        "resourceType": "Bundle",
+        "type": "searchset",
+        "total": len(resources),
+        "link": links,
+        "entry": [{"fullUrl": f"{url}/{r['id']}", "resource": r} for r in resources[start:start + page_size]],
+    }
+
+
+# ============================================================================
+# Server
+# ============================================================================
+
+def _make_token(kind: str, ttl_seconds: float) -> Tuple[str, float]:
+    """Unsigned JWT with an exp claim (the client reads exp to schedule refreshes)."""
+    expires_at = time.time() + ttl_seconds
+    header = base64.urlsafe_b64encode(b'{"alg":"none"}').rstrip(b"=").decode("ascii")
+    payload = base64.urlsafe_b64encode(json.dumps({
+        "sub": f"fhir-stub-{kind}",
+        "exp": int(expires_at),
+        "jti": os.urandom(6).hex(),
+    }).encode("utf-8")).rstrip(b"=").decode("ascii")
+    return f"{header}.{payload}.", expires_at
+
+
+class FHIRStubServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering like the OncoEMR FHIR API for synthetic patients.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        patients: List[Dict[str, Any]],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        binary_latency: Optional[float] = None,
+        jitter: float = 0.0,
+        max_qps: Optional[float] = None,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        max_page_size: int = 100,
+        token_ttl: float = 3600.0,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize server (call start() or serve_forever() to serve).
+
+        Args:
+            patients: Synthetic patients (see synthetic_patients)
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Seconds added to every FHIR response
+            binary_latency: Seconds added to Binary downloads (default: latency)
+            jitter: Latency varies uniformly by +/- this fraction
+            max_qps: Server-side request budget across all clients; requests over it get 429
+            throttle_rate: Fraction of FHIR requests answered 429 at random
+            retry_after: Retry-After value (seconds) sent with every 429
+            max_page_size: Upper bound applied to _count
+            token_ttl: Lifetime of issued tokens in seconds
+            seed: Seed for jitter and random throttling
+        """
+        super().__init__((host, port), FHIRStubHandler)
+        self.latency = latency
+        self.binary_latency = latency if binary_latency is None else binary_latency
+        self.jitter = jitter
+        self.max_qps = max_qps
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.max_page_size = max_page_size
+        self.token_ttl = token_ttl
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, float] = {}
+        self._budget = float(max(1.0, max_qps or 1.0))
+        self._budget_updated = time.monotonic()
+        self._thread = None
+
+        self._patients_by_mrn = {p["mrn"]: p for p in patients}
+        self._patients_by_id = {p["fhir_id"]: p for p in patients}
+        self._documents: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        for patient in patients:
+            for document in patient.get("documents", []):
+                self._documents[document["id"]] = (document, patient["fhir_id"])
+        self._pdf_lock = threading.Lock()
+        self._pdfs: Dict[str, bytes] = {}
+
+        self.reset_stats()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    @property
+    def root_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        """FHIR base URL (value for FHIR_BASE_URL)."""
+        return f"{self.root_url}/fhir"
+
+    def client_env(self) -> Dict[str, str]:
+        """Environment variables that point documents_reference.py at this server."""
+        return {
+            "FHIR_BASE_URL": self.base_url,
+            "RISA_AUTH_TOKEN_URL": f"{self.root_url}/auth/token",
+            "ONCO_EMR_TOKEN_URL": f"{self.root_url}/emr/token",
+        }
+
+    def start(self) -> "FHIRStubServer":
+        """Serve from a daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="fhir-stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        super().shutdown()
+        self.server_close()
+
+    # ------------------------------------------------------------------
+    # Upstream behaviour
+    # ------------------------------------------------------------------
+
+    def issue_token(self, kind: str) -> str:
+        token, expires_at = _make_token(kind, self.token_ttl)
+        with self._lock:
+            self._tokens[token] = expires_at
+            self._stats["tokens_issued"] += 1
+        return token
+
+    def is_authorized(self, authorization: Optional[str]) -> bool:
+        if not authorization or not authorization.startswith("Bearer "):
+            return False
+        with self._lock:
+            expires_at = self._tokens.get(authorization[len("Bearer "):])
+        return expires_at is not None and time.time() < expires_at
+
+    def should_throttle(self) -> bool:
+        """Spend one unit of the QPS budget; True if the request should get 429."""
+        with self._lock:
+            if self.throttle_rate and self._random.random() < self.throttle_rate:
+                return True
+            if not self.max_qps:
+                return False
+            now = time.monotonic()
+            capacity = max(1.0, self.max_qps)
+            self._budget = min(capacity, self._budget + (now - self._budget_updated) * self.max_qps)
+            self._budget_updated = now
+            if self._budget < 1.0:
+                return True
+            self._budget -= 1.0
+            return False
+
+    def delay(self, binary: bool = False):
+        latency = self.binary_latency if binary else self.latency
+        if latency <= 0:
+            return
+        if self.jitter:
+            with self._lock:
+                latency *= 1.0 + self._random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, latency))
+
+    # ------------------------------------------------------------------
+    # Data
+    # ------------------------------------------------------------------
+
+    def find_patient(self, mrn: str = None, patient_id: str = None) -> Optional[Dict[str, Any]]:
+        if mrn is not None:
+            return self._patients_by_mrn.get(mrn)
+        return self._patients_by_id.get(patient_id)
+
+    def document_resources(self, patient_id: str, loinc: Optional[str] = None, sort: Optional[str] = None) -> List[Dict]:
+        patient = self._patients_by_id.get(patient_id) or {}
+        documents = [d for d in patient.get("documents", []) if not loinc or d.get("loinc") == loinc]
+        if sort in ("date", "-date"):
+            documents = sorted(documents, key=lambda d: d["date"], reverse=sort == "-date")
+        return [document_reference_resource(d, patient_id, self.base_url) for d in documents]
+
+    def document_resource(self, document_id: str) -> Optional[Dict[str, Any]]:
+        found = self._documents.get(document_id)
+        if found is None:
+            return None
+        document, patient_id = found
+        return document_reference_resource(document, patient_id, self.base_url)
+
+    def observation_resources(self, patient_id: str, category: Optional[str] = None) -> List[Dict]:
+        patient = self._patients_by_id.get(patient_id) or {}
+        if category and category != "laboratory":
+            return []
+        return [observation_resource(patient_id, i, row) for i, row in enumerate(patient.get("observations", []))]
+
+    def pdf_bytes(self, document_id: str) -> Optional[bytes]:
+        found = self._documents.get(document_id)
+        if found is None:
+            return None
+        with self._pdf_lock:
+            if document_id not in self._pdfs:
+                document = found[0]
+                self._pdfs[document_id] = make_pdf(document["text"], document.get("pad_kb", 0))
+            return self._pdfs[document_id]
+
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+
+    def count(self, endpoint: Optional[str] = None, **values):
+        with self._lock:
+            for name, value in values.items():
+                self._stats[name] += value
+            if endpoint:
+                self._stats["by_endpoint"][endpoint] = self._stats["by_endpoint"].get(endpoint, 0) + 1
+
+    def enter(self):
+        with self._lock:
+            self._in_flight += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._in_flight)
+
+    def leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def reset_stats(self):
+        with self._lock:
+            self._in_flight = 0
+            self._started_at = time.monotonic()
+            self._stats = {
+                "connections": 0,
+                "requests": 0,
+                "throttled": 0,
+                "unauthorized": 0,
+                "not_found": 0,
+                "tokens_issued": 0,
+                "bytes_sent": 0,
+                "max_in_flight": 0,
+                "by_endpoint": {},
+            }
+
+    def get_stats(self) -> Dict:
+        """Get request statistics since start (or the last reset_stats())."""
+        with self._lock:
+            stats = dict(self._stats, by_endpoint=dict(self._stats["by_endpoint"]))
+            elapsed = time.monotonic() - self._started_at
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["requests_per_second"] = round(stats["requests"] / elapsed, 2) if elapsed > 0 else 0.0
+        stats["throttle_rate"] = f"{(stats['throttled'] / stats['requests'] * 100):.1f}%" if stats["requests"] else "0.0%"
+        return stats
+
+
+class FHIRStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid Nagle/delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # One accepted TCP connection (handshake) per handler instance
+        self.server.count(connections=1)
+
+    # ------------------------------------------------------------------
+    # Responses
+    # ------------------------------------------------------------------
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(bytes_sent=len(body))
+
+    def _send_json(self, status: int, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(data).encode("utf-8"), "application/fhir+json", headers)
+
+    def _send_error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        self._send_json(status, {
+            "resourceType": "OperationOutcome",
+            "issue": [{"severity": "error", "code": "processing", "diagnostics": message}],
+        }, headers)
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        path = urlsplit(self.path).path
+        self.server.count(requests=1, endpoint=f"POST {path}")
+        if path == "/auth/token":
+            self._send_json(200, {"access_token": self.server.issue_token("bearer")})
+        else:
+            self.server.count(not_found=1)
+            self._send_error(404, f"Unknown endpoint {path}")
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query, keep_blank_values=True).items()}
+        segments = [s for s in parts.path.split("/") if s]
+
+        if parts.path == "/_stats":
+            self._send(200, json.dumps(self.server.get_stats()).encode("utf-8"), "application/json")
+            return
+        if parts.path == "/emr/token":
+            self.server.count(requests=1, endpoint="GET /emr/token")
+            self._send_json(200, {"access_token": self.server.issue_token("onco-emr")})
+            return
+        if not segments or segments[0] != "fhir" or len(segments) < 2:
+            self.server.count(requests=1, not_found=1, endpoint="GET other")
+            self._send_error(404, f"Unknown endpoint {parts.path}")
+            return
+
+        resource_type = segments[1]
+        resource_id = segments[2] if len(segments) > 2 else None
+        self.server.count(requests=1, endpoint=f"GET {resource_type}{'/{id}' if resource_id else ''}")
+
+        self.server.enter()
+        try:
+            self.server.delay(binary=resource_type == "Binary")
+            if self.server.should_throttle():
+                self.server.count(throttled=1)
+                self._send_error(429, "Too many requests", {"Retry-After": f"{self.server.retry_after:g}"})
+                return
+            if not self.server.is_authorized(self.headers.get("Authorization")):
+                self.server.count(unauthorized=1)
+                self._send_error(401, "Missing, unknown or expired token")
+                return
+            self._route(resource_type, resource_id, query)
+        finally:
+            self.server.leave()
+
+    def _route(self, resource_type: str, resource_id: Optional[str], query: Dict[str, str]):
+        server = self.server
+        url = f"{server.base_url}/{resource_type}"
+
+        if resource_type == "Binary" and resource_id:
+            pdf = server.pdf_bytes(resource_id)
+            if pdf is not None:
+                self._send(200, pdf, "application/pdf")
+                return
+
+        elif resource_type == "DocumentReference" and resource_id:
+            resource = server.document_resource(resource_id)
+            if resource is not None:
+                self._send_json(200, resource)
+                return
+
+        elif resource_type == "Patient":
+            patient = server.find_patient(patient_id=resource_id) if resource_id else server.find_patient(mrn=query.get("identifier"))
+            if resource_id and patient is not None:
+                self._send_json(200, patient_resource(patient))
+                return
+            if not resource_id:
+                resources = [patient_resource(patient)] if patient is not None else []
+                self._send_json(200, searchset_page(url, resources, {"identifier": query.get("identifier", "")}, 1, 1))
+                return
+
+        elif resource_type in ("DocumentReference", "Observation"):
+            search_params = {key: value for key, value in query.items() if key != "_page"}
+            page_size = max(1, min(int(query.get("_count") or server.max_page_size), server.max_page_size))
+            patient_id = query.get("patient", "")
+            if resource_type == "DocumentReference":
+                resources = server.document_resources(patient_id, query.get("type"), query.get("_sort"))
+            else:
+                resources = server.observation_resources(patient_id, query.get("category"))
+            self._send_json(200, searchset_page(url, resources, search_params, int(query.get("_page") or 1), page_size))
+            return
+
+        server.count(not_found=1)
+        self._send_error(404, f"{resource_type}/{resource_id} not found")
+
+    def log_message(self, format, *args):
+        pass
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local FHIR stand-in server with synthetic patients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="Synthetic patient fixture")
+    parser.add_argument("--patients", type=int, default=None, help="Number of patients (fixture patients cycled)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency per FHIR response")
+    parser.add_argument("--binary-latency-ms", type=float, default=None, help="Latency per Binary download")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latency jitter as a fraction (e.g. 0.3)")
+    parser.add_argument("--max-qps", type=float, default=None, help="Server-side request budget (429 above it)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered 429 at random")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429")
+    parser.add_argument("--max-page-size", type=int, default=100, help="Upper bound for _count")
+    parser.add_argument("--token-ttl", type=float, default=3600.0, help="Token lifetime in seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    patients = synthetic_patients(load_fixture(args.fixture), args.patients)
+    server = FHIRStubServer(
+        patients,
+        host=args.host,
+        port=args.port,
+        latency=args.latency_ms / 1000.0,
+        binary_latency=None if args.binary_latency_ms is None else args.binary_latency_ms / 1000.0,
+        jitter=args.jitter,
+        max_qps=args.max_qps,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        max_page_size=args.max_page_size,
+        token_ttl=args.token_ttl,
+        seed=args.seed,
+    )
+
+    print(f"🩺 FHIR stand-in serving {len(patients)} synthetic patients at {server.base_url}")
+    print("   Point the backend at it with:")
+    for name, value in server.client_env().items():
+        print(f"   export {name}={value}")
+    print(f"   MRNs: {', '.join(p['mrn'] for p in patients[:10])}{' ...' if len(patients) > 10 else ''}")
+    print(f"   Stats: {server.root_url}/_stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n📊 {json.dumps(server.get_stats(), indent=2)}")
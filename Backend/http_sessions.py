@@ -0,0 +1,151 @@
+"""
+Pooled HTTP Sessions
+
+Bare requests.get/post calls open a new TCP + TLS connection for every
+request. This module keeps one requests.Session per host with a keep-alive
+connection pool, so repeated FHIR / auth / ClinicalTrials.gov calls reuse
+connections.
+
+Features:
+- One session per host, shared across threads (urllib3 pools are thread-safe)
+- Default (connect, read) timeout applied to every request
+- Reuse metrics: requests sent vs. new connections (handshakes) per host
+- Requests are recorded to or replayed from a cassette when one is active
+  (cassettes.py, CASSETTE_MODE=record|replay)
+
+Configuration (environment variables):
+- HTTP_POOL_MAXSIZE: connections kept alive per host (default: 16)
+- HTTP_CONNECT_TIMEOUT: connect timeout in seconds (default: 10)
+- HTTP_READ_TIMEOUT: read timeout in seconds (default: 120)
+
+Usage:
+    from Backend.http_sessions import get_session
+    response = get_session("https://fhir.prod.flatiron.io").get(url, headers=headers)
+"""
+
+import os
+import threading
+from typing import Dict, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from Backend.cassettes import get_cassette
+except ModuleNotFoundError:
+    from cassettes import get_cassette
+
+
+class PooledSession(requests.Session):
+    """
+    requests.Session with a default timeout and a sized keep-alive pool.
+    """
+
+    def __init__(self, host: str, pool_maxsize: int = 16, timeout: Tuple[float, float] = (10, 120)):
+        """
+        Initialize pooled session.
+
+        Args:
+            host: Host this session is used for (for metrics)
+            pool_maxsize: Number of connections to keep alive
+            timeout: Default (connect, read) timeout for requests without one
+        """
+        super().__init__()
+        self.host = host
+        self.default_timeout = timeout
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self._adapter = adapter
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.default_timeout
+        cassette = get_cassette()
+        if cassette is not None:
+            return cassette.http_request(super().request, method, url, **kwargs)
+        return super().request(method, url, **kwargs)
+
+    def get_stats(self) -> Dict:
+        """
+        Get connection reuse statistics.
+
+        Returns:
+            Dict with requests, new_connections (handshakes) and reused_connections
+        """
+        total_requests = 0
+        new_connections = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            total_requests += getattr(pool, "num_requests", 0)
+            new_connections += getattr(pool, "num_connections", 0)
+        return {
+            "host": self.host,
+            "requests": total_requests,
+            "new_connections": new_connections,
+            "reused_connections": max(0, total_requests - new_connections),
+        }
+
+
+# Global session registry (one session per host)
+_sessions: Dict[str, PooledSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def _host_of(url_or_host: str) -> str:
+    parsed = urlparse(url_or_host)
+    return parsed.netloc or parsed.path
+
+
+def get_session(url_or_host: str) -> PooledSession:
+    """
+    Get the shared pooled session for a host (singleton per host).
+
+    Args:
+        url_or_host: Full URL or bare host name
+
+    Returns:
+        PooledSession instance
+    """
+    host = _host_of(url_or_host)
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = PooledSession(
+                host=host,
+                pool_maxsize=int(os.environ.get("HTTP_POOL_MAXSIZE", 16)),
+                timeout=(
+                    float(os.environ.get("HTTP_CONNECT_TIMEOUT", 10)),
+                    float(os.environ.get("HTTP_READ_TIMEOUT", 120)),
+                ),
+            )
+            _sessions[host] = session
+        return session
+
+
+def get_session_stats() -> Dict[str, Dict]:
+    """Get reuse statistics for every host session."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    return {session.host: session.get_stats() for session in sessions}
+
+
+def close_sessions():
+    """Close all pooled sessions (mainly for tests and shutdown)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+if __name__ == "__main__":
+    # Example usage
+    session = get_session("https://clinicaltrials.gov")
+    for _ in range(3):
+        response = session.get("https://clinicaltrials.gov/api/v2/version")
+        print(f"Status: {response.status_code}")
+    print(f"Stats: {get_session_stats()}")
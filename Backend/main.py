@@ -14,7 +14,6 @@ import requests
 import base64
 from io import BytesIO
 import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 try:
     import PyPDF2
 except ImportError:
@@ -34,7 +33,7 @@ from Backend.bytes_extractor import (
     fetch_pdf_bytes_from_fhir_url,
     combine_pdf_bytes_and_upload
 )
-from Backend.documents_reference import generate_bearer_token, generate_onco_emr_token
+from Backend.documents_reference import get_fhir_tokens
 from Backend.storage_uploader import upload_and_share_pdf_bytes
 from Backend.Utils.components.patient_demographics import extract_patient_demographics
 from Backend.Utils.components.patient_diagnosis_status import extract_diagnosis_status
@@ -45,6 +44,7 @@ from Backend.Utils.Tabs.diagnosis_tab import diagnosis_extraction
 from Backend.Utils.Tabs.pathology_tab import pathology_info, classify_pathology_report_with_gemini
 from Backend.Utils.classification_cache import get_cached_classification, cache_classification, get_classification_cache
 from Backend.Utils.logger_config import setup_logger
+from Backend.Utils.stage_graph import StageGraph
 
 # Setup logger
 logger = setup_logger(__name__)
@@ -68,7 +68,8 @@ def extract_patient_data(mrn: str, verbose: bool = True):
             'demographics': dict,
             'diagnosis': dict,
             'comorbidities': dict,
-            'error': str (if failed)
+            'error': str (if failed),
+            'upload_error': str (if only the MD note upload failed; pdf_url is None)
         }
     """
     result = {
@@ -114,54 +115,50 @@ def extract_patient_data(mrn: str, verbose: bool = True):
         if verbose:
             print(f"      ✓ Retrieved {len(pdf_bytes):,} bytes ({len(pdf_bytes)/1024:.1f} KB)")
 
-        # Step 2: Upload to Google Drive
-        if verbose:
-            print("\n[2/6] Uploading to Google Drive...")
-
-        upload_result = upload_and_share_pdf_bytes(
-            pdf_bytes=pdf_bytes,
-            file_name=f"MD_note_{mrn}.pdf"
-        )
-
-        result['pdf_url'] = upload_result['shareable_url']
-
-        if verbose:
-            print(f"      ✓ URL: {result['pdf_url']}")
-
-        # Step 3-7: Extract all tab information in parallel
+        # Step 2-7: Upload and extract all tab information in parallel.
+        # The extractors get the bytes directly; the upload is only needed for
+        # the returned pdf_url, so it runs alongside them instead of before them.
         if verbose:
+            print("\n[2/6] Uploading to Google Drive in the background...")
             print("\n[3/6] Extracting all tab information in parallel...")
             print("      🔄 Running 5 extraction tasks concurrently...")
 
+        def upload_task():
+            upload_result = upload_and_share_pdf_bytes(
+                pdf_bytes=pdf_bytes,
+                file_name=f"MD_note_{mrn}.pdf"
+            )
+            return upload_result['shareable_url']
+
         # Define extraction tasks
         def extract_demographics_task():
             try:
-                return ('demographics', extract_patient_demographics(pdf_url=result['pdf_url']), None)
+                return ('demographics', extract_patient_demographics(pdf_bytes=pdf_bytes), None)
             except Exception as e:
                 return ('demographics', None, str(e))
 
         def extract_diagnosis_status_task():
             try:
-                return ('diagnosis', extract_diagnosis_status(pdf_url=result['pdf_url']), None)
+                return ('diagnosis', extract_diagnosis_status(pdf_bytes=pdf_bytes), None)
             except Exception as e:
                 return ('diagnosis', None, str(e))
 
         def extract_comorbidities_task():
             try:
-                return ('comorbidities', extract_comorbidities_status(pdf_url=result['pdf_url']), None)
+                return ('comorbidities', extract_comorbidities_status(pdf_bytes=pdf_bytes), None)
             except Exception as e:
                 return ('comorbidities', None, str(e))
 
         def extract_treatment_task():
             try:
-                lot, timeline = extract_treatment_tab_info(pdf_url=result['pdf_url'])
+                lot, timeline = extract_treatment_tab_info(pdf_bytes=pdf_bytes)
                 return ('treatment', {'lot': lot, 'timeline': timeline}, None)
             except Exception as e:
                 return ('treatment', None, str(e))
 
         def extract_diagnosis_tab_task():
             try:
-                header, timeline, footer = diagnosis_extraction(pdf_input=result['pdf_url'])
+                header, timeline, footer = diagnosis_extraction(pdf_input=pdf_bytes)
                 return ('diagnosis_tab', {'header': header, 'timeline': timeline, 'footer': footer}, None)
             except Exception as e:
                 return ('diagnosis_tab', None, str(e))
@@ -175,41 +172,56 @@ def extract_patient_data(mrn: str, verbose: bool = True):
             extract_diagnosis_tab_task
         ]
 
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            # Submit all tasks
-            future_to_task = {executor.submit(task): task.__name__ for task in tasks}
+        # None of the stages depend on each other; the graph runs them all at once
+        graph = StageGraph(f"patient-{mrn}")
+        graph.add('upload', upload_task)
+        for task in tasks:
+            graph.add(task.__name__, task)
+        graph_run = graph.run()
 
-            # Collect results as they complete
-            for future in as_completed(future_to_task):
-                task_name = future_to_task[future]
-                try:
-                    data_type, data, error = future.result()
+        for task in tasks:
+            task_name = task.__name__
+            if task_name in graph_run.errors:
+                if verbose:
+                    print(f"      ⚠️  Task {task_name} failed: {graph_run.errors[task_name]}")
+                continue
 
-                    if error:
-                        if verbose:
-                            print(f"      ⚠️  {data_type} extraction failed: {error}")
-                        result[f'{data_type}_error'] = error
-                    else:
-                        # Handle different data types
-                        if data_type == 'treatment':
-                            result['treatment_tab_info_LOT'] = data['lot']
-                            result['treatment_tab_info_timeline'] = data['timeline']
-                            if verbose:
-                                print(f"      ✓ Treatment tab extracted ({len(data['lot'])} LOT, {len(data['timeline'])} timeline)")
-                        elif data_type == 'diagnosis_tab':
-                            result['diagnosis_header'] = data['header']
-                            result['diagnosis_evolution_timeline'] = data['timeline']
-                            result['diagnosis_footer'] = data['footer']
-                            if verbose:
-                                print(f"      ✓ Diagnosis tab extracted ({len(data['header'])} header, {len(data['timeline'])} timeline, {len(data['footer'])} footer)")
-                        else:
-                            result[data_type] = data
-                            if verbose:
-                                print(f"      ✓ {data_type.capitalize()} extracted ({len(data)} fields)")
+            data_type, data, error = graph_run.results[task_name]
 
-                except Exception as e:
+            if error:
+                if verbose:
+                    print(f"      ⚠️  {data_type} extraction failed: {error}")
+                result[f'{data_type}_error'] = error
+            else:
+                # Handle different data types
+                if data_type == 'treatment':
+                    result['treatment_tab_info_LOT'] = data['lot']
+                    result['treatment_tab_info_timeline'] = data['timeline']
+                    if verbose:
+                        print(f"      ✓ Treatment tab extracted ({len(data['lot'])} LOT, {len(data['timeline'])} timeline)")
+                elif data_type == 'diagnosis_tab':
+                    result['diagnosis_header'] = data['header']
+                    result['diagnosis_evolution_timeline'] = data['timeline']
+                    result['diagnosis_footer'] = data['footer']
                     if verbose:
-                        print(f"      ⚠️  Task {task_name} failed: {str(e)}")
+                        print(f"      ✓ Diagnosis tab extracted ({len(data['header'])} header, {len(data['timeline'])} timeline, {len(data['footer'])} footer)")
+                else:
+                    result[data_type] = data
+                    if verbose:
+                        print(f"      ✓ {data_type.capitalize()} extracted ({len(data)} fields)")
+
+        # A failed upload only loses the pdf_url; the extractions above are kept
+        if 'upload' in graph_run.errors:
+            result['upload_error'] = str(graph_run.errors['upload'])
+            if verbose:
+                print(f"      ⚠️  MD note upload failed: {result['upload_error']}")
+        else:
+            result['pdf_url'] = graph_run.results['upload']
+            if verbose:
+                print(f"      ✓ Uploaded MD note URL: {result['pdf_url']}")
+        if verbose:
+            for stage_name, timing in graph_run.timings.items():
+                print(f"      ⏱️  {stage_name}: {timing['seconds']:.1f}s")
 
         result['success'] = True
 
@@ -469,8 +481,7 @@ def genomics_tab_info(mrn: str, verbose: bool = True):
             print("\n[3/5] Classifying pathology reports to identify genomic alterations...")
 
         # Authenticate once for all document fetches
-        bearer_token = generate_bearer_token()
-        onco_emr_token = generate_onco_emr_token(bearer_token)
+        bearer_token, onco_emr_token = get_fhir_tokens()
 
         pathology_docs = []
         genomic_pathology_docs = []
@@ -864,8 +875,7 @@ def pathology_tab_info_pipeline(mrn: str, verbose: bool = True, use_gemini_api:
             print("\n[2/3] Classifying pathology reports...")
 
         # Authenticate once for all document fetches
-        bearer_token = generate_bearer_token()
-        onco_emr_token = generate_onco_emr_token(bearer_token)
+        bearer_token, onco_emr_token = get_fhir_tokens()
 
         typical_pathology_docs = []
         genomic_pathology_docs = []
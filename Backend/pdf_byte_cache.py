@@ -0,0 +1,348 @@
+"""
+Content-Addressed PDF Byte Cache
+
+One ingest downloads the same PDF several times: genomics re-fetches the
+pathology and MD-note documents that the pathology pipeline already pulled,
+and each MD-note extractor re-downloads the note that was just uploaded to
+storage. This cache keeps PDF bytes in process so every pipeline shares one
+download.
+
+Design:
+- Content-addressed: bytes are stored once per SHA-256 digest. Lookup keys
+  (FHIR DocumentReference id, storage URL, direct URL) are aliases that point
+  at a digest, so the same PDF reached through different keys is stored once.
+- LRU bounded by total bytes, not entry count.
+- Optional disk spill: entries evicted from memory are written to a directory
+  as <sha256>.pdf and read back (and promoted) on the next hit.
+- Concurrent callers for the same key share one fetch (per-key lock). The
+  lock only exists while a caller holds or waits on it, and keys whose bytes
+  were evicted (from memory and disk) are dropped with them.
+
+Configuration (environment variables):
+- PDF_CACHE_MAX_BYTES: in-memory budget in bytes (default: 268435456 = 256 MB)
+- PDF_CACHE_SPILL_DIR: directory for spilled entries (default: unset = no spill)
+- PDF_CACHE_SPILL_MAX_BYTES: disk budget for spilled entries (default: 1073741824 = 1 GB)
+
+Usage:
+    from Backend.pdf_byte_cache import get_pdf_byte_cache, document_reference_key
+    pdf_bytes = get_pdf_byte_cache().get_or_fetch(document_reference_key(url), lambda: download(url))
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Set
+from urllib.parse import urlparse
+
+
+def document_reference_key(fhir_url: str) -> str:
+    """
+    Cache key for a FHIR DocumentReference URL.
+
+    Uses the resource id, so the same document reached through different
+    base URLs or query strings maps to one key.
+
+    Args:
+        fhir_url: FHIR DocumentReference URL (".../DocumentReference/<id>")
+
+    Returns:
+        Key string ("fhir:DocumentReference/<id>"), or "url:<fhir_url>" if no id is found
+    """
+    segments = [segment for segment in urlparse(fhir_url).path.split("/") if segment]
+    if "DocumentReference" in segments:
+        index = segments.index("DocumentReference")
+        if index + 1 < len(segments):
+            return f"fhir:DocumentReference/{segments[index + 1]}"
+    return url_key(fhir_url)
+
+
+def url_key(url: str) -> str:
+    """Cache key for a storage, Drive or direct PDF URL."""
+    return f"url:{url}"
+
+
+class PDFByteCache:
+    """
+    Thread-safe, content-addressed LRU cache of PDF bytes with optional disk spill.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+        spill_max_bytes: int = 1024 * 1024 * 1024
+    ):
+        """
+        Initialize PDF byte cache.
+
+        Args:
+            max_bytes: Maximum total size of bytes kept in memory
+            spill_dir: Directory for entries evicted from memory (None disables spill)
+            spill_max_bytes: Maximum total size of spilled files
+        """
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # key -> [lock, callers holding or waiting on it]
+        self._key_locks: Dict[str, list] = {}
+        self._aliases: Dict[str, str] = {}
+        self._digest_keys: Dict[str, Set[str]] = {}
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._spilled: "OrderedDict[str, int]" = OrderedDict()
+        self._spilled_bytes = 0
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bytes_saved": 0,
+            "evictions": 0,
+            "spills": 0,
+        }
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = [threading.Lock(), 0]
+                self._key_locks[key] = entry
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0 and self._key_locks.get(key) is entry:
+                    del self._key_locks[key]
+
+    def _alias_locked(self, key: str, digest: str):
+        self._unalias_locked(key)
+        self._aliases[key] = digest
+        self._digest_keys.setdefault(digest, set()).add(key)
+
+    def _unalias_locked(self, key: str):
+        digest = self._aliases.pop(key, None)
+        if digest is not None:
+            keys = self._digest_keys.get(digest)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._digest_keys[digest]
+
+    def _drop_digest_locked(self, digest: str):
+        """Forget every key of bytes that are neither in memory nor spilled."""
+        if digest in self._blobs or digest in self._spilled:
+            return
+        for key in self._digest_keys.pop(digest, ()):
+            if self._aliases.get(key) == digest:
+                del self._aliases[key]
+
+    def _spill_path(self, digest: str) -> str:
+        return os.path.join(self.spill_dir, f"{digest}.pdf")
+
+    def _read_spilled(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._spill_path(digest), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        # Never trust a truncated or replaced file
+        if hashlib.sha256(data).hexdigest() != digest:
+            return None
+        return data
+
+    def _write_spilled_locked(self, digest: str, data: bytes):
+        if digest in self._spilled:
+            self._spilled.move_to_end(digest)
+            return
+        if len(data) > self.spill_max_bytes:
+            self._drop_digest_locked(digest)
+            return
+        path = self._spill_path(digest)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  PDF cache spill failed for {digest[:12]}: {e}")
+            self._drop_digest_locked(digest)
+            return
+        self._spilled[digest] = len(data)
+        self._spilled_bytes += len(data)
+        self._stats["spills"] += 1
+
+        while self._spilled_bytes > self.spill_max_bytes and self._spilled:
+            old_digest, size = self._spilled.popitem(last=False)
+            self._spilled_bytes -= size
+            try:
+                os.remove(self._spill_path(old_digest))
+            except OSError:
+                pass
+            self._drop_digest_locked(old_digest)
+
+    def _store_locked(self, digest: str, data: bytes):
+        if digest in self._blobs:
+            self._blobs.move_to_end(digest)
+            return
+        if len(data) > self.max_bytes:
+            # Too large for memory; keep it on disk only
+            if self.spill_dir:
+                self._write_spilled_locked(digest, data)
+            else:
+                self._drop_digest_locked(digest)
+            return
+        self._blobs[digest] = data
+        self._memory_bytes += len(data)
+
+        while self._memory_bytes > self.max_bytes:
+            old_digest, old_data = self._blobs.popitem(last=False)
+            self._memory_bytes -= len(old_data)
+            self._stats["evictions"] += 1
+            if self.spill_dir:
+                self._write_spilled_locked(old_digest, old_data)
+            else:
+                self._drop_digest_locked(old_digest)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Look up PDF bytes by key.
+
+        Args:
+            key: Cache key (see document_reference_key / url_key)
+
+        Returns:
+            PDF bytes, or None on a miss
+        """
+        with self._lock:
+            digest = self._aliases.get(key)
+            if digest is None:
+                self._stats["misses"] += 1
+                return None
+            data = self._blobs.get(digest)
+            if data is not None:
+                self._blobs.move_to_end(digest)
+                self._stats["hits"] += 1
+                self._stats["memory_hits"] += 1
+                self._stats["bytes_saved"] += len(data)
+                return data
+            spilled = self.spill_dir and digest in self._spilled
+
+        data = self._read_spilled(digest) if spilled else None
+
+        with self._lock:
+            if data is None:
+                self._unalias_locked(key)
+                self._stats["misses"] += 1
+                return None
+            self._store_locked(digest, data)
+            self._stats["hits"] += 1
+            self._stats["disk_hits"] += 1
+            self._stats["bytes_saved"] += len(data)
+            return data
+
+    def put(self, key: str, data: bytes) -> str:
+        """
+        Store PDF bytes under a key.
+
+        Args:
+            key: Cache key
+            data: PDF bytes
+
+        Returns:
+            SHA-256 hex digest of the bytes
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._alias_locked(key, digest)
+            self._store_locked(digest, data)
+        return digest
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """
+        Return cached bytes for key, or call fetch() once and cache its result.
+
+        Concurrent callers for the same key wait for the in-flight fetch.
+        None results are returned but not cached.
+
+        Args:
+            key: Cache key
+            fetch: Zero-argument function that downloads the bytes
+
+        Returns:
+            PDF bytes (or whatever fetch returned if it was None)
+        """
+        with self._key_lock(key):
+            data = self.get(key)
+            if data is not None:
+                return data
+            data = fetch()
+            if data:
+                self.put(key, data)
+            return data
+
+    def invalidate(self, key: Optional[str] = None):
+        """
+        Drop one key, or everything (including spilled files) if key is None.
+        """
+        with self._lock:
+            if key is not None:
+                self._unalias_locked(key)
+                return
+            self._aliases.clear()
+            self._digest_keys.clear()
+            self._blobs.clear()
+            self._memory_bytes = 0
+            for digest in list(self._spilled):
+                try:
+                    os.remove(self._spill_path(digest))
+                except OSError:
+                    pass
+            self._spilled.clear()
+            self._spilled_bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+            stats["keys"] = len(self._aliases)
+            stats["key_locks"] = len(self._key_locks)
+            stats["memory_entries"] = len(self._blobs)
+            stats["memory_bytes"] = self._memory_bytes
+            stats["spilled_entries"] = len(self._spilled)
+            stats["spilled_bytes"] = self._spilled_bytes
+            return stats
+
+
+# Global cache instance
+_pdf_cache_instance = None
+_pdf_cache_lock = threading.Lock()
+
+
+def get_pdf_byte_cache() -> PDFByteCache:
+    """
+    Get global PDF byte cache instance (singleton pattern).
+
+    Returns:
+        PDFByteCache instance
+    """
+    global _pdf_cache_instance
+    with _pdf_cache_lock:
+        if _pdf_cache_instance is None:
+            _pdf_cache_instance = PDFByteCache(
+                max_bytes=int(os.environ.get("PDF_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+                spill_dir=os.environ.get("PDF_CACHE_SPILL_DIR") or None,
+                spill_max_bytes=int(os.environ.get("PDF_CACHE_SPILL_MAX_BYTES", 1024 * 1024 * 1024)),
+            )
+        return _pdf_cache_instance
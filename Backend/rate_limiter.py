@@ -0,0 +1,226 @@
+"""
+Adaptive Rate Limiter for the FHIR API
+
+Replaces the fixed time.sleep(1.5) calls that were spread across the FHIR
+fetch code. One limiter is shared by every thread in the process per host,
+so concurrent extractions share a single request budget instead of each
+sleeping independently.
+
+Algorithm:
+- Token bucket: requests take a token; tokens refill at the current rate.
+- AIMD: each successful response adds a small step to the rate (additive
+  increase); each 429/503 multiplies it down (multiplicative decrease).
+- Retry-After: a throttled response pauses the whole host until the time the
+  server asked for.
+
+Configuration (environment variables):
+- FHIR_RATE_LIMIT_QPS: initial requests per second (default: 2.0)
+- FHIR_RATE_LIMIT_MIN_QPS: lower bound for the rate (default: 0.2)
+- FHIR_RATE_LIMIT_MAX_QPS: upper bound for the rate (default: 8.0)
+- FHIR_RATE_LIMIT_BURST: bucket size (default: 2)
+- FHIR_RATE_LIMIT_MAX_RETRY_AFTER: longest Retry-After pause honored, in
+  seconds (default: 60)
+"""
+
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+
+# HTTP status codes that mean "slow down"
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str], max_seconds: Optional[float] = None) -> Optional[float]:
+    """
+    Parse a Retry-After header value into seconds.
+
+    Args:
+        value: Header value, either delta-seconds ("5") or an HTTP date
+        max_seconds: Longest pause returned (default: FHIR_RATE_LIMIT_MAX_RETRY_AFTER)
+
+    Returns:
+        Seconds to wait (at most max_seconds), or None if the header is missing
+        or invalid ("inf" and "nan" are invalid)
+    """
+    if not value:
+        return None
+    if max_seconds is None:
+        max_seconds = float(os.environ.get("FHIR_RATE_LIMIT_MAX_RETRY_AFTER", 60))
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    if not math.isfinite(seconds):
+        # One malformed header must not stall the shared limiter forever
+        return None
+    return min(max(0.0, seconds), max_seconds)
+
+
+class AdaptiveRateLimiter:
+    """
+    Thread-safe token bucket whose refill rate adapts with AIMD.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_rate: float = 2.0,
+        min_rate: float = 0.2,
+        max_rate: float = 8.0,
+        burst: int = 2,
+        increase_step: float = 0.05,
+        decrease_factor: float = 0.5
+    ):
+        """
+        Initialize rate limiter.
+
+        Args:
+            name: Name used in stats (usually the host)
+            initial_rate: Starting rate in requests per second
+            min_rate: Lowest rate AIMD may reduce to
+            max_rate: Highest rate AIMD may increase to
+            burst: Maximum number of tokens in the bucket
+            increase_step: Rate added after each successful response
+            decrease_factor: Rate multiplier applied after each throttled response
+        """
+        self.name = name
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1, burst)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+
+        self._lock = threading.Lock()
+        self._rate = min(max(initial_rate, min_rate), max_rate)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._stats = {
+            "requests": 0,
+            "throttled": 0,
+            "total_wait_seconds": 0.0,
+        }
+
+    def _refill_locked(self, now: float):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(float(self.burst), self._tokens + elapsed * self._rate)
+            self._last_refill = now
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill_locked(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self._stats["requests"] += 1
+                    self._stats["total_wait_seconds"] += now - started
+                    return
+                else:
+                    wait = (1.0 - self._tokens) / self._rate
+            time.sleep(wait)
+
+    def on_success(self):
+        """Additive increase after a successful (non-throttled) response."""
+        with self._lock:
+            self._rate = min(self.max_rate, self._rate + self.increase_step)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """
+        Multiplicative decrease after a 429/503 response.
+
+        Args:
+            retry_after: Seconds from the Retry-After header, if any. The host is
+                         paused for that long; otherwise for one refill interval.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._stats["throttled"] += 1
+            self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+            pause = retry_after if retry_after is not None else 1.0 / self._rate
+            self._blocked_until = max(self._blocked_until, now + pause)
+            # Drop saved-up burst so the host is not hit again the moment the pause ends
+            self._tokens = 0.0
+            self._last_refill = max(now, self._blocked_until)
+
+    @property
+    def rate(self) -> float:
+        """Current rate in requests per second."""
+        with self._lock:
+            return self._rate
+
+    def get_stats(self) -> Dict:
+        """Get limiter statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["name"] = self.name
+            stats["current_rate"] = round(self._rate, 3)
+            stats["total_wait_seconds"] = round(stats["total_wait_seconds"], 3)
+            return stats
+
+
+# Global limiter registry (one limiter per host)
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(host: str) -> AdaptiveRateLimiter:
+    """
+    Get the shared rate limiter for a host (singleton per host).
+
+    Args:
+        host: Host name (e.g. "fhir.prod.flatiron.io")
+
+    Returns:
+        AdaptiveRateLimiter instance
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(
+                name=host,
+                initial_rate=float(os.environ.get("FHIR_RATE_LIMIT_QPS", 2.0)),
+                min_rate=float(os.environ.get("FHIR_RATE_LIMIT_MIN_QPS", 0.2)),
+                max_rate=float(os.environ.get("FHIR_RATE_LIMIT_MAX_QPS", 8.0)),
+                burst=int(os.environ.get("FHIR_RATE_LIMIT_BURST", 2)),
+            )
+            _limiters[host] = limiter
+        return limiter
+
+
+def get_rate_limiter_stats() -> Dict[str, Dict]:
+    """Get statistics for every host limiter."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.get_stats() for limiter in limiters}
+
+
+if __name__ == "__main__":
+    # Example usage
+    limiter = AdaptiveRateLimiter("example", initial_rate=5.0, burst=1)
+    start = time.monotonic()
+    for i in range(10):
+        limiter.acquire()
+        if i == 4:
+            limiter.on_throttle(retry_after=1.0)
+        else:
+            limiter.on_success()
+        print(f"Request {i + 1} at {time.monotonic() - start:.2f}s (rate={limiter.rate:.2f}/s)")
+    print(f"Stats: {limiter.get_stats()}")
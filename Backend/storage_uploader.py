@@ -3,13 +3,23 @@ Firebase Storage (Google Cloud Storage) Document Uploader Module
 
 Replaces Google Drive for document storage. Uploads PDFs to a GCS bucket
 and serves them via a backend proxy endpoint.
+
+Set STORAGE_BACKEND=memory to keep objects in process instead (offline runs
+and benchmarks; nothing survives the process).
 """
 import os
 import logging
+import threading
 import urllib.parse
+from datetime import datetime, timezone
 from io import BytesIO
 from typing import Optional, Dict, Any
 
+try:
+    from Backend.pdf_byte_cache import get_pdf_byte_cache, url_key
+except ModuleNotFoundError:
+    from pdf_byte_cache import get_pdf_byte_cache, url_key
+
 logger = logging.getLogger(__name__)
 
 BUCKET_NAME = os.environ.get("FIREBASE_STORAGE_BUCKET", "rapids-platform.firebasestorage.app")
@@ -18,9 +28,58 @@ _storage_client_cache = None
 _bucket_cache = None
 
 
+class _MemoryBlob:
+    """Blob of an in-memory bucket (the subset of google.cloud.storage.Blob used here)."""
+
+    def __init__(self, bucket: "_MemoryBucket", name: str):
+        self._bucket = bucket
+        self.name = name
+        self.content_type = None
+        self.size = None
+        self.updated = None
+
+    def upload_from_file(self, file_obj, content_type: Optional[str] = None):
+        data = file_obj.read()
+        with self._bucket.lock:
+            self._bucket.objects[self.name] = (data, content_type, datetime.now(timezone.utc))
+        self.reload()
+
+    def download_as_bytes(self) -> bytes:
+        return self._get()[0]
+
+    def delete(self):
+        self._get()
+        with self._bucket.lock:
+            self._bucket.objects.pop(self.name, None)
+
+    def reload(self):
+        data, self.content_type, self.updated = self._get()
+        self.size = len(data)
+
+    def _get(self):
+        with self._bucket.lock:
+            if self.name not in self._bucket.objects:
+                raise FileNotFoundError(f"No such object: {BUCKET_NAME}/{self.name}")
+            return self._bucket.objects[self.name]
+
+
+class _MemoryBucket:
+    """In-process stand-in for the storage bucket (STORAGE_BACKEND=memory, offline runs)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.objects: Dict[str, Any] = {}
+
+    def blob(self, blob_path: str) -> _MemoryBlob:
+        return _MemoryBlob(self, blob_path)
+
+
 def _get_bucket():
     """Get the GCS bucket, initializing client if needed."""
     global _storage_client_cache, _bucket_cache
+    if _bucket_cache is None and os.environ.get("STORAGE_BACKEND", "gcs").lower() == "memory":
+        _bucket_cache = _MemoryBucket(BUCKET_NAME)
     if _bucket_cache is None:
         from google.cloud import storage
         project = os.environ.get("GCP_PROJECT_ID", "rapids-platform")
@@ -52,7 +111,10 @@ def upload_pdf_bytes_to_storage(pdf_bytes: bytes, blob_path: str) -> str:
     blob.upload_from_file(BytesIO(pdf_bytes), content_type="application/pdf")
     # Return a URL via our own serving endpoint (avoids GCS public access issues)
     encoded_path = urllib.parse.quote(blob_path, safe="")
-    return f"/api/documents/{encoded_path}"
+    url = f"/api/documents/{encoded_path}"
+    # Later downloads of the uploaded document are served from memory
+    get_pdf_byte_cache().put(url_key(url), pdf_bytes)
+    return url
 
 
 def upload_and_share_pdf_bytes(
@@ -88,6 +150,29 @@ def create_or_get_folder(folder_name: str, parent_folder_id: Optional[str] = Non
     return f"documents/{folder_name}"
 
 
+def upload_bytes_to_gcs(data: bytes, blob_path: str, content_type: str = "application/pdf") -> str:
+    """
+    Upload bytes to the storage bucket for services that read GCS directly (e.g. Vertex AI).
+
+    Args:
+        data: Raw bytes
+        blob_path: Full path in bucket
+        content_type: MIME type stored on the blob
+
+    Returns:
+        gs:// URI of the blob
+    """
+    bucket = _get_bucket()
+    blob = bucket.blob(blob_path)
+    blob.upload_from_file(BytesIO(data), content_type=content_type)
+    return f"gs://{BUCKET_NAME}/{blob_path}"
+
+
+def delete_blob(blob_path: str):
+    """Delete a blob from the storage bucket."""
+    _get_bucket().blob(blob_path).delete()
+
+
 def download_pdf_bytes(blob_path: str) -> bytes:
     """Download PDF bytes from Firebase Storage by blob path."""
     bucket = _get_bucket()
@@ -100,7 +185,13 @@ def download_pdf_bytes_from_url(url: str) -> bytes:
     Download PDF bytes from a Firebase Storage URL or Google Drive URL.
 
     Handles Firebase Storage paths, URLs, and legacy Google Drive URLs.
+    Bytes are served from the shared PDF byte cache when available.
     """
+    return get_pdf_byte_cache().get_or_fetch(url_key(url), lambda: _download_pdf_bytes_from_url(url))
+
+
+def _download_pdf_bytes_from_url(url: str) -> bytes:
+    """Download PDF bytes from a storage, Drive or direct URL (uncached)."""
     # Our own document endpoint path
     if url.startswith("/api/documents/"):
         blob_path = urllib.parse.unquote(url.replace("/api/documents/", "", 1))
@@ -116,8 +207,11 @@ def download_pdf_bytes_from_url(url: str) -> bytes:
         return _download_from_drive(url)
 
     # Direct URL
-    import requests
-    resp = requests.get(url, timeout=60)
+    try:
+        from Backend.http_sessions import get_session
+    except ModuleNotFoundError:
+        from http_sessions import get_session
+    resp = get_session(url).get(url, timeout=60)
     resp.raise_for_status()
     return resp.content
 
@@ -0,0 +1,189 @@
+"""
+Benchmark: split (one Gemini call per section) vs. combined (one call per tab) extraction.
+
+For each PDF, runs the tab's extraction in both modes against Vertex AI and
+reports:
+1. wall time per mode
+2. Gemini calls and prompt/output tokens per mode (from GeminiClient stats)
+3. field-level agreement: every leaf field of the split output is compared
+   with the same path in the combined output (strings are compared after
+   lowercasing and collapsing whitespace)
+
+The on-disk response cache is disabled so both modes make live calls.
+Requires Vertex AI credentials.
+
+Usage:
+    python test_combined_extraction_benchmark.py --tab diagnosis --pdf md_note.pdf
+    python test_combined_extraction_benchmark.py --tab pathology --pdf path1.pdf --pdf path2.pdf --json results.json
+"""
+
+import sys
+import os
+import re
+import json
+import time
+import argparse
+
+# The response cache would turn the second mode into cache hits
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+# Add Backend and repository root to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (BACKEND_DIR, os.path.dirname(BACKEND_DIR)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from Backend.Utils.gemini_client import get_gemini_client
+
+
+def run_diagnosis(pdf_bytes, mode):
+    from Backend.Utils.Tabs.diagnosis_tab import diagnosis_extraction
+    header, evolution, footer = diagnosis_extraction(pdf_bytes, mode=mode)
+    return {"header": header, "evolution": evolution, "footer": footer}
+
+
+def run_treatment(pdf_bytes, mode):
+    from Backend.Utils.Tabs.treatment_tab import extract_treatment_tab_info
+    lot, timeline = extract_treatment_tab_info(pdf_bytes=pdf_bytes, mode=mode)
+    return {"lot": lot, "timeline": timeline}
+
+
+def run_radiology(pdf_bytes, mode):
+    from Backend.Utils.Tabs.radiology_tab import radiology_info
+    summary, imp_recist = radiology_info(pdf_input=pdf_bytes, use_gemini_api=True, mode=mode)
+    return {"summary": summary, "imp_recist": imp_recist}
+
+
+def run_pathology(pdf_bytes, mode):
+    from Backend.Utils.Tabs.pathology_tab import pathology_info
+    summary, markers = pathology_info(pdf_bytes, use_gemini_api=True, mode=mode)
+    if isinstance(summary, dict):
+        summary = {k: v for k, v in summary.items() if k != "pdf_url"}
+    return {"summary": summary, "markers": markers}
+
+
+RUNNERS = {
+    "diagnosis": run_diagnosis,
+    "treatment": run_treatment,
+    "radiology": run_radiology,
+    "pathology": run_pathology,
+}
+
+
+def flatten(value, prefix=""):
+    """Flatten nested dicts/lists into {path: leaf value}."""
+    leaves = {}
+    if isinstance(value, dict):
+        for key, child in value.items():
+            leaves.update(flatten(child, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(value, list):
+        if not value:
+            leaves[prefix] = []
+        for index, child in enumerate(value):
+            leaves.update(flatten(child, f"{prefix}[{index}]"))
+    else:
+        leaves[prefix] = value
+    return leaves
+
+
+def normalize(value):
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value).strip().lower()
+    return value
+
+
+def field_agreement(split_output, combined_output):
+    """
+    Compare combined output to split output field by field.
+
+    Returns:
+        Dict with total split fields, matching fields, fields missing from the
+        combined output, and per-section agreement
+    """
+    split_leaves = flatten(split_output)
+    combined_leaves = flatten(combined_output)
+    matching = [path for path, value in split_leaves.items()
+                if path in combined_leaves and normalize(combined_leaves[path]) == normalize(value)]
+    missing = [path for path in split_leaves if path not in combined_leaves]
+
+    sections = {}
+    for path in split_leaves:
+        section = path.split(".", 1)[0].split("[", 1)[0]
+        stats = sections.setdefault(section, {"fields": 0, "matching": 0})
+        stats["fields"] += 1
+    for path in matching:
+        sections[path.split(".", 1)[0].split("[", 1)[0]]["matching"] += 1
+
+    return {
+        "fields": len(split_leaves),
+        "matching": len(matching),
+        "agreement": round(len(matching) / len(split_leaves), 3) if split_leaves else 1.0,
+        "missing_in_combined": len(missing),
+        "extra_in_combined": len([path for path in combined_leaves if path not in split_leaves]),
+        "sections": {name: dict(stats, agreement=round(stats["matching"] / stats["fields"], 3))
+                     for name, stats in sections.items()},
+    }
+
+
+def gemini_totals():
+    totals = {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for stats in get_gemini_client().get_stats()["models"].values():
+        for name in totals:
+            totals[name] += stats.get(name, 0)
+    return totals
+
+
+def run_mode(tab, pdf_bytes, mode):
+    before = gemini_totals()
+    started = time.perf_counter()
+    output = RUNNERS[tab](pdf_bytes, mode)
+    wall = time.perf_counter() - started
+    after = gemini_totals()
+    usage = {name: after[name] - before[name] for name in after}
+    return output, dict(usage, wall_seconds=round(wall, 2))
+
+
+def print_mode(label, usage):
+    print(f"  {label:<9} wall={usage['wall_seconds']:>7.2f}s  calls={usage['calls']:<3} "
+          f"prompt_tokens={usage['prompt_tokens']:<8} output_tokens={usage['output_tokens']:<8} "
+          f"total_tokens={usage['total_tokens']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split vs. combined Gemini extraction benchmark")
+    parser.add_argument("--tab", required=True, choices=sorted(RUNNERS))
+    parser.add_argument("--pdf", required=True, action="append", help="PDF file (repeatable)")
+    parser.add_argument("--json", help="Write per-PDF results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for pdf_path in args.pdf:
+        with open(pdf_path, "rb") as f:
+            pdf_bytes = f.read()
+
+        print(f"\n{'='*80}\n{args.tab.upper()} - {os.path.basename(pdf_path)} ({len(pdf_bytes)} bytes)\n{'='*80}")
+        split_output, split_usage = run_mode(args.tab, pdf_bytes, "split")
+        combined_output, combined_usage = run_mode(args.tab, pdf_bytes, "combined")
+        agreement = field_agreement(split_output, combined_output)
+
+        print_mode("split", split_usage)
+        print_mode("combined", combined_usage)
+        if split_usage["wall_seconds"]:
+            print(f"  speedup   {split_usage['wall_seconds'] / max(combined_usage['wall_seconds'], 0.01):.2f}x wall, "
+                  f"{split_usage['total_tokens'] - combined_usage['total_tokens']} tokens saved")
+        print(f"  agreement {agreement['matching']}/{agreement['fields']} fields ({agreement['agreement']:.1%}), "
+              f"{agreement['missing_in_combined']} missing in combined")
+        for section, stats in agreement["sections"].items():
+            print(f"    {section:<12} {stats['matching']}/{stats['fields']} ({stats['agreement']:.1%})")
+
+        results.append({
+            "pdf": pdf_path,
+            "split": split_usage,
+            "combined": combined_usage,
+            "agreement": agreement,
+        })
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
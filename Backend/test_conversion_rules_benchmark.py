@@ -0,0 +1,145 @@
+"""
+Microbenchmark: _apply_dynamic_rules with per-call vs. cached conversion rules.
+
+_apply_dynamic_rules runs for every inclusion and exclusion Gemini call, and
+used to open and parse Utils/conversion_rules.json each time. This script
+times it on a representative patient:
+1. reloading the rules on every call (read + parse, as before)
+2. with the cached, precompiled rules (_load_conversion_rules)
+
+and checks that both produce the same facts, and that editing the rules file
+is picked up by the cached loader without a restart.
+
+Usage:
+    python test_conversion_rules_benchmark.py
+    python test_conversion_rules_benchmark.py --calls 20000
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+# Add Backend directory to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import Utils.Tabs.clinical_trials_tab as clinical_trials_tab
+
+
+SAMPLE_PATIENT = {
+    "demographics": {
+        "Age": "68 years",
+        "Gender": "Female",
+        "Height": "5 ft 6 in",
+        "Weight": "150 lbs",
+        "Social History": {"smoking_status": "Former smoker, quit 2010, 30 pack-years"},
+    },
+    "comorbidities": {
+        "comorbidities": [
+            {"condition_name": "Hypertension", "associated_medications": ["Lisinopril"]},
+            {"condition_name": "Type 2 diabetes mellitus", "associated_medications": ["Metformin"]},
+            {"condition_name": "Hypothyroidism", "associated_medications": "Levothyroxine"},
+        ],
+        "ecog_performance_status": {"score": "1"},
+        "review_of_systems": {
+            "respiratory": "Mild dyspnea on exertion. No hemoptysis.",
+            "neurological": "Denies seizures, headaches or focal weakness.",
+        },
+    },
+    "treatment_tab_info_LOT": {
+        "treatment_history": [
+            {"regimen_details": {"display_name": "Carboplatin + Pemetrexed + Pembrolizumab",
+                                 "drugs": ["carboplatin", "pemetrexed", {"name": "pembrolizumab"}]}},
+            {"regimen_details": {"display_name": "Osimertinib", "drugs": ["osimertinib"]}},
+        ]
+    },
+    "radiology_details": [
+        {"summary": "CT chest: partial response of RUL mass. No new brain metastases. Stable adrenal lesion."},
+        {"summary": "MRI brain: no evidence of intracranial metastatic disease."},
+    ],
+}
+
+
+def apply_rules(patient):
+    return clinical_trials_tab._apply_dynamic_rules(
+        patient,
+        patient.get("demographics", {}),
+        patient.get("comorbidities", {}),
+        patient.get("lab_info", {}),
+        patient.get("treatment_tab_info_LOT", {}),
+    )
+
+
+def time_calls(label, calls):
+    apply_rules(SAMPLE_PATIENT)  # warm up
+    start = time.perf_counter()
+    for _ in range(calls):
+        facts = apply_rules(SAMPLE_PATIENT)
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<34} calls={calls:<6} total={elapsed:7.3f}s  ({elapsed / calls * 1e6:8.1f} µs/call)")
+    return elapsed, facts
+
+
+def check_hot_reload():
+    """Edit a copy of the rules file and confirm the cached loader sees the new rule."""
+    original_path = clinical_trials_tab.CONVERSION_RULES_PATH
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rules_path = os.path.join(tmp_dir, "conversion_rules.json")
+        shutil.copy(original_path, rules_path)
+        clinical_trials_tab.CONVERSION_RULES_PATH = rules_path
+        try:
+            before = apply_rules(SAMPLE_PATIENT)
+            with open(rules_path, "r") as f:
+                data = json.load(f)
+            data["rules"].append({
+                "id": "benchmark_reload_probe",
+                "type": "data_search",
+                "active": True,
+                "search_terms": ["osimertinib"],
+                "output_if_found": "RELOAD PROBE: found {matches}",
+                "output_if_not_found": "RELOAD PROBE: none ({drugs_searched})",
+            })
+            with open(rules_path, "w") as f:
+                json.dump(data, f)
+            # Make sure the mtime moves even on coarse-grained filesystems
+            stat = os.stat(rules_path)
+            os.utime(rules_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            after = apply_rules(SAMPLE_PATIENT)
+        finally:
+            clinical_trials_tab.CONVERSION_RULES_PATH = original_path
+    return len(after) == len(before) + 1 and after[-1].startswith("RELOAD PROBE: found")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversion rules microbenchmark")
+    parser.add_argument("--calls", type=int, default=5000, help="Calls per case")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 80)
+    print("CONVERSION RULES MICROBENCHMARK (_apply_dynamic_rules)")
+    print("=" * 80)
+
+    cached_loader = clinical_trials_tab._load_conversion_rules
+    clinical_trials_tab._load_conversion_rules = clinical_trials_tab._read_conversion_rules
+    try:
+        before_time, before_facts = time_calls("reload rules on every call", args.calls)
+    finally:
+        clinical_trials_tab._load_conversion_rules = cached_loader
+    after_time, after_facts = time_calls("cached + precompiled rules", args.calls)
+
+    same_facts = before_facts == after_facts
+    reloads = check_hot_reload()
+
+    print(f"\n   Speedup: {before_time / after_time:.1f}x  ({len(after_facts)} facts per call)")
+    print(f"   Same facts: {same_facts}   Hot reload after edit: {reloads}")
+
+    passed = same_facts and reloads and after_time < before_time
+    print("\n" + "=" * 80)
+    print("✅ PASS" if passed else "❌ FAIL")
+    print("=" * 80 + "\n")
+    sys.exit(0 if passed else 1)
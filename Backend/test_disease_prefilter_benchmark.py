@@ -0,0 +1,174 @@
+"""
+Microbenchmark: check_disease_match + pre_filter_trial per (patient, trial) pair.
+
+Both checks run for every pair in an eligibility matrix before any Gemini
+call. The trial-side work (lower-casing and joining the trial text, scanning
+it for the keyword lists, parsing ages and the ECOG requirement) only depends
+on the trial, so it is computed once per trial and shared by every patient.
+This script times the pre-filter over the fixture trials plus synthetic
+variants:
+1. recomputing the trial features for every pair (no per-trial cache)
+2. with the per-NCT trial feature cache (trials without stored features)
+3. with the features stored on the trial at sync time (trial["features"])
+4. with the columnar TrialPrefilterIndex (one vectorized pass per patient,
+   as compute_eligibility_matrix runs it; scalar fallback without NumPy)
+
+and checks that all of them make the same decision for every pair, with the
+same reason (the index through TrialPrefilterIndex.prefilter, vectorized and
+scalar fallback).
+
+Usage:
+    python test_disease_prefilter_benchmark.py
+    python test_disease_prefilter_benchmark.py --trials 20000 --patients 50
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+
+# Add Backend directory to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import Utils.Tabs.clinical_trials_tab as clinical_trials_tab
+from Utils.trial_prefilter import TrialPrefilterIndex
+
+FIXTURE = os.path.join(BACKEND_DIR, "fixtures", "offline_patients.json")
+
+CONDITIONS = [
+    ["Non-small Cell Lung Cancer"], ["Breast Cancer", "HER2-positive Breast Cancer"],
+    ["Advanced Solid Tumor"], ["Colorectal Cancer"], ["Type 2 Diabetes"], ["HIV Infections"],
+    ["Prostate Cancer", "Metastatic Castration-resistant Prostate Cancer"], [],
+]
+CRITERIA = [
+    "Inclusion Criteria:\n- ECOG performance status 0-1\n- Adequate organ function",
+    "Inclusion Criteria:\n- ECOG ≤ 2\n- Measurable disease per RECIST 1.1",
+    "Inclusion Criteria:\n- Age >= 18\nExclusion Criteria:\n- Active brain metastases",
+]
+DIAGNOSES = [
+    ("Non-small cell lung cancer", "Adenocarcinoma"), ("Breast cancer", "Invasive ductal carcinoma"),
+    ("Colorectal cancer", "Adenocarcinoma"), ("Pancreatic cancer", ""),
+]
+
+
+def build_trials(fixture, count, rng):
+    trials = list(fixture.get("trials", []))
+    for i in range(count - len(trials)):
+        conditions = rng.choice(CONDITIONS)
+        trials.append({
+            "nct_id": f"NCTSYN{i:05d}",
+            "title": f"A Phase {rng.randint(1, 3)} Study in {', '.join(conditions) or 'Advanced Cancer'}",
+            "conditions": conditions,
+            "brief_summary": "This study evaluates the safety and efficacy of the investigational agent " * 4,
+            "eligibility_criteria_text": rng.choice(CRITERIA) * 3,
+            "minimum_age": rng.choice(["18 Years", "21 Years", ""]),
+            "maximum_age": rng.choice(["", "75 Years"]),
+            "sex": rng.choice(["ALL", "ALL", "FEMALE", "MALE"]),
+        })
+    return trials
+
+
+def build_patients(count, rng):
+    return [{
+        "diagnosis": dict(zip(("cancer_type", "histology"), rng.choice(DIAGNOSES))),
+        "demographics": {"Age": f"{rng.randint(30, 85)} years", "Gender": rng.choice(["Male", "Female"])},
+        "comorbidities": {"ecog_performance_status": {"score": str(rng.randint(0, 3))}},
+    } for _ in range(count)]
+
+
+def run_prefilter(trials, patients):
+    results = []
+    for patient in patients:
+        for trial in trials:
+            results.append((clinical_trials_tab.check_disease_match(trial, patient),
+                            clinical_trials_tab.pre_filter_trial(trial, patient)))
+    return results
+
+
+def time_pairs(label, trials, patients):
+    start = time.perf_counter()
+    results = run_prefilter(trials, patients)
+    elapsed = time.perf_counter() - start
+    pairs = len(trials) * len(patients)
+    print(f"   {label:<34} pairs={pairs:<7} total={elapsed:7.3f}s  ({elapsed / pairs * 1e6:6.1f} µs/pair)")
+    return elapsed, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Disease match / pre-filter microbenchmark")
+    parser.add_argument("--trials", type=int, default=500, help="Trials (fixture trials + synthetic)")
+    parser.add_argument("--patients", type=int, default=20, help="Synthetic patients")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with open(FIXTURE, "r") as f:
+        trials = build_trials(json.load(f), args.trials, rng)
+    patients = build_patients(args.patients, rng)
+
+    print("\n" + "=" * 80)
+    print("DISEASE MATCH / PRE-FILTER MICROBENCHMARK")
+    print("=" * 80)
+
+    cached_features = clinical_trials_tab.get_trial_match_features
+    clinical_trials_tab.get_trial_match_features = clinical_trials_tab.compute_trial_features
+    try:
+        before_time, before_results = time_pairs("recompute trial features per pair", trials, patients)
+    finally:
+        clinical_trials_tab.get_trial_match_features = cached_features
+    clinical_trials_tab.get_trial_feature_cache().clear()
+    cached_time, cached_results = time_pairs("per-NCT trial feature cache", trials, patients)
+    synced_trials = [dict(t, features=clinical_trials_tab.compute_trial_features(t)) for t in trials]
+    after_time, after_results = time_pairs("features stored at sync", synced_trials, patients)
+
+
+    index_start = time.perf_counter()
+    index = TrialPrefilterIndex(synced_trials)
+    build_time = time.perf_counter() - index_start
+    index_start = time.perf_counter()
+    index_results = [passes for patient in patients for passes in index.candidate_mask(patient)]
+    index_time = time.perf_counter() - index_start
+    pairs = len(trials) * len(patients)
+    label = "vectorized prefilter index" if index.vectorized else "prefilter index (no NumPy)"
+    print(f"   {label:<34} pairs={pairs:<7} total={index_time:7.3f}s  ({index_time / pairs * 1e6:6.1f} µs/pair)"
+          f"  build={build_time:.3f}s")
+
+    def expected_rejection(disease, prefilter):
+        if not disease[0]:
+            return ("disease", disease[1])
+        return None if prefilter[0] else ("prefilter", prefilter[1])
+
+    expected_rejections = [expected_rejection(disease, prefilter) for disease, prefilter in after_results]
+    scalar_index = TrialPrefilterIndex(synced_trials)
+    scalar_index.vectorized = False
+    same_reasons = True
+    for indexed in (index, scalar_index):
+        rejections = {}
+        for i, patient in enumerate(patients):
+            for nct_id, rejection in indexed.prefilter(patient)[1].items():
+                rejections[(i, nct_id)] = rejection
+        same_reasons = same_reasons and rejections == {
+            (i // len(trials), synced_trials[i % len(trials)]["nct_id"]): rejection
+            for i, rejection in enumerate(expected_rejections) if rejection is not None
+        }
+
+    same_results = before_results == cached_results == after_results
+    same_decisions = index_results == [disease[0] and prefilter[0] for disease, prefilter in after_results]
+    passed_pairs = sum(index_results)
+
+    print(f"\n   Speedup: {before_time / cached_time:.1f}x cached, {before_time / after_time:.1f}x stored, "
+          f"{before_time / index_time:.1f}x index  ({passed_pairs}/{len(after_results)} pairs pass both checks)")
+    print(f"   Same results: {same_results}   Same index decisions: {same_decisions}   "
+          f"Same index reasons: {same_reasons}")
+    print(f"   Cache: {clinical_trials_tab.get_trial_feature_cache().get_stats()}")
+    print(f"   Index: {index.get_stats()}")
+
+    passed = same_results and same_decisions and same_reasons and cached_time < before_time and after_time < before_time
+    print("\n" + "=" * 80)
+    print("✅ PASS" if passed else "❌ FAIL")
+    print("=" * 80 + "\n")
+    sys.exit(0 if passed else 1)
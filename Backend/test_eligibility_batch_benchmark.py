@@ -0,0 +1,152 @@
+"""
+Benchmark: BatchEligibilityEngine._process_patient_trials_batch with the prefilter index.
+
+Runs the per-patient trial batch of compute_eligibility_matrix over the
+fixture trials plus synthetic variants (see test_disease_prefilter_benchmark)
+in three ways:
+1. per pair - no index, every (patient, trial) pair goes to the worker pool
+   and process_single_trial runs check_disease_match / pre_filter_trial
+2. index, scalar reasons - candidates from TrialPrefilterIndex.candidates;
+   rejected pairs re-run both checks for their reason and candidates run
+   them again in process_single_trial
+3. index - TrialPrefilterIndex.prefilter: rejected pairs are built from the
+   index's reasons and candidates skip the checks (production path)
+
+Gemini criteria matching is replaced by a fixed answer (optionally with a
+sleep) so the timings show the prefilter and result bookkeeping. Results are
+not stored by default: store_eligibility commits once per result (about 1 ms
+on SQLite, a round trip on Firestore) and hides the prefilter cost; --store
+sqlite stores them in a temporary SQLite data pool. All three must produce
+the same results.
+
+Usage:
+    python test_eligibility_batch_benchmark.py
+    python test_eligibility_batch_benchmark.py --trials 5000 --patients 5 --llm-latency-ms 2
+    python test_eligibility_batch_benchmark.py --store sqlite
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+
+# Add Backend directory to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+from test_disease_prefilter_benchmark import FIXTURE, build_trials, build_patients
+
+
+def fake_match_criteria(latency):
+    def match_criteria_with_gemini(criteria_list, criteria_type, patient_context, patient_data,
+                                   derived_facts=None, precleaned=False):
+        if latency:
+            time.sleep(latency)
+        return [{
+            "criterion_number": i + 1,
+            "criterion_text": criterion,
+            "criterion_type": criteria_type,
+            "met": criteria_type == "inclusion",
+            "confidence": "high",
+            "explanation": "benchmark",
+            "patient_value": "",
+        } for i, criterion in enumerate(criteria_list)]
+    return match_criteria_with_gemini
+
+
+def run_case(label, engine, index, trials, patients, mode):
+    from Utils.batch_eligibility_engine import BatchEligibilityEngine
+    from Utils.Tabs.clinical_trials_tab import build_patient_match_context
+
+    compute_single = engine._compute_single_eligibility
+    if mode == "scalar_reasons":
+        # Candidates run the prefilter again, as before TrialPrefilterIndex.prefilter
+        engine._compute_single_eligibility = lambda patient_data, trial, match_context, prefiltered=False: \
+            BatchEligibilityEngine._compute_single_eligibility(engine, patient_data, trial, match_context)
+
+    results = []
+    start = time.perf_counter()
+    try:
+        for i, patient in enumerate(patients):
+            candidate_nct_ids, rejections = None, None
+            if mode == "scalar_reasons":
+                candidate_nct_ids = set(index.candidates(patient))
+            elif mode == "index":
+                candidate_nct_ids, rejections = index.prefilter(patient)
+                candidate_nct_ids = set(candidate_nct_ids)
+            batch = engine._process_patient_trials_batch(
+                f"BENCH{i:04d}", patient, trials, "demo", match_context=build_patient_match_context(patient),
+                candidate_nct_ids=candidate_nct_ids, rejections=rejections
+            )
+            results.extend(sorted(batch, key=lambda r: r["trial_nct_id"]))
+    finally:
+        engine._compute_single_eligibility = compute_single
+    elapsed = time.perf_counter() - start
+
+    pairs = len(trials) * len(patients)
+    print(f"   {label:<22} pairs={pairs:<7} results={len(results):<6} total={elapsed:7.3f}s  "
+          f"({elapsed / pairs * 1e6:7.1f} µs/pair)")
+    return elapsed, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Eligibility batch benchmark (prefilter index)")
+    parser.add_argument("--trials", type=int, default=1000, help="Trials (fixture trials + synthetic)")
+    parser.add_argument("--patients", type=int, default=5, help="Synthetic patients")
+    parser.add_argument("--workers", type=int, default=3, help="BatchEligibilityEngine max_workers")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Sleep per criteria matching call")
+    parser.add_argument("--store", choices=["none", "sqlite"], default="none",
+                        help="Where eligibility results and progress are written")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    import data_pool as data_pool_module
+    import Utils.Tabs.clinical_trials_tab as clinical_trials_tab
+    from Utils.batch_eligibility_engine import BatchEligibilityEngine
+    from Utils.trial_prefilter import TrialPrefilterIndex
+
+    rng = random.Random(args.seed)
+    with open(FIXTURE, "r") as f:
+        trials = build_trials(json.load(f), args.trials, rng)
+    patients = build_patients(args.patients, rng)
+
+    tmp_dir = tempfile.mkdtemp(prefix="eligibility_batch_")
+    data_pool_module._data_pool_instance = data_pool_module.DataPool(db_path=os.path.join(tmp_dir, "data_pool.db"))
+    clinical_trials_tab.match_criteria_with_gemini = fake_match_criteria(args.llm_latency_ms / 1000.0)
+    clinical_trials_tab.classify_unknown_criteria_with_llm = lambda criteria_results: criteria_results
+
+    engine = BatchEligibilityEngine(max_workers=args.workers)
+    if args.store == "none":
+        engine.data_pool.store_eligibility = lambda *_, **__: True
+        engine.data_pool.increment_computation_progress = lambda *_, **__: None
+    # Trials as compute_eligibility_matrix serves them: features stored at sync
+    trials = [dict(t, features=clinical_trials_tab.compute_trial_features(t)) for t in trials]
+    index = TrialPrefilterIndex([engine._trial_for_processing(t) for t in trials])
+
+    print("\n" + "=" * 80)
+    print(f"ELIGIBILITY BATCH BENCHMARK - {len(trials)} trials x {len(patients)} patients, "
+          f"{args.workers} worker(s), store={args.store}")
+    print("=" * 80)
+
+    per_pair_time, per_pair = run_case("per pair", engine, index, trials, patients, "per_pair")
+    scalar_time, scalar = run_case("index, scalar reasons", engine, index, trials, patients, "scalar_reasons")
+    index_time, indexed = run_case("index", engine, index, trials, patients, "index")
+
+    same_results = per_pair == scalar == indexed
+    print(f"\n   Speedup: {per_pair_time / scalar_time:.1f}x index with scalar reasons, "
+          f"{per_pair_time / index_time:.1f}x index  ({scalar_time / index_time:.2f}x over scalar reasons)")
+    print(f"   Same results: {same_results}")
+    print(f"   Index: {index.get_stats()}")
+
+    # Storage dominates with --store sqlite; only the results are compared then
+    passed = same_results and (args.store != "none" or index_time < scalar_time < per_pair_time)
+    print("\n" + "=" * 80)
+    print("✅ PASS" if passed else "❌ FAIL")
+    print("=" * 80 + "\n")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,233 @@
+"""
+Load test: cached-read latency while cold extractions are in flight.
+
+This checks that blocking extraction work no longer stalls the event loop.
+It starts N cold POST /api/patient/all requests and, while they are running,
+issues GET /api/pool/patient/{mrn} reads for a cached MRN. The p99 latency of
+those reads is compared against an idle baseline.
+
+Two modes:
+- Default (offline): drives the real FastAPI app in-process (httpx ASGI
+  transport) on a temporary SQLite data pool. The extractors behind
+  /api/patient/all are replaced by blocking sleep-based stand-ins and Firebase
+  token verification is bypassed, so no server or credentials are needed.
+  Everything else (auth middleware, single-flight, ingest graph, bounded
+  executors, data pool reads/writes) is the production code path.
+- --url (live): fires N POST /api/patient/all requests for cold MRNs and polls
+  GET /api/pool/patient/{mrn} for a cached MRN against a running server.
+
+Usage:
+    python test_event_loop_load.py
+    python test_event_loop_load.py --cold 8 --reads 400
+    python test_event_loop_load.py --url http://localhost:8000 --cached-mrn A2451440 --cold-mrns MRN1,MRN2
+"""
+
+import sys
+import os
+import time
+import json
+import argparse
+import asyncio
+import tempfile
+import threading
+import urllib.request
+from types import SimpleNamespace
+
+# Add Backend directory and repository root to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (BACKEND_DIR, os.path.dirname(BACKEND_DIR)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+CACHED_MRN = "LOADTEST-CACHED"
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of floats."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(label, latencies):
+    print(f"   {label:<28} n={len(latencies):<5} "
+          f"p50={percentile(latencies, 50) * 1000:7.2f}ms  "
+          f"p99={percentile(latencies, 99) * 1000:7.2f}ms  "
+          f"max={max(latencies) * 1000 if latencies else 0:7.2f}ms")
+
+
+# ============================================================================
+# Offline mode (in-process app)
+# ============================================================================
+
+def blocking_stage(seconds, value):
+    """Stand-in for an extractor: blocking I/O waits + a little CPU, like FHIR + Gemini calls."""
+    def run(*args, **kwargs):
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            time.sleep(0.05)
+            sum(i * i for i in range(2000))
+        return value(*args) if callable(value) else value
+    return run
+
+
+def load_app(tmp_dir, extraction_seconds):
+    """Import the FastAPI app with stub extractors, no auth and a temporary data pool."""
+    os.environ.setdefault("STORAGE_BACKEND", "memory")
+    import Backend.app as app_module
+
+    app_module.fb_auth = SimpleNamespace(verify_id_token=lambda token: {"uid": "load-test"})
+    pool = type(app_module.data_pool)(db_path=os.path.join(tmp_dir, "data_pool.db"))
+    app_module.data_pool = pool
+
+    def patient_record(mrn, *rest):
+        record = {field: None for field in app_module.PatientDataResponse.model_fields}
+        record.update(success=True, mrn=mrn, demographics={"Patient Name": mrn})
+        return record
+
+    app_module.extract_patient_data = blocking_stage(extraction_seconds, patient_record)
+    app_module.lab_tab_info = blocking_stage(extraction_seconds / 2, {"lab_info": {}, "lab_reports": []})
+    app_module.pathology_tab_info_pipeline = blocking_stage(extraction_seconds / 2, {})
+    app_module.genomics_tab_info = blocking_stage(extraction_seconds / 4, {"genomic_info": {}, "genomics_reports": []})
+    app_module.upload_individual_radiology_reports_with_MD_notes_to_drive = blocking_stage(extraction_seconds / 2, [])
+
+    pool.store_patient_data(CACHED_MRN, {"success": True, "mrn": CACHED_MRN})
+    return app_module
+
+
+async def measure_reads(client, count, interval):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get(f"/api/pool/patient/{CACHED_MRN}")
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"cached read returned HTTP {response.status_code}")
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run_offline(cold, reads, extraction_seconds, interval):
+    import httpx
+
+    print("\n" + "=" * 80)
+    print("EVENT LOOP LOAD TEST (offline, in-process app)")
+    print("=" * 80)
+    print(f"   Cold POST /api/patient/all: {cold} x ~{extraction_seconds}s (stub extractors)")
+    print(f"   Cached GET /api/pool/patient: {reads} (every {interval * 1000:.0f}ms)")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app_module = load_app(tmp_dir, extraction_seconds)
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest",
+                                     headers={"Authorization": "Bearer load-test"}, timeout=600) as client:
+            baseline = await measure_reads(client, reads, interval)
+
+            cold_requests = [
+                asyncio.ensure_future(client.post("/api/patient/all", json={"mrn": f"LOADTEST-COLD-{i}"}))
+                for i in range(cold)
+            ]
+            # Let the extraction pool fill up before measuring
+            await asyncio.sleep(0.1)
+            under_load = await measure_reads(client, reads, interval)
+            in_flight = sum(1 for request in cold_requests if not request.done())
+            responses = await asyncio.gather(*cold_requests)
+            executor_stats = app_module.get_executor_stats()
+            cold_ok = sum(1 for response in responses if response.status_code == 200 and response.json().get("success"))
+
+    print("\nResults:")
+    summarize("idle", baseline)
+    summarize(f"{cold} cold extractions", under_load)
+    print(f"   Cold requests still in flight at end of read window: {in_flight}")
+    print(f"   Cold requests completed successfully: {cold_ok}/{cold}")
+    print(f"\nExecutor stats:\n{json.dumps(executor_stats, indent=2)}")
+
+    baseline_p99 = percentile(baseline, 99)
+    load_p99 = percentile(under_load, 99)
+    # Allow scheduler noise, but a blocked loop shows up as multi-second reads
+    allowed = max(baseline_p99 * 3, baseline_p99 + 0.025)
+    passed = load_p99 <= allowed and in_flight > 0 and cold_ok == cold
+
+    print("\n" + "=" * 80)
+    if passed:
+        print(f"✅ PASS: p99 under load {load_p99 * 1000:.2f}ms <= {allowed * 1000:.2f}ms")
+    else:
+        print(f"❌ FAIL: p99 under load {load_p99 * 1000:.2f}ms > {allowed * 1000:.2f}ms "
+              f"(or extractions finished before reads, or a cold request failed)")
+    print("=" * 80 + "\n")
+    return passed
+
+
+# ============================================================================
+# Live mode
+# ============================================================================
+
+def _http(method, url, payload=None, timeout=600):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(url, data=data, method=method,
+                                 headers={"Content-Type": "application/json"})
+    token = os.environ.get("FIREBASE_ID_TOKEN")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return resp.status
+
+
+def _timed_reads(base_url, mrn, count, interval):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        _http("GET", f"{base_url}/api/pool/patient/{mrn}", timeout=60)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return latencies
+
+
+def run_live(base_url, cached_mrn, cold_mrns, reads, interval):
+    print("\n" + "=" * 80)
+    print(f"EVENT LOOP LOAD TEST (live: {base_url})")
+    print("=" * 80)
+
+    baseline = _timed_reads(base_url, cached_mrn, reads, interval)
+
+    def cold_request(mrn):
+        try:
+            status_code = _http("POST", f"{base_url}/api/patient/all", {"mrn": mrn})
+            print(f"   Cold extraction {mrn}: HTTP {status_code}")
+        except Exception as e:
+            print(f"   Cold extraction {mrn} failed: {e}")
+
+    threads = [threading.Thread(target=cold_request, args=(mrn,), daemon=True) for mrn in cold_mrns]
+    for thread in threads:
+        thread.start()
+    time.sleep(2)
+    under_load = _timed_reads(base_url, cached_mrn, reads, interval)
+
+    print("\nResults:")
+    summarize("idle", baseline)
+    summarize(f"{len(cold_mrns)} cold extractions", under_load)
+    print("\nWaiting for cold extractions to finish...")
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cached-read latency under cold extraction load")
+    parser.add_argument("--cold", type=int, default=8, help="Number of concurrent cold extractions (offline)")
+    parser.add_argument("--reads", type=int, default=200, help="Number of cached reads per window")
+    parser.add_argument("--extraction-seconds", type=float, default=3.0, help="Simulated extraction duration")
+    parser.add_argument("--interval", type=float, default=0.005, help="Delay between cached reads (seconds)")
+    parser.add_argument("--url", help="Base URL of a running server (enables live mode)")
+    parser.add_argument("--cached-mrn", help="MRN already present in the data pool (live mode)")
+    parser.add_argument("--cold-mrns", help="Comma-separated MRNs not yet in the data pool (live mode)")
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.cached_mrn or not args.cold_mrns:
+            parser.error("--url requires --cached-mrn and --cold-mrns")
+        run_live(args.url.rstrip("/"), args.cached_mrn, args.cold_mrns.split(","), args.reads, args.interval)
+    else:
+        ok = asyncio.run(run_offline(args.cold, args.reads, args.extraction_seconds, args.interval))
+        sys.exit(0 if ok else 1)
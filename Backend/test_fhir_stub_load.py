@@ -0,0 +1,147 @@
+"""
+Load test: the real FHIR client against the local stand-in server.
+
+Starts fhir_stub_server.FHIRStubServer with synthetic patients, points the
+client at it (FHIR_BASE_URL, RISA_AUTH_TOKEN_URL, ONCO_EMR_TOKEN_URL) and
+runs, for every patient on a thread pool:
+1. get_patient_id_from_mrn
+2. get_document_references (paged)
+3. fetch_pdf_bytes_from_fhir_url for every document (DocumentReference + Binary)
+4. fetch_fhir_observations (paged)
+
+The server injects latency and answers 429 with Retry-After when its QPS
+budget is exceeded (or at random with --throttle-rate), so the run shows how
+the adaptive rate limiter, token cache and PDF byte cache behave under
+concurrency. Reports wall time, server-side request/throttle counts and peak
+concurrency, and the client-side limiter and cache statistics.
+
+Passes if every patient's documents and observations were fetched intact.
+
+Usage:
+    python test_fhir_stub_load.py
+    python test_fhir_stub_load.py --patients 40 --workers 8 --latency-ms 80 --max-qps 10
+    python test_fhir_stub_load.py --client-qps 4 --client-max-qps 20 --throttle-rate 0.05
+"""
+
+import sys
+import os
+import time
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Add Backend and repository root to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (BACKEND_DIR, os.path.dirname(BACKEND_DIR)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from fhir_stub_server import FHIRStubServer, load_fixture, synthetic_patients, make_pdf, DEFAULT_FIXTURE
+
+
+def fetch_patient(mrn, page_size):
+    from Backend.documents_reference import get_fhir_tokens, get_patient_id_from_mrn, get_document_references
+    from Backend.bytes_extractor import fetch_pdf_bytes_from_fhir_url
+    from Backend.Utils.Tabs.fhir_lab_integration import fetch_fhir_observations
+
+    _, onco_emr_token = get_fhir_tokens()
+    patient_id, _ = get_patient_id_from_mrn(mrn, onco_emr_token)
+    bundle = get_document_references(patient_id, onco_emr_token, loinc_type=None, page_size=page_size)
+    pdfs = {}
+    for entry in bundle.get("entry", []):
+        pdfs[entry["resource"]["id"]] = fetch_pdf_bytes_from_fhir_url(entry["fullUrl"])
+    observations = fetch_fhir_observations(patient_id, onco_emr_token)
+    return {"patient_id": patient_id, "pdfs": pdfs, "observations": len(observations)}
+
+
+def check_patient(patient, result):
+    expected = {d["id"]: make_pdf(d["text"], d.get("pad_kb", 0)) for d in patient["documents"]}
+    if result["patient_id"] != patient["fhir_id"]:
+        return f"patient id {result['patient_id']} != {patient['fhir_id']}"
+    if result["pdfs"] != expected:
+        return f"{len(result['pdfs'])}/{len(expected)} documents, or PDF bytes differ"
+    if result["observations"] != len(patient.get("observations", [])):
+        return f"{result['observations']} observations, expected {len(patient.get('observations', []))}"
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FHIR client load test against the local stand-in server")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="Synthetic patient fixture")
+    parser.add_argument("--patients", type=int, default=8, help="Patients to fetch (fixture patients cycled)")
+    parser.add_argument("--workers", type=int, default=4, help="Patients fetched concurrently")
+    parser.add_argument("--page-size", type=int, default=4, help="DocumentReference _count")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Server latency per FHIR response")
+    parser.add_argument("--binary-latency-ms", type=float, default=None, help="Server latency per Binary download")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Server latency jitter fraction")
+    parser.add_argument("--max-qps", type=float, default=15.0, help="Server-side QPS budget (0 = unlimited)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered 429 at random")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After seconds sent with 429")
+    parser.add_argument("--max-page-size", type=int, default=10, help="Server cap on _count")
+    parser.add_argument("--client-qps", type=float, default=10.0, help="FHIR_RATE_LIMIT_QPS for the client")
+    parser.add_argument("--client-max-qps", type=float, default=30.0, help="FHIR_RATE_LIMIT_MAX_QPS for the client")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    patients = synthetic_patients(load_fixture(args.fixture), args.patients)
+    server = FHIRStubServer(
+        patients,
+        latency=args.latency_ms / 1000.0,
+        binary_latency=None if args.binary_latency_ms is None else args.binary_latency_ms / 1000.0,
+        jitter=args.jitter,
+        max_qps=args.max_qps or None,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        max_page_size=args.max_page_size,
+        seed=args.seed,
+    ).start()
+
+    # Must be set before the client creates its rate limiter
+    os.environ.update(server.client_env())
+    os.environ["FHIR_RATE_LIMIT_QPS"] = str(args.client_qps)
+    os.environ["FHIR_RATE_LIMIT_MAX_QPS"] = str(args.client_max_qps)
+    os.environ.setdefault("STORAGE_BACKEND", "memory")
+    os.environ.setdefault("CASSETTE_MODE", "off")
+
+    from Backend.documents_reference import get_fhir_token_cache
+    from Backend.rate_limiter import get_rate_limiter_stats
+    from Backend.pdf_byte_cache import get_pdf_byte_cache
+
+    print("\n" + "=" * 80)
+    print(f"FHIR STAND-IN LOAD TEST - {len(patients)} patient(s), {args.workers} worker(s), {server.base_url}")
+    print(f"   server: latency={args.latency_ms:g}ms max_qps={args.max_qps or 'unlimited'} "
+          f"throttle_rate={args.throttle_rate:g} retry_after={args.retry_after:g}s")
+    print(f"   client: FHIR_RATE_LIMIT_QPS={args.client_qps:g} FHIR_RATE_LIMIT_MAX_QPS={args.client_max_qps:g}")
+    print("=" * 80)
+
+    failures = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {p["mrn"]: executor.submit(fetch_patient, p["mrn"], args.page_size) for p in patients}
+        for patient in patients:
+            try:
+                problem = check_patient(patient, futures[patient["mrn"]].result())
+            except Exception as e:
+                problem = f"{type(e).__name__}: {e}"
+            if problem:
+                failures.append(f"{patient['mrn']}: {problem}")
+    elapsed = time.perf_counter() - start
+
+    server_stats = server.get_stats()
+    server.shutdown()
+
+    print(f"\n   wall={elapsed:.2f}s  ({elapsed / len(patients):.2f}s/patient)")
+    print(f"\n   Server: {json.dumps(server_stats, indent=2)}")
+    print(f"\n   Rate limiters: {json.dumps(get_rate_limiter_stats(), indent=2)}")
+    print(f"\n   Token cache: {get_fhir_token_cache().get_stats()}")
+    print(f"   PDF byte cache: {get_pdf_byte_cache().get_stats()}")
+
+    print("\n" + "=" * 80)
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        print(f"❌ FAIL: {len(failures)}/{len(patients)} patient(s) incomplete")
+    else:
+        print(f"✅ PASS: {len(patients)} patient(s) fetched, {server_stats['throttled']} throttled responses absorbed")
+    print("=" * 80 + "\n")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,156 @@
+"""
+Benchmark: patient ingest FHIR traffic with and without pooled sessions.
+
+Starts fhir_stub_server.FHIRStubServer (which counts accepted TCP
+connections, one per handshake) and runs the FHIR part of a patient ingest
+for every synthetic patient on a thread pool, as /api/patient/all does:
+1. get_cached_patient_id (Patient search)
+2. get_cached_document_bundle (paged DocumentReference search)
+3. fetch_pdf_bytes_from_fhir_url for every document (DocumentReference + Binary)
+4. fetch_fhir_observations (paged Observation search)
+
+The ingest is run twice with cold caches:
+1. unpooled - every request goes through a throwaway requests.Session, i.e.
+   one handshake per request like the old bare requests.get calls
+2. pooled - http_sessions.get_session keep-alive pools (production path)
+
+Reports server-side handshake counts, client-side reuse metrics and wall time.
+Client rate limiting is opened up so pacing does not hide connection costs.
+
+Usage:
+    python test_http_session_benchmark.py
+    python test_http_session_benchmark.py --patients 16 --workers 8 --latency-ms 5
+"""
+
+import sys
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Add Backend and repository root to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (BACKEND_DIR, os.path.dirname(BACKEND_DIR)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from fhir_stub_server import FHIRStubServer, load_fixture, synthetic_patients, make_pdf, DEFAULT_FIXTURE
+
+
+def ingest_patient_fhir(mrn):
+    from Backend.documents_reference import get_fhir_tokens
+    from Backend.document_bundle_cache import get_cached_patient_id, get_cached_document_bundle
+    from Backend.bytes_extractor import fetch_pdf_bytes_from_fhir_url
+    from Backend.Utils.Tabs.fhir_lab_integration import fetch_fhir_observations
+
+    _, onco_emr_token = get_fhir_tokens()
+    patient_id = get_cached_patient_id(mrn)
+    bundle = get_cached_document_bundle(mrn)
+    pdfs = {}
+    for entry in bundle.get("entry", []):
+        pdfs[entry["resource"]["id"]] = fetch_pdf_bytes_from_fhir_url(entry["fullUrl"])
+    observations = fetch_fhir_observations(patient_id, onco_emr_token)
+    return {"patient_id": patient_id, "pdfs": pdfs, "observations": len(observations)}
+
+
+def check_patient(patient, result):
+    expected = {d["id"]: make_pdf(d["text"], d.get("pad_kb", 0)) for d in patient["documents"]}
+    if result["patient_id"] != patient["fhir_id"]:
+        return f"patient id {result['patient_id']} != {patient['fhir_id']}"
+    if result["pdfs"] != expected:
+        return f"{len(result['pdfs'])}/{len(expected)} documents, or PDF bytes differ"
+    if result["observations"] != len(patient.get("observations", [])):
+        return f"{result['observations']} observations, expected {len(patient.get('observations', []))}"
+    return None
+
+
+def reset_client_state():
+    from Backend.http_sessions import close_sessions
+    from Backend.document_bundle_cache import get_document_bundle_cache
+    from Backend.pdf_byte_cache import get_pdf_byte_cache
+
+    close_sessions()
+    get_document_bundle_cache().invalidate()
+    get_pdf_byte_cache().invalidate()
+
+
+def run_case(label, server, patients, workers, unpooled):
+    import requests
+    from Backend.http_sessions import PooledSession
+
+    reset_client_state()
+    server.reset_stats()
+    pooled_request = PooledSession.request
+
+    def unpooled_request(self, method, url, **kwargs):
+        with requests.Session() as session:
+            return session.request(method, url, **kwargs)
+
+    if unpooled:
+        PooledSession.request = unpooled_request
+    failures = []
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {p["mrn"]: executor.submit(ingest_patient_fhir, p["mrn"]) for p in patients}
+            for patient in patients:
+                try:
+                    problem = check_patient(patient, futures[patient["mrn"]].result())
+                except Exception as e:
+                    problem = f"{type(e).__name__}: {e}"
+                if problem:
+                    failures.append(f"{patient['mrn']}: {problem}")
+    finally:
+        PooledSession.request = pooled_request
+    elapsed = time.perf_counter() - start
+
+    stats = server.get_stats()
+    print(f"   {label:<10} patients={len(patients):<4} requests={stats['requests']:<5} "
+          f"handshakes={stats['connections']:<5} wall={elapsed:7.3f}s  ({elapsed / len(patients):.3f}s/patient)")
+    return {"handshakes": stats["connections"], "requests": stats["requests"], "seconds": elapsed,
+            "failures": failures}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pooled session benchmark on the patient ingest FHIR calls")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="Synthetic patient fixture")
+    parser.add_argument("--patients", type=int, default=8, help="Patients to ingest (fixture patients cycled)")
+    parser.add_argument("--workers", type=int, default=4, help="Patients ingested concurrently")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Server latency per FHIR response")
+    args = parser.parse_args()
+
+    patients = synthetic_patients(load_fixture(args.fixture), args.patients)
+    server = FHIRStubServer(patients, latency=args.latency_ms / 1000.0, max_page_size=10, seed=7).start()
+
+    # Must be set before the client creates its rate limiter
+    os.environ.update(server.client_env())
+    os.environ["FHIR_RATE_LIMIT_QPS"] = "1000"
+    os.environ["FHIR_RATE_LIMIT_MAX_QPS"] = "1000"
+    os.environ.setdefault("STORAGE_BACKEND", "memory")
+    os.environ.setdefault("CASSETTE_MODE", "off")
+
+    from Backend.http_sessions import get_session_stats
+
+    print("\n" + "=" * 80)
+    print(f"HTTP SESSION POOLING BENCHMARK - patient ingest, {args.workers} worker(s), {server.base_url}")
+    print("=" * 80)
+
+    unpooled = run_case("unpooled", server, patients, args.workers, unpooled=True)
+    pooled = run_case("pooled", server, patients, args.workers, unpooled=False)
+    print(f"\nClient-side reuse metrics: {get_session_stats()}")
+    server.shutdown()
+
+    failures = unpooled["failures"] + pooled["failures"]
+    # Token fetches and one connection per worker thread and host at most
+    passed = not failures and pooled["handshakes"] <= 2 * (args.workers + 1) < unpooled["handshakes"]
+    print("\n" + "=" * 80)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if passed:
+        print(f"✅ PASS: pooled handshakes {pooled['handshakes']} vs unpooled {unpooled['handshakes']} "
+              f"({pooled['seconds']:.2f}s vs {unpooled['seconds']:.2f}s)")
+    else:
+        print(f"❌ FAIL: pooled ingest opened {pooled['handshakes']} connections "
+              f"(unpooled {unpooled['handshakes']}) or a patient was incomplete")
+    print("=" * 80 + "\n")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,650 @@
+"""
+Offline benchmark: extraction pipelines and eligibility matrix without network access.
+
+Runs each stage against a replay cassette (cassettes.py) instead of Vertex AI,
+the FHIR API and ClinicalTrials.gov:
+1. extract_patient_data          (MD note -> demographics, diagnosis, treatment, ...)
+2. lab_tab_info                  (lab reports + FHIR Observations)
+3. genomics_tab_info             (classification + combined genomic extraction)
+4. pathology_tab_info_pipeline   (classification + per-report extraction)
+5. BatchEligibilityEngine.compute_eligibility_matrix (patients x fixture trials)
+
+By default the cassette is synthesized from fixtures/offline_patients.json:
+synthetic patients whose documents are generated as PDFs and served through
+recorded FHIR responses (token, Patient, paged DocumentReference, Binary,
+paged Observation), plus recorded Gemini responses per document and label.
+Use --cassette to replay a cassette recorded from a live run instead
+(CASSETTE_MODE=record, see cassettes.py).
+
+Every run of a stage happens in a fresh process (no warm caches), with
+Firestore off, an in-memory storage bucket, a temporary classification cache
+and a temporary SQLite data pool. Injected latency (--llm-latency-ms,
+--http-latency-ms) stands in for Vertex AI and FHIR response times.
+
+Client rate limiters are pinned open by default (--rate-limits pinned):
+the production rates (FHIR 2 QPS, Gemini 4 QPS) would otherwise pace the
+replay and hide pipeline changes. --rate-limits production keeps them.
+
+Reported per stage (median over --repeat runs):
+- wall time and CPU time (all threads of the process)
+- peak RSS and its growth during the stage
+- Gemini calls / tokens and cassette interactions replayed
+- time spent waiting in the FHIR and Gemini rate limiters
+
+The eligibility stage first runs the four extraction stages (untimed, without
+injected latency) to build the patient records it scores, and serves the
+fixture trials from its data pool.
+
+With --profile N, each stage also prints the top N repo functions of a CPU
+profile covering every thread of the stage process.
+
+With --baseline (a previous --json output), exits with status 1 if any
+stage's wall time, CPU time or peak RSS grew by more than --max-regression.
+
+Usage:
+    python test_offline_benchmark.py
+    python test_offline_benchmark.py --stage lab --stage eligibility --repeat 3 --llm-latency-ms 1500
+    python test_offline_benchmark.py --trials 60 --json results.json
+    python test_offline_benchmark.py --stage eligibility --trials 60 --profile 25
+    python test_offline_benchmark.py --baseline results.json --max-regression 0.2
+    python test_offline_benchmark.py --stage patient --rate-limits production
+    python test_offline_benchmark.py --cassette live_run.json --mrn A2451440
+"""
+
+import sys
+import os
+import json
+import time
+import base64
+import hashlib
+import importlib
+import argparse
+import resource
+import statistics
+import tempfile
+import threading
+import multiprocessing
+from datetime import datetime
+
+# Add Backend and repository root to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (BACKEND_DIR, os.path.dirname(BACKEND_DIR)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+DEFAULT_FIXTURE = os.path.join(BACKEND_DIR, "fixtures", "offline_patients.json")
+
+from documents_reference import DEFAULT_AUTH_TOKEN_URL, DEFAULT_ONCO_EMR_TOKEN_URL, DEFAULT_FHIR_BASE_URL
+from fhir_stub_server import (
+    make_pdf, patient_resource, document_reference_resource, observation_resource, searchset_page
+)
+
+AUTH_URL = DEFAULT_AUTH_TOKEN_URL
+ONCO_TOKEN_URL = DEFAULT_ONCO_EMR_TOKEN_URL
+FHIR_BASE_URL = DEFAULT_FHIR_BASE_URL
+
+# Small pages so the fixtures exercise pagination
+DOCUMENT_PAGE_SIZE = 4
+OBSERVATION_PAGE_SIZE = 5
+
+LAB_PANELS = {
+    "tumor_markers": ["CEA", "NSE", "proGRP", "CYFRA_21_1"],
+    "complete_blood_count": ["WBC", "Hemoglobin", "Platelets", "ANC"],
+    "metabolic_panel": ["Creatinine", "ALT", "AST", "Total Bilirubin"],
+}
+
+STAGES = ["patient", "lab", "genomics", "pathology", "eligibility"]
+
+# Environment for every stage process: nothing may reach GCP
+OFFLINE_ENV = {
+    "FIRESTORE_ENABLED": "false",
+    "STORAGE_BACKEND": "memory",
+    "LLM_CACHE_ENABLED": "false",
+    "GEMINI_DOCUMENT_HANDLES": "off",
+    "CASSETTE_MODE": "off",
+    # Synthesized cassettes record the production URLs
+    "FHIR_BASE_URL": FHIR_BASE_URL,
+    "RISA_AUTH_TOKEN_URL": AUTH_URL,
+    "ONCO_EMR_TOKEN_URL": ONCO_TOKEN_URL,
+}
+
+# Added with --rate-limits pinned (default): limiters never make a replayed call wait
+PINNED_RATE_LIMIT_ENV = {
+    "FHIR_RATE_LIMIT_QPS": "1000",
+    "FHIR_RATE_LIMIT_MAX_QPS": "1000",
+    "FHIR_RATE_LIMIT_BURST": "1000",
+    "GEMINI_QPS": "1000",
+    "GEMINI_MAX_QPS": "1000",
+}
+
+
+# ----------------------------------------------------------------------
+# Fixture -> cassette
+# ----------------------------------------------------------------------
+
+def expand_lab_response(compact, date):
+    """Expand {"values": {name: [value, unit, status, range]}, "interpretation": [...]} to the lab_extraction schema."""
+    values = compact.get("values", {})
+    response = {}
+    for panel, names in LAB_PANELS.items():
+        response[panel] = {}
+        for name in names:
+            if name in values:
+                value, unit, status, reference_range = values[name]
+                response[panel][name] = {
+                    "value": value, "unit": unit, "date": date, "status": status,
+                    "reference_range": reference_range, "source_context": "Lab Report Page 1",
+                }
+            else:
+                response[panel][name] = {
+                    "value": None, "unit": None, "date": None, "status": None,
+                    "reference_range": None, "source_context": None,
+                }
+    response["clinical_interpretation"] = compact.get("interpretation", [])
+    return response
+
+
+def _llm_interaction(label, response, document=None, date=None):
+    if label == "lab_extraction":
+        response = expand_lab_response(response, date)
+    text = json.dumps(response)
+    match = {"label": label}
+    if document is not None:
+        match["document_sha256"] = hashlib.sha256(document).hexdigest()
+    prompt_tokens = 1200 + (len(document) // 400 if document else 0)
+    return {
+        "kind": "llm",
+        "match": match,
+        "response": {
+            "text": text,
+            "usage": {
+                "prompt_token_count": prompt_tokens,
+                "candidates_token_count": len(text) // 4,
+                "total_token_count": prompt_tokens + len(text) // 4,
+            },
+        },
+        "latency_seconds": 0.0,
+    }
+
+
+def _http_json(method, url, body, params=None):
+    match = {"method": method, "url": url}
+    if params:
+        match["params"] = params
+    return {"kind": "http", "match": match, "response": {"status": 200, "json": body}, "latency_seconds": 0.0}
+
+
+def _paged_bundle(resource_type, patient_id, resources, page_size, search_params):
+    """Searchset bundle pages for resources, linked with next URLs."""
+    url = f"{FHIR_BASE_URL}/{resource_type}"
+    search_params = dict(search_params, patient=patient_id)
+    page_count = max(1, -(-len(resources) // page_size))
+    interactions = []
+    for number in range(1, page_count + 1):
+        params = dict(search_params, _page=str(number)) if number > 1 else search_params
+        bundle = searchset_page(url, resources, search_params, number, page_size)
+        interactions.append(_http_json("GET", url, bundle, params))
+    return interactions
+
+
+def build_fixture_interactions(fixture):
+    """
+    Synthesize replay interactions for every fixture patient.
+
+    Returns:
+        List of cassette interactions (see cassettes.py)
+    """
+    interactions = [
+        _http_json("POST", AUTH_URL, {"access_token": "offline-bearer-token"}),
+        _http_json("GET", ONCO_TOKEN_URL, {"access_token": "offline-onco-emr-token"}),
+    ]
+
+    for label, response in fixture.get("llm", {}).items():
+        interactions.append(_llm_interaction(label, response))
+
+    for patient in fixture["patients"]:
+        patient_id = patient["fhir_id"]
+        interactions.append(_http_json(
+            "GET", f"{FHIR_BASE_URL}/Patient",
+            {"resourceType": "Bundle", "type": "searchset", "total": 1,
+             "entry": [{"resource": patient_resource(patient)}]},
+            {"identifier": patient["mrn"]},
+        ))
+
+        summaries = []
+        for document in sorted(patient["documents"], key=lambda d: d["date"], reverse=True):
+            pdf_bytes = make_pdf(document["text"], document.get("pad_kb", 0))
+            binary_url = f"{FHIR_BASE_URL}/Binary/{document['id']}"
+            resource = document_reference_resource(document, patient_id, FHIR_BASE_URL)
+            summaries.append(resource)
+            interactions.append(_http_json("GET", f"{FHIR_BASE_URL}/DocumentReference/{document['id']}", resource))
+            interactions.append({
+                "kind": "http",
+                "match": {"method": "GET", "url": binary_url},
+                "response": {"status": 200, "headers": {"Content-Type": "application/pdf"},
+                             "base64": base64.b64encode(pdf_bytes).decode("ascii")},
+                "latency_seconds": 0.0,
+            })
+            for label, response in document.get("llm", {}).items():
+                interactions.append(_llm_interaction(label, response, pdf_bytes, document["date"][:10]))
+
+        interactions.extend(_paged_bundle(
+            "DocumentReference", patient_id, summaries, DOCUMENT_PAGE_SIZE, {}
+        ))
+
+        observations = [
+            observation_resource(patient_id, index, row)
+            for index, row in enumerate(patient.get("observations", []))
+        ]
+        interactions.extend(_paged_bundle(
+            "Observation", patient_id, observations, OBSERVATION_PAGE_SIZE, {"category": "laboratory"}
+        ))
+
+    return interactions
+
+
+def fixture_trials(fixture, count=None):
+    """Fixture trials, cycled with suffixed NCT IDs up to count."""
+    trials = fixture.get("trials", [])
+    if not count or count <= len(trials):
+        return [dict(t) for t in trials[:count or len(trials)]]
+    result = []
+    for index in range(count):
+        trial = dict(trials[index % len(trials)])
+        if index >= len(trials):
+            trial["nct_id"] = f"{trial['nct_id']}-{index // len(trials)}"
+        result.append(trial)
+    return result
+
+
+# ----------------------------------------------------------------------
+# Stages (run inside the stage process)
+# ----------------------------------------------------------------------
+
+def run_patient(mrns, context):
+    from Backend.main import extract_patient_data
+    return {mrn: extract_patient_data(mrn, verbose=False) for mrn in mrns}
+
+
+def run_lab(mrns, context):
+    from Backend.main import lab_tab_info
+    return {mrn: lab_tab_info(mrn, verbose=False) for mrn in mrns}
+
+
+def run_genomics(mrns, context):
+    from Backend.main import genomics_tab_info
+    return {mrn: genomics_tab_info(mrn, verbose=False) for mrn in mrns}
+
+
+def run_pathology(mrns, context):
+    from Backend.main import pathology_tab_info_pipeline
+    return {mrn: pathology_tab_info_pipeline(mrn, verbose=False) for mrn in mrns}
+
+
+def build_patient_record(mrn, context):
+    """Patient record as the ingest endpoint stores it (app.py), from the four extraction stages."""
+    result = run_patient([mrn], context)[mrn]
+    lab_result = run_lab([mrn], context)[mrn]
+    genomics_result = run_genomics([mrn], context)[mrn]
+    pathology_result = run_pathology([mrn], context)[mrn]
+    result["lab_info"] = lab_result.get("lab_info")
+    result["genomic_info"] = genomics_result.get("genomic_info")
+    result["pathology_summary"] = pathology_result.get("pathology_summary")
+    result["pathology_markers"] = pathology_result.get("pathology_markers")
+    result["pathology_reports"] = [
+        {
+            "date": report.get("date"),
+            "document_type": report.get("document_type"),
+            "description": report.get("description", "Pathology Report"),
+            "pathology_summary": report.get("pathology_summary"),
+            "pathology_markers": report.get("pathology_markers"),
+        }
+        for report in pathology_result.get("typical_pathology_reports", []) or []
+    ]
+    result["radiology_reports"] = []
+    return result
+
+
+def setup_eligibility(mrns, context):
+    """Store patient records and fixture trials in a temporary data pool (untimed)."""
+    import data_pool as data_pool_module
+    from Backend.cassettes import get_cassette
+    from Utils.Tabs.clinical_trials_tab import compute_trial_features
+
+    # Trials are served with their features, as sync_trials stores them
+    trials = [dict(t, features=compute_trial_features(t)) for t in context["trials"]]
+
+    class FixtureDataPool(data_pool_module.DataPool):
+        """SQLite data pool that serves the fixture trials (trials are otherwise Firestore-only)."""
+
+        def get_trial(self, nct_id, db_type=None):
+            return next((dict(t) for t in trials if t["nct_id"] == nct_id), None)
+
+        def list_all_trials(self, status=None, condition=None, limit=100, offset=0, db_type=None):
+            matching = [dict(t) for t in trials if not status or t.get("status") == status]
+            return matching[offset:offset + limit]
+
+    pool = FixtureDataPool(db_path=os.path.join(context["tmp_dir"], "data_pool.db"))
+    data_pool_module._data_pool_instance = pool
+
+    # Records are built with the cassette's latency off; only the matrix is timed
+    cassette = get_cassette()
+    latency, cassette.latency = cassette.latency, {}
+    try:
+        for mrn in mrns:
+            pool.store_patient_data(mrn, build_patient_record(mrn, context), db_type="demo")
+    finally:
+        cassette.latency = latency
+
+
+def run_eligibility(mrns, context):
+    from Utils.batch_eligibility_engine import BatchEligibilityEngine
+    engine = BatchEligibilityEngine(max_workers=context["eligibility_workers"])
+    return engine.compute_eligibility_matrix(patient_mrns=mrns, db_type="demo")
+
+
+def check_patient(output):
+    return all(r.get("success") for r in output.values()), "extract_patient_data failed"
+
+
+def check_lab(output):
+    return all(r.get("success") for r in output.values()), "lab_tab_info failed"
+
+
+def check_genomics(output):
+    return all(r.get("success") for r in output.values()), "genomics_tab_info failed"
+
+
+def check_pathology(output):
+    return all(r.get("success") for r in output.values()), "pathology_tab_info_pipeline failed"
+
+
+def check_eligibility(output):
+    return bool(output.get("eligibility_computed")) and not output.get("error"), "no eligibility computed"
+
+
+STAGE_RUNNERS = {
+    "patient": (run_patient, check_patient, None),
+    "lab": (run_lab, check_lab, None),
+    "genomics": (run_genomics, check_genomics, None),
+    "pathology": (run_pathology, check_pathology, None),
+    "eligibility": (run_eligibility, check_eligibility, setup_eligibility),
+}
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _start_profiling():
+    """Profile this thread and every thread started from now on (cProfile only sees its own thread)."""
+    import cProfile
+    profiles = []
+
+    def profile_new_thread(*_):
+        profile = cProfile.Profile()
+        profiles.append(profile)
+        profile.enable()
+
+    threading.setprofile(profile_new_thread)
+    main_profile = cProfile.Profile()
+    profiles.append(main_profile)
+    main_profile.enable()
+    return profiles
+
+
+def _stop_profiling(profiles, top):
+    """Repo functions by cumulative time, merged over all profiled threads."""
+    import io
+    import pstats
+    threading.setprofile(None)
+    profiles[0].disable()
+    stream = io.StringIO()
+    stats = pstats.Stats(profiles[0], stream=stream)
+    for profile in profiles[1:]:
+        stats.add(profile)
+    stats.sort_stats("cumulative").print_stats(r"Backend", top)
+    return stream.getvalue()
+
+
+def _gemini_totals(stats):
+    totals = {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "errors": 0}
+    for model_stats in stats["models"].values():
+        for name in totals:
+            totals[name] += model_stats.get(name, 0)
+    return totals
+
+
+def _limiter_wait_seconds():
+    """Seconds spent waiting in the FHIR host limiters and the Gemini model limiters so far."""
+    from Backend.Utils.gemini_client import get_gemini_client
+    wait = {"fhir": 0.0, "gemini": 0.0}
+    # documents_reference may import the limiter registry as either module name
+    for module_name in ("Backend.rate_limiter", "rate_limiter"):
+        module = sys.modules.get(module_name)
+        if module is not None:
+            wait["fhir"] += sum(s["total_wait_seconds"] for s in module.get_rate_limiter_stats().values())
+    for model_stats in get_gemini_client().get_stats()["models"].values():
+        wait["gemini"] += model_stats.get("limiter", {}).get("total_wait_seconds", 0.0)
+    return wait
+
+
+def stage_process(stage, mrns, context, connection):
+    """Entry point of a stage process: set up offline clients, run the stage, send metrics back."""
+    os.environ.update(OFFLINE_ENV)
+    if context["rate_limits"] == "pinned":
+        os.environ.update(PINNED_RATE_LIMIT_ENV)
+    os.environ["CLASSIFICATION_CACHE_DIR"] = os.path.join(context["tmp_dir"], "classifications")
+    os.chdir(context["tmp_dir"])  # Debug files some extractors write stay out of the tree
+    if not context["verbose"]:
+        # Pipeline progress output and logs go to stdout; keep the report readable
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+
+    try:
+        from Backend.cassettes import Cassette, set_cassette
+        if context["cassette_path"]:
+            cassette = Cassette(context["cassette_path"], mode="replay", match="loose", latency=context["latency"])
+        else:
+            cassette = Cassette(None, mode="replay", latency=context["latency"], interactions=context["interactions"])
+        set_cassette(cassette)
+
+        from Backend.Utils.gemini_client import get_gemini_client
+        # Import cost is not part of the stage
+        importlib.import_module("Backend.main")
+        importlib.import_module("Utils.batch_eligibility_engine")
+
+        run, check, setup = STAGE_RUNNERS[stage]
+        if setup:
+            setup(mrns, context)
+        gemini_before = _gemini_totals(get_gemini_client().get_stats())
+        cassette_before = cassette.get_stats()
+        wait_before = _limiter_wait_seconds()
+        rss_before = _peak_rss_mb()
+
+        profiles = _start_profiling() if context["profile"] else None
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        output = run(mrns, context)
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        profile_report = _stop_profiling(profiles, context["profile"]) if profiles else None
+
+        gemini_after = _gemini_totals(get_gemini_client().get_stats())
+        cassette_after = cassette.get_stats()
+        wait_after = _limiter_wait_seconds()
+        ok, failure = check(output)
+        connection.send({
+            "ok": ok,
+            "error": None if ok else failure,
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(cpu, 3),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "rss_growth_mb": round(_peak_rss_mb() - rss_before, 1),
+            "gemini": {name: gemini_after[name] - gemini_before[name] for name in gemini_after},
+            "cassette": {name: cassette_after[name] - cassette_before[name]
+                         for name in ("llm_replayed", "http_replayed", "loose_matches", "misses")},
+            "limiter_wait_seconds": {name: round(wait_after[name] - wait_before[name], 3) for name in wait_after},
+            "profile": profile_report,
+        })
+    except Exception as e:
+        import traceback
+        connection.send({"ok": False, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()})
+    finally:
+        connection.close()
+
+
+def run_stage_once(stage, mrns, context):
+    with tempfile.TemporaryDirectory(prefix=f"offline-bench-{stage}-") as tmp_dir:
+        spawn = multiprocessing.get_context("spawn")
+        parent, child = spawn.Pipe(duplex=False)
+        process = spawn.Process(target=stage_process, args=(stage, mrns, dict(context, tmp_dir=tmp_dir), child))
+        process.start()
+        child.close()
+        try:
+            result = parent.recv()
+        except EOFError:
+            result = {"ok": False, "error": f"stage process exited with code {process.exitcode}"}
+        process.join()
+        return result
+
+
+# ----------------------------------------------------------------------
+# Reporting
+# ----------------------------------------------------------------------
+
+METRICS = ("wall_seconds", "cpu_seconds", "peak_rss_mb")
+
+
+def summarize(runs):
+    summary = {"runs": len(runs)}
+    for metric in METRICS + ("rss_growth_mb",):
+        values = [run[metric] for run in runs]
+        summary[metric] = round(statistics.median(values), 3)
+        summary[f"{metric}_min"] = round(min(values), 3)
+    summary["gemini"] = runs[-1]["gemini"]
+    summary["cassette"] = runs[-1]["cassette"]
+    summary["limiter_wait_seconds"] = {
+        name: round(statistics.median(run["limiter_wait_seconds"][name] for run in runs), 3)
+        for name in runs[-1]["limiter_wait_seconds"]
+    }
+    return summary
+
+
+def compare_to_baseline(results, baseline, max_regression):
+    """List of regressions (stage, metric, baseline, current) beyond max_regression."""
+    regressions = []
+    for stage, summary in results.items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        for metric in METRICS:
+            if previous.get(metric) and summary[metric] > previous[metric] * (1 + max_regression):
+                regressions.append((stage, metric, previous[metric], summary[metric]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline pipeline and eligibility benchmark (record/replay cassettes)")
+    parser.add_argument("--stage", action="append", choices=STAGES, help="Stage to run (repeatable, default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage, each in a fresh process (default: 1)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Injected latency per Gemini call")
+    parser.add_argument("--http-latency-ms", type=float, default=0, help="Injected latency per HTTP request")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="Fixture patient set")
+    parser.add_argument("--cassette", help="Replay this recorded cassette instead of the fixtures (requires --mrn)")
+    parser.add_argument("--write-cassette", help="Write the cassette synthesized from the fixtures to this file and exit")
+    parser.add_argument("--mrn", action="append", help="Patients to run (default: all fixture patients)")
+    parser.add_argument("--trials", type=int, help="Trials for the eligibility stage (fixture trials are cycled)")
+    parser.add_argument("--rate-limits", choices=("pinned", "production"), default="pinned",
+                        help="pinned: open the FHIR / Gemini limiters (default); production: keep their rates")
+    parser.add_argument("--eligibility-workers", type=int, default=3, help="BatchEligibilityEngine max_workers")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output of the stage processes")
+    parser.add_argument("--profile", type=int, default=0, metavar="N",
+                        help="Print the top N repo functions of each stage's CPU profile (all threads)")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Previous --json output to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed growth over the baseline before failing (default: 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    with open(args.fixture, "r") as f:
+        fixture = json.load(f)
+
+    interactions = None if args.cassette else build_fixture_interactions(fixture)
+    if args.write_cassette:
+        from Backend.cassettes import Cassette
+        Cassette(args.write_cassette, mode="record", interactions=interactions).save()
+        print(f"Cassette with {len(interactions)} interactions written to {args.write_cassette}")
+        sys.exit(0)
+    if args.cassette and not args.mrn:
+        parser.error("--cassette requires --mrn")
+
+    mrns = args.mrn or [patient["mrn"] for patient in fixture["patients"]]
+    latency = {"llm": args.llm_latency_ms / 1000.0, "http": args.http_latency_ms / 1000.0}
+    context = {
+        "cassette_path": args.cassette,
+        "interactions": interactions,
+        "latency": latency,
+        "trials": fixture_trials(fixture, args.trials),
+        "eligibility_workers": args.eligibility_workers,
+        "rate_limits": args.rate_limits,
+        "verbose": args.verbose,
+        "profile": args.profile,
+    }
+
+    print(f"\n{'='*80}\nOFFLINE BENCHMARK - {len(mrns)} patient(s), {len(context['trials'])} trial(s), "
+          f"latency llm={args.llm_latency_ms:.0f}ms http={args.http_latency_ms:.0f}ms, "
+          f"rate limits {args.rate_limits}\n{'='*80}")
+
+    results = {}
+    failures = []
+    for stage in args.stage or STAGES:
+        runs = []
+        for _ in range(args.repeat):
+            run = run_stage_once(stage, mrns, context)
+            if not run["ok"]:
+                failures.append((stage, run["error"]))
+                print(f"  {stage:<12} FAILED: {run['error']}")
+                if run.get("traceback"):
+                    print(run["traceback"])
+                break
+            runs.append(run)
+        if len(runs) < args.repeat:
+            continue
+        summary = results[stage] = summarize(runs)
+        print(f"  {stage:<12} wall={summary['wall_seconds']:>7.2f}s  cpu={summary['cpu_seconds']:>6.2f}s  "
+              f"peak_rss={summary['peak_rss_mb']:>6.1f}MB (+{summary['rss_growth_mb']:.1f})  "
+              f"gemini_calls={summary['gemini']['calls']:<4} http={summary['cassette']['http_replayed']:<4} "
+              f"tokens={summary['gemini']['prompt_tokens'] + summary['gemini']['output_tokens']}  "
+              f"limiter_wait=fhir {summary['limiter_wait_seconds']['fhir']:.2f}s / "
+              f"gemini {summary['limiter_wait_seconds']['gemini']:.2f}s")
+        if runs[-1].get("profile"):
+            print(runs[-1]["profile"])
+
+    output = {
+        "timestamp": datetime.now().isoformat(),
+        "patients": mrns,
+        "trials": len(context["trials"]),
+        "latency_ms": {"llm": args.llm_latency_ms, "http": args.http_latency_ms},
+        "rate_limits": args.rate_limits,
+        "repeat": args.repeat,
+        "stages": results,
+        "failures": [{"stage": stage, "error": error} for stage, error in failures],
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    exit_code = 1 if failures else 0
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.max_regression)
+        for stage, metric, previous, current in regressions:
+            print(f"  ❌ {stage} {metric}: {previous} -> {current} (+{(current / previous - 1):.0%})")
+        if regressions:
+            exit_code = 1
+        else:
+            print(f"  ✅ No regressions beyond {args.max_regression:.0%} of {args.baseline}")
+    sys.exit(exit_code)